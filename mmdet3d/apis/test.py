@@ -4,9 +4,45 @@ from os import path as osp
 import mmcv
 import torch
 from mmcv.image import tensor2imgs
+from mmcv.runner import get_dist_info
+from torch import distributed as dist
 
+from mmdet3d.datasets import SceneSequentialSampler, SceneStreamDataset
 from mmdet3d.models import (Base3DDetector, Base3DSegmentor,
                             SingleStageMono3DDetector)
+from mmdet.apis import multi_gpu_test as mmdet_multi_gpu_test
+
+
+def is_scene_sequential(data_loader):
+    """Whether a data loader reads its dataset scene by scene.
+
+    Args:
+        data_loader (nn.Dataloader): Pytorch data loader.
+
+    Returns:
+        bool: Whether the data loader uses a :obj:`SceneSequentialSampler`
+            or streams a :obj:`SceneStreamDataset`.
+    """
+    return isinstance(data_loader.dataset, SceneStreamDataset) or \
+        isinstance(getattr(data_loader, 'sampler', None),
+                   SceneSequentialSampler)
+
+
+def restore_scene_order(data_loader, part_list):
+    """Put the results of a scene-sequential data loader in dataset order.
+
+    Args:
+        data_loader (nn.Dataloader): Pytorch data loader.
+        part_list (list[list]): Results produced by each rank.
+
+    Returns:
+        list: Results ordered by dataset index.
+    """
+    dataset = data_loader.dataset
+    if isinstance(dataset, SceneStreamDataset):
+        return dataset.restore_order(part_list, data_loader.num_workers,
+                                     data_loader.batch_size)
+    return data_loader.sampler.restore_order(part_list)
 
 
 def single_gpu_test(model,
@@ -87,4 +123,147 @@ def single_gpu_test(model,
         batch_size = len(result)
         for _ in range(batch_size):
             prog_bar.update()
+    if is_scene_sequential(data_loader):
+        results = restore_scene_order(data_loader, [results])
     return results
+
+
+def multi_gpu_test(model, data_loader, tmpdir=None, gpu_collect=False):
+    """Test model with multiple gpus.
+
+    Data loaders that read the dataset scene by scene produce a different
+    number of results on each rank, which are gathered with
+    ``all_gather_object`` and put back into dataset order. Other data loaders
+    are handled by ``mmdet.apis.multi_gpu_test``.
+
+    Args:
+        model (nn.Module): Model to be tested.
+        data_loader (nn.Dataloader): Pytorch data loader.
+        tmpdir (str, optional): Path of directory to save the temporary
+            results from different gpus under cpu mode. Defaults to None.
+        gpu_collect (bool, optional): Option to use either gpu or cpu to
+            collect results. Defaults to False.
+
+    Returns:
+        list[dict]: The prediction results on rank 0, None on other ranks.
+    """
+    if not is_scene_sequential(data_loader):
+        return mmdet_multi_gpu_test(model, data_loader, tmpdir, gpu_collect)
+
+    model.eval()
+    results = []
+    rank, world_size = get_dist_info()
+    if rank == 0:
+        prog_bar = mmcv.ProgressBar(len(data_loader.dataset))
+    for data in data_loader:
+        with torch.no_grad():
+            result = model(return_loss=False, rescale=True, **data)
+        results.extend(result)
+        if rank == 0:
+            # ranks may read a different number of samples, the progress
+            # is thus estimated from rank 0
+            for _ in range(len(result) * world_size):
+                prog_bar.update()
+
+    part_list = [None for _ in range(world_size)]
+    dist.all_gather_object(part_list, results)
+    if rank != 0:
+        return None
+    return restore_scene_order(data_loader, part_list)
+
+
+def _sampler_indices(data_loader):
+    """Get the dataset index of each sample read by the data loader.
+
+    Samples padded by a :obj:`DistributedSampler` to even the ranks are
+    marked as None so that they are not evaluated twice.
+    """
+    dataset = data_loader.dataset
+    sampler = getattr(data_loader, 'sampler', None)
+    if sampler is None:
+        return list(range(len(dataset)))
+    indices = list(iter(sampler))
+    num_replicas = getattr(sampler, 'num_replicas', 1)
+    rank = getattr(sampler, 'rank', 0)
+    if num_replicas > 1 and not isinstance(sampler, SceneSequentialSampler):
+        # the k-th sample of a rank is at position k * num_replicas + rank
+        # of the padded indices
+        indices = [
+            idx if k * num_replicas + rank < len(dataset) else None
+            for k, idx in enumerate(indices)
+        ]
+    return indices
+
+
+def accumulate_test(model, data_loader, accumulator):
+    """Test model and accumulate the evaluation statistics batch by batch.
+
+    The predictions are matched against the ground truths as soon as they
+    are produced by calling ``dataset.accumulate``, thus they are never
+    gathered. For distributed testing, the accumulators of the ranks are
+    gathered and merged instead, which are much smaller than the results,
+    or all-reduced if they support it.
+
+    Args:
+        model (nn.Module): Model to be tested.
+        data_loader (nn.Dataloader): Pytorch data loader, which should not
+            shuffle the samples.
+        accumulator (object): Accumulator built by
+            ``dataset.build_accumulator``.
+
+    Returns:
+        object: The accumulator merged over all the ranks.
+    """
+    model.eval()
+    dataset = data_loader.dataset
+    assert hasattr(dataset, 'accumulate'), \
+        f'{type(dataset).__name__} does not support accumulated evaluation'
+    indices = _sampler_indices(data_loader)
+    rank, world_size = get_dist_info()
+    if rank == 0:
+        prog_bar = mmcv.ProgressBar(len(dataset))
+    pos = 0
+    for data in data_loader:
+        with torch.no_grad():
+            result = model(return_loss=False, rescale=True, **data)
+        batch_size = len(result)
+        batch_indices = indices[pos:pos + batch_size]
+        pos += batch_size
+        pairs = [(idx, res) for idx, res in zip(batch_indices, result)
+                 if idx is not None]
+        if len(pairs) > 0:
+            batch_indices, result = zip(*pairs)
+            dataset.accumulate(accumulator, list(result), list(batch_indices))
+        if rank == 0:
+            for _ in range(batch_size * world_size):
+                prog_bar.update()
+
+    return reduce_accumulator(accumulator)
+
+
+def reduce_accumulator(accumulator):
+    """Reduce the evaluation statistics accumulated by each rank.
+
+    Each rank only matches its own predictions, so only the statistics are
+    communicated. Fixed-size statistics are all-reduced in place if the
+    accumulator supports it, otherwise the accumulators of all the ranks are
+    gathered and merged. It works with any backend supporting the
+    collectives, e.g. gloo for CPU processes.
+
+    Args:
+        accumulator (object): Accumulator of the current rank, with a
+            ``merge`` or an ``all_reduce`` method.
+
+    Returns:
+        object: The accumulator merged over all the ranks.
+    """
+    _, world_size = get_dist_info()
+    if world_size == 1:
+        return accumulator
+    if hasattr(accumulator, 'all_reduce'):
+        # fixed-size statistics are summed in place
+        accumulator.all_reduce()
+        return accumulator
+    accumulators = [None for _ in range(world_size)]
+    dist.all_gather_object(accumulators, accumulator)
+    return accumulators[0].merge(accumulators[1:])
@@ -11,7 +11,8 @@ from mmcv.runner import (HOOKS, DistSamplerSeedHook, EpochBasedRunner,
 from mmcv.utils import build_from_cfg
 from torch import distributed as dist
 
-from mmdet3d.datasets import build_dataset
+from mmdet3d.core import SetDatasetEpochHook
+from mmdet3d.datasets import build_dataloader, build_dataset
 from mmdet3d.utils import find_latest_checkpoint
 from mmdet.core import DistEvalHook as MMDET_DistEvalHook
 from mmdet.core import EvalHook as MMDET_EvalHook
@@ -205,7 +206,7 @@ def train_detector(model,
     runner_type = 'EpochBasedRunner' if 'runner' not in cfg else cfg.runner[
         'type']
     data_loaders = [
-        build_mmdet_dataloader(
+        build_dataloader(
             ds,
             cfg.data.samples_per_gpu,
             cfg.data.workers_per_gpu,
@@ -214,7 +215,8 @@ def train_detector(model,
             dist=distributed,
             seed=cfg.seed,
             runner_type=runner_type,
-            persistent_workers=cfg.data.get('persistent_workers', False))
+            persistent_workers=cfg.data.get('persistent_workers', False),
+            packed_collate=cfg.data.get('packed_collate', False))
         for ds in dataset
     ]
 
@@ -282,6 +284,11 @@ def train_detector(model,
         if isinstance(runner, EpochBasedRunner):
             runner.register_hook(DistSamplerSeedHook())
 
+    # resample the datasets such as CBGSDataset at every epoch
+    if any(hasattr(ds, 'set_epoch') for ds in dataset) and not any(
+            isinstance(hook, SetDatasetEpochHook) for hook in runner.hooks):
+        runner.register_hook(SetDatasetEpochHook())
+
     # register eval hooks
     if validate:
         # Support batch_size > 1 in validation
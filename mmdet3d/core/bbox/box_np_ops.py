@@ -7,7 +7,8 @@
 import numba
 import numpy as np
 
-from .structures.utils import limit_period, points_cam2img, rotation_3d_in_axis
+from .projection import depth_map_to_points, points_img_bbox, points_in_image
+from .structures.utils import limit_period, rotation_3d_in_axis
 
 
 def camera_to_lidar(points, r_rect, velo2cam):
@@ -160,12 +161,8 @@ def depth_to_lidar_points(depth, trunc_pixel, P2, r_rect, velo2cam):
     Returns:
         np.ndarray: Points in lidar coordinates.
     """
-    pts = depth_to_points(depth, trunc_pixel)
-    points_shape = list(pts.shape[0:-1])
-    points = np.concatenate([pts, np.ones(points_shape + [1])], axis=-1)
-    points = points @ np.linalg.inv(P2.T)
-    lidar_points = camera_to_lidar(points, r_rect, velo2cam)
-    return lidar_points
+    return depth_map_to_points(
+        depth, P2 @ r_rect @ velo2cam, trunc_pixel=trunc_pixel)
 
 
 def center_to_corner_box3d(centers,
@@ -320,12 +317,7 @@ def box3d_to_bbox(box3d, P2):
     """
     box_corners = center_to_corner_box3d(
         box3d[:, :3], box3d[:, 3:6], box3d[:, 6], [0.5, 1.0, 0.5], axis=1)
-    box_corners_in_image = points_cam2img(box_corners, P2)
-    # box_corners_in_image: [N, 8, 2]
-    minxy = np.min(box_corners_in_image, axis=1)
-    maxxy = np.max(box_corners_in_image, axis=1)
-    bbox = np.concatenate([minxy, maxxy], axis=1)
-    return bbox
+    return points_img_bbox(box_corners, P2)
 
 
 def corner_to_surfaces_3d(corners):
@@ -568,17 +560,9 @@ def remove_outside_points(points, rect, Trv2c, P2, image_shape):
     Returns:
         np.ndarray, shape=[N, 3+dims]: Filtered points.
     """
-    # 5x faster than remove_outside_points_v1(2ms vs 10ms)
-    C, R, T = projection_matrix_to_CRT_kitti(P2)
-    image_bbox = [0, 0, image_shape[1], image_shape[0]]
-    frustum = get_frustum(image_bbox, C)
-    frustum -= T
-    frustum = np.linalg.inv(R) @ frustum.T
-    frustum = camera_to_lidar(frustum.T, rect, Trv2c)
-    frustum_surfaces = corner_to_surfaces_3d_jit(frustum[np.newaxis, ...])
-    indices = points_in_convex_polygon_3d_jit(points[:, :3], frustum_surfaces)
-    points = points[indices.reshape([-1])]
-    return points
+    # the points are projected instead of tested against the surfaces of
+    # the frustum of the image, see :func:`points_in_image`
+    return points[points_in_image(points, P2 @ rect @ Trv2c, image_shape)]
 
 
 def get_frustum(bbox_image, C, near_clip=0.001, far_clip=100):
@@ -0,0 +1,199 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import numpy as np
+import torch
+
+
+def _as_type_of(array, template, dtype=None):
+    """Convert an array to the type, dtype and device of a template."""
+    if isinstance(template, torch.Tensor):
+        return torch.as_tensor(
+            array, dtype=dtype or template.dtype, device=template.device)
+    if isinstance(array, torch.Tensor):
+        array = array.cpu().numpy()
+    return np.asarray(array, dtype=dtype or template.dtype)
+
+
+def _transpose(matrix):
+    """Transpose the last two dimensions of a batch of matrices."""
+    if isinstance(matrix, torch.Tensor):
+        return matrix.transpose(-1, -2)
+    return np.swapaxes(matrix, -1, -2)
+
+
+def _cat(arrays, axis=-1):
+    if isinstance(arrays[0], torch.Tensor):
+        return torch.cat(arrays, dim=axis)
+    return np.concatenate(arrays, axis=axis)
+
+
+def project_points_homo(points, proj_mat):
+    """Project points with a projection matrix in homogeneous coordinates.
+
+    The points are multiplied with the rotation part of the matrix and
+    shifted by its translation part, without building the homogeneous
+    points of shape (N, 4).
+
+    Args:
+        points (np.ndarray | torch.Tensor): Points of shape (..., N, 3+),
+            only the first 3 dimensions are projected.
+        proj_mat (np.ndarray | torch.Tensor): Projection matrices of shape
+            (..., 3, 3), (..., 3, 4) or (..., 4, 4), broadcast with the
+            points, e.g. of shape (num_cams, 4, 4) to project the points
+            of shape (N, 3) into several images at once.
+
+    Returns:
+        np.ndarray | torch.Tensor: Projected points of shape (..., N, 3),
+            the image coordinates multiplied by the depth and the depth,
+            of the type and dtype of the points.
+    """
+    proj_mat = _as_type_of(proj_mat, points)
+    assert proj_mat.shape[-2] in (3, 4) and proj_mat.shape[-1] in (3, 4), \
+        f'The shape of the projection matrix {proj_mat.shape} is not ' \
+        'supported.'
+    pts_img = points[..., :3] @ _transpose(proj_mat[..., :3, :3])
+    if proj_mat.shape[-1] == 4:
+        pts_img = pts_img + proj_mat[..., None, :3, 3]
+    return pts_img
+
+
+def project_points(points, proj_mat, with_depth=False, min_depth=None):
+    """Project points to the image coordinates.
+
+    It is a batched counterpart of :func:`points_cam2img`, which keeps the
+    type and dtype of the points, e.g. float32 arrays or tensors on GPU.
+
+    Args:
+        points (np.ndarray | torch.Tensor): Points of shape (..., N, 3+).
+        proj_mat (np.ndarray | torch.Tensor): Projection matrices of shape
+            (..., 3, 3), (..., 3, 4) or (..., 4, 4).
+        with_depth (bool, optional): Whether to keep the depth in the
+            output. Defaults to False.
+        min_depth (float, optional): Depth the points are clipped to before
+            dividing their coordinates, e.g. for the points behind the
+            camera. Defaults to None.
+
+    Returns:
+        np.ndarray | torch.Tensor: Points in image coordinates of shape
+            (..., N, 2), or (..., N, 3) if ``with_depth``.
+    """
+    pts_img = project_points_homo(points, proj_mat)
+    depth = pts_img[..., 2:3]
+    if min_depth is not None:
+        depth = depth.clip(min=min_depth)
+    uv = pts_img[..., :2] / depth
+    if with_depth:
+        return _cat([uv, pts_img[..., 2:3]])
+    return uv
+
+
+def points_in_image(points,
+                    proj_mat,
+                    image_shape,
+                    near_clip=0.001,
+                    far_clip=100):
+    """Find the points which are projected inside an image.
+
+    It is equivalent to testing the points against the frustum of the
+    image, but the pixel coordinates are compared with the image bounds
+    scaled by the depth, which avoids dividing them.
+
+    Args:
+        points (np.ndarray | torch.Tensor): Points of shape (..., N, 3+).
+        proj_mat (np.ndarray | torch.Tensor): Projection matrices from the
+            points to the images of shape (..., 3, 4) or (..., 4, 4), e.g.
+            ``P2 @ R0_rect @ Tr_velo_to_cam`` for KITTI.
+        image_shape (tuple[int]): Height and width of the images.
+        near_clip (float, optional): Nearest depth of the points.
+            Defaults to 0.001.
+        far_clip (float, optional): Farthest depth of the points.
+            Defaults to 100.
+
+    Returns:
+        np.ndarray | torch.Tensor: Whether each point is inside the image,
+            of shape (..., N).
+    """
+    pts_img = project_points_homo(points, proj_mat)
+    u, v, depth = pts_img[..., 0], pts_img[..., 1], pts_img[..., 2]
+    mask = (depth >= near_clip) & (depth <= far_clip)
+    mask &= (u >= 0) & (v >= 0)
+    mask &= u <= depth * image_shape[1]
+    mask &= v <= depth * image_shape[0]
+    return mask
+
+
+def unproject_points(points, proj_mat):
+    """Project points in image coordinates with their depth back.
+
+    Args:
+        points (np.ndarray | torch.Tensor): Points of shape (..., N, 3),
+            the image coordinates multiplied by the depth and the depth.
+        proj_mat (np.ndarray | torch.Tensor): Invertible projection matrices
+            of shape (..., 3, 3) or (..., 4, 4), the last row of the latter
+            being (0, 0, 0, 1).
+
+    Returns:
+        np.ndarray | torch.Tensor: Points of shape (..., N, 3) in the
+            coordinates projected by ``proj_mat``.
+    """
+    # the inverse is computed in double precision, even for float32 points
+    if isinstance(points, torch.Tensor):
+        inv_mat = torch.inverse(
+            torch.as_tensor(
+                proj_mat, dtype=torch.float64, device=points.device))
+    else:
+        if isinstance(proj_mat, torch.Tensor):
+            proj_mat = proj_mat.cpu().numpy()
+        inv_mat = np.linalg.inv(np.asarray(proj_mat, dtype=np.float64))
+    return project_points_homo(points, _as_type_of(inv_mat, points))
+
+
+def depth_map_to_points(depth, proj_mat, min_depth=0.1, trunc_pixel=0):
+    """Convert a depth map to points.
+
+    Args:
+        depth (np.ndarray | torch.Tensor): Depth map of shape (H, W).
+        proj_mat (np.ndarray | torch.Tensor): Invertible projection matrix
+            to the image of shape (3, 3) or (4, 4), see
+            :func:`unproject_points`.
+        min_depth (float, optional): Pixels with a smaller depth are
+            ignored. Defaults to 0.1.
+        trunc_pixel (int, optional): Number of truncated rows at the top of
+            the depth map. Defaults to 0.
+
+    Returns:
+        np.ndarray | torch.Tensor: Points of shape (N, 3) in the coordinates
+            projected by ``proj_mat``, in the row-major order of the pixels.
+    """
+    if isinstance(depth, torch.Tensor):
+        v, u = torch.nonzero(depth[trunc_pixel:] > min_depth, as_tuple=True)
+        stack = torch.stack
+    else:
+        v, u = np.nonzero(depth[trunc_pixel:] > min_depth)
+        stack = np.stack
+    v = v + trunc_pixel
+    d = depth[v, u]
+    pts_img = stack([_as_type_of(u, depth) * d,
+                     _as_type_of(v, depth) * d, d], -1)
+    return unproject_points(pts_img, proj_mat)
+
+
+def points_img_bbox(points, proj_mat, min_depth=None):
+    """Get the image boxes enclosing sets of projected points, e.g. the
+    corners of 3D boxes.
+
+    Args:
+        points (np.ndarray | torch.Tensor): Sets of points of shape
+            (..., M, 3).
+        proj_mat (np.ndarray | torch.Tensor): Projection matrices of shape
+            (..., 3, 3), (..., 3, 4) or (..., 4, 4).
+        min_depth (float, optional): Depth the points are clipped to before
+            dividing their coordinates. Defaults to None.
+
+    Returns:
+        np.ndarray | torch.Tensor: Boxes of shape (..., 4) in the format of
+            (x1, y1, x2, y2).
+    """
+    uv = project_points(points, proj_mat, min_depth=min_depth)
+    if isinstance(uv, torch.Tensor):
+        return torch.cat([uv.min(dim=-2)[0], uv.max(dim=-2)[0]], dim=-1)
+    return np.concatenate([uv.min(axis=-2), uv.max(axis=-2)], axis=-1)
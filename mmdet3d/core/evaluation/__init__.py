@@ -1,11 +1,17 @@
 # Copyright (c) OpenMMLab. All rights reserved.
-from .indoor_eval import indoor_eval
+from .indoor_eval import IndoorEvalAccumulator, indoor_eval
 from .instance_seg_eval import instance_seg_eval
-from .kitti_utils import kitti_eval, kitti_eval_coco_style
+from .kitti_utils import (KittiEvalAccumulator, kitti_eval,
+                          kitti_eval_coco_style)
 from .lyft_eval import lyft_eval
-from .seg_eval import seg_eval
+from .nuscenes_eval import (NuScenesEvalAccumulator, build_nuscenes_gts,
+                            nuscenes_eval)
+from .seg_eval import SegEvalAccumulator, seg_eval
+from .waymo_eval import waymo_eval
 
 __all__ = [
     'kitti_eval_coco_style', 'kitti_eval', 'indoor_eval', 'lyft_eval',
-    'seg_eval', 'instance_seg_eval'
+    'seg_eval', 'instance_seg_eval', 'KittiEvalAccumulator',
+    'IndoorEvalAccumulator', 'nuscenes_eval', 'build_nuscenes_gts',
+    'waymo_eval', 'SegEvalAccumulator', 'NuScenesEvalAccumulator'
 ]
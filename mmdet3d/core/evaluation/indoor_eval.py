@@ -53,13 +53,46 @@ def average_precision(recalls, precisions, mode='area'):
     return ap
 
 
+def greedy_match(ious, iou_thr):
+    """Greedily match the detections sorted by descending score.
+
+    Each detection is compared with its most overlapping ground truth only.
+    It is a true positive if the IoU is above the threshold and no detection
+    before it was matched to the same ground truth, which is found with the
+    first occurrence of each ground truth among the candidates instead of
+    going down the detections one by one.
+
+    Args:
+        ious (np.ndarray | tuple[np.ndarray]): IoUs of shape (N, M) between
+            the sorted detections and the ground truths, or a tuple of the
+            maximum IoU and the index of the matched ground truth of each
+            detection.
+        iou_thr (list[float]): A list of iou thresholds.
+
+    Returns:
+        np.ndarray: Whether the detections are true positives, of shape
+            (N, len(iou_thr)).
+    """
+    if isinstance(ious, tuple):
+        iou_max, jmax = ious
+    else:
+        jmax = ious.argmax(axis=1)
+        iou_max = ious[np.arange(len(jmax)), jmax]
+    tp = np.zeros((len(jmax), len(iou_thr)), dtype=bool)
+    for iou_idx, thresh in enumerate(iou_thr):
+        cand = np.nonzero(iou_max > thresh)[0]
+        _, first = np.unique(jmax[cand], return_index=True)
+        tp[cand[first], iou_idx] = True
+    return tp
+
+
 def eval_det_cls(pred, gt, iou_thr=None):
     """Generic functions to compute precision/recall for object detection for a
     single class.
 
     Args:
-        pred (dict): Predictions mapping from image id to bounding boxes
-            and scores.
+        pred (dict): Predictions mapping from image id to a tuple of the
+            bounding boxes and the scores of the image.
         gt (dict): Ground truths mapping from image id to bounding boxes.
         iou_thr (list[float]): A list of iou thresholds.
 
@@ -67,90 +100,49 @@ def eval_det_cls(pred, gt, iou_thr=None):
         tuple (np.ndarray, np.ndarray, float): Recalls, precisions and
             average precision.
     """
-
-    # {img_id: {'bbox': box structure, 'det': matched list}}
-    class_recs = {}
+    # index of the first ground truth of each image among all the images
+    gt_offsets = {}
     npos = 0
-    for img_id in gt.keys():
-        cur_gt_num = len(gt[img_id])
-        if cur_gt_num != 0:
-            gt_cur = torch.zeros([cur_gt_num, 7], dtype=torch.float32)
-            for i in range(cur_gt_num):
-                gt_cur[i] = gt[img_id][i].tensor
-            bbox = gt[img_id][0].new_box(gt_cur)
-        else:
-            bbox = gt[img_id]
-        det = [[False] * len(bbox) for i in iou_thr]
+    for img_id, bbox in gt.items():
+        gt_offsets[img_id] = npos
         npos += len(bbox)
-        class_recs[img_id] = {'bbox': bbox, 'det': det}
 
-    # construct dets
-    image_ids = []
+    # match each detection to its most overlapping ground truth, computing
+    # the iou of all the boxes of an image at once
     confidence = []
-    ious = []
-    for img_id in pred.keys():
-        cur_num = len(pred[img_id])
+    iou_max = []
+    jmax = []
+    for img_id, (pred_cur, scores) in pred.items():
+        cur_num = len(scores)
         if cur_num == 0:
             continue
-        pred_cur = torch.zeros((cur_num, 7), dtype=torch.float32)
-        box_idx = 0
-        for box, score in pred[img_id]:
-            image_ids.append(img_id)
-            confidence.append(score)
-            pred_cur[box_idx] = box.tensor
-            box_idx += 1
-        pred_cur = box.new_box(pred_cur)
-        gt_cur = class_recs[img_id]['bbox']
+        confidence.append(scores)
+        gt_cur = gt[img_id]
         if len(gt_cur) > 0:
-            # calculate iou in each image
-            iou_cur = pred_cur.overlaps(pred_cur, gt_cur)
-            for i in range(cur_num):
-                ious.append(iou_cur[i])
+            iou_cur = pred_cur.overlaps(pred_cur, gt_cur).numpy()
+            jmax_cur = iou_cur.argmax(axis=1)
+            iou_max.append(iou_cur[np.arange(cur_num), jmax_cur])
+            jmax.append(jmax_cur + gt_offsets[img_id])
         else:
-            for i in range(cur_num):
-                ious.append(np.zeros(1))
-
-    confidence = np.array(confidence)
+            iou_max.append(np.zeros(cur_num))
+            jmax.append(np.full(cur_num, -1))
+    if len(confidence) == 0:
+        confidence = iou_max = np.zeros(0)
+        jmax = np.zeros(0, dtype=np.int64)
+    else:
+        confidence = np.concatenate(confidence)
+        iou_max = np.concatenate(iou_max)
+        jmax = np.concatenate(jmax)
 
-    # sort by confidence
+    # sort by confidence and mark TPs and FPs
     sorted_ind = np.argsort(-confidence)
-    image_ids = [image_ids[x] for x in sorted_ind]
-    ious = [ious[x] for x in sorted_ind]
-
-    # go down dets and mark TPs and FPs
-    nd = len(image_ids)
-    tp_thr = [np.zeros(nd) for i in iou_thr]
-    fp_thr = [np.zeros(nd) for i in iou_thr]
-    for d in range(nd):
-        R = class_recs[image_ids[d]]
-        iou_max = -np.inf
-        BBGT = R['bbox']
-        cur_iou = ious[d]
-
-        if len(BBGT) > 0:
-            # compute overlaps
-            for j in range(len(BBGT)):
-                # iou = get_iou_main(get_iou_func, (bb, BBGT[j,...]))
-                iou = cur_iou[j]
-                if iou > iou_max:
-                    iou_max = iou
-                    jmax = j
-
-        for iou_idx, thresh in enumerate(iou_thr):
-            if iou_max > thresh:
-                if not R['det'][iou_idx][jmax]:
-                    tp_thr[iou_idx][d] = 1.
-                    R['det'][iou_idx][jmax] = 1
-                else:
-                    fp_thr[iou_idx][d] = 1.
-            else:
-                fp_thr[iou_idx][d] = 1.
+    tp_thr = greedy_match((iou_max[sorted_ind], jmax[sorted_ind]), iou_thr)
 
     ret = []
     for iou_idx, thresh in enumerate(iou_thr):
         # compute precision recall
-        fp = np.cumsum(fp_thr[iou_idx])
-        tp = np.cumsum(tp_thr[iou_idx])
+        fp = np.cumsum(~tp_thr[:, iou_idx])
+        tp = np.cumsum(tp_thr[:, iou_idx])
         recall = tp / float(npos)
         # avoid divide by zero in case the first detection matches a difficult
         # ground truth
@@ -229,24 +221,22 @@ def indoor_eval(gt_annos,
         dict[str, float]: Dict of results.
     """
     assert len(dt_annos) == len(gt_annos)
-    pred = {}  # map {class_id: pred}
-    gt = {}  # map {class_id: gt}
+    pred = {}  # map {class_id: {img_id: (boxes, scores)}}
+    gt = {}  # map {class_id: {img_id: boxes}}
     for img_id in range(len(dt_annos)):
         # parse detected annotations
         det_anno = dt_annos[img_id]
-        for i in range(len(det_anno['labels_3d'])):
-            label = det_anno['labels_3d'].numpy()[i]
-            bbox = det_anno['boxes_3d'].convert_to(box_mode_3d)[i]
-            score = det_anno['scores_3d'].numpy()[i]
-            if label not in pred:
-                pred[int(label)] = {}
-            if img_id not in pred[label]:
-                pred[int(label)][img_id] = []
-            if label not in gt:
-                gt[int(label)] = {}
-            if img_id not in gt[label]:
-                gt[int(label)][img_id] = []
-            pred[int(label)][img_id].append((bbox, score))
+        labels = det_anno['labels_3d'].numpy()
+        if len(labels) > 0:
+            boxes = det_anno['boxes_3d'].convert_to(box_mode_3d)
+            scores = det_anno['scores_3d'].numpy()
+        # classes in order of appearance
+        _, first = np.unique(labels, return_index=True)
+        for label in labels[np.sort(first)]:
+            mask = labels == label
+            bbox = boxes.new_box(boxes.tensor[torch.from_numpy(mask)][:, :7])
+            pred.setdefault(int(label), {})[img_id] = (bbox, scores[mask])
+            gt.setdefault(int(label), {})[img_id] = []
 
         # parse gt annotations
         gt_anno = gt_annos[img_id]
@@ -255,21 +245,34 @@ def indoor_eval(gt_annos,
                 gt_anno['gt_boxes_upright_depth'],
                 box_dim=gt_anno['gt_boxes_upright_depth'].shape[-1],
                 origin=(0.5, 0.5, 0.5)).convert_to(box_mode_3d)
-            labels_3d = gt_anno['class']
+            labels_3d = np.asarray(gt_anno['class'])
         else:
-            gt_boxes = box_type_3d(np.array([], dtype=np.float32))
             labels_3d = np.array([], dtype=np.int64)
 
-        for i in range(len(labels_3d)):
-            label = labels_3d[i]
-            bbox = gt_boxes[i]
-            if label not in gt:
-                gt[label] = {}
-            if img_id not in gt[label]:
-                gt[label][img_id] = []
-            gt[label][img_id].append(bbox)
+        _, first = np.unique(labels_3d, return_index=True)
+        for label in labels_3d[np.sort(first)]:
+            mask = torch.from_numpy(labels_3d == label)
+            gt.setdefault(label, {})[img_id] = gt_boxes.new_box(
+                gt_boxes.tensor[mask][:, :7])
 
     rec, prec, ap = eval_map_recall(pred, gt, metric)
+    return indoor_eval_summary(rec, ap, metric, label2cat, logger=logger)
+
+
+def indoor_eval_summary(rec, ap, metric, label2cat, logger=None):
+    """Summarize the indoor recalls and APs into a table and a dict.
+
+    Args:
+        rec (list[dict]): Recalls of each class for each IoU threshold.
+        ap (list[dict]): APs of each class for each IoU threshold.
+        metric (list[float]): IoU thresholds.
+        label2cat (dict): Map from label to category.
+        logger (logging.Logger | str, optional): The way to print the mAP
+            summary. See `mmdet.utils.print_log()` for details. Default: None.
+
+    Return:
+        dict[str, float]: Dict of results.
+    """
     ret_dict = dict()
     header = ['classes']
     table_columns = [[label2cat[label]
@@ -307,3 +310,146 @@ def indoor_eval(gt_annos,
     print_log('\n' + table.table, logger=logger)
 
     return ret_dict
+
+
+class IndoorEvalAccumulator(object):
+    """Accumulate the indoor evaluation statistics batch by batch.
+
+    The detections of a scene are only matched against the ground truths of
+    the same scene, in descending score order, so each batch can be matched
+    right away. Only the scores and the true positive flags of the
+    detections and the number of ground truths of each class are kept, from
+    which the same recalls and APs as :func:`indoor_eval` are computed.
+
+    Accumulators filled by several ranks can be merged with :meth:`merge`.
+
+    Args:
+        metric (list[float]): IoU thresholds for computing average precisions.
+        label2cat (dict): Map from label to category.
+        box_type_3d (:obj:`BaseInstance3DBoxes`, optional): Type of the
+            ground truth boxes. Default: None.
+        box_mode_3d (:obj:`Box3DMode`, optional): Mode in which the boxes
+            are matched. Default: None.
+    """
+
+    def __init__(self, metric, label2cat, box_type_3d=None, box_mode_3d=None):
+        self.metric = list(metric)
+        self.label2cat = label2cat
+        self.box_type_3d = box_type_3d
+        self.box_mode_3d = box_mode_3d
+        # number of ground truths of each class, in order of appearance
+        self.npos = {}
+        self.scores = {}
+        self.tps = {}
+
+    def _match(self, pred_boxes, scores, gt_boxes):
+        """Match the detections of a class in a scene.
+
+        Returns:
+            tuple[np.ndarray]: Scores of the detections in descending order
+                and whether they are true positives at each IoU threshold.
+        """
+        order = np.argsort(-scores)
+        if len(gt_boxes) > 0:
+            ious = pred_boxes.overlaps(pred_boxes, gt_boxes).numpy()[order]
+            tp = greedy_match(ious, self.metric)
+        else:
+            tp = np.zeros((len(order), len(self.metric)), dtype=bool)
+        return scores[order], tp
+
+    def update(self, gt_annos, dt_annos):
+        """Match a batch of predictions against their ground truths.
+
+        Args:
+            gt_annos (list[dict]): Ground truth annotations.
+            dt_annos (list[dict]): Detection annotations, see
+                :func:`indoor_eval`.
+        """
+        assert len(dt_annos) == len(gt_annos)
+        for gt_anno, det_anno in zip(gt_annos, dt_annos):
+            labels = det_anno['labels_3d'].numpy()
+            scores = det_anno['scores_3d'].numpy()
+            boxes = det_anno['boxes_3d'].convert_to(self.box_mode_3d)
+            if gt_anno['gt_num'] != 0:
+                gt_boxes = self.box_type_3d(
+                    gt_anno['gt_boxes_upright_depth'],
+                    box_dim=gt_anno['gt_boxes_upright_depth'].shape[-1],
+                    origin=(0.5, 0.5, 0.5)).convert_to(self.box_mode_3d)
+                gt_labels = np.asarray(gt_anno['class'])
+            else:
+                gt_boxes = None
+                gt_labels = np.array([], dtype=np.int64)
+
+            for label in list(labels) + list(gt_labels):
+                self.npos.setdefault(int(label), 0)
+            for label in gt_labels:
+                self.npos[int(label)] += 1
+            for label in np.unique(labels):
+                mask = labels == label
+                pred_boxes = boxes.new_box(
+                    boxes.tensor[torch.from_numpy(mask)][:, :7])
+                gt_mask = gt_labels == label
+                if gt_mask.any():
+                    cur_gt_boxes = gt_boxes.new_box(
+                        gt_boxes.tensor[torch.from_numpy(gt_mask)][:, :7])
+                else:
+                    cur_gt_boxes = []
+                cur_scores, tp = self._match(pred_boxes, scores[mask],
+                                             cur_gt_boxes)
+                self.scores.setdefault(int(label), []).append(cur_scores)
+                self.tps.setdefault(int(label), []).append(tp)
+
+    def merge(self, others):
+        """Merge the statistics of other accumulators, e.g. of other ranks.
+
+        Args:
+            others (list[:obj:`IndoorEvalAccumulator`]): Accumulators with
+                the same IoU thresholds.
+
+        Returns:
+            :obj:`IndoorEvalAccumulator`: The merged accumulator itself.
+        """
+        for other in others:
+            if other is self:
+                continue
+            assert other.metric == self.metric, \
+                'can only merge accumulators of the same IoU thresholds'
+            for label, npos in other.npos.items():
+                self.npos[label] = self.npos.get(label, 0) + npos
+            for label in other.scores:
+                self.scores.setdefault(label, []).extend(other.scores[label])
+                self.tps.setdefault(label, []).extend(other.tps[label])
+        return self
+
+    def evaluate(self, logger=None):
+        """Compute the recalls and APs from the accumulated statistics.
+
+        Args:
+            logger (logging.Logger | str, optional): The way to print the mAP
+                summary. See `mmdet.utils.print_log()` for details.
+                Default: None.
+
+        Return:
+            dict[str, float]: Dict of results.
+        """
+        recall = [{} for _ in self.metric]
+        ap = [{} for _ in self.metric]
+        for label, npos in self.npos.items():
+            if label not in self.scores:
+                for iou_idx in range(len(self.metric)):
+                    recall[iou_idx][label] = np.zeros(1)
+                    ap[iou_idx][label] = np.zeros(1)
+                continue
+            scores = np.concatenate(self.scores[label])
+            tps = np.concatenate(self.tps[label])[np.argsort(-scores)]
+            for iou_idx in range(len(self.metric)):
+                tp = np.cumsum(tps[:, iou_idx])
+                fp = np.cumsum(~tps[:, iou_idx])
+                rec = tp / float(npos)
+                # avoid divide by zero in case the first detection matches a
+                # difficult ground truth
+                prec = tp / np.maximum(tp + fp, np.finfo(np.float64).eps)
+                recall[iou_idx][label] = rec
+                ap[iou_idx][label] = average_precision(rec, prec)
+        return indoor_eval_summary(
+            recall, ap, self.metric, self.label2cat, logger=logger)
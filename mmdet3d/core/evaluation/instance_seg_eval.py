@@ -3,7 +3,7 @@ import numpy as np
 from mmcv.utils import print_log
 from terminaltables import AsciiTable
 
-from .scannet_utils.evaluate_semantic_instance import scannet_eval
+from .scannet_utils.evaluate_semantic_instance import scannet_eval_encoded
 
 
 def aggregate_predictions(masks, labels, scores, valid_class_ids):
@@ -29,13 +29,42 @@ def aggregate_predictions(masks, labels, scores, valid_class_ids):
             # match pred_instance['filename'] from assign_instances_for_scan
             file_name = f'{id}_{i}'
             info[file_name] = dict()
-            info[file_name]['mask'] = (mask == i).astype(np.int)
+            info[file_name]['mask'] = (mask == i).astype(np.int64)
             info[file_name]['label_id'] = valid_class_ids[label[i]]
             info[file_name]['conf'] = score[i]
         infos.append(info)
     return infos
 
 
+def encode_predictions(masks, labels, scores, valid_class_ids):
+    """Maps predictions to the label-encoded format of
+    :func:`scannet_eval_encoded`.
+
+    Unlike :func:`aggregate_predictions`, the instance masks are kept as
+    the instance id of each point instead of a dense mask per instance.
+
+    Args:
+        masks (list[torch.Tensor]): Per scene predicted instance masks.
+        labels (list[torch.Tensor]): Per scene predicted instance labels.
+        scores (list[torch.Tensor]): Per scene predicted instance scores.
+        valid_class_ids (tuple[int]): Ids of valid categories.
+
+    Returns:
+        list[dict]: Per scene predictions.
+    """
+    valid_class_ids = np.array(valid_class_ids)
+    infos = []
+    for mask, label, score in zip(masks, labels, scores):
+        mask = mask.clone().numpy()
+        n_instances = max(mask.max(initial=-1) + 1, 0)
+        infos.append(
+            dict(
+                mask=mask,
+                label_id=valid_class_ids[label.numpy()[:n_instances]],
+                conf=score.clone().numpy()[:n_instances]))
+    return infos
+
+
 def rename_gt(gt_semantic_masks, gt_instance_masks, valid_class_ids):
     """Maps gt instance and semantic masks to instance masks for ScanNet
     evaluator.
@@ -48,22 +77,24 @@ def rename_gt(gt_semantic_masks, gt_instance_masks, valid_class_ids):
     Returns:
         list[np.array]: Per scene instance masks.
     """
+    valid_class_ids = np.array(valid_class_ids)
     renamed_instance_masks = []
     for semantic_mask, instance_mask in zip(gt_semantic_masks,
                                             gt_instance_masks):
         semantic_mask = semantic_mask.clone().numpy()
         instance_mask = instance_mask.clone().numpy()
-        unique = np.unique(instance_mask)
+        unique, first, inverse = np.unique(
+            instance_mask, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
         assert len(unique) < 1000
-        for i in unique:
-            semantic_instance = semantic_mask[instance_mask == i]
-            semantic_unique = np.unique(semantic_instance)
-            assert len(semantic_unique) == 1
-            if semantic_unique[0] < len(valid_class_ids):
-                instance_mask[
-                    instance_mask ==
-                    i] = 1000 * valid_class_ids[semantic_unique[0]] + i
-        renamed_instance_masks.append(instance_mask)
+        # each instance has a single semantic label
+        semantic_unique = semantic_mask[first]
+        assert np.all(semantic_mask == semantic_unique[inverse])
+        renamed = unique.copy()
+        valid = semantic_unique < len(valid_class_ids)
+        renamed[valid] = \
+            1000 * valid_class_ids[semantic_unique[valid]] + unique[valid]
+        renamed_instance_masks.append(renamed[inverse])
     return renamed_instance_masks
 
 
@@ -75,7 +106,8 @@ def instance_seg_eval(gt_semantic_masks,
                       valid_class_ids,
                       class_labels,
                       options=None,
-                      logger=None):
+                      logger=None,
+                      nproc=1):
     """Instance Segmentation Evaluation.
 
     Evaluate the result of the instance segmentation.
@@ -93,6 +125,8 @@ def instance_seg_eval(gt_semantic_masks,
             `distance_confs`. Default: None.
         logger (logging.Logger | str, optional): The way to print the mAP
             summary. See `mmdet.utils.print_log()` for details. Default: None.
+        nproc (int, optional): Number of processes used to match the
+            instances of the scenes. Default: 1.
 
     Returns:
         dict[str, float]: Dict of results.
@@ -102,19 +136,20 @@ def instance_seg_eval(gt_semantic_masks,
         valid_class_ids[i]: class_labels[i]
         for i in range(len(valid_class_ids))
     }
-    preds = aggregate_predictions(
+    preds = encode_predictions(
         masks=pred_instance_masks,
         labels=pred_instance_labels,
         scores=pred_instance_scores,
         valid_class_ids=valid_class_ids)
     gts = rename_gt(gt_semantic_masks, gt_instance_masks, valid_class_ids)
-    metrics = scannet_eval(
+    metrics = scannet_eval_encoded(
         preds=preds,
         gts=gts,
         options=options,
         valid_class_ids=valid_class_ids,
         class_labels=class_labels,
-        id_to_label=id_to_label)
+        id_to_label=id_to_label,
+        nproc=nproc)
     header = ['classes', 'AP_0.25', 'AP_0.50', 'AP']
     rows = []
     for label, data in metrics['classes'].items():
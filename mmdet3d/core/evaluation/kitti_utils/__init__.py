@@ -1,4 +1,5 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+from .accumulator import KittiEvalAccumulator
 from .eval import kitti_eval, kitti_eval_coco_style
 
-__all__ = ['kitti_eval', 'kitti_eval_coco_style']
+__all__ = ['kitti_eval', 'kitti_eval_coco_style', 'KittiEvalAccumulator']
@@ -0,0 +1,279 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import numba
+import numpy as np
+from mmcv.utils import print_log
+
+from .eval import (_clean_data_flat, _flatten_annos, _flatten_overlaps,
+                   calculate_iou_partly, compute_statistics_jit,
+                   get_kitti_classes, get_thresholds, kitti_eval_summary,
+                   pr_to_curves, rets_to_mAPs)
+
+
+@numba.jit(nopython=True)
+def _image_statistics(overlap, gt_data, dt_data, ignored_gt, ignored_det,
+                      dontcare, metric, min_overlap, thresh):
+    """Get tp, fp, fn and similarity of an image at a score threshold."""
+    tp, fp, fn, similarity, _ = compute_statistics_jit(
+        overlap,
+        gt_data,
+        dt_data,
+        ignored_gt,
+        ignored_det,
+        dontcare,
+        metric,
+        min_overlap=min_overlap,
+        thresh=thresh,
+        compute_fp=True,
+        compute_aos=True)
+    if similarity == -1:
+        similarity = 0
+    return np.array([tp, fp, fn, similarity], dtype=np.float64)
+
+
+@numba.jit(nopython=True)
+def _accumulate_events(overlaps, overlap_offsets, gt_offsets, dt_offsets,
+                       dc_offsets, gt_datas, dt_datas, dontcares, ignored_gts,
+                       ignored_dets, metric, min_overlap):
+    """Match the detections of each image for all the score thresholds.
+
+    The statistics of an image only change when the threshold crosses the
+    score of one of its relevant detections. They are thus recorded as
+    their value when no detection is kept, plus the change at each of these
+    scores, which is enough to rebuild the statistics at any threshold.
+
+    Returns:
+        tuple[np.ndarray]: Scores of the true positives, scores of the
+            changes, the changes of shape [num_changes, 4] and the
+            statistics when no detection is kept.
+    """
+    num_images = gt_offsets.shape[0] - 1
+    tp_scores = np.zeros((gt_datas.shape[0], ))
+    num_tp = 0
+    event_scores = np.zeros((dt_datas.shape[0], ))
+    event_deltas = np.zeros((dt_datas.shape[0], 4))
+    num_events = 0
+    base = np.zeros((4, ))
+    for i in range(num_images):
+        gt_start, gt_end = gt_offsets[i], gt_offsets[i + 1]
+        dt_start, dt_end = dt_offsets[i], dt_offsets[i + 1]
+        overlap = overlaps[overlap_offsets[i]:overlap_offsets[i + 1]].reshape(
+            (dt_end - dt_start, gt_end - gt_start))
+        gt_data = gt_datas[gt_start:gt_end]
+        dt_data = dt_datas[dt_start:dt_end]
+        ignored_gt = ignored_gts[gt_start:gt_end]
+        ignored_det = ignored_dets[dt_start:dt_end]
+        dontcare = dontcares[dc_offsets[i]:dc_offsets[i + 1]]
+
+        _, _, _, _, thresholds = compute_statistics_jit(
+            overlap,
+            gt_data,
+            dt_data,
+            ignored_gt,
+            ignored_det,
+            dontcare,
+            metric,
+            min_overlap=min_overlap,
+            thresh=0.0,
+            compute_fp=False)
+        tp_scores[num_tp:num_tp + thresholds.shape[0]] = thresholds
+        num_tp += thresholds.shape[0]
+
+        prev = _image_statistics(overlap, gt_data, dt_data, ignored_gt,
+                                 ignored_det, dontcare, metric, min_overlap,
+                                 np.inf)
+        base += prev
+        scores = np.unique(dt_data[:, -1][ignored_det != -1])[::-1]
+        for score in scores:
+            cur = _image_statistics(overlap, gt_data, dt_data, ignored_gt,
+                                    ignored_det, dontcare, metric, min_overlap,
+                                    score)
+            delta = cur - prev
+            if np.any(delta != 0):
+                event_scores[num_events] = score
+                event_deltas[num_events] = delta
+                num_events += 1
+            prev = cur
+    return (tp_scores[:num_tp], event_scores[:num_events],
+            event_deltas[:num_events], base)
+
+
+class KittiEvalAccumulator(object):
+    """Accumulate the KITTI evaluation statistics batch by batch.
+
+    Instead of keeping all the predictions until the end of testing, each
+    batch is matched against its ground truths right away. Only the scores
+    of the true positives, which define the score thresholds, and the
+    changes of tp, fp, fn and similarity at the scores of the detections are
+    kept for each (metric, class, difficulty, min overlap). The APs are the
+    same as :func:`kitti_eval` on all the predictions at once.
+
+    Accumulators filled by several ranks can be merged with :meth:`merge`.
+
+    Args:
+        current_classes (list[str]): Classes to evaluate.
+        eval_types (list[str], optional): Types to eval among 'bbox', 'bev'
+            and '3d'. Defaults to ('bbox', 'bev', '3d').
+    """
+
+    def __init__(self, current_classes, eval_types=('bbox', 'bev', '3d')):
+        assert len(eval_types) > 0, \
+            'must contain at least one evaluation type'
+        self.eval_types = [t for t in eval_types if t != 'aos']
+        self.current_classes, self.min_overlaps = get_kitti_classes(
+            current_classes)
+        self.metrics = [
+            metric for metric, eval_type in enumerate(['bbox', 'bev', '3d'])
+            if eval_type in self.eval_types
+        ]
+        self.difficultys = [0, 1, 2]
+        self.num_valid_gt = np.zeros(
+            (len(self.current_classes), len(self.difficultys)), dtype=np.int64)
+        # lists of arrays of each (metric, class, difficulty, min overlap)
+        self.tp_scores = {}
+        self.event_scores = {}
+        self.event_deltas = {}
+        self.base = {}
+        self.num_samples = 0
+        self.pred_alpha = False
+        self.valid_alpha_gt = False
+
+    def update(self, gt_annos, dt_annos):
+        """Match a batch of predictions against their ground truths.
+
+        Args:
+            gt_annos (list[dict]): Contain gt information of each sample.
+            dt_annos (list[dict]): Contain detected information of each
+                sample, in the format of :func:`kitti_eval`.
+        """
+        assert len(gt_annos) == len(dt_annos)
+        if len(gt_annos) == 0:
+            return
+        self.num_samples += len(gt_annos)
+        for anno in dt_annos:
+            if np.any(anno['alpha'] != -10):
+                self.pred_alpha = True
+        for anno in gt_annos:
+            if len(anno['alpha']) > 0 and anno['alpha'][0] != -10:
+                self.valid_alpha_gt = True
+
+        data = _flatten_annos(gt_annos, dt_annos)
+        overlaps = {
+            metric: _flatten_overlaps(
+                calculate_iou_partly(dt_annos, gt_annos, metric,
+                                     len(gt_annos))[0])
+            for metric in self.metrics
+        }
+        for m, current_class in enumerate(self.current_classes):
+            for idx_l, difficulty in enumerate(self.difficultys):
+                num_valid_gt, ignored_gt, ignored_dt = _clean_data_flat(
+                    data, current_class, difficulty)
+                self.num_valid_gt[m, idx_l] += num_valid_gt
+                for metric in self.metrics:
+                    min_overlaps = self.min_overlaps[:, metric, m]
+                    for k, min_overlap in enumerate(min_overlaps):
+                        rets = _accumulate_events(
+                            *overlaps[metric], data['gt_offsets'],
+                            data['dt_offsets'], data['dc_offsets'],
+                            data['gt_datas'], data['dt_datas'],
+                            data['dontcares'], ignored_gt, ignored_dt, metric,
+                            min_overlap)
+                        self._append((metric, m, idx_l, k), *rets)
+
+    def _arrays(self):
+        return self.tp_scores, self.event_scores, self.event_deltas
+
+    def _append(self, key, tp_scores, event_scores, event_deltas, base):
+        new_arrays = (tp_scores, event_scores, event_deltas)
+        for arrays, array in zip(self._arrays(), new_arrays):
+            arrays = arrays.setdefault(key, [])
+            arrays.append(array)
+            # compact the small arrays of the batches from time to time
+            if len(arrays) >= 64:
+                arrays[:] = [np.concatenate(arrays)]
+        self.base[key] = self.base.get(key, 0) + base
+
+    def merge(self, others):
+        """Merge the statistics of other accumulators, e.g. of other ranks.
+
+        Args:
+            others (list[:obj:`KittiEvalAccumulator`]): Accumulators with
+                the same classes and eval types.
+
+        Returns:
+            :obj:`KittiEvalAccumulator`: The merged accumulator itself.
+        """
+        for other in others:
+            if other is self:
+                continue
+            assert other.current_classes == self.current_classes and \
+                other.metrics == self.metrics, \
+                'can only merge accumulators of the same evaluation'
+            self.num_valid_gt += other.num_valid_gt
+            self.num_samples += other.num_samples
+            self.pred_alpha |= other.pred_alpha
+            self.valid_alpha_gt |= other.valid_alpha_gt
+            for key in other.base:
+                for tp_scores, event_scores, event_deltas in zip(
+                        other.tp_scores[key], other.event_scores[key],
+                        other.event_deltas[key]):
+                    self._append(key, tp_scores, event_scores, event_deltas, 0)
+                self.base[key] = self.base.get(key, 0) + other.base[key]
+        return self
+
+    def _get_pr(self, key, thresholds):
+        """Rebuild the statistics at each score threshold."""
+        scores = np.concatenate(self.event_scores[key])
+        deltas = np.concatenate(self.event_deltas[key]).reshape(-1, 4)
+        order = np.argsort(-scores, kind='stable')
+        cum_deltas = np.concatenate(
+            [np.zeros((1, 4)),
+             np.cumsum(deltas[order], axis=0)])
+        # number of changes at scores no smaller than each threshold
+        num_events = np.searchsorted(-scores[order], -thresholds, 'right')
+        return self.base[key] + cum_deltas[num_events]
+
+    def evaluate(self, logger=None):
+        """Compute the APs from the accumulated statistics.
+
+        Args:
+            logger (logging.Logger | str, optional): Logger used for printing
+                the results. Defaults to None.
+
+        Returns:
+            dict[str, float]: Results of each evaluation metric, as returned
+                by :func:`kitti_eval`.
+        """
+        compute_aos = self.pred_alpha and self.valid_alpha_gt and \
+            'bbox' in self.eval_types
+        shape = (len(self.current_classes), len(self.difficultys),
+                 len(self.min_overlaps), 41)
+        rets = {
+            metric: {
+                'recall': np.zeros(shape),
+                'precision': np.zeros(shape),
+                'orientation': np.zeros(shape)
+            }
+            for metric in self.metrics
+        }
+        for key in self.base:
+            metric, m, idx_l, k = key
+            scores = np.concatenate(self.tp_scores[key])
+            thresholds = np.array(
+                get_thresholds(scores, self.num_valid_gt[m, idx_l]))
+            if len(thresholds) == 0:
+                continue
+            pr = self._get_pr(key, thresholds)
+            curves = pr_to_curves(pr, compute_aos and metric == 0)
+            ret = rets[metric]
+            ret['recall'][m, idx_l, k], ret['precision'][m, idx_l, k], \
+                ret['orientation'][m, idx_l, k] = curves
+
+        eval_types = list(self.eval_types)
+        if compute_aos:
+            eval_types.append('aos')
+        mAPs = rets_to_mAPs(rets, eval_types)
+        result, ret_dict = kitti_eval_summary(self.current_classes,
+                                              self.min_overlaps, mAPs,
+                                              compute_aos)
+        print_log('\n' + result, logger=logger)
+        return ret_dict
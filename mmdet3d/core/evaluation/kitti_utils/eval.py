@@ -1,6 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import gc
 import io as sysio
+import multiprocessing
 
 import numba
 import numpy as np
@@ -418,35 +419,298 @@ def calculate_iou_partly(gt_annos, dt_annos, metric, num_parts=50):
     return overlaps, parted_overlaps, total_gt_num, total_dt_num
 
 
-def _prepare_data(gt_annos, dt_annos, current_class, difficulty):
-    gt_datas_list = []
-    dt_datas_list = []
-    total_dc_num = []
-    ignored_gts, ignored_dets, dontcares = [], [], []
-    total_num_valid_gt = 0
-    for i in range(len(gt_annos)):
-        rets = clean_data(gt_annos[i], dt_annos[i], current_class, difficulty)
-        num_valid_gt, ignored_gt, ignored_det, dc_bboxes = rets
-        ignored_gts.append(np.array(ignored_gt, dtype=np.int64))
-        ignored_dets.append(np.array(ignored_det, dtype=np.int64))
-        if len(dc_bboxes) == 0:
-            dc_bboxes = np.zeros((0, 4)).astype(np.float64)
+KITTI_CLASS_TO_NAME = {
+    0: 'Car',
+    1: 'Pedestrian',
+    2: 'Cyclist',
+    3: 'Van',
+    4: 'Person_sitting',
+}
+
+# the data shared by the workers of `eval_class`, it is inherited by the
+# forked workers instead of being pickled for every (class, difficulty) cell
+_EVAL_DATA = None
+
+
+def _flatten_annos(gt_annos, dt_annos):
+    """Concatenate the annotations of all the images for the eval kernels.
+
+    The fields that do not depend on the evaluated class and difficulty are
+    gathered once, and the images are delimited by offsets.
+    """
+    gt_nums = np.array([len(a['name']) for a in gt_annos], dtype=np.int64)
+    dt_nums = np.array([len(a['name']) for a in dt_annos], dtype=np.int64)
+    gt_names = np.concatenate([np.asarray(a['name']) for a in gt_annos])
+    dt_names = np.concatenate([np.asarray(a['name']) for a in dt_annos])
+    gt_bbox = np.concatenate([a['bbox'] for a in gt_annos]).reshape(-1, 4)
+    dt_bbox = np.concatenate([a['bbox'] for a in dt_annos]).reshape(-1, 4)
+    gt_alpha = np.concatenate([a['alpha'] for a in gt_annos])
+    dt_alpha = np.concatenate([a['alpha'] for a in dt_annos])
+    dt_score = np.concatenate([a['score'] for a in dt_annos])
+
+    dc_mask = gt_names == 'DontCare'
+    gt_image_inds = np.repeat(np.arange(len(gt_annos)), gt_nums)
+    dc_nums = np.bincount(
+        gt_image_inds[dc_mask], minlength=len(gt_annos)).astype(np.int64)
+    return dict(
+        gt_offsets=np.concatenate([[0], np.cumsum(gt_nums)]),
+        dt_offsets=np.concatenate([[0], np.cumsum(dt_nums)]),
+        dc_offsets=np.concatenate([[0], np.cumsum(dc_nums)]),
+        gt_names=np.char.lower(gt_names.astype(str)),
+        dt_names=np.char.lower(dt_names.astype(str)),
+        gt_height=gt_bbox[:, 3] - gt_bbox[:, 1],
+        dt_height=np.abs(dt_bbox[:, 3] - dt_bbox[:, 1]),
+        occluded=np.concatenate([a['occluded'] for a in gt_annos]),
+        truncated=np.concatenate([a['truncated'] for a in gt_annos]),
+        gt_datas=np.concatenate([gt_bbox, gt_alpha[:, np.newaxis]], 1),
+        dt_datas=np.concatenate(
+            [dt_bbox, dt_alpha[:, np.newaxis], dt_score[:, np.newaxis]], 1),
+        dontcares=gt_bbox[dc_mask].astype(np.float64))
+
+
+def _flatten_overlaps(overlaps):
+    """Concatenate the overlaps of each image into a 1-D array."""
+    sizes = np.array([o.size for o in overlaps], dtype=np.int64)
+    flat = np.concatenate([o.ravel() for o in overlaps] +
+                          [np.zeros(0)]).astype(np.float64)
+    return flat, np.concatenate([[0], np.cumsum(sizes)])
+
+
+def _clean_data_flat(data, current_class, difficulty):
+    """Vectorized version of :func:`clean_data` over all the images."""
+    CLASS_NAMES = ['car', 'pedestrian', 'cyclist']
+    MIN_HEIGHT = [40, 25, 25]
+    MAX_OCCLUSION = [0, 1, 2]
+    MAX_TRUNCATION = [0.15, 0.3, 0.5]
+    current_cls_name = CLASS_NAMES[current_class]
+    gt_names = data['gt_names']
+    valid_gt = gt_names == current_cls_name
+    if current_cls_name == 'pedestrian':
+        neighbor_gt = gt_names == 'person_sitting'
+    elif current_cls_name == 'car':
+        neighbor_gt = gt_names == 'van'
+    else:
+        neighbor_gt = np.zeros_like(valid_gt)
+    ignore = ((data['occluded'] > MAX_OCCLUSION[difficulty])
+              | (data['truncated'] > MAX_TRUNCATION[difficulty])
+              | (data['gt_height'] <= MIN_HEIGHT[difficulty]))
+    ignored_gt = np.full(len(gt_names), -1, dtype=np.int64)
+    ignored_gt[neighbor_gt | (valid_gt & ignore)] = 1
+    ignored_gt[valid_gt & ~ignore] = 0
+    num_valid_gt = int(np.sum(valid_gt & ~ignore))
+
+    ignored_dt = np.full(len(data['dt_names']), -1, dtype=np.int64)
+    ignored_dt[data['dt_names'] == current_cls_name] = 0
+    ignored_dt[data['dt_height'] < MIN_HEIGHT[difficulty]] = 1
+    return num_valid_gt, ignored_gt, ignored_dt
+
+
+@numba.jit(nopython=True)
+def _collect_thresholds(overlaps, overlap_offsets, gt_offsets, dt_offsets,
+                        dc_offsets, gt_datas, dt_datas, dontcares, ignored_gts,
+                        ignored_dets, metric, min_overlap):
+    """Collect the scores of the true positives over all the images."""
+    scores = np.zeros((gt_datas.shape[0], ))
+    num_scores = 0
+    for i in range(gt_offsets.shape[0] - 1):
+        gt_start, gt_end = gt_offsets[i], gt_offsets[i + 1]
+        dt_start, dt_end = dt_offsets[i], dt_offsets[i + 1]
+        overlap = overlaps[overlap_offsets[i]:overlap_offsets[i + 1]].reshape(
+            (dt_end - dt_start, gt_end - gt_start))
+        _, _, _, _, thresholds = compute_statistics_jit(
+            overlap,
+            gt_datas[gt_start:gt_end],
+            dt_datas[dt_start:dt_end],
+            ignored_gts[gt_start:gt_end],
+            ignored_dets[dt_start:dt_end],
+            dontcares[dc_offsets[i]:dc_offsets[i + 1]],
+            metric,
+            min_overlap=min_overlap,
+            thresh=0.0,
+            compute_fp=False)
+        scores[num_scores:num_scores + thresholds.shape[0]] = thresholds
+        num_scores += thresholds.shape[0]
+    return scores[:num_scores]
+
+
+@numba.jit(nopython=True)
+def _sweep_thresholds(overlaps, overlap_offsets, gt_offsets, dt_offsets,
+                      dc_offsets, gt_datas, dt_datas, dontcares, ignored_gts,
+                      ignored_dets, metric, min_overlap, thresholds,
+                      compute_aos):
+    """Accumulate tp, fp, fn and similarity of all the score thresholds."""
+    pr = np.zeros((thresholds.shape[0], 4))
+    for i in range(gt_offsets.shape[0] - 1):
+        gt_start, gt_end = gt_offsets[i], gt_offsets[i + 1]
+        dt_start, dt_end = dt_offsets[i], dt_offsets[i + 1]
+        overlap = overlaps[overlap_offsets[i]:overlap_offsets[i + 1]].reshape(
+            (dt_end - dt_start, gt_end - gt_start))
+        for t in range(thresholds.shape[0]):
+            tp, fp, fn, similarity, _ = compute_statistics_jit(
+                overlap,
+                gt_datas[gt_start:gt_end],
+                dt_datas[dt_start:dt_end],
+                ignored_gts[gt_start:gt_end],
+                ignored_dets[dt_start:dt_end],
+                dontcares[dc_offsets[i]:dc_offsets[i + 1]],
+                metric,
+                min_overlap=min_overlap,
+                thresh=thresholds[t],
+                compute_fp=True,
+                compute_aos=compute_aos)
+            pr[t, 0] += tp
+            pr[t, 1] += fp
+            pr[t, 2] += fn
+            if similarity != -1:
+                pr[t, 3] += similarity
+    return pr
+
+
+def _eval_cell(task):
+    """Evaluate a (class, difficulty) cell for all the metrics.
+
+    Returns:
+        tuple[np.ndarray]: Recall, precision and aos of shape
+            [num_metric, num_minoverlap, N_SAMPLE_PTS].
+    """
+    m, current_class, difficulty = task
+    data = _EVAL_DATA
+    N_SAMPLE_PTS = 41
+    num_valid_gt, ignored_gt, ignored_dt = _clean_data_flat(
+        data, current_class, difficulty)
+    min_overlaps = data['min_overlaps']
+    shape = (len(data['metrics']), len(min_overlaps), N_SAMPLE_PTS)
+    recall, precision, aos = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    for n, metric in enumerate(data['metrics']):
+        overlaps, overlap_offsets = data['overlaps'][metric]
+        compute_aos = data['compute_aos'] and metric == 0
+        args = (overlaps, overlap_offsets, data['gt_offsets'],
+                data['dt_offsets'], data['dc_offsets'], data['gt_datas'],
+                data['dt_datas'], data['dontcares'], ignored_gt, ignored_dt,
+                metric)
+        for k, min_overlap in enumerate(min_overlaps[:, metric, m]):
+            scores = _collect_thresholds(*args, min_overlap)
+            thresholds = np.array(get_thresholds(scores, num_valid_gt))
+            if len(thresholds) == 0:
+                continue
+            pr = _sweep_thresholds(*args, min_overlap, thresholds, compute_aos)
+            recall[n, k], precision[n,
+                                    k], aos[n,
+                                            k] = pr_to_curves(pr, compute_aos)
+    return recall, precision, aos
+
+
+def pr_to_curves(pr, compute_aos=False, num_sample_pts=41):
+    """Compute the interpolated curves from the statistics of thresholds.
+
+    Args:
+        pr (np.ndarray): tp, fp, fn and similarity of each score threshold,
+            of shape [num_thresholds, 4].
+        compute_aos (bool, optional): Whether to compute aos.
+            Defaults to False.
+        num_sample_pts (int, optional): Number of sample points of the
+            curves. Defaults to 41.
+
+    Returns:
+        tuple[np.ndarray]: Recall, precision and aos of shape
+            [num_sample_pts].
+    """
+    recall = np.zeros(num_sample_pts)
+    precision = np.zeros(num_sample_pts)
+    aos = np.zeros(num_sample_pts)
+    num_thresh = len(pr)
+    if num_thresh > 0:
+        recall[:num_thresh] = pr[:, 0] / (pr[:, 0] + pr[:, 2])
+        precision[:num_thresh] = pr[:, 0] / (pr[:, 0] + pr[:, 1])
+        if compute_aos:
+            aos[:num_thresh] = pr[:, 3] / (pr[:, 0] + pr[:, 1])
+    # interpolate by taking the max over the larger thresholds
+    return tuple(
+        np.maximum.accumulate(x[::-1])[::-1] for x in (recall, precision, aos))
+
+
+def eval_metrics(gt_annos,
+                 dt_annos,
+                 current_classes,
+                 difficultys,
+                 metrics,
+                 min_overlaps,
+                 compute_aos=False,
+                 num_parts=200,
+                 nproc=1):
+    """Kitti eval of several metrics sharing the preprocessing.
+
+    The overlaps of each metric are computed once and shared by all the
+    classes, difficulties and min overlaps. The annotations are cleaned once
+    per (class, difficulty) cell for all the metrics, and every threshold
+    sweep runs in a single compiled kernel over all the images. The cells
+    are independent and can be evaluated by a pool of forked processes.
+
+    Args:
+        gt_annos (dict): Must from get_label_annos() in kitti_common.py.
+        dt_annos (dict): Must from get_label_annos() in kitti_common.py.
+        current_classes (list[int]): 0: car, 1: pedestrian, 2: cyclist.
+        difficultys (list[int]): Eval difficulty, 0: easy, 1: normal, 2: hard
+        metrics (list[int]): Eval types. 0: bbox, 1: bev, 2: 3d
+        min_overlaps (float): Min overlap. format:
+            [num_overlap, metric, class].
+        compute_aos (bool, optional): Whether to compute aos for the bbox
+            metric. Defaults to False.
+        num_parts (int, optional): A parameter for fast calculate algorithm.
+            Defaults to 200.
+        nproc (int, optional): Number of processes evaluating the cells.
+            Defaults to 1.
+
+    Returns:
+        dict[int, dict[str, np.ndarray]]: recall, precision and aos of each
+            metric.
+    """
+    global _EVAL_DATA
+    assert len(gt_annos) == len(dt_annos)
+    num_examples = len(gt_annos)
+    if num_examples < num_parts:
+        num_parts = num_examples
+
+    data = _flatten_annos(gt_annos, dt_annos)
+    data['overlaps'] = {}
+    for metric in metrics:
+        overlaps = calculate_iou_partly(dt_annos, gt_annos, metric,
+                                        num_parts)[0]
+        data['overlaps'][metric] = _flatten_overlaps(overlaps)
+        del overlaps
+    data.update(
+        metrics=list(metrics),
+        min_overlaps=min_overlaps,
+        compute_aos=compute_aos)
+
+    tasks = [(m, current_class, difficulty)
+             for m, current_class in enumerate(current_classes)
+             for difficulty in difficultys]
+    _EVAL_DATA = data
+    try:
+        if nproc > 1 and len(tasks) > 1:
+            ctx = multiprocessing.get_context('fork')
+            with ctx.Pool(min(nproc, len(tasks))) as pool:
+                cells = pool.map(_eval_cell, tasks)
         else:
-            dc_bboxes = np.stack(dc_bboxes, 0).astype(np.float64)
-        total_dc_num.append(dc_bboxes.shape[0])
-        dontcares.append(dc_bboxes)
-        total_num_valid_gt += num_valid_gt
-        gt_datas = np.concatenate(
-            [gt_annos[i]['bbox'], gt_annos[i]['alpha'][..., np.newaxis]], 1)
-        dt_datas = np.concatenate([
-            dt_annos[i]['bbox'], dt_annos[i]['alpha'][..., np.newaxis],
-            dt_annos[i]['score'][..., np.newaxis]
-        ], 1)
-        gt_datas_list.append(gt_datas)
-        dt_datas_list.append(dt_datas)
-    total_dc_num = np.stack(total_dc_num, axis=0)
-    return (gt_datas_list, dt_datas_list, ignored_gts, ignored_dets, dontcares,
-            total_dc_num, total_num_valid_gt)
+            cells = [_eval_cell(task) for task in tasks]
+    finally:
+        _EVAL_DATA = None
+
+    shape = (len(current_classes), len(difficultys), len(metrics),
+             len(min_overlaps), -1)
+    recall, precision, aos = [
+        np.stack([cell[i] for cell in cells]).reshape(shape) for i in range(3)
+    ]
+    gc.collect()
+    return {
+        metric: {
+            'recall': recall[:, :, n],
+            'precision': precision[:, :, n],
+            'orientation': aos[:, :, n],
+        }
+        for n, metric in enumerate(metrics)
+    }
 
 
 def eval_class(gt_annos,
@@ -456,7 +720,8 @@ def eval_class(gt_annos,
                metric,
                min_overlaps,
                compute_aos=False,
-               num_parts=200):
+               num_parts=200,
+               nproc=1):
     """Kitti eval. support 2d/bev/3d/aos eval. support 0.5:0.05:0.95 coco AP.
 
     Args:
@@ -468,106 +733,15 @@ def eval_class(gt_annos,
         min_overlaps (float): Min overlap. format:
             [num_overlap, metric, class].
         num_parts (int): A parameter for fast calculate algorithm
+        nproc (int, optional): Number of processes evaluating the
+            (class, difficulty) cells. Defaults to 1.
 
     Returns:
         dict[str, np.ndarray]: recall, precision and aos
     """
-    assert len(gt_annos) == len(dt_annos)
-    num_examples = len(gt_annos)
-    if num_examples < num_parts:
-        num_parts = num_examples
-    split_parts = get_split_parts(num_examples, num_parts)
-
-    rets = calculate_iou_partly(dt_annos, gt_annos, metric, num_parts)
-    overlaps, parted_overlaps, total_dt_num, total_gt_num = rets
-    N_SAMPLE_PTS = 41
-    num_minoverlap = len(min_overlaps)
-    num_class = len(current_classes)
-    num_difficulty = len(difficultys)
-    precision = np.zeros(
-        [num_class, num_difficulty, num_minoverlap, N_SAMPLE_PTS])
-    recall = np.zeros(
-        [num_class, num_difficulty, num_minoverlap, N_SAMPLE_PTS])
-    aos = np.zeros([num_class, num_difficulty, num_minoverlap, N_SAMPLE_PTS])
-    for m, current_class in enumerate(current_classes):
-        for idx_l, difficulty in enumerate(difficultys):
-            rets = _prepare_data(gt_annos, dt_annos, current_class, difficulty)
-            (gt_datas_list, dt_datas_list, ignored_gts, ignored_dets,
-             dontcares, total_dc_num, total_num_valid_gt) = rets
-            for k, min_overlap in enumerate(min_overlaps[:, metric, m]):
-                thresholdss = []
-                for i in range(len(gt_annos)):
-                    rets = compute_statistics_jit(
-                        overlaps[i],
-                        gt_datas_list[i],
-                        dt_datas_list[i],
-                        ignored_gts[i],
-                        ignored_dets[i],
-                        dontcares[i],
-                        metric,
-                        min_overlap=min_overlap,
-                        thresh=0.0,
-                        compute_fp=False)
-                    tp, fp, fn, similarity, thresholds = rets
-                    thresholdss += thresholds.tolist()
-                thresholdss = np.array(thresholdss)
-                thresholds = get_thresholds(thresholdss, total_num_valid_gt)
-                thresholds = np.array(thresholds)
-                pr = np.zeros([len(thresholds), 4])
-                idx = 0
-                for j, num_part in enumerate(split_parts):
-                    gt_datas_part = np.concatenate(
-                        gt_datas_list[idx:idx + num_part], 0)
-                    dt_datas_part = np.concatenate(
-                        dt_datas_list[idx:idx + num_part], 0)
-                    dc_datas_part = np.concatenate(
-                        dontcares[idx:idx + num_part], 0)
-                    ignored_dets_part = np.concatenate(
-                        ignored_dets[idx:idx + num_part], 0)
-                    ignored_gts_part = np.concatenate(
-                        ignored_gts[idx:idx + num_part], 0)
-                    fused_compute_statistics(
-                        parted_overlaps[j],
-                        pr,
-                        total_gt_num[idx:idx + num_part],
-                        total_dt_num[idx:idx + num_part],
-                        total_dc_num[idx:idx + num_part],
-                        gt_datas_part,
-                        dt_datas_part,
-                        dc_datas_part,
-                        ignored_gts_part,
-                        ignored_dets_part,
-                        metric,
-                        min_overlap=min_overlap,
-                        thresholds=thresholds,
-                        compute_aos=compute_aos)
-                    idx += num_part
-                for i in range(len(thresholds)):
-                    recall[m, idx_l, k, i] = pr[i, 0] / (pr[i, 0] + pr[i, 2])
-                    precision[m, idx_l, k, i] = pr[i, 0] / (
-                        pr[i, 0] + pr[i, 1])
-                    if compute_aos:
-                        aos[m, idx_l, k, i] = pr[i, 3] / (pr[i, 0] + pr[i, 1])
-                for i in range(len(thresholds)):
-                    precision[m, idx_l, k, i] = np.max(
-                        precision[m, idx_l, k, i:], axis=-1)
-                    recall[m, idx_l, k, i] = np.max(
-                        recall[m, idx_l, k, i:], axis=-1)
-                    if compute_aos:
-                        aos[m, idx_l, k, i] = np.max(
-                            aos[m, idx_l, k, i:], axis=-1)
-    ret_dict = {
-        'recall': recall,
-        'precision': precision,
-        'orientation': aos,
-    }
-
-    # clean temp variables
-    del overlaps
-    del parted_overlaps
-
-    gc.collect()
-    return ret_dict
+    return eval_metrics(gt_annos, dt_annos, current_classes, difficultys,
+                        [metric], min_overlaps, compute_aos, num_parts,
+                        nproc)[metric]
 
 
 def get_mAP11(prec):
@@ -597,22 +771,44 @@ def do_eval(gt_annos,
             dt_annos,
             current_classes,
             min_overlaps,
-            eval_types=['bbox', 'bev', '3d']):
+            eval_types=['bbox', 'bev', '3d'],
+            nproc=1):
     # min_overlaps: [num_minoverlap, metric, num_class]
     difficultys = [0, 1, 2]
+    metrics = [
+        metric for metric, eval_type in enumerate(['bbox', 'bev', '3d'])
+        if eval_type in eval_types
+    ]
+    rets = eval_metrics(
+        gt_annos,
+        dt_annos,
+        current_classes,
+        difficultys,
+        metrics,
+        min_overlaps,
+        compute_aos=('aos' in eval_types),
+        nproc=nproc)
+    return rets_to_mAPs(rets, eval_types)
+
+
+def rets_to_mAPs(rets, eval_types):
+    """Compute the AP11 and AP40 of the curves of each metric.
+
+    Args:
+        rets (dict[int, dict[str, np.ndarray]]): Curves of each metric,
+            see :func:`eval_metrics`.
+        eval_types (list[str]): Types to eval.
+
+    Returns:
+        tuple[np.ndarray]: AP11 of bbox, bev, 3d and aos, followed by their
+            AP40, None if not evaluated.
+    """
     mAP11_bbox = None
     mAP11_aos = None
     mAP40_bbox = None
     mAP40_aos = None
     if 'bbox' in eval_types:
-        ret = eval_class(
-            gt_annos,
-            dt_annos,
-            current_classes,
-            difficultys,
-            0,
-            min_overlaps,
-            compute_aos=('aos' in eval_types))
+        ret = rets[0]
         # ret: [num_class, num_diff, num_minoverlap, num_sample_points]
         mAP11_bbox = get_mAP11(ret['precision'])
         mAP40_bbox = get_mAP40(ret['precision'])
@@ -623,16 +819,14 @@ def do_eval(gt_annos,
     mAP11_bev = None
     mAP40_bev = None
     if 'bev' in eval_types:
-        ret = eval_class(gt_annos, dt_annos, current_classes, difficultys, 1,
-                         min_overlaps)
+        ret = rets[1]
         mAP11_bev = get_mAP11(ret['precision'])
         mAP40_bev = get_mAP40(ret['precision'])
 
     mAP11_3d = None
     mAP40_3d = None
     if '3d' in eval_types:
-        ret = eval_class(gt_annos, dt_annos, current_classes, difficultys, 2,
-                         min_overlaps)
+        ret = rets[2]
         mAP11_3d = get_mAP11(ret['precision'])
         mAP40_3d = get_mAP40(ret['precision'])
     return (mAP11_bbox, mAP11_bev, mAP11_3d, mAP11_aos, mAP40_bbox, mAP40_bev,
@@ -662,7 +856,8 @@ def do_coco_style_eval(gt_annos, dt_annos, current_classes, overlap_ranges,
 def kitti_eval(gt_annos,
                dt_annos,
                current_classes,
-               eval_types=['bbox', 'bev', '3d']):
+               eval_types=['bbox', 'bev', '3d'],
+               nproc=1):
     """KITTI evaluation.
 
     Args:
@@ -671,6 +866,8 @@ def kitti_eval(gt_annos,
         current_classes (list[str]): Classes to evaluation.
         eval_types (list[str], optional): Types to eval.
             Defaults to ['bbox', 'bev', '3d'].
+        nproc (int, optional): Number of processes evaluating the classes
+            and difficulties in parallel. Defaults to 1.
 
     Returns:
         tuple: String and dict of evaluation results.
@@ -678,32 +875,7 @@ def kitti_eval(gt_annos,
     assert len(eval_types) > 0, 'must contain at least one evaluation type'
     if 'aos' in eval_types:
         assert 'bbox' in eval_types, 'must evaluate bbox when evaluating aos'
-    overlap_0_7 = np.array([[0.7, 0.5, 0.5, 0.7,
-                             0.5], [0.7, 0.5, 0.5, 0.7, 0.5],
-                            [0.7, 0.5, 0.5, 0.7, 0.5]])
-    overlap_0_5 = np.array([[0.7, 0.5, 0.5, 0.7, 0.5],
-                            [0.5, 0.25, 0.25, 0.5, 0.25],
-                            [0.5, 0.25, 0.25, 0.5, 0.25]])
-    min_overlaps = np.stack([overlap_0_7, overlap_0_5], axis=0)  # [2, 3, 5]
-    class_to_name = {
-        0: 'Car',
-        1: 'Pedestrian',
-        2: 'Cyclist',
-        3: 'Van',
-        4: 'Person_sitting',
-    }
-    name_to_class = {v: n for n, v in class_to_name.items()}
-    if not isinstance(current_classes, (list, tuple)):
-        current_classes = [current_classes]
-    current_classes_int = []
-    for curcls in current_classes:
-        if isinstance(curcls, str):
-            current_classes_int.append(name_to_class[curcls])
-        else:
-            current_classes_int.append(curcls)
-    current_classes = current_classes_int
-    min_overlaps = min_overlaps[:, :, current_classes]
-    result = ''
+    current_classes, min_overlaps = get_kitti_classes(current_classes)
     # check whether alpha is valid
     compute_aos = False
     pred_alpha = False
@@ -721,11 +893,57 @@ def kitti_eval(gt_annos,
     if compute_aos:
         eval_types.append('aos')
 
-    mAP11_bbox, mAP11_bev, mAP11_3d, mAP11_aos, mAP40_bbox, mAP40_bev, \
-        mAP40_3d, mAP40_aos = do_eval(gt_annos, dt_annos,
-                                      current_classes, min_overlaps,
-                                      eval_types)
+    mAPs = do_eval(gt_annos, dt_annos, current_classes, min_overlaps,
+                   eval_types, nproc)
+    return kitti_eval_summary(current_classes, min_overlaps, mAPs, compute_aos)
+
+
+def get_kitti_classes(current_classes):
+    """Get the class ids and the min overlaps of the evaluated classes.
+
+    Args:
+        current_classes (list[str | int] | str | int): Classes to evaluate.
+
+    Returns:
+        tuple[list[int], np.ndarray]: Class ids and min overlaps of shape
+            [num_minoverlap, metric, num_class].
+    """
+    overlap_0_7 = np.array([[0.7, 0.5, 0.5, 0.7,
+                             0.5], [0.7, 0.5, 0.5, 0.7, 0.5],
+                            [0.7, 0.5, 0.5, 0.7, 0.5]])
+    overlap_0_5 = np.array([[0.7, 0.5, 0.5, 0.7, 0.5],
+                            [0.5, 0.25, 0.25, 0.5, 0.25],
+                            [0.5, 0.25, 0.25, 0.5, 0.25]])
+    min_overlaps = np.stack([overlap_0_7, overlap_0_5], axis=0)  # [2, 3, 5]
+    name_to_class = {v: n for n, v in KITTI_CLASS_TO_NAME.items()}
+    if not isinstance(current_classes, (list, tuple)):
+        current_classes = [current_classes]
+    current_classes_int = []
+    for curcls in current_classes:
+        if isinstance(curcls, str):
+            current_classes_int.append(name_to_class[curcls])
+        else:
+            current_classes_int.append(curcls)
+    return current_classes_int, min_overlaps[:, :, current_classes_int]
+
 
+def kitti_eval_summary(current_classes, min_overlaps, mAPs, compute_aos):
+    """Summarize the KITTI APs into a string and a dict.
+
+    Args:
+        current_classes (list[int]): Evaluated class ids.
+        min_overlaps (np.ndarray): Min overlaps of shape
+            [num_minoverlap, metric, num_class].
+        mAPs (tuple[np.ndarray]): APs returned by :func:`do_eval`.
+        compute_aos (bool): Whether aos is evaluated.
+
+    Returns:
+        tuple: String and dict of evaluation results.
+    """
+    mAP11_bbox, mAP11_bev, mAP11_3d, mAP11_aos, mAP40_bbox, mAP40_bev, \
+        mAP40_3d, mAP40_aos = mAPs
+    class_to_name = KITTI_CLASS_TO_NAME
+    result = ''
     ret_dict = {}
     difficulty = ['easy', 'moderate', 'hard']
 
@@ -0,0 +1,124 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import math
+
+import numba
+import numpy as np
+
+
+@numba.jit(nopython=True)
+def _clip_polygon(poly, num_pts, x1, y1, x2, y2, out):
+    """Keep the part of a polygon on the left of the line (x1, y1)->(x2, y2),
+    with Sutherland-Hodgman clipping."""
+    num_out = 0
+    for i in range(num_pts):
+        j = (i + 1) % num_pts
+        side_i = (x2 - x1) * (poly[i, 1] - y1) - (y2 - y1) * (poly[i, 0] - x1)
+        side_j = (x2 - x1) * (poly[j, 1] - y1) - (y2 - y1) * (poly[j, 0] - x1)
+        if side_i >= 0:
+            out[num_out, 0] = poly[i, 0]
+            out[num_out, 1] = poly[i, 1]
+            num_out += 1
+        if side_i * side_j < 0:
+            t = side_i / (side_i - side_j)
+            out[num_out, 0] = poly[i, 0] + t * (poly[j, 0] - poly[i, 0])
+            out[num_out, 1] = poly[i, 1] + t * (poly[j, 1] - poly[i, 1])
+            num_out += 1
+    return num_out
+
+
+@numba.jit(nopython=True)
+def _rbbox_corners_cpu(rbbox, corners):
+    """Get the corners of a rotated box in counterclockwise order."""
+    a_cos = math.cos(rbbox[4])
+    a_sin = math.sin(rbbox[4])
+    half_x = rbbox[2] / 2
+    half_y = rbbox[3] / 2
+    signs_x = (1., -1., -1., 1.)
+    signs_y = (1., 1., -1., -1.)
+    for i in range(4):
+        x = signs_x[i] * half_x
+        y = signs_y[i] * half_y
+        corners[i, 0] = a_cos * x - a_sin * y + rbbox[0]
+        corners[i, 1] = a_sin * x + a_cos * y + rbbox[1]
+
+
+@numba.jit(nopython=True)
+def rbbox_intersection_cpu(rbbox1, rbbox2):
+    """Compute the intersection area of two rotated boxes on cpu.
+
+    Args:
+        rbbox1 (np.ndarray, shape=[5]): Rotated 2d box, in the format of
+            centers, dims and angle (counterclockwise when positive).
+        rbbox2 (np.ndarray, shape=[5]): Rotated 2d box.
+
+    Returns:
+        float: Intersection area of the two boxes.
+    """
+    corners1 = np.empty((4, 2))
+    corners2 = np.empty((4, 2))
+    _rbbox_corners_cpu(rbbox1, corners1)
+    _rbbox_corners_cpu(rbbox2, corners2)
+    # a convex polygon clipped by a half plane gains at most one vertex
+    poly = np.empty((8, 2))
+    clipped = np.empty((8, 2))
+    poly[:4] = corners1
+    num_pts = 4
+    for i in range(4):
+        j = (i + 1) % 4
+        num_pts = _clip_polygon(poly, num_pts, corners2[i, 0], corners2[i, 1],
+                                corners2[j, 0], corners2[j, 1], clipped)
+        poly[:num_pts] = clipped[:num_pts]
+        if num_pts < 3:
+            return 0.0
+    area_val = 0.0
+    for i in range(num_pts):
+        j = (i + 1) % num_pts
+        area_val += poly[i, 0] * poly[j, 1] - poly[j, 0] * poly[i, 1]
+    return abs(area_val) / 2.0
+
+
+@numba.jit(nopython=True)
+def _rotate_iou_cpu_kernel(boxes, query_boxes, iou, criterion):
+    for i in range(boxes.shape[0]):
+        area1 = boxes[i, 2] * boxes[i, 3]
+        for j in range(query_boxes.shape[0]):
+            area2 = query_boxes[j, 2] * query_boxes[j, 3]
+            area_inter = rbbox_intersection_cpu(boxes[i], query_boxes[j])
+            if criterion == -1:
+                iou[i, j] = area_inter / (area1 + area2 - area_inter)
+            elif criterion == 0:
+                iou[i, j] = area_inter / area1
+            elif criterion == 1:
+                iou[i, j] = area_inter / area2
+            else:
+                iou[i, j] = area_inter
+
+
+def rotate_iou_cpu_eval(boxes, query_boxes, criterion=-1):
+    """Rotated box iou running on cpu, the counterpart of
+    :func:`rotate_iou_gpu_eval` for machines without CUDA.
+
+    Unlike :func:`rotate_iou_gpu_eval`, the angles are counterclockwise when
+    positive, e.g. the yaws of boxes in LiDAR coordinates. Negate them to
+    use bev boxes in camera coordinate system.
+
+    Args:
+        boxes (np.ndarray): rbboxes. format: centers, dims, angles with the
+            shape of [N, 5].
+        query_boxes (np.ndarray): rbboxes to compute iou with boxes, with
+            the shape of [K, 5].
+        criterion (int, optional): Indicate different type of iou.
+            -1 indicate `area_inter / (area1 + area2 - area_inter)`,
+            0 indicate `area_inter / area1`,
+            1 indicate `area_inter / area2`,
+            other values indicate `area_inter`.
+
+    Returns:
+        np.ndarray: IoU results.
+    """
+    boxes = np.ascontiguousarray(boxes, dtype=np.float64)
+    query_boxes = np.ascontiguousarray(query_boxes, dtype=np.float64)
+    iou = np.zeros((boxes.shape[0], query_boxes.shape[0]))
+    if iou.size > 0:
+        _rotate_iou_cpu_kernel(boxes, query_boxes, iou, criterion)
+    return iou
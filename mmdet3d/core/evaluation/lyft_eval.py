@@ -2,6 +2,7 @@
 from os import path as osp
 
 import mmcv
+import numba
 import numpy as np
 from lyft_dataset_sdk.eval.detection.mAP_evaluation import (Box3D, get_ap,
                                                             get_class_names,
@@ -11,6 +12,8 @@ from lyft_dataset_sdk.eval.detection.mAP_evaluation import (Box3D, get_ap,
 from mmcv.utils import print_log
 from terminaltables import AsciiTable
 
+from .kitti_utils.rotate_iou_cpu import rbbox_intersection_cpu
+
 
 def load_lyft_gts(lyft, data_root, eval_split, logger=None):
     """Loads ground truth boxes from database.
@@ -88,7 +91,13 @@ def load_lyft_predictions(res_path):
     return all_preds
 
 
-def lyft_eval(lyft, data_root, res_path, eval_set, output_dir, logger=None):
+def lyft_eval(lyft,
+              data_root,
+              res_path,
+              eval_set,
+              output_dir,
+              logger=None,
+              nproc=1):
     """Evaluation API for Lyft dataset.
 
     Args:
@@ -99,6 +108,8 @@ def lyft_eval(lyft, data_root, res_path, eval_set, output_dir, logger=None):
         output_dir (str): Output directory for output json files.
         logger (logging.Logger | str, optional): Logger used for printing
                 related information during evaluation. Default: None.
+        nproc (int, optional): Number of processes used to evaluate the
+            classes. Default: 1.
 
     Returns:
         dict[str, float]: The evaluation results.
@@ -112,8 +123,8 @@ def lyft_eval(lyft, data_root, res_path, eval_set, output_dir, logger=None):
 
     iou_thresholds = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95]
     metrics = {}
-    average_precisions = \
-        get_classwise_aps(gts, predictions, class_names, iou_thresholds)
+    average_precisions = get_classwise_aps(gts, predictions, class_names,
+                                           iou_thresholds, nproc)
     APs_data = [['IOU', 0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95]]
 
     mAPs = np.mean(average_precisions, axis=0)
@@ -140,9 +151,13 @@ def lyft_eval(lyft, data_root, res_path, eval_set, output_dir, logger=None):
     return metrics
 
 
-def get_classwise_aps(gt, predictions, class_names, iou_thresholds):
+def get_classwise_aps(gt, predictions, class_names, iou_thresholds, nproc=1):
     """Returns an array with an average precision per class.
 
+    The boxes are converted to arrays and each class is evaluated by
+    :func:`compute_single_class_aps`, which gives the same APs as
+    :func:`get_single_class_aps`.
+
     Note: Ground truth and predictions should have the following format.
 
     .. code-block::
@@ -176,6 +191,8 @@ def get_classwise_aps(gt, predictions, class_names, iou_thresholds):
         class_names (list[str]): list of the class names.
         iou_thresholds (list[float]): IOU thresholds used to calculate
             TP / FN
+        nproc (int, optional): Number of processes used to evaluate the
+            classes. Default: 1.
 
     Returns:
         np.ndarray: an array with an average precision per class.
@@ -187,16 +204,179 @@ def get_classwise_aps(gt, predictions, class_names, iou_thresholds):
 
     average_precisions = np.zeros((len(class_names), len(iou_thresholds)))
 
-    for class_id, class_name in enumerate(class_names):
-        if class_name in pred_by_class_name:
-            recalls, precisions, average_precision = get_single_class_aps(
-                gt_by_class_name[class_name], pred_by_class_name[class_name],
-                iou_thresholds)
-            average_precisions[class_id, :] = average_precision
+    class_ids = [
+        class_id for class_id, class_name in enumerate(class_names)
+        if class_name in pred_by_class_name
+    ]
+    tasks = [(lyft_boxes_to_arrays(gt_by_class_name[class_names[class_id]]),
+              lyft_boxes_to_arrays(pred_by_class_name[class_names[class_id]]),
+              iou_thresholds) for class_id in class_ids]
+    if nproc > 1 and len(tasks) > 1:
+        class_aps = mmcv.track_parallel_progress(_compute_class_aps, tasks,
+                                                 min(nproc, len(tasks)))
+    else:
+        class_aps = [_compute_class_aps(task) for task in tasks]
+    for class_id, average_precision in zip(class_ids, class_aps):
+        average_precisions[class_id, :] = average_precision
 
     return average_precisions
 
 
+def _compute_class_aps(task):
+    """Compute the APs of a class, used by the workers of
+    :func:`get_classwise_aps`."""
+    return compute_single_class_aps(*task)[2]
+
+
+def lyft_boxes_to_arrays(boxes):
+    """Convert Lyft boxes to arrays.
+
+    The ground box of :class:`Box3D` is built from the first row of the
+    rotation matrix of the box, which is only a rotation of the box around
+    the z axis if the rotation is a yaw, and is otherwise scaled by the norm
+    of this row. The bev boxes keep this scaling, while the heights and
+    volumes are those given by the sizes, as in :class:`Box3D`.
+
+    Args:
+        boxes (list[dict]): Boxes in the format described in
+            :func:`get_classwise_aps`.
+
+    Returns:
+        dict[str, np.ndarray]: Boxes with the following keys.
+
+            - sample_tokens (np.ndarray): Tokens of the samples.
+            - bev (np.ndarray): Bev boxes of shape (N, 5) in the format of
+              (x, y, length, width, yaw) with counterclockwise yaws.
+            - z (np.ndarray): Heights of the centers.
+            - height (np.ndarray): Heights of the boxes.
+            - volume (np.ndarray): Volumes of the boxes.
+            - scores (np.ndarray): Scores, -1 for ground truths.
+    """
+    translation = np.array([box['translation'] for box in boxes],
+                           dtype=np.float64).reshape(-1, 3)
+    size = np.array([box['size'] for box in boxes],
+                    dtype=np.float64).reshape(-1, 3)
+    rotation = np.array([box['rotation'] for box in boxes],
+                        dtype=np.float64).reshape(-1, 4)
+    w, x, y, z = (rotation / np.linalg.norm(rotation, axis=1, keepdims=True)).T
+    cos_angle = 1 - 2 * (y * y + z * z)
+    sin_angle = 2 * (x * y - w * z)
+    scale = np.hypot(cos_angle, sin_angle)
+    # the lengths are along the first row of the rotation matrix
+    dims = size[:, [1, 0]] * scale[:, None]
+    yaws = np.arctan2(sin_angle, cos_angle)
+    bev = np.concatenate([translation[:, :2], dims, yaws[:, None]], axis=1)
+    return dict(
+        sample_tokens=np.array([box['sample_token'] for box in boxes]),
+        bev=bev,
+        z=translation[:, 2],
+        height=size[:, 2],
+        volume=np.prod(size, axis=1),
+        scores=np.array([box.get('score', -1) for box in boxes],
+                        dtype=np.float64))
+
+
+@numba.jit(nopython=True)
+def _max_overlaps(pred_offsets, gt_offsets, pred_boxes, gt_boxes):
+    """Get the largest IoU of each prediction with the ground truths of its
+    sample, and the first ground truth reaching it.
+
+    The boxes are in the format of (x, y, length, width, yaw, z, height,
+    volume) and sorted by sample.
+    """
+    num_preds = pred_boxes.shape[0]
+    max_ious = np.full(num_preds, -np.inf)
+    argmax = np.full(num_preds, -1, dtype=np.int64)
+    for s in range(pred_offsets.shape[0] - 1):
+        for i in range(pred_offsets[s], pred_offsets[s + 1]):
+            pred = pred_boxes[i]
+            pred_min_z = pred[5] - pred[6] / 2
+            pred_max_z = pred[5] + pred[6] / 2
+            for j in range(gt_offsets[s], gt_offsets[s + 1]):
+                gt = gt_boxes[j]
+                height = min(gt[5] + gt[6] / 2, pred_max_z) - \
+                    max(gt[5] - gt[6] / 2, pred_min_z)
+                intersection = max(0., height) * rbbox_intersection_cpu(
+                    pred[:5], gt[:5])
+                iou = intersection / (pred[7] + gt[7] - intersection)
+                iou = min(max(iou, 0.), 1.)
+                if iou > max_ious[i]:
+                    max_ious[i] = iou
+                    argmax[i] = j
+    return max_ious, argmax
+
+
+def compute_single_class_aps(gts, predictions, iou_thresholds):
+    """Compute recall and precision for all iou thresholds on arrays.
+
+    It is the array counterpart of :func:`get_single_class_aps`. The IoUs of
+    all the predictions with the ground truths of their samples are computed
+    in a single pass, then the true positives at each threshold are the
+    first predictions by descending score whose best ground truth overlaps
+    them above the threshold.
+
+    Args:
+        gts (dict[str, np.ndarray]): Ground truths converted by
+            :func:`lyft_boxes_to_arrays`.
+        predictions (dict[str, np.ndarray]): Predictions converted by
+            :func:`lyft_boxes_to_arrays`.
+        iou_thresholds (list[float]): IOU thresholds used to calculate
+            TP / FN
+
+    Returns:
+        tuple[np.ndarray]: Returns (recalls, precisions, average precisions)
+            for each class.
+    """
+    num_gts = len(gts['scores'])
+    num_preds = len(predictions['scores'])
+    tokens, sample_inds = np.unique(
+        np.concatenate([gts['sample_tokens'], predictions['sample_tokens']]),
+        return_inverse=True)
+    gt_sample_inds = sample_inds[:num_gts]
+    pred_sample_inds = sample_inds[num_gts:]
+
+    def _sorted_boxes(boxes, inds):
+        order = np.argsort(inds, kind='stable')
+        offsets = np.searchsorted(inds[order], np.arange(len(tokens) + 1))
+        heights = np.stack([boxes['z'], boxes['height'], boxes['volume']],
+                           axis=1)
+        sorted_boxes = np.concatenate([boxes['bev'], heights], axis=1)[order]
+        return order, offsets, np.ascontiguousarray(sorted_boxes)
+
+    _, gt_offsets, gt_boxes = _sorted_boxes(gts, gt_sample_inds)
+    pred_order, pred_offsets, pred_boxes = _sorted_boxes(
+        predictions, pred_sample_inds)
+    max_ious = np.empty(num_preds)
+    gt_inds = np.empty(num_preds, dtype=np.int64)
+    max_ious[pred_order], gt_inds[pred_order] = _max_overlaps(
+        pred_offsets, gt_offsets, pred_boxes, gt_boxes)
+
+    # go down dets and mark TPs and FPs
+    order = np.argsort(-predictions['scores'], kind='stable')
+    max_ious, gt_inds = max_ious[order], gt_inds[order]
+    tps = np.zeros((num_preds, len(iou_thresholds)))
+    for i, iou_threshold in enumerate(iou_thresholds):
+        candidates = np.nonzero(max_ious > iou_threshold)[0]
+        # only the first prediction of each ground truth is a TP
+        _, first = np.unique(gt_inds[candidates], return_index=True)
+        tps[candidates[first], i] = 1.0
+    fps = 1.0 - tps
+
+    # compute precision recall
+    fps = np.cumsum(fps, axis=0)
+    tps = np.cumsum(tps, axis=0)
+
+    recalls = tps / float(num_gts)
+    precisions = tps / np.maximum(tps + fps, np.finfo(np.float64).eps)
+
+    aps = np.array([
+        get_ap(recalls[:, i], precisions[:, i])
+        for i in range(len(iou_thresholds))
+    ])
+
+    return recalls, precisions, aps
+
+
 def get_single_class_aps(gt, predictions, iou_thresholds):
     """Compute recall and precision for all iou thresholds. Adapted from
     LyftDatasetDevkit.
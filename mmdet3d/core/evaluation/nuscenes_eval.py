@@ -0,0 +1,795 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import numba
+import numpy as np
+import pyquaternion
+from mmcv.utils import print_log
+from terminaltables import AsciiTable
+
+TP_METRICS = ('trans_err', 'scale_err', 'orient_err', 'vel_err', 'attr_err')
+
+# the evaluation config `detection_cvpr_2019` of the nuScenes devkit
+NUSCENES_EVAL_CFG = dict(
+    class_range=dict(
+        car=50,
+        truck=50,
+        bus=50,
+        trailer=50,
+        construction_vehicle=50,
+        pedestrian=40,
+        motorcycle=40,
+        bicycle=40,
+        traffic_cone=30,
+        barrier=30),
+    dist_fcn='center_distance',
+    dist_ths=[0.5, 1.0, 2.0, 4.0],
+    dist_th_tp=2.0,
+    min_recall=0.1,
+    min_precision=0.1,
+    max_boxes_per_sample=500,
+    mean_ap_weight=5)
+
+# TP errors which are not defined for some classes, following the devkit
+_NAN_TP_METRICS = dict(
+    traffic_cone=('attr_err', 'vel_err', 'orient_err'),
+    barrier=('attr_err', 'vel_err'))
+
+_BIKE_RACK = 'static_object.bicycle_rack'
+
+
+def lidar_boxes_to_global(info, centers, yaws, velocities=None):
+    """Transform boxes from the LiDAR frame of a sample to the global frame.
+
+    It is the vectorized equivalent of rotating and translating each
+    ``NuScenesBox`` of the sample by the lidar2ego and ego2global poses.
+
+    Args:
+        info (dict): Info of the sample, with the lidar2ego and ego2global
+            rotations and translations.
+        centers (np.ndarray): Centers of the boxes with shape (N, 3).
+        yaws (np.ndarray): Yaws of the boxes with shape (N, ).
+        velocities (np.ndarray, optional): Velocities of the boxes with shape
+            (N, 2). Defaults to None.
+
+    Returns:
+        tuple[np.ndarray]: Centers in the ego frame, centers, yaws and
+            velocities (None if not given) in the global frame.
+    """
+    l2e_r = pyquaternion.Quaternion(info['lidar2ego_rotation']).rotation_matrix
+    e2g_r = pyquaternion.Quaternion(
+        info['ego2global_rotation']).rotation_matrix
+    ego_centers = centers @ l2e_r.T + np.array(info['lidar2ego_translation'])
+    global_centers = ego_centers @ e2g_r.T + np.array(
+        info['ego2global_translation'])
+    rot = e2g_r @ l2e_r
+    # yaw of the rotated box, i.e. the direction of its rotated x axis
+    headings = np.stack(
+        [np.cos(yaws), np.sin(yaws),
+         np.zeros_like(yaws)], axis=1) @ rot.T
+    global_yaws = np.arctan2(headings[:, 1], headings[:, 0])
+    global_velocities = None
+    if velocities is not None:
+        velocities = np.concatenate(
+            [velocities, np.zeros((len(velocities), 1))], axis=1)
+        global_velocities = (velocities @ rot.T)[:, :2]
+    return ego_centers, global_centers, global_yaws, global_velocities
+
+
+def quaternion_multiply(q1, q2):
+    """Hamilton product of quaternions in (w, x, y, z) order.
+
+    It gives the elements of ``Quaternion(q1) * Quaternion(q2)`` of
+    pyquaternion, broadcast over the leading dimensions.
+
+    Args:
+        q1 (np.ndarray): Left quaternions with shape (..., 4).
+        q2 (np.ndarray): Right quaternions with shape (..., 4).
+
+    Returns:
+        np.ndarray: Products with the broadcast shape of the inputs.
+    """
+    w1, x1, y1, z1 = np.moveaxis(np.asarray(q1, dtype=np.float64), -1, 0)
+    w2, x2, y2, z2 = np.moveaxis(np.asarray(q2, dtype=np.float64), -1, 0)
+    w = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
+    x = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
+    y = w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2
+    z = w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2
+    return np.stack([w, x, y, z], axis=-1)
+
+
+def axis_angle_to_quaternion(axis, angles):
+    """Get the quaternions of rotations around an axis.
+
+    Args:
+        axis (list[float]): Axis of the rotations.
+        angles (np.ndarray): Angles of the rotations in radians.
+
+    Returns:
+        np.ndarray: Quaternions with shape (N, 4).
+    """
+    axis = np.asarray(axis, dtype=np.float64)
+    axis = axis / np.linalg.norm(axis)
+    half_angles = np.asarray(angles, dtype=np.float64).reshape(-1, 1) / 2
+    return np.concatenate(
+        [np.cos(half_angles), np.sin(half_angles) * axis], axis=1)
+
+
+def quaternion_yaw(quats):
+    """Get the yaws of the z-y'-x'' Euler angles of quaternions.
+
+    It is the vectorized ``Quaternion.yaw_pitch_roll[0]`` of pyquaternion.
+
+    Args:
+        quats (np.ndarray): Quaternions with shape (N, 4).
+
+    Returns:
+        np.ndarray: Yaws with shape (N, ).
+    """
+    quats = quats / np.linalg.norm(quats, axis=1, keepdims=True)
+    w, x, y, z = quats.T
+    return np.arctan2(2 * (w * z - x * y), 1 - 2 * (y**2 + z**2))
+
+
+def transform_nusc_boxes(boxes, rotation, translation, inverse=False):
+    """Rotate and translate nuScenes boxes stored as arrays.
+
+    The boxes are a dict of arrays with the attributes of ``NuScenesBox``:
+    'center' (N, 3), 'wlh' (N, 3), 'orientation' (N, 4), 'velocity' (N, 3),
+    'label' (N, ) and 'score' (N, ), plus any other per-box array which is
+    left unchanged. It is the batched equivalent of calling ``box.rotate``
+    then ``box.translate`` on every box.
+
+    Args:
+        boxes (dict[str, np.ndarray]): Boxes to transform.
+        rotation (list[float]): Quaternion of the rotation.
+        translation (list[float]): Translation.
+        inverse (bool, optional): Whether to apply the inverse transform,
+            i.e. translate by ``-translation`` then rotate by the inverse of
+            ``rotation``. Defaults to False.
+
+    Returns:
+        dict[str, np.ndarray]: Transformed boxes.
+    """
+    quat = pyquaternion.Quaternion(rotation)
+    translation = np.array(translation)
+    if inverse:
+        quat = quat.inverse
+    rot = quat.rotation_matrix
+    boxes = dict(boxes)
+    center = boxes['center']
+    if inverse:
+        center = center - translation
+    center = center @ rot.T
+    if not inverse:
+        center = center + translation
+    boxes['center'] = center
+    boxes['orientation'] = quaternion_multiply(quat.elements,
+                                               boxes['orientation'])
+    boxes['velocity'] = boxes['velocity'] @ rot.T
+    return boxes
+
+
+def filter_nusc_boxes(boxes, classes, class_range):
+    """Remove the boxes out of the detection range of their class.
+
+    Args:
+        boxes (dict[str, np.ndarray]): Boxes in the ego frame, see
+            :func:`transform_nusc_boxes`.
+        classes (list[str]): Classes of the labels.
+        class_range (dict[str, float]): Detection range of each class.
+
+    Returns:
+        dict[str, np.ndarray]: Boxes within the range of their class.
+    """
+    det_ranges = np.array([class_range[name] for name in classes])
+    radius = np.linalg.norm(boxes['center'][:, :2], axis=1)
+    keep = radius <= det_ranges[boxes['label']]
+    return {key: value[keep] for key, value in boxes.items()}
+
+
+def nusc_boxes_to_records(boxes, sample_token, names, attrs):
+    """Convert boxes in the global frame to nuScenes submission records.
+
+    Args:
+        boxes (dict[str, np.ndarray]): Boxes, see
+            :func:`transform_nusc_boxes`.
+        sample_token (str): Token of the sample.
+        names (np.ndarray): Class names of the boxes.
+        attrs (np.ndarray): Attribute names of the boxes.
+
+    Returns:
+        list[dict]: Detection records of the sample.
+    """
+    return [
+        dict(
+            sample_token=sample_token,
+            translation=translation,
+            size=size,
+            rotation=rotation,
+            velocity=velocity,
+            detection_name=name,
+            detection_score=score,
+            attribute_name=attr)
+        for translation, size, rotation, velocity, name, score, attr in zip(
+            boxes['center'].tolist(), boxes['wlh'].tolist(),
+            boxes['orientation'].tolist(), boxes['velocity'][:, :2].tolist(),
+            np.asarray(names).tolist(), boxes['score'].tolist(),
+            np.asarray(attrs).tolist())
+    ]
+
+
+def build_nuscenes_gts(data_infos):
+    """Gather the ground truths of the samples into flat arrays.
+
+    The boxes are transformed to the global frame as loaded by the nuScenes
+    devkit, so that the evaluation does not need the raw tables. The
+    attributes are only available if the infos contain ``gt_attr_names``.
+
+    Args:
+        data_infos (list[dict]): Infos of the samples with annotations.
+
+    Returns:
+        dict[str, np.ndarray]: Sample index, name, center, size, yaw,
+            velocity, attribute, number of points and distance to the ego
+            vehicle of each box, plus the bicycle racks used to filter the
+            bicycles and motorcycles.
+    """
+    keys = ('sample_inds', 'names', 'translation', 'size', 'yaw', 'velocity',
+            'attrs', 'num_pts', 'ego_dist')
+    gts = {key: [] for key in keys}
+    for sample_id, info in enumerate(data_infos):
+        gt_boxes = info['gt_boxes']
+        num_boxes = len(gt_boxes)
+        _, centers, yaws, velocities = lidar_boxes_to_global(
+            info, gt_boxes[:, :3], gt_boxes[:, 6], info['gt_velocity'])
+        gts['sample_inds'].append(np.full(num_boxes, sample_id))
+        gts['names'].append(np.asarray(info['gt_names'], dtype=str))
+        gts['translation'].append(centers)
+        gts['size'].append(gt_boxes[:, 3:6])
+        gts['yaw'].append(yaws)
+        gts['velocity'].append(velocities)
+        gts['attrs'].append(
+            np.asarray(info.get('gt_attr_names', [''] * num_boxes), dtype=str))
+        gts['num_pts'].append(info['num_lidar_pts'] + info['num_radar_pts'])
+        gts['ego_dist'].append(
+            np.linalg.norm(
+                (centers - np.array(info['ego2global_translation']))[:, :2],
+                axis=1))
+    gts = {
+        key: np.concatenate(value) if len(value) > 0 else np.zeros(0)
+        for key, value in gts.items()
+    }
+    gts['sample_inds'] = gts['sample_inds'].astype(np.int64)
+    gts['translation'] = gts['translation'].reshape(-1, 3)
+    gts['size'] = gts['size'].reshape(-1, 3)
+    gts['velocity'] = gts['velocity'].reshape(-1, 2)
+    gts['num_samples'] = np.array(len(data_infos))
+    return gts
+
+
+def _in_bike_racks(boxes, racks):
+    """Find the bicycles and motorcycles whose center is in a bike rack."""
+    cand = np.nonzero(np.isin(boxes['names'], ['bicycle', 'motorcycle']))[0]
+    in_racks = np.zeros(len(boxes['names']), dtype=bool)
+    if len(cand) == 0 or len(racks['names']) == 0:
+        return in_racks
+    inds, rack_inds = np.nonzero(
+        boxes['sample_inds'][cand][:, None] == racks['sample_inds'][None])
+    offsets = boxes['translation'][cand[inds]] - \
+        racks['translation'][rack_inds]
+    yaws = racks['yaw'][rack_inds]
+    # offsets in the frame of the racks
+    local_x = np.cos(yaws) * offsets[:, 0] + np.sin(yaws) * offsets[:, 1]
+    local_y = -np.sin(yaws) * offsets[:, 0] + np.cos(yaws) * offsets[:, 1]
+    local = np.stack([local_x, local_y, offsets[:, 2]], axis=1)
+    inside = np.all(np.abs(local) <= racks['size'][rack_inds] / 2, axis=1)
+    in_racks[cand[inds[inside]]] = True
+    return in_racks
+
+
+def filter_eval_boxes(boxes, class_range, racks=None):
+    """Filter the boxes as ``filter_eval_boxes`` of the devkit.
+
+    The boxes farther than the range of their class, without any point, or
+    bicycles and motorcycles in a bike rack are removed.
+
+    Args:
+        boxes (dict[str, np.ndarray]): Boxes in the format of
+            :func:`build_nuscenes_gts`. Boxes without ``num_pts`` are not
+            filtered by the number of points.
+        class_range (dict[str, float]): Evaluation range of each class.
+        racks (dict[str, np.ndarray], optional): The bike racks. Defaults to
+            None.
+
+    Returns:
+        dict[str, np.ndarray]: The kept boxes.
+    """
+    names = boxes['names']
+    unique_names, name_inds = np.unique(names, return_inverse=True)
+    max_dist = np.array([class_range.get(name, -1) for name in unique_names])
+    keep = boxes['ego_dist'] < max_dist[name_inds.reshape(-1)]
+    if 'num_pts' in boxes:
+        keep &= boxes['num_pts'] != 0
+    if racks is not None:
+        keep &= ~_in_bike_racks(boxes, racks)
+    return {key: value[keep] for key, value in boxes.items()}
+
+
+@numba.jit(nopython=True)
+def _greedy_center_match(order, row_offsets, gt_inds, dists, num_gts, dist_th):
+    """Match the sorted predictions to their closest ground truth left.
+
+    Args:
+        order (np.ndarray): Predictions sorted by descending score.
+        row_offsets (np.ndarray): Offsets of the distances of each prediction
+            to the ground truths of its sample.
+        gt_inds (np.ndarray): Ground truth of each distance.
+        dists (np.ndarray): Center distances.
+        num_gts (int): Number of ground truths.
+        dist_th (float): Distance threshold of a match.
+
+    Returns:
+        np.ndarray: Ground truth matched by each sorted prediction, -1 if
+            not matched.
+    """
+    taken = np.zeros(num_gts, dtype=np.bool_)
+    matched = np.full(len(order), -1, dtype=np.int64)
+    for i in range(len(order)):
+        p = order[i]
+        min_dist = np.inf
+        match = -1
+        for k in range(row_offsets[p], row_offsets[p + 1]):
+            j = gt_inds[k]
+            if not taken[j] and dists[k] < min_dist:
+                min_dist = dists[k]
+                match = j
+        if min_dist < dist_th:
+            taken[match] = True
+            matched[i] = match
+    return matched
+
+
+def _center_distances(gts, preds, num_samples):
+    """Get the distances between the predictions and the ground truths of
+    the same sample, in the order of the ground truths."""
+    gt_order = np.argsort(gts['sample_inds'], kind='stable')
+    counts = np.bincount(gts['sample_inds'], minlength=num_samples)
+    starts = np.cumsum(counts) - counts
+    row_counts = counts[preds['sample_inds']]
+    row_offsets = np.concatenate([[0], np.cumsum(row_counts)])
+    pair_preds = np.repeat(np.arange(len(row_counts)), row_counts)
+    within = np.arange(row_offsets[-1]) - row_offsets[pair_preds]
+    pair_gts = gt_order[starts[preds['sample_inds']][pair_preds] + within]
+    dists = np.linalg.norm(
+        preds['translation'][pair_preds, :2] -
+        gts['translation'][pair_gts, :2],
+        axis=1)
+    return row_offsets, pair_gts, dists
+
+
+def _cummean(x):
+    """Cumulative mean ignoring the NaNs, 1 if all are NaNs."""
+    if np.all(np.isnan(x)):
+        return np.ones(len(x))
+    sum_vals = np.nancumsum(x.astype(float))
+    count_vals = np.cumsum(~np.isnan(x))
+    return np.divide(
+        sum_vals,
+        count_vals,
+        out=np.zeros_like(sum_vals),
+        where=count_vals != 0)
+
+
+def _yaw_diff(gt_yaws, pred_yaws, period=2 * np.pi):
+    """Smallest absolute yaw difference given the period."""
+    diff = (gt_yaws - pred_yaws + period / 2) % period - period / 2
+    diff = np.where(diff > np.pi, diff - 2 * np.pi, diff)
+    return np.abs(diff)
+
+
+def _scale_iou(gt_sizes, pred_sizes):
+    """IoU of aligned boxes sharing the same center."""
+    intersection = np.prod(np.minimum(gt_sizes, pred_sizes), axis=1)
+    union = np.prod(gt_sizes, axis=1) + np.prod(pred_sizes, axis=1) - \
+        intersection
+    return intersection / union
+
+
+def match_class(gts, preds, class_name, dist_ths, num_samples):
+    """Match the predictions of a class for several distance thresholds.
+
+    The predictions are sorted by descending score and each of them is
+    matched to the closest ground truth of its sample not taken yet, as
+    ``accumulate`` of the devkit. The distances between the predictions and
+    ground truths of the same sample are computed at once and shared by the
+    thresholds.
+
+    Args:
+        gts (dict[str, np.ndarray]): Filtered ground truths.
+        preds (dict[str, np.ndarray]): Filtered predictions.
+        class_name (str): Name of the class.
+        dist_ths (list[float]): Center distance thresholds.
+        num_samples (int): Number of samples.
+
+    Returns:
+        tuple: Number of ground truths of the class, indices of the
+            predictions of the class by descending score, and for each
+            threshold whether they are true positives and the TP errors of
+            the true positives.
+    """
+    pred_inds = np.nonzero(preds['names'] == class_name)[0]
+    gts = {k: v[gts['names'] == class_name] for k, v in gts.items()}
+    preds = {k: v[pred_inds] for k, v in preds.items()}
+    npos = len(gts['names'])
+    if npos == 0:
+        return npos, pred_inds[:0], []
+
+    # sort by descending score, the later predictions first for ties
+    order = np.lexsort(
+        (np.arange(len(preds['scores'])), preds['scores']))[::-1]
+    row_offsets, pair_gts, dists = _center_distances(gts, preds, num_samples)
+    period = np.pi if class_name == 'barrier' else 2 * np.pi
+
+    matches = []
+    for dist_th in dist_ths:
+        matched = _greedy_center_match(order, row_offsets, pair_gts, dists,
+                                       npos, dist_th)
+        is_tp = matched != -1
+        tp_inds = order[is_tp]
+        gt_inds = matched[is_tp]
+        gt_attrs = gts['attrs'][gt_inds]
+        errors = dict(
+            trans_err=np.linalg.norm(
+                preds['translation'][tp_inds, :2] -
+                gts['translation'][gt_inds, :2],
+                axis=1),
+            vel_err=np.linalg.norm(
+                preds['velocity'][tp_inds] - gts['velocity'][gt_inds], axis=1),
+            scale_err=1 -
+            _scale_iou(gts['size'][gt_inds], preds['size'][tp_inds]),
+            orient_err=_yaw_diff(gts['yaw'][gt_inds], preds['yaw'][tp_inds],
+                                 period),
+            attr_err=np.where(gt_attrs == '', np.nan,
+                              1. - (gt_attrs == preds['attrs'][tp_inds])))
+        matches.append((is_tp, errors))
+    return npos, pred_inds[order], matches
+
+
+def compute_metric_data(npos, confs, is_tp, errors):
+    """Interpolate the precision, confidence and TP errors at 101 recalls.
+
+    Args:
+        npos (int): Number of ground truths.
+        confs (np.ndarray): Scores of the predictions in descending order.
+        is_tp (np.ndarray): Whether the predictions are true positives.
+        errors (dict[str, np.ndarray]): TP errors of the true positives.
+
+    Returns:
+        dict | None: Recall, precision, confidence and TP errors, None if
+            there is no ground truth or no match.
+    """
+    if npos == 0 or not is_tp.any():
+        return None
+    tp = np.cumsum(is_tp).astype(float)
+    fp = np.cumsum(~is_tp).astype(float)
+    rec = tp / float(npos)
+    rec_interp = np.linspace(0, 1, 101)
+    prec = np.interp(rec_interp, rec, tp / (fp + tp), right=0)
+    conf = np.interp(rec_interp, rec, confs, right=0)
+    ret = dict(recall=rec_interp, precision=prec, confidence=conf)
+    match_conf = confs[is_tp]
+    for key, error in errors.items():
+        ret[key] = np.interp(conf[::-1], match_conf[::-1],
+                             _cummean(error)[::-1])[::-1]
+    return ret
+
+
+def accumulate(gts, preds, class_name, dist_ths, num_samples):
+    """Match the predictions of a class for several distance thresholds.
+
+    See :func:`match_class` for the matching.
+
+    Args:
+        gts (dict[str, np.ndarray]): Filtered ground truths.
+        preds (dict[str, np.ndarray]): Filtered predictions.
+        class_name (str): Name of the class.
+        dist_ths (list[float]): Center distance thresholds.
+        num_samples (int): Number of samples.
+
+    Returns:
+        list[dict | None]: Recall, precision, confidence and TP errors
+            interpolated at 101 recalls for each threshold, None if there is
+            no ground truth or no match.
+    """
+    npos, order, matches = match_class(gts, preds, class_name, dist_ths,
+                                       num_samples)
+    if npos == 0:
+        return [None for _ in dist_ths]
+    confs = preds['scores'][order]
+    return [
+        compute_metric_data(npos, confs, is_tp, errors)
+        for is_tp, errors in matches
+    ]
+
+
+def calc_ap(md, min_recall, min_precision):
+    """Average precision above the minimum recall and precision."""
+    if md is None:
+        return 0.
+    prec = np.copy(md['precision'])
+    prec = prec[round(100 * min_recall) + 1:]
+    prec -= min_precision
+    prec[prec < 0] = 0
+    return float(np.mean(prec)) / (1.0 - min_precision)
+
+
+def calc_tp(md, min_recall, metric_name):
+    """Mean TP error from the minimum recall to the maximum recall."""
+    if md is None:
+        return 1.0
+    first_ind = round(100 * min_recall) + 1
+    non_zero = np.nonzero(md['confidence'])[0]
+    last_ind = non_zero[-1] if len(non_zero) > 0 else 0
+    if last_ind < first_ind:
+        return 1.0
+    return float(np.mean(md[metric_name][first_ind:last_ind + 1]))
+
+
+def _eval_thresholds(eval_cfg):
+    """Distance thresholds of the APs followed by that of the TP errors."""
+    dist_ths = list(eval_cfg['dist_ths'])
+    dist_th_tp = eval_cfg['dist_th_tp']
+    if dist_th_tp not in dist_ths:
+        return dist_ths + [dist_th_tp]
+    return dist_ths
+
+
+def _filter_gts_preds(gts, preds, class_range):
+    """Filter the ground truths and predictions with the bike racks."""
+    gts = {k: v for k, v in gts.items() if k != 'num_samples'}
+    is_rack = gts['names'] == _BIKE_RACK
+    racks = {k: v[is_rack] for k, v in gts.items()}
+    gts = filter_eval_boxes(gts, class_range, racks)
+    preds = filter_eval_boxes(preds, class_range, racks)
+    return gts, preds
+
+
+def nuscenes_eval(gts, preds, eval_cfg=None, logger=None):
+    """Evaluate the detections in the nuScenes protocol.
+
+    It is a vectorized implementation of ``NuScenesEval`` of the devkit,
+    which works on flat arrays of boxes in the global frame instead of a
+    json file and the raw tables. The attribute errors are NaN if the
+    ground truths have no attributes.
+
+    Args:
+        gts (dict[str, np.ndarray]): Ground truths built by
+            :func:`build_nuscenes_gts`.
+        preds (dict[str, np.ndarray]): Predictions in the global frame,
+            including the sample index, name, center, size, yaw, velocity,
+            attribute, score and distance to the ego vehicle of each box.
+        eval_cfg (dict, optional): Serialized evaluation config of the
+            devkit. Defaults to the config `detection_cvpr_2019`.
+        logger (logging.Logger | str, optional): Logger used for printing
+            related information during evaluation. Default: None.
+
+    Returns:
+        dict: Metrics in the format of the ``metrics_summary.json`` of the
+            devkit, with keys 'label_aps', 'label_tp_errors', 'mean_dist_aps',
+            'mean_ap', 'tp_errors', 'tp_scores' and 'nd_score'.
+    """
+    if eval_cfg is None:
+        eval_cfg = NUSCENES_EVAL_CFG
+    num_samples = int(gts['num_samples'])
+    gts, preds = _filter_gts_preds(gts, preds, eval_cfg['class_range'])
+    ths = _eval_thresholds(eval_cfg)
+    metric_data = {
+        class_name:
+        dict(zip(ths, accumulate(gts, preds, class_name, ths, num_samples)))
+        for class_name in eval_cfg['class_range']
+    }
+    return nuscenes_eval_summary(metric_data, eval_cfg, logger=logger)
+
+
+def nuscenes_eval_summary(metric_data, eval_cfg, logger=None):
+    """Compute the nuScenes metrics from the interpolated metric data.
+
+    Args:
+        metric_data (dict[str, dict]): Metric data of each class at each
+            distance threshold, see :func:`compute_metric_data`.
+        eval_cfg (dict): Serialized evaluation config of the devkit.
+        logger (logging.Logger | str, optional): Logger used for printing
+            related information during evaluation. Default: None.
+
+    Returns:
+        dict: Metrics in the format of the ``metrics_summary.json`` of the
+            devkit, see :func:`nuscenes_eval`.
+    """
+    class_names = list(eval_cfg['class_range'].keys())
+    dist_ths = list(eval_cfg['dist_ths'])
+    dist_th_tp = eval_cfg['dist_th_tp']
+    label_aps = {}
+    label_tp_errors = {}
+    for class_name in class_names:
+        mds = metric_data[class_name]
+        label_aps[class_name] = {
+            dist_th: calc_ap(mds[dist_th], eval_cfg['min_recall'],
+                             eval_cfg['min_precision'])
+            for dist_th in dist_ths
+        }
+        label_tp_errors[class_name] = {}
+        for metric_name in TP_METRICS:
+            if metric_name in _NAN_TP_METRICS.get(class_name, ()):
+                tp = np.nan
+            else:
+                tp = calc_tp(mds[dist_th_tp], eval_cfg['min_recall'],
+                             metric_name)
+            label_tp_errors[class_name][metric_name] = tp
+
+    mean_dist_aps = {
+        class_name: float(np.mean(list(aps.values())))
+        for class_name, aps in label_aps.items()
+    }
+    mean_ap = float(np.mean(list(mean_dist_aps.values())))
+    tp_errors = {}
+    tp_scores = {}
+    for metric_name in TP_METRICS:
+        class_errors = [
+            label_tp_errors[class_name][metric_name]
+            for class_name in class_names
+        ]
+        tp_errors[metric_name] = float(np.nanmean(class_errors))
+        tp_scores[metric_name] = max(0.0, 1.0 - tp_errors[metric_name])
+    nd_score = (eval_cfg['mean_ap_weight'] * mean_ap + np.sum(
+        list(tp_scores.values()))) / float(eval_cfg['mean_ap_weight'] +
+                                           len(tp_scores))
+
+    table_data = [['class', 'AP'] + list(TP_METRICS)]
+    for class_name in class_names:
+        table_data.append([class_name, f'{mean_dist_aps[class_name]:.3f}'] + [
+            f'{label_tp_errors[class_name][metric_name]:.3f}'
+            for metric_name in TP_METRICS
+        ])
+    table = AsciiTable(table_data)
+    print_log('\n' + table.table, logger=logger)
+    print_log(f'mAP: {mean_ap:.4f}, NDS: {nd_score:.4f}', logger=logger)
+
+    return dict(
+        label_aps=label_aps,
+        label_tp_errors=label_tp_errors,
+        mean_dist_aps=mean_dist_aps,
+        mean_ap=mean_ap,
+        tp_errors=tp_errors,
+        tp_scores=tp_scores,
+        nd_score=float(nd_score))
+
+
+class NuScenesEvalAccumulator(object):
+    """Accumulate the nuScenes evaluation statistics batch by batch.
+
+    A prediction is only matched against the ground truths of its sample,
+    so each batch of samples can be matched right away, as long as all the
+    boxes of a sample are in the same batch. For each class and distance
+    threshold, only the score, the sample and box index, whether it is a
+    true positive and its TP errors are kept for each prediction. They are
+    sorted as :func:`nuscenes_eval` sorts all the predictions at once, thus
+    the metrics are the same.
+
+    Accumulators filled by several ranks can be merged with :meth:`merge`.
+
+    Args:
+        eval_cfg (dict, optional): Serialized evaluation config of the
+            devkit. Defaults to the config `detection_cvpr_2019`.
+    """
+
+    def __init__(self, eval_cfg=None):
+        if eval_cfg is None:
+            eval_cfg = NUSCENES_EVAL_CFG
+        self.eval_cfg = eval_cfg
+        self.class_names = list(eval_cfg['class_range'].keys())
+        self.ths = _eval_thresholds(eval_cfg)
+        self.npos = {class_name: 0 for class_name in self.class_names}
+        # lists of the arrays of each batch for each class
+        self.matches = {class_name: [] for class_name in self.class_names}
+
+    def update(self, gts, preds):
+        """Match a batch of predictions against their ground truths.
+
+        Args:
+            gts (dict[str, np.ndarray]): Ground truths of the samples of the
+                batch, in the format of :func:`build_nuscenes_gts`.
+            preds (dict[str, np.ndarray]): Predictions of the samples of the
+                batch, in the format of :func:`nuscenes_eval`, where the
+                boxes of each sample are in their original order.
+        """
+        num_samples = int(
+            max(gts['sample_inds'].max(initial=-1),
+                preds['sample_inds'].max(initial=-1))) + 1
+        gts, preds = _filter_gts_preds(gts, preds,
+                                       self.eval_cfg['class_range'])
+        box_inds = np.arange(len(preds['scores']))
+        for class_name in self.class_names:
+            npos, order, matches = match_class(gts, preds, class_name,
+                                               self.ths, num_samples)
+            self.npos[class_name] += npos
+            if len(order) == 0:
+                continue
+            batch = dict(
+                scores=preds['scores'][order],
+                sample_inds=preds['sample_inds'][order],
+                box_inds=box_inds[order],
+                is_tp=[],
+                errors=[])
+            for is_tp, errors in matches:
+                batch['is_tp'].append(is_tp)
+                # the errors of all the predictions, NaN if not matched
+                batch['errors'].append({})
+                for key, error in errors.items():
+                    full_error = np.full(len(order), np.nan)
+                    full_error[is_tp] = error
+                    batch['errors'][-1][key] = full_error
+            self.matches[class_name].append(batch)
+
+    def merge(self, others):
+        """Merge the statistics of other accumulators, e.g. of other ranks.
+
+        Args:
+            others (list[:obj:`NuScenesEvalAccumulator`]): Accumulators with
+                the same evaluation config.
+
+        Returns:
+            :obj:`NuScenesEvalAccumulator`: The merged accumulator itself.
+        """
+        for other in others:
+            if other is self:
+                continue
+            assert other.class_names == self.class_names and \
+                other.ths == self.ths, \
+                'can only merge accumulators of the same evaluation'
+            for class_name in self.class_names:
+                self.npos[class_name] += other.npos[class_name]
+                self.matches[class_name].extend(other.matches[class_name])
+        return self
+
+    def _metric_data(self, class_name):
+        """Get the metric data of a class at each threshold."""
+        npos = self.npos[class_name]
+        batches = self.matches[class_name]
+        if npos == 0 or len(batches) == 0:
+            return {th: None for th in self.ths}
+        scores = np.concatenate([batch['scores'] for batch in batches])
+        sample_inds = np.concatenate(
+            [batch['sample_inds'] for batch in batches])
+        box_inds = np.concatenate([batch['box_inds'] for batch in batches])
+        # the order of all the predictions at once, by descending score and
+        # the later predictions first for ties
+        order = np.lexsort((box_inds, sample_inds, scores))[::-1]
+        confs = scores[order]
+        metric_data = {}
+        for k, th in enumerate(self.ths):
+            is_tp = np.concatenate([batch['is_tp'][k]
+                                    for batch in batches])[order]
+            errors = {
+                key:
+                np.concatenate([batch['errors'][k][key]
+                                for batch in batches])[order][is_tp]
+                for key in TP_METRICS
+            }
+            metric_data[th] = compute_metric_data(npos, confs, is_tp, errors)
+        return metric_data
+
+    def evaluate(self, logger=None):
+        """Compute the metrics from the accumulated statistics.
+
+        Args:
+            logger (logging.Logger | str, optional): Logger used for printing
+                related information during evaluation. Default: None.
+
+        Returns:
+            dict: Metrics in the format of the ``metrics_summary.json`` of
+                the devkit, as returned by :func:`nuscenes_eval`.
+        """
+        metric_data = {
+            class_name: self._metric_data(class_name)
+            for class_name in self.class_names
+        }
+        return nuscenes_eval_summary(metric_data, self.eval_cfg, logger=logger)
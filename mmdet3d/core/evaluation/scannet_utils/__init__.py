@@ -1,4 +1,5 @@
 # Copyright (c) OpenMMLab. All rights reserved.
-from .evaluate_semantic_instance import evaluate_matches, scannet_eval
+from .evaluate_semantic_instance import (evaluate_matches, scannet_eval,
+                                         scannet_eval_encoded)
 
-__all__ = ['scannet_eval', 'evaluate_matches']
+__all__ = ['scannet_eval', 'evaluate_matches', 'scannet_eval_encoded']
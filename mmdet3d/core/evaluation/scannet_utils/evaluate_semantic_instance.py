@@ -4,6 +4,7 @@ from copy import deepcopy
 
 import numpy as np
 
+from mmdet3d.utils import track_parallel_progress_with_state
 from . import util_3d
 
 
@@ -26,7 +27,7 @@ def evaluate_matches(matches, class_labels, options):
 
     # results: class x overlap
     ap = np.zeros((len(dist_threshes), len(class_labels), len(overlaps)),
-                  np.float)
+                  np.float64)
     for di, (min_region_size, distance_thresh, distance_conf) in enumerate(
             zip(min_region_sizes, dist_threshes, dist_confs)):
         for oi, overlap_th in enumerate(overlaps):
@@ -59,7 +60,7 @@ def evaluate_matches(matches, class_labels, options):
 
                     cur_true = np.ones(len(gt_instances))
                     cur_score = np.ones(len(gt_instances)) * (-float('inf'))
-                    cur_match = np.zeros(len(gt_instances), dtype=np.bool)
+                    cur_match = np.zeros(len(gt_instances), dtype=bool)
                     # collect matches
                     for (gti, gt) in enumerate(gt_instances):
                         found_match = False
@@ -247,7 +248,7 @@ def assign_instances_for_scan(pred_info, gt_ids, options, valid_class_ids,
         pred2gt[label] = []
     num_pred_instances = 0
     # mask of void labels in the ground truth
-    bool_void = np.logical_not(np.in1d(gt_ids // 1000, valid_class_ids))
+    bool_void = np.logical_not(np.isin(gt_ids // 1000, valid_class_ids))
     # go through all prediction masks
     for pred_mask_file in pred_info:
         label_id = int(pred_info[pred_mask_file]['label_id'])
@@ -294,6 +295,160 @@ def assign_instances_for_scan(pred_info, gt_ids, options, valid_class_ids,
     return gt2pred, pred2gt
 
 
+def assign_encoded_instances_for_scan(pred_masks, pred_label_ids, pred_scores,
+                                      gt_ids, options, valid_class_ids,
+                                      class_labels, id_to_label, scan_id):
+    """Assign gt and predicted instances given as instance ids of points.
+
+    It gives the same assignment as :func:`assign_instances_for_scan`, but
+    the intersections of all the gt and predicted instances are counted at
+    once with a single ``np.bincount`` over the pairs of their ids instead
+    of comparing a dense mask of each prediction with each gt instance.
+
+    Args:
+        pred_masks (np.ndarray): Predicted instance id of each point, from 0
+            to the number of predicted instances, negative ids are ignored.
+        pred_label_ids (np.ndarray): Class id of each predicted instance.
+        pred_scores (np.ndarray): Score of each predicted instance.
+        gt_ids (np.array): Ground truth instance masks.
+        options (dict): ScanNet evaluator options. See get_options.
+        valid_class_ids (tuple[int]): Ids of valid categories.
+        class_labels (tuple[str]): Class names.
+        id_to_label (dict[int, str]): Mapping of valid class id to class label.
+        scan_id (int): Id of the scene, the predicted instance i is named
+            '{scan_id}_{i}'.
+
+    Returns:
+        dict: Per class assigned gt to predicted instances.
+        dict: Per class assigned predicted to gt instances.
+    """
+    if len(pred_masks) != len(gt_ids):
+        raise ValueError('len(pred_mask) != len(gt_ids)')
+    # get gt instances, in the order of util_3d.get_instances
+    gt_uniques, gt_inverse, gt_counts = np.unique(
+        gt_ids, return_inverse=True, return_counts=True)
+    gt2pred = {label: [] for label in class_labels}
+    gt_instances = [None] * len(gt_uniques)
+    for k, (instance_id, vert_count) in enumerate(zip(gt_uniques, gt_counts)):
+        label_id = int(instance_id // 1000)
+        if instance_id == 0 or label_id not in valid_class_ids:
+            continue
+        gt_instances[k] = dict(
+            instance_id=int(instance_id),
+            label_id=label_id,
+            vert_count=int(vert_count),
+            med_dist=-1,
+            dist_conf=0.0,
+            matched_pred=[])
+        gt2pred[id_to_label[label_id]].append(gt_instances[k])
+
+    # count the points, void points and gt intersections of each prediction
+    num_preds = len(pred_label_ids)
+    num_gts = len(gt_uniques)
+    valid = (pred_masks >= 0) & (pred_masks < num_preds)
+    pred_inds = pred_masks[valid].astype(np.int64)
+    bool_void = np.logical_not(np.isin(gt_ids // 1000, valid_class_ids))
+    vert_counts = np.bincount(pred_inds, minlength=num_preds)
+    void_counts = np.bincount(pred_inds[bool_void[valid]], minlength=num_preds)
+    intersections = np.bincount(
+        pred_inds * num_gts + gt_inverse.reshape(-1)[valid],
+        minlength=num_preds * num_gts).reshape(num_preds, num_gts)
+
+    pred2gt = {label: [] for label in class_labels}
+    num_pred_instances = 0
+    for i in range(num_preds):
+        label_id = int(pred_label_ids[i])
+        if label_id not in id_to_label:
+            continue
+        label_name = id_to_label[label_id]
+        num = int(vert_counts[i])
+        if num < options['min_region_sizes'][0]:
+            continue  # skip if empty
+
+        pred_instance = {}
+        pred_instance['filename'] = f'{scan_id}_{i}'
+        pred_instance['pred_id'] = num_pred_instances
+        pred_instance['label_id'] = label_id
+        pred_instance['vert_count'] = num
+        pred_instance['confidence'] = pred_scores[i]
+        pred_instance['void_intersection'] = int(void_counts[i])
+
+        # matched gt instances with matching label
+        matched_gt = []
+        for k in np.nonzero(intersections[i])[0]:
+            gt_inst = gt_instances[k]
+            if gt_inst is None or gt_inst['label_id'] != label_id:
+                continue
+            intersection = int(intersections[i, k])
+            gt_copy = gt_inst.copy()
+            pred_copy = pred_instance.copy()
+            gt_copy['intersection'] = intersection
+            pred_copy['intersection'] = intersection
+            matched_gt.append(gt_copy)
+            gt_inst['matched_pred'].append(pred_copy)
+        pred_instance['matched_gt'] = matched_gt
+        num_pred_instances += 1
+        pred2gt[label_name].append(pred_instance)
+
+    return gt2pred, pred2gt
+
+
+def _assign_scan(assign_args, scan_id):
+    """Assign the instances of a scan, see :func:`scannet_eval_encoded`."""
+    preds, gts, args = assign_args
+    pred = preds[scan_id]
+    return assign_encoded_instances_for_scan(pred['mask'], pred['label_id'],
+                                             pred['conf'], gts[scan_id], *args,
+                                             scan_id)
+
+
+def scannet_eval_encoded(preds,
+                         gts,
+                         options,
+                         valid_class_ids,
+                         class_labels,
+                         id_to_label,
+                         nproc=1):
+    """Evaluate instance segmentation in ScanNet protocol, with the
+    predicted instances given as instance ids of points.
+
+    The results are the same as :func:`scannet_eval`, with the instances
+    assigned by :func:`assign_encoded_instances_for_scan`.
+
+    Args:
+        preds (list[dict]): Per scene predictions with keys 'mask', the
+            instance id of each point, 'label_id' and 'conf', the class id
+            and the confidence of each instance.
+        gts (list[np.array]): Per scene ground truth instance masks.
+        options (dict): ScanNet evaluator options. See get_options.
+        valid_class_ids (tuple[int]): Ids of valid categories.
+        class_labels (tuple[str]): Class names.
+        id_to_label (dict[int, str]): Mapping of valid class id to class label.
+        nproc (int, optional): Number of processes used to assign the
+            instances of the scenes. Default: 1.
+
+    Returns:
+        dict: Overall and per-category AP scores.
+    """
+    options = get_options(options)
+    assert len(preds) == len(gts)
+    assign_args = (preds, gts, (options, valid_class_ids, class_labels,
+                                id_to_label))
+    if nproc > 1:
+        assignments = track_parallel_progress_with_state(
+            _assign_scan, assign_args, range(len(preds)), nproc)
+    else:
+        assignments = [_assign_scan(assign_args, i) for i in range(len(preds))]
+    matches = {
+        i: dict(gt=gt2pred, pred=pred2gt)
+        for i, (gt2pred, pred2gt) in enumerate(assignments)
+    }
+
+    ap_scores = evaluate_matches(matches, class_labels, options)
+    avgs = compute_averages(ap_scores, options, class_labels)
+    return avgs
+
+
 def scannet_eval(preds, gts, options, valid_class_ids, class_labels,
                  id_to_label):
     """Evaluate instance segmentation in ScanNet protocol.
@@ -1,24 +1,32 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import numpy as np
+import torch
 from mmcv.utils import print_log
 from terminaltables import AsciiTable
+from torch import distributed as dist
 
 
 def fast_hist(preds, labels, num_classes):
     """Compute the confusion matrix for every batch.
 
     Args:
-        preds (np.ndarray):  Prediction labels of points with shape of
-        (num_points, ).
-        labels (np.ndarray): Ground truth labels of points with shape of
-        (num_points, ).
+        preds (np.ndarray | torch.Tensor):  Prediction labels of points with
+        shape of (num_points, ).
+        labels (np.ndarray | torch.Tensor): Ground truth labels of points
+        with shape of (num_points, ).
         num_classes (int): number of classes
 
     Returns:
-        np.ndarray: Calculated confusion matrix.
+        np.ndarray | torch.Tensor: Calculated confusion matrix, a tensor on
+            the device of the labels if they are given as tensors.
     """
 
     k = (labels >= 0) & (labels < num_classes)
+    if isinstance(labels, torch.Tensor):
+        bin_count = torch.bincount(
+            num_classes * labels[k].long() + preds[k].long(),
+            minlength=num_classes**2)
+        return bin_count[:num_classes**2].reshape(num_classes, num_classes)
     bin_count = np.bincount(
         num_classes * labels[k].astype(int) + preds[k],
         minlength=num_classes**2)
@@ -88,8 +96,8 @@ def seg_eval(gt_labels, seg_preds, label2cat, ignore_index, logger=None):
 
     hist_list = []
     for i in range(len(gt_labels)):
-        gt_seg = gt_labels[i].clone().numpy().astype(np.int)
-        pred_seg = seg_preds[i].clone().numpy().astype(np.int)
+        gt_seg = gt_labels[i].clone().numpy().astype(np.int64)
+        pred_seg = seg_preds[i].clone().numpy().astype(np.int64)
 
         # filter out ignored points
         pred_seg[gt_seg == ignore_index] = -1
@@ -98,10 +106,26 @@ def seg_eval(gt_labels, seg_preds, label2cat, ignore_index, logger=None):
         # calculate one instance result
         hist_list.append(fast_hist(pred_seg, gt_seg, num_classes))
 
-    iou = per_class_iou(sum(hist_list))
+    return seg_eval_summary(sum(hist_list), label2cat, logger=logger)
+
+
+def seg_eval_summary(hist, label2cat, logger=None):
+    """Compute and print the segmentation metrics of a confusion matrix.
+
+    Args:
+        hist (np.ndarray): Overall confusion matrix
+            (num_classes, num_classes).
+        label2cat (dict): Map from label to category name.
+        logger (logging.Logger | str, optional): The way to print the mAP
+            summary. See `mmdet.utils.print_log()` for details. Default: None.
+
+    Returns:
+        dict[str, float]: Dict of results.
+    """
+    iou = per_class_iou(hist)
     miou = np.nanmean(iou)
-    acc = get_acc(sum(hist_list))
-    acc_cls = get_acc_cls(sum(hist_list))
+    acc = get_acc(hist)
+    acc_cls = get_acc_cls(hist)
 
     header = ['classes']
     for i in range(len(label2cat)):
@@ -129,3 +153,97 @@ def seg_eval(gt_labels, seg_preds, label2cat, ignore_index, logger=None):
     print_log('\n' + table.table, logger=logger)
 
     return ret_dict
+
+
+class SegEvalAccumulator(object):
+    """Accumulate the segmentation confusion matrix batch by batch.
+
+    The confusion matrix of each scene is added up as soon as its prediction
+    is produced, so the point-level predictions are never kept, and the
+    metrics are the same as :func:`seg_eval` on all the predictions at once.
+    The matrix can be kept on the device of the predictions to avoid copying
+    them to the host.
+
+    Accumulators of several ranks can be merged with :meth:`all_reduce` or
+    with :meth:`merge`.
+
+    Args:
+        label2cat (dict): Map from label to category name.
+        ignore_index (int): Index that will be ignored in evaluation.
+        device (str | torch.device, optional): Device of the confusion
+            matrix. Defaults to 'cpu'.
+    """
+
+    def __init__(self, label2cat, ignore_index, device='cpu'):
+        self.label2cat = label2cat
+        self.ignore_index = ignore_index
+        self.num_classes = len(label2cat)
+        self.hist = torch.zeros((self.num_classes, self.num_classes),
+                                dtype=torch.int64,
+                                device=device)
+
+    def update(self, gt_labels, seg_preds):
+        """Add the confusion matrices of a batch of scenes.
+
+        Args:
+            gt_labels (list[torch.Tensor]): Ground truth labels.
+            seg_preds  (list[torch.Tensor]): Predictions.
+        """
+        assert len(seg_preds) == len(gt_labels)
+        for gt_seg, pred_seg in zip(gt_labels, seg_preds):
+            gt_seg = torch.as_tensor(gt_seg).to(self.hist.device).long()
+            pred_seg = torch.as_tensor(pred_seg).to(self.hist.device).long()
+            # ignored points are out of range for the confusion matrix
+            gt_seg = gt_seg.masked_fill(gt_seg == self.ignore_index, -1)
+            self.hist += fast_hist(pred_seg, gt_seg, self.num_classes)
+
+    def all_reduce(self):
+        """Sum the confusion matrices of all the ranks in place.
+
+        The NCCL backend only reduces CUDA tensors, so a matrix accumulated
+        on CPU is reduced on the current CUDA device and copied back.
+
+        Returns:
+            :obj:`SegEvalAccumulator`: The reduced accumulator itself.
+        """
+        if dist.is_available() and dist.is_initialized() and \
+                dist.get_world_size() > 1:
+            hist = self.hist
+            if dist.get_backend() == 'nccl' and not hist.is_cuda:
+                hist = hist.cuda()
+            dist.all_reduce(hist, op=dist.ReduceOp.SUM)
+            self.hist = hist.to(self.hist.device)
+        return self
+
+    def merge(self, others):
+        """Merge the confusion matrices of other accumulators.
+
+        Args:
+            others (list[:obj:`SegEvalAccumulator`]): Accumulators with the
+                same classes.
+
+        Returns:
+            :obj:`SegEvalAccumulator`: The merged accumulator itself.
+        """
+        for other in others:
+            if other is self:
+                continue
+            assert other.num_classes == self.num_classes, \
+                'can only merge accumulators of the same classes'
+            self.hist += other.hist.to(self.hist.device)
+        return self
+
+    def evaluate(self, logger=None):
+        """Compute the metrics from the accumulated confusion matrix.
+
+        Args:
+            logger (logging.Logger | str, optional): The way to print the mAP
+                summary. See `mmdet.utils.print_log()` for details.
+                Default: None.
+
+        Returns:
+            dict[str, float]: Dict of results, as returned by
+                :func:`seg_eval`.
+        """
+        return seg_eval_summary(
+            self.hist.cpu().numpy(), self.label2cat, logger=logger)
@@ -0,0 +1,284 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import numba
+import numpy as np
+from mmcv.utils import print_log
+from terminaltables import AsciiTable
+
+from .kitti_utils.rotate_iou_cpu import rbbox_intersection_cpu
+
+# names of the classes in the Waymo metrics
+WAYMO_CLASS_NAMES = dict(
+    Car='Vehicle', Pedestrian='Pedestrian', Cyclist='Cyclist', Sign='Sign')
+
+# IoU thresholds of the Waymo detection metrics
+WAYMO_IOU_THRS = dict(Vehicle=0.7, Pedestrian=0.5, Cyclist=0.5, Sign=0.5)
+
+# score cutoffs where the PR curves are sampled, as in the default config of
+# `compute_detection_metrics_main`
+WAYMO_SCORE_CUTOFFS = np.append(np.arange(100) * 0.01, 1.0)
+
+# ground truths with no more lidar points are of LEVEL_2
+_LEVEL_2_MAX_POINTS = 5
+
+
+@numba.jit(nopython=True)
+def _box_iou(bev1, z1, h1, bev2, z2, h2, bev):
+    """IoU of two boxes given by their bev boxes, center heights and
+    heights."""
+    area_inter = rbbox_intersection_cpu(bev1, bev2)
+    area1 = bev1[2] * bev1[3]
+    area2 = bev2[2] * bev2[3]
+    if bev:
+        union = area1 + area2 - area_inter
+        return area_inter / union if union > 0 else 0.0
+    overlap_h = min(z1 + h1 / 2, z2 + h2 / 2) - max(z1 - h1 / 2, z2 - h2 / 2)
+    if overlap_h <= 0:
+        return 0.0
+    vol_inter = area_inter * overlap_h
+    union = area1 * h1 + area2 * h2 - vol_inter
+    return vol_inter / union if union > 0 else 0.0
+
+
+@numba.jit(nopython=True)
+def _greedy_iou_match(order, pred_offsets, gt_offsets, pred_boxes, gt_boxes,
+                      gt_ignored, iou_thr, bev):
+    """Greedily match the predictions of each sample to its ground truths.
+
+    The predictions of a sample are visited by descending score, each one
+    takes the unmatched ground truth with the highest IoU above the
+    threshold, preferring the ground truths which are not ignored.
+
+    Returns:
+        np.ndarray: Index of the ground truth matched by each prediction, -1
+            if it matched none.
+    """
+    matched = np.full(pred_boxes.shape[0], -1, dtype=np.int64)
+    taken = np.zeros(gt_boxes.shape[0], dtype=np.bool_)
+    for s in range(pred_offsets.shape[0] - 1):
+        for k in range(pred_offsets[s], pred_offsets[s + 1]):
+            i = order[k]
+            best_iou, best_j = iou_thr, -1
+            best_ignored_iou, best_ignored_j = iou_thr, -1
+            for j in range(gt_offsets[s], gt_offsets[s + 1]):
+                if taken[j]:
+                    continue
+                iou = _box_iou(pred_boxes[i, :5], pred_boxes[i, 5],
+                               pred_boxes[i, 6], gt_boxes[j, :5],
+                               gt_boxes[j, 5], gt_boxes[j, 6], bev)
+                if gt_ignored[j]:
+                    if iou >= best_ignored_iou:
+                        best_ignored_iou, best_ignored_j = iou, j
+                elif iou >= best_iou:
+                    best_iou, best_j = iou, j
+            if best_j < 0:
+                best_j = best_ignored_j
+            if best_j >= 0:
+                taken[best_j] = True
+                matched[i] = best_j
+    return matched
+
+
+def _to_bev_boxes(boxes):
+    """Rearrange (x, y, z, dx, dy, dz, yaw) boxes as (x, y, dx, dy, yaw, z,
+    dz) for the matching."""
+    return np.ascontiguousarray(
+        boxes[:, [0, 1, 3, 4, 6, 2, 5]], dtype=np.float64)
+
+
+def _heading_accuracy(pred_yaws, gt_yaws):
+    """Heading accuracy of the true positives, 1 for the same heading and 0
+    for the opposite one."""
+    diff = np.abs(pred_yaws - gt_yaws) % (2 * np.pi)
+    return 1 - np.minimum(diff, 2 * np.pi - diff) / np.pi
+
+
+def compute_waymo_ap(precisions, recalls):
+    """Compute the area under a PR curve sampled at score cutoffs.
+
+    The precision at each recall is replaced by the maximum precision at a
+    higher recall before integrating over the recall.
+
+    Args:
+        precisions (np.ndarray): Precisions at the score cutoffs.
+        recalls (np.ndarray): Recalls at the score cutoffs.
+
+    Returns:
+        float: Average precision.
+    """
+    order = np.argsort(recalls, kind='stable')
+    recalls = np.concatenate([[0.], recalls[order]])
+    precisions = np.maximum.accumulate(precisions[order][::-1])[::-1]
+    return float(np.sum(np.diff(recalls) * precisions))
+
+
+def _subset(data, mask):
+    return {key: value[mask] for key, value in data.items()}
+
+
+def _offsets(sample_inds, num_samples):
+    return np.searchsorted(sample_inds, np.arange(num_samples + 1))
+
+
+def eval_waymo_cls(gts,
+                   preds,
+                   iou_thr,
+                   difficulty_level,
+                   num_samples,
+                   bev=False,
+                   score_cutoffs=WAYMO_SCORE_CUTOFFS):
+    """Compute the AP and APH of a class at a difficulty level.
+
+    Args:
+        gts (dict[str, np.ndarray]): Ground truths of the class, see
+            :func:`waymo_eval`, with their 'levels'.
+        preds (dict[str, np.ndarray]): Predictions of the class.
+        iou_thr (float): IoU threshold of the true positives.
+        difficulty_level (int): Difficulty level, 1 or 2. The ground truths
+            of a higher level are ignored, so are the predictions matching
+            them.
+        num_samples (int): Number of samples.
+        bev (bool, optional): Whether to use the bev IoU instead of the 3D
+            IoU. Defaults to False.
+        score_cutoffs (np.ndarray, optional): Score cutoffs where the PR
+            curves are sampled. Defaults to :obj:`WAYMO_SCORE_CUTOFFS`.
+
+    Returns:
+        tuple[float]: AP and APH.
+    """
+    gt_ignored = gts['levels'] > difficulty_level
+    num_gts = int((~gt_ignored).sum())
+    if num_gts == 0:
+        return 0.0, 0.0
+    gt_order = np.argsort(gts['sample_inds'], kind='stable')
+    gt_sample_inds = gts['sample_inds'][gt_order]
+    gt_boxes = _to_bev_boxes(gts['boxes'][gt_order])
+    gt_ignored = gt_ignored[gt_order]
+    # predictions sorted by sample then by descending score
+    scores = preds['scores']
+    order = np.lexsort((-scores, preds['sample_inds']))
+    pred_offsets = _offsets(preds['sample_inds'][order], num_samples)
+    matched = _greedy_iou_match(order, pred_offsets,
+                                _offsets(gt_sample_inds, num_samples),
+                                _to_bev_boxes(preds['boxes']), gt_boxes,
+                                gt_ignored, iou_thr, bev)
+
+    valid = (matched < 0) | ~gt_ignored[np.maximum(matched, 0)]
+    tp = (matched >= 0) & valid
+    heading_acc = np.zeros(len(scores))
+    heading_acc[tp] = _heading_accuracy(preds['boxes'][tp, 6],
+                                        gt_boxes[matched[tp], 4])
+    # numbers of tp, fp and heading weighted tp at each score cutoff
+    scores, tp, heading_acc = scores[valid], tp[valid], heading_acc[valid]
+    order = np.argsort(-scores, kind='stable')
+    cum_tp = np.concatenate([[0], np.cumsum(tp[order])])
+    cum_tph = np.concatenate([[0.], np.cumsum(heading_acc[order])])
+    num_dets = np.searchsorted(-scores[order], -score_cutoffs, 'right')
+    num_tp, num_tph = cum_tp[num_dets], cum_tph[num_dets]
+    num_dets = np.maximum(num_dets, 1)
+    ap = compute_waymo_ap(num_tp / num_dets, num_tp / num_gts)
+    aph = compute_waymo_ap(num_tph / num_dets, num_tph / num_gts)
+    return ap, aph
+
+
+def get_difficulty_levels(num_points, levels=None):
+    """Get the difficulty levels of the ground truths.
+
+    Ground truths with at most 5 lidar points are of LEVEL_2, so are those
+    labeled as LEVEL_2 by the annotators if their levels are given.
+
+    Args:
+        num_points (np.ndarray): Number of lidar points in each ground truth.
+        levels (np.ndarray, optional): Levels given by the annotators, 0 or 1
+            for LEVEL_1 and 2 for LEVEL_2. Defaults to None.
+
+    Returns:
+        np.ndarray: Levels of the ground truths.
+    """
+    difficulty = np.where(num_points <= _LEVEL_2_MAX_POINTS, 2, 1)
+    if levels is not None:
+        difficulty = np.maximum(difficulty, levels)
+    return difficulty
+
+
+def waymo_eval(gts,
+               preds,
+               classes,
+               eval_types=('3d', 'bev'),
+               num_samples=None,
+               logger=None):
+    """Waymo AP and APH evaluation, computed in process.
+
+    It is a native counterpart of `compute_detection_metrics_main` of the
+    Waymo Open Dataset, for 3D and bev boxes at the difficulty levels
+    LEVEL_1 and LEVEL_2. The predictions are matched to the ground truths
+    greedily by descending score instead of with the Hungarian matching of
+    the official metrics, which only makes a difference when a prediction
+    overlaps several ground truths. The APH weights each true positive by
+    the accuracy of its heading. Ground truths without any lidar point are
+    ignored.
+
+    Args:
+        gts (dict[str, np.ndarray]): Ground truths with keys 'sample_inds',
+            'labels', 'boxes' of shape (N, 7) in the format of (x, y, z, dx,
+            dy, dz, yaw) with z at the center of the boxes, 'num_points' and
+            optionally 'levels' given by the annotators.
+        preds (dict[str, np.ndarray]): Predictions with keys 'sample_inds',
+            'labels', 'boxes' and 'scores'.
+        classes (list[str]): Names of the labels.
+        eval_types (tuple[str], optional): IoU types to evaluate among '3d'
+            and 'bev'. Defaults to ('3d', 'bev').
+        num_samples (int, optional): Number of samples. Defaults to the
+            largest sample index plus one.
+        logger (logging.Logger | str, optional): Logger used for printing
+            related information during evaluation. Defaults to None.
+
+    Returns:
+        dict[str, float]: The mAP and mAPH of each class at each level, with
+            the same keys as the results of `compute_detection_metrics_main`
+            for 3D boxes, and their averages over the classes ('Overall').
+    """
+    if num_samples is None:
+        num_samples = int(
+            max(gts['sample_inds'].max(initial=-1),
+                preds['sample_inds'].max(initial=-1))) + 1
+    levels = get_difficulty_levels(gts['num_points'], gts.get('levels'))
+    # ground truths without any point are never used
+    levels[gts['num_points'] == 0] = 3
+    gts = dict(gts, levels=levels)
+
+    ap_dict = {}
+    names = [WAYMO_CLASS_NAMES.get(c, c) for c in classes]
+    table_data = [['Class'] + [
+        f'{eval_type.upper()} L{level} {metric}' for eval_type in eval_types
+        for level in (1, 2) for metric in ('mAP', 'mAPH')
+    ]]
+    for label, name in enumerate(names):
+        cls_gts = _subset(gts, gts['labels'] == label)
+        cls_preds = _subset(preds, preds['labels'] == label)
+        row = [name]
+        for eval_type in eval_types:
+            prefix = '' if eval_type == '3d' else 'BEV '
+            for level in (1, 2):
+                ap, aph = eval_waymo_cls(cls_gts, cls_preds,
+                                         WAYMO_IOU_THRS.get(name, 0.5), level,
+                                         num_samples, eval_type == 'bev')
+                ap_dict[f'{name}/L{level} {prefix}mAP'] = ap
+                ap_dict[f'{name}/L{level} {prefix}mAPH'] = aph
+                row += [f'{ap:.4f}', f'{aph:.4f}']
+        table_data.append(row)
+
+    row = ['Overall']
+    for eval_type in eval_types:
+        prefix = '' if eval_type == '3d' else 'BEV '
+        for level in (1, 2):
+            for metric in ('mAP', 'mAPH'):
+                key = f'L{level} {prefix}{metric}'
+                mean_ap = float(
+                    np.mean([ap_dict[f'{n}/{key}'] for n in names]))
+                ap_dict[f'Overall/{key}'] = mean_ap
+                row.append(f'{mean_ap:.4f}')
+    table_data.append(row)
+    table = AsciiTable(table_data)
+    table.inner_footing_row_border = True
+    print_log('\n' + table.table, logger=logger)
+    return ap_dict
@@ -0,0 +1,4 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from .set_dataset_epoch_hook import SetDatasetEpochHook
+
+__all__ = ['SetDatasetEpochHook']
@@ -0,0 +1,17 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from mmcv.runner import HOOKS, Hook
+
+
+@HOOKS.register_module()
+class SetDatasetEpochHook(Hook):
+    """Set runner's epoch information to the training dataset.
+
+    It lets datasets such as :obj:`CBGSDataset` resample their indices at
+    every epoch. Since the data loader workers hold a copy of the dataset,
+    it takes no effect with ``persistent_workers=True``.
+    """
+
+    def before_train_epoch(self, runner):
+        dataset = runner.data_loader.dataset
+        if hasattr(dataset, 'set_epoch'):
+            dataset.set_epoch(runner.epoch)
@@ -2,9 +2,10 @@
 from .array_converter import ArrayConverter, array_converter
 from .gaussian import (draw_heatmap_gaussian, ellip_gaussian2D, gaussian_2d,
                        gaussian_radius, get_ellip_gaussian_2D)
+from .packed_batch import pack_batch, unpack_batch, unpack_inputs
 
 __all__ = [
     'gaussian_2d', 'gaussian_radius', 'draw_heatmap_gaussian',
     'ArrayConverter', 'array_converter', 'ellip_gaussian2D',
-    'get_ellip_gaussian_2D'
+    'get_ellip_gaussian_2D', 'pack_batch', 'unpack_batch', 'unpack_inputs'
 ]
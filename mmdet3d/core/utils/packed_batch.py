@@ -0,0 +1,98 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import torch
+
+
+def pack_batch(tensors):
+    """Pack the tensors of the samples in a batch into a single tensor.
+
+    The packed tensor has one row per element of the inputs, and its first
+    column holds the index of the sample each row comes from. It is used to
+    move variable-size inputs such as points and boxes to the device with a
+    single copy.
+
+    Args:
+        tensors (list[torch.Tensor]): Tensors of the samples, with shape
+            (N_i, C) or (N_i, ). All of them should share the same dtype and
+            number of columns.
+
+    Returns:
+        torch.Tensor: Packed tensor of shape (sum(N_i), C + 1).
+    """
+    assert len(tensors) > 0, 'Expect at least one tensor to pack'
+    tensors = [
+        t.unsqueeze(1) if t.dim() == 1 else t.flatten(1) for t in tensors
+    ]
+    num_rows = sum(t.shape[0] for t in tensors)
+    packed = tensors[0].new_empty((num_rows, tensors[0].shape[1] + 1))
+    # write every sample into the preallocated buffer without concatenating
+    start = 0
+    for i, t in enumerate(tensors):
+        end = start + t.shape[0]
+        packed[start:end, 0] = i
+        packed[start:end, 1:] = t
+        start = end
+    return packed
+
+
+def unpack_batch(packed, num_samples=None):
+    """Split a tensor packed by :func:`pack_batch` into the samples.
+
+    Args:
+        packed (torch.Tensor): Packed tensor of shape (N, C + 1).
+        num_samples (int, optional): Number of samples in the batch. It is
+            needed if the last samples may be empty. Defaults to None.
+
+    Returns:
+        list[torch.Tensor]: Tensors of shape (N_i, C) of each sample.
+    """
+    sample_inds = packed[:, 0].long()
+    if num_samples is None:
+        num_samples = int(sample_inds.max()) + 1 if len(sample_inds) else 0
+    counts = torch.bincount(sample_inds, minlength=num_samples)
+    # the rows of a sample are contiguous, but the split views skip the
+    # column of sample indices, so each sample is copied on the device into
+    # a contiguous tensor as expected by the CUDA ops
+    return [
+        t.contiguous()
+        for t in torch.split(packed[:, 1:], counts.tolist(), dim=0)
+    ]
+
+
+def unpack_inputs(inputs, unpack_points=True):
+    """Split the inputs packed by ``packed_collate`` into each sample.
+
+    The points, 3D GT boxes and 3D GT labels may be moved to the device as a
+    single packed tensor (see :func:`pack_batch`). They are split into each
+    sample here so that the detectors and segmentors receive the usual lists.
+    The points are kept packed for the models whose ``extract_feat`` accepts
+    them, e.g. with dynamic voxelization, which avoids the copy of each
+    sample.
+
+    Args:
+        inputs (dict): Inputs of ``forward`` of a model.
+        unpack_points (bool, optional): Whether to split the points. If
+            False, the packed points of shape (N, C + 1), whose first column
+            is the index of the sample, are kept. Defaults to True.
+
+    Returns:
+        dict: Inputs with the packed tensors split into lists.
+    """
+    img_metas = inputs.get('img_metas')
+    if not isinstance(inputs.get('points'), torch.Tensor) or \
+            img_metas is None:
+        return inputs
+    num_samples = len(img_metas)
+    if unpack_points:
+        inputs['points'] = unpack_batch(inputs['points'], num_samples)
+    if isinstance(inputs.get('gt_labels_3d'), torch.Tensor):
+        inputs['gt_labels_3d'] = [
+            labels.view(-1)
+            for labels in unpack_batch(inputs['gt_labels_3d'], num_samples)
+        ]
+    if isinstance(inputs.get('gt_bboxes_3d'), torch.Tensor):
+        inputs['gt_bboxes_3d'] = [
+            img_meta['box_type_3d'](boxes, box_dim=boxes.shape[-1])
+            for img_meta, boxes in zip(
+                img_metas, unpack_batch(inputs['gt_bboxes_3d'], num_samples))
+        ]
+    return inputs
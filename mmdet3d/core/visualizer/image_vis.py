@@ -23,16 +23,12 @@ def project_pts_on_img(points,
             Default: 70.
         thickness (int, optional): The thickness of 2D points. Default: -1.
     """
-    img = raw_img.copy()
-    num_points = points.shape[0]
-    pts_4d = np.concatenate([points[:, :3], np.ones((num_points, 1))], axis=-1)
-    pts_2d = pts_4d @ lidar2img_rt.T
+    from mmdet3d.core.bbox import project_points
 
-    # cam_points is Tensor of Nx4 whose last column is 1
-    # transform camera coordinate to image coordinate
-    pts_2d[:, 2] = np.clip(pts_2d[:, 2], a_min=1e-5, a_max=99999)
-    pts_2d[:, 0] /= pts_2d[:, 2]
-    pts_2d[:, 1] /= pts_2d[:, 2]
+    img = raw_img.copy()
+    # transform lidar coordinate to image coordinate
+    pts_2d = project_points(
+        points[:, :3], lidar2img_rt, with_depth=True, min_depth=1e-5)
 
     fov_inds = ((pts_2d[:, 0] < img.shape[1])
                 & (pts_2d[:, 0] >= 0)
@@ -105,21 +101,18 @@ def draw_lidar_bbox3d_on_img(bboxes3d,
             Default: (0, 255, 0).
         thickness (int, optional): The thickness of bboxes. Default: 1.
     """
+    from mmdet3d.core.bbox import project_points
+
     img = raw_img.copy()
     corners_3d = bboxes3d.corners
+    if isinstance(corners_3d, torch.Tensor):
+        corners_3d = corners_3d.cpu().numpy()
     num_bbox = corners_3d.shape[0]
-    pts_4d = np.concatenate(
-        [corners_3d.reshape(-1, 3),
-         np.ones((num_bbox * 8, 1))], axis=-1)
     lidar2img_rt = copy.deepcopy(lidar2img_rt).reshape(4, 4)
     if isinstance(lidar2img_rt, torch.Tensor):
         lidar2img_rt = lidar2img_rt.cpu().numpy()
-    pts_2d = pts_4d @ lidar2img_rt.T
-
-    pts_2d[:, 2] = np.clip(pts_2d[:, 2], a_min=1e-5, a_max=1e5)
-    pts_2d[:, 0] /= pts_2d[:, 2]
-    pts_2d[:, 1] /= pts_2d[:, 2]
-    imgfov_pts_2d = pts_2d[..., :2].reshape(num_bbox, 8, 2)
+    imgfov_pts_2d = project_points(
+        corners_3d.astype(np.float64), lidar2img_rt, min_depth=1e-5)
 
     return plot_rect3d_on_img(img, num_bbox, imgfov_pts_2d, color, thickness)
 
@@ -1,8 +1,9 @@
 # Copyright (c) OpenMMLab. All rights reserved.
-from mmdet.datasets.builder import build_dataloader
-from .builder import DATASETS, PIPELINES, build_dataset
+from .builder import DATASETS, PIPELINES, build_dataloader, build_dataset
+from .collate import packed_collate
 from .custom_3d import Custom3DDataset
 from .custom_3d_seg import Custom3DSegDataset
+from .dataset_wrappers import CBGSDataset, SceneStreamDataset
 from .kitti_dataset import KittiDataset
 from .kitti_mono_dataset import KittiMonoDataset
 from .lyft_dataset import LyftDataset
@@ -16,17 +17,19 @@ from .pipelines import (AffineResize, BackgroundPointsFilter, GlobalAlignment,
                         LoadPointsFromMultiSweeps, MultiViewWrapper,
                         NormalizePointsColor, ObjectNameFilter, ObjectNoise,
                         ObjectRangeFilter, ObjectSample, PointSample,
-                        PointShuffle, PointsRangeFilter, RandomDropPointsColor,
-                        RandomFlip3D, RandomJitterPoints, RandomRotate,
-                        RandomShiftScale, RangeLimitedRandomCrop,
-                        VoxelBasedPointSampler)
+                        PointShuffle, PointsInImageFilter, PointsRangeFilter,
+                        RandomDropPointsColor, RandomFlip3D,
+                        RandomJitterPoints, RandomRotate, RandomShiftScale,
+                        RangeLimitedRandomCrop, VoxelBasedPointSampler)
 # yapf: enable
 from .s3dis_dataset import S3DISDataset, S3DISSegDataset
+from .samplers import SceneSequentialSampler
 from .scannet_dataset import (ScanNetDataset, ScanNetInstanceSegDataset,
                               ScanNetSegDataset)
 from .semantickitti_dataset import SemanticKITTIDataset
 from .sunrgbd_dataset import SUNRGBDDataset
 from .utils import get_loading_pipeline
+from .valid_samples import find_valid_samples, find_valid_scenes
 from .waymo_dataset import WaymoDataset
 
 __all__ = [
@@ -43,5 +46,8 @@ __all__ = [
     'VoxelBasedPointSampler', 'get_loading_pipeline', 'RandomDropPointsColor',
     'RandomJitterPoints', 'ObjectNameFilter', 'AffineResize',
     'RandomShiftScale', 'LoadPointsFromDict', 'PIPELINES',
-    'RangeLimitedRandomCrop', 'RandomRotate', 'MultiViewWrapper'
+    'RangeLimitedRandomCrop', 'RandomRotate', 'MultiViewWrapper',
+    'CBGSDataset', 'SceneStreamDataset', 'SceneSequentialSampler',
+    'find_valid_samples', 'find_valid_scenes', 'packed_collate',
+    'PointsInImageFilter'
 ]
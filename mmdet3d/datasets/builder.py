@@ -1,10 +1,16 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import platform
+from functools import partial
 
+from mmcv.parallel import collate
+from mmcv.runner import get_dist_info
 from mmcv.utils import Registry, build_from_cfg
+from torch.utils.data import DataLoader, IterableDataset
 
 from mmdet.datasets import DATASETS as MMDET_DATASETS
 from mmdet.datasets.builder import _concat_dataset
+from mmdet.datasets.builder import build_dataloader as build_mmdet_dataloader
+from mmdet.datasets.builder import worker_init_fn
 
 if platform.system() != 'Windows':
     # https://github.com/pytorch/pytorch/issues/973
@@ -21,7 +27,8 @@ PIPELINES = Registry('pipeline')
 
 
 def build_dataset(cfg, default_args=None):
-    from mmdet3d.datasets.dataset_wrappers import CBGSDataset
+    from mmdet3d.datasets.dataset_wrappers import (CBGSDataset,
+                                                   SceneStreamDataset)
     from mmdet.datasets.dataset_wrappers import (ClassBalancedDataset,
                                                  ConcatDataset, RepeatDataset)
     if isinstance(cfg, (list, tuple)):
@@ -37,7 +44,13 @@ def build_dataset(cfg, default_args=None):
         dataset = ClassBalancedDataset(
             build_dataset(cfg['dataset'], default_args), cfg['oversample_thr'])
     elif cfg['type'] == 'CBGSDataset':
-        dataset = CBGSDataset(build_dataset(cfg['dataset'], default_args))
+        dataset = CBGSDataset(
+            build_dataset(cfg['dataset'], default_args),
+            seed=cfg.get('seed', None),
+            cache=cfg.get('cache', True))
+    elif cfg['type'] == 'SceneStreamDataset':
+        dataset = SceneStreamDataset(
+            build_dataset(cfg['dataset'], default_args))
     elif isinstance(cfg.get('ann_file'), (list, tuple)):
         dataset = _concat_dataset(cfg, default_args)
     elif cfg['type'] in DATASETS._module_dict.keys():
@@ -45,3 +58,107 @@ def build_dataset(cfg, default_args=None):
     else:
         dataset = build_from_cfg(cfg, MMDET_DATASETS, default_args)
     return dataset
+
+
+def build_dataloader(dataset,
+                     samples_per_gpu,
+                     workers_per_gpu,
+                     num_gpus=1,
+                     dist=True,
+                     shuffle=True,
+                     seed=None,
+                     scene_sequential=False,
+                     packed_collate=False,
+                     **kwargs):
+    """Build PyTorch DataLoader.
+
+    Compared with ``mmdet.datasets.build_dataloader``, it additionally
+    supports reading temporal datasets scene by scene, which is only meant
+    for testing:
+
+    - If ``scene_sequential`` is True, a :obj:`SceneSequentialSampler` is
+      used so that each rank reads whole scenes in timestamp order.
+    - If ``dataset`` is an iterable dataset (e.g.
+      :obj:`SceneStreamDataset`), no sampler is used since the dataset
+      shards itself across ranks and workers.
+
+    In all other cases it falls back to ``mmdet.datasets.build_dataloader``.
+
+    If ``packed_collate`` is True, the points, 3D GT boxes and 3D GT labels
+    of each device are packed into pinned tensors by :func:`packed_collate`
+    so that each of them is copied to the device at once.
+
+    Args:
+        dataset (Dataset): A PyTorch dataset.
+        samples_per_gpu (int): Number of samples on each GPU, i.e.,
+            batch size of each GPU.
+        workers_per_gpu (int): How many subprocesses to use for data loading
+            for each GPU.
+        num_gpus (int, optional): Number of GPUs. Only used in
+            non-distributed mode. Defaults to 1.
+        dist (bool, optional): Distributed training/test or not.
+            Defaults to True.
+        shuffle (bool, optional): Whether to shuffle the data at every epoch.
+            Ignored when reading scenes sequentially. Defaults to True.
+        seed (int, optional): Seed to be used. Defaults to None.
+        scene_sequential (bool, optional): Whether to read the dataset scene
+            by scene. Defaults to False.
+        packed_collate (bool, optional): Whether to pack the variable-size
+            inputs of each device. Defaults to False.
+        kwargs: Any keyword argument to be used to initialize DataLoader.
+
+    Returns:
+        DataLoader: A PyTorch dataloader.
+    """
+    from .collate import packed_collate as packed_collate_fn
+    collate_fn = packed_collate_fn if packed_collate else collate
+    is_stream = isinstance(dataset, IterableDataset)
+    if not scene_sequential and not is_stream:
+        data_loader = build_mmdet_dataloader(
+            dataset,
+            samples_per_gpu,
+            workers_per_gpu,
+            num_gpus=num_gpus,
+            dist=dist,
+            shuffle=shuffle,
+            seed=seed,
+            **kwargs)
+        if packed_collate:
+            data_loader.collate_fn = partial(
+                collate_fn, samples_per_gpu=samples_per_gpu)
+            data_loader.pin_memory = True
+        return data_loader
+
+    from .samplers import SceneSequentialSampler
+    rank, world_size = get_dist_info()
+    if dist:
+        batch_size = samples_per_gpu
+        num_workers = workers_per_gpu
+    else:
+        batch_size = num_gpus * samples_per_gpu
+        num_workers = num_gpus * workers_per_gpu
+        rank, world_size = 0, 1
+
+    if is_stream:
+        sampler = None
+    else:
+        sampler = SceneSequentialSampler(dataset, world_size, rank)
+
+    init_fn = partial(
+        worker_init_fn, num_workers=num_workers, rank=rank,
+        seed=seed) if seed is not None else None
+    # these arguments only make sense for the samplers of mmdet
+    kwargs.pop('runner_type', None)
+    kwargs.pop('class_aware_sampler', None)
+
+    data_loader = DataLoader(
+        dataset,
+        batch_size=batch_size,
+        sampler=sampler,
+        num_workers=num_workers,
+        collate_fn=partial(collate_fn, samples_per_gpu=samples_per_gpu),
+        pin_memory=kwargs.pop('pin_memory', packed_collate),
+        worker_init_fn=init_fn,
+        **kwargs)
+
+    return data_loader
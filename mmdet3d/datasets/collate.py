@@ -0,0 +1,69 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from mmcv.parallel import DataContainer, collate
+
+from mmdet3d.core.bbox import BaseInstance3DBoxes
+from mmdet3d.core.utils import pack_batch
+
+
+class PackedDataContainer(DataContainer):
+    """A data container holding one packed tensor per device.
+
+    Unlike the tensors of a :obj:`DataContainer`, the packed tensors are
+    pinned by the pinning thread of the data loader, so that they can be
+    copied to the device asynchronously.
+    """
+
+    def pin_memory(self):
+        self._data = [data.pin_memory() for data in self._data]
+        return self
+
+
+def _pack(container, to_tensor=None):
+    """Pack the data of each device in a collated container."""
+    packed = []
+    for samples in container.data:
+        if to_tensor is not None:
+            samples = [to_tensor(sample) for sample in samples]
+        packed.append(pack_batch(samples))
+    return PackedDataContainer(packed, stack=False, cpu_only=False)
+
+
+def packed_collate(batch, samples_per_gpu=1):
+    """Collate a batch and pack the variable-size inputs of each device.
+
+    Compared with :func:`mmcv.parallel.collate`, the points, the 3D GT boxes
+    and the 3D GT labels of the samples on each device are packed into a
+    single tensor with :func:`pack_batch` instead of a list of tensors.
+    Each of them is thus copied to the device at once. The detectors and
+    segmentors unpack them into each sample at the start of their
+    ``forward`` with :func:`unpack_inputs`. Only the detectors with
+    ``accept_packed_points`` (i.e. with dynamic voxelization) keep the
+    points packed and voxelize them at once, the others still process a
+    list of samples.
+
+    Inputs with test-time augmentation (i.e. wrapped in a list) and GT boxes
+    without yaw are left untouched.
+
+    Args:
+        batch (list[dict]): Data of the samples.
+        samples_per_gpu (int, optional): Number of samples on each device.
+            Defaults to 1.
+
+    Returns:
+        dict: Collated data.
+    """
+    data = collate(batch, samples_per_gpu=samples_per_gpu)
+    if not isinstance(data, dict):
+        return data
+
+    if isinstance(data.get('points'), DataContainer):
+        data['points'] = _pack(data['points'])
+    if isinstance(data.get('gt_labels_3d'), DataContainer):
+        data['gt_labels_3d'] = _pack(data['gt_labels_3d'])
+    gt_bboxes_3d = data.get('gt_bboxes_3d')
+    if isinstance(gt_bboxes_3d, DataContainer) and all(
+            isinstance(boxes, BaseInstance3DBoxes) and boxes.with_yaw
+            for samples in gt_bboxes_3d.data for boxes in samples):
+        data['gt_bboxes_3d'] = _pack(
+            gt_bboxes_3d, to_tensor=lambda boxes: boxes.tensor)
+    return data
@@ -11,6 +11,7 @@ from ..core.bbox import get_box_type
 from .builder import DATASETS
 from .pipelines import Compose
 from .utils import extract_result_dict, get_loading_pipeline
+from .valid_samples import RetryStatistics, find_valid_samples
 
 
 @DATASETS.register_module()
@@ -58,6 +59,14 @@ class Custom3DDataset(Dataset):
             Defaults to True.
         test_mode (bool, optional): Whether the dataset is in test mode.
             Defaults to False.
+        valid_sample_cfg (dict, optional): If given in training mode, the
+            samples that can never yield valid ground truths are found once
+            with :func:`find_valid_samples` using this config and removed,
+            e.g. ``dict(point_cloud_range=point_cloud_range, nproc=8)``.
+            The indices of the kept samples in the annotation file are
+            stored in ``valid_sample_inds``. Defaults to None.
+        retry_log_interval (int, optional): Interval of attempts to log the
+            rate of samples that are retried in training. Defaults to 1000.
     """
 
     def __init__(self,
@@ -69,7 +78,9 @@ class Custom3DDataset(Dataset):
                  box_type_3d='LiDAR',
                  filter_empty_gt=True,
                  test_mode=False,
-                 file_client_args=dict(backend='disk')):
+                 file_client_args=dict(backend='disk'),
+                 valid_sample_cfg=None,
+                 retry_log_interval=1000):
         super().__init__()
         self.data_root = data_root
         self.ann_file = ann_file
@@ -98,6 +109,19 @@ class Custom3DDataset(Dataset):
         if pipeline is not None:
             self.pipeline = Compose(pipeline)
 
+        # remove the samples that can never yield valid ground truths, so
+        # that they are never loaded and retried
+        self.valid_sample_inds = None
+        if not self.test_mode and valid_sample_cfg is not None:
+            valid = find_valid_samples(self, **valid_sample_cfg)
+            self.data_infos = [
+                info for info, v in zip(self.data_infos, valid) if v
+            ]
+            self.valid_sample_inds = np.flatnonzero(valid)
+
+        self.retry_log_interval = retry_log_interval
+        self.retry_stats = None
+
         # set group flag for the samplers
         if not self.test_mode:
             self._set_group_flag()
@@ -187,6 +211,32 @@ class Custom3DDataset(Dataset):
             gt_names=gt_names_3d)
         return anns_results
 
+    def get_scene_id(self, index):
+        """Get the id of the scene a sample belongs to.
+
+        Samples without a ``scene_token`` in their info are treated as scenes
+        of their own.
+
+        Args:
+            index (int): Index of the sample data.
+
+        Returns:
+            str | int: Scene id of the sample.
+        """
+        return self.data_infos[index].get('scene_token', index)
+
+    def get_timestamp(self, index):
+        """Get the timestamp of a sample, used to order frames in a scene.
+
+        Args:
+            index (int): Index of the sample data.
+
+        Returns:
+            int | float: Timestamp of the sample. The index is returned if
+                there is no timestamp in the info.
+        """
+        return self.data_infos[index].get('timestamp', index)
+
     def pre_pipeline(self, results):
         """Initialization before data preparation.
 
@@ -350,6 +400,55 @@ class Custom3DDataset(Dataset):
 
         return ret_dict
 
+    def build_accumulator(self, metric=None, iou_thr=(0.25, 0.5), **kwargs):
+        """Build an accumulator to evaluate the results batch by batch.
+
+        It takes the same options as :meth:`evaluate`.
+
+        Args:
+            metric (str | list[str], optional): Metrics to be evaluated.
+                Defaults to None.
+            iou_thr (list[float]): AP IoU thresholds. Defaults to (0.25, 0.5).
+            kwargs (dict): Other options of :meth:`evaluate`, e.g. ``show``,
+                which do not apply to the accumulated evaluation.
+
+        Returns:
+            :obj:`IndoorEvalAccumulator`: The accumulator.
+        """
+        from mmdet3d.core.evaluation import IndoorEvalAccumulator
+        label2cat = {i: cat_id for i, cat_id in enumerate(self.CLASSES)}
+        return IndoorEvalAccumulator(
+            iou_thr,
+            label2cat,
+            box_type_3d=self.box_type_3d,
+            box_mode_3d=self.box_mode_3d)
+
+    def accumulate(self, accumulator, results, indices):
+        """Accumulate the results of a batch of samples.
+
+        Args:
+            accumulator (:obj:`IndoorEvalAccumulator`): The accumulator built
+                by :meth:`build_accumulator`.
+            results (list[dict]): Testing results of the samples.
+            indices (list[int]): Indices of the samples in the dataset.
+        """
+        gt_annos = [self.data_infos[idx]['annos'] for idx in indices]
+        accumulator.update(gt_annos, results)
+
+    def evaluate_accumulator(self, accumulator, logger=None):
+        """Evaluate the statistics accumulated by :meth:`accumulate`.
+
+        Args:
+            accumulator (object): The accumulator built by
+                :meth:`build_accumulator`.
+            logger (logging.Logger | str, optional): Logger used for printing
+                related information during evaluation. Defaults to None.
+
+        Returns:
+            dict: Evaluation results, as returned by :meth:`evaluate`.
+        """
+        return accumulator.evaluate(logger=logger)
+
     def _build_default_pipeline(self):
         """Build the default pipeline for this dataset."""
         raise NotImplementedError('_build_default_pipeline is not implemented '
@@ -431,8 +530,14 @@ class Custom3DDataset(Dataset):
         """
         if self.test_mode:
             return self.prepare_test_data(idx)
+        if self.retry_stats is None:
+            self.retry_stats = RetryStatistics(
+                len(self),
+                log_interval=self.retry_log_interval,
+                name=self.__class__.__name__)
         while True:
             data = self.prepare_train_data(idx)
+            self.retry_stats.update(idx, data is not None)
             if data is None:
                 idx = self._rand_another(idx)
                 continue
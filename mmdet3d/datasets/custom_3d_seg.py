@@ -11,6 +11,7 @@ from mmseg.datasets import DATASETS as SEG_DATASETS
 from .builder import DATASETS
 from .pipelines import Compose
 from .utils import extract_result_dict, get_loading_pipeline
+from .valid_samples import RetryStatistics, find_valid_scenes
 
 
 @DATASETS.register_module()
@@ -40,6 +41,12 @@ class Custom3DSegDataset(Dataset):
         scene_idxs (np.ndarray | str, optional): Precomputed index to load
             data. For scenes with many points, we may sample it several times.
             Defaults to None.
+        valid_sample_cfg (dict, optional): If given in training mode, the
+            scenes without any point of the classes are found once with
+            :func:`find_valid_scenes` using this config and removed from
+            ``scene_idxs``, e.g. ``dict(nproc=8)``. Defaults to None.
+        retry_log_interval (int, optional): Interval of attempts to log the
+            rate of samples that are retried in training. Defaults to 1000.
     """
     # names of all classes data used for the task
     CLASSES = None
@@ -63,7 +70,9 @@ class Custom3DSegDataset(Dataset):
                  test_mode=False,
                  ignore_index=None,
                  scene_idxs=None,
-                 file_client_args=dict(backend='disk')):
+                 file_client_args=dict(backend='disk'),
+                 valid_sample_cfg=None,
+                 retry_log_interval=1000):
         super().__init__()
         self.data_root = data_root
         self.ann_file = ann_file
@@ -93,6 +102,15 @@ class Custom3DSegDataset(Dataset):
         self.CLASSES, self.PALETTE = \
             self.get_classes_and_palette(classes, palette)
 
+        # remove the scenes that can never yield valid semantic labels, so
+        # that they are never sampled
+        if not self.test_mode and valid_sample_cfg is not None:
+            valid = find_valid_scenes(self, **valid_sample_cfg)
+            self.scene_idxs = self.scene_idxs[valid[self.scene_idxs]]
+
+        self.retry_log_interval = retry_log_interval
+        self.retry_stats = None
+
         # set group flag for the sampler
         if not self.test_mode:
             self._set_group_flag()
@@ -361,6 +379,58 @@ class Custom3DSegDataset(Dataset):
 
         return ret_dict
 
+    def build_accumulator(self, metric=None, device='cpu', **kwargs):
+        """Build an accumulator to evaluate the results batch by batch.
+
+        It takes the same options as :meth:`evaluate`.
+
+        Args:
+            metric (str | list[str], optional): Metrics to be evaluated.
+                Defaults to None.
+            device (str | torch.device, optional): Device where the confusion
+                matrix is accumulated. Defaults to 'cpu'.
+            kwargs (dict): Other options of :meth:`evaluate`, e.g. ``show``,
+                which do not apply to the accumulated evaluation.
+
+        Returns:
+            :obj:`SegEvalAccumulator`: The accumulator.
+        """
+        from mmdet3d.core.evaluation import SegEvalAccumulator
+        return SegEvalAccumulator(
+            self.label2cat, self.ignore_index, device=device)
+
+    def accumulate(self, accumulator, results, indices):
+        """Accumulate the results of a batch of samples.
+
+        Args:
+            accumulator (:obj:`SegEvalAccumulator`): The accumulator built by
+                :meth:`build_accumulator`.
+            results (list[dict]): Testing results of the samples.
+            indices (list[int]): Indices of the samples in the dataset.
+        """
+        load_pipeline = self._get_pipeline(None)
+        gt_sem_masks = [
+            self._extract_data(
+                idx, load_pipeline, 'pts_semantic_mask', load_annos=True)
+            for idx in indices
+        ]
+        pred_sem_masks = [result['semantic_mask'] for result in results]
+        accumulator.update(gt_sem_masks, pred_sem_masks)
+
+    def evaluate_accumulator(self, accumulator, logger=None):
+        """Evaluate the statistics accumulated by :meth:`accumulate`.
+
+        Args:
+            accumulator (:obj:`SegEvalAccumulator`): The accumulator built by
+                :meth:`build_accumulator`.
+            logger (logging.Logger | str, optional): Logger used for printing
+                related information during evaluation. Defaults to None.
+
+        Returns:
+            dict: Evaluation results, as returned by :meth:`evaluate`.
+        """
+        return accumulator.evaluate(logger=logger)
+
     def _rand_another(self, idx):
         """Randomly get another item with the same flag.
 
@@ -447,8 +517,15 @@ class Custom3DSegDataset(Dataset):
         scene_idx = self.scene_idxs[idx]  # map to scene idx
         if self.test_mode:
             return self.prepare_test_data(scene_idx)
+        if self.retry_stats is None:
+            self.retry_stats = RetryStatistics(
+                len(self),
+                log_interval=self.retry_log_interval,
+                logger='mmseg',
+                name=self.__class__.__name__)
         while True:
             data = self.prepare_train_data(scene_idx)
+            self.retry_stats.update(idx, data is not None)
             if data is None:
                 idx = self._rand_another(idx)
                 scene_idx = self.scene_idxs[idx]  # map to scene idx
@@ -1,7 +1,16 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import hashlib
+import warnings
+from itertools import zip_longest
+from os import path as osp
+
+import mmcv
 import numpy as np
+from mmcv.runner import get_dist_info
+from torch.utils.data import IterableDataset, get_worker_info
 
 from .builder import DATASETS
+from .samplers import group_by_scene, partition_scenes
 
 
 @DATASETS.register_module()
@@ -12,51 +21,129 @@ class CBGSDataset(object):
 
     Balance the number of scenes under different classes.
 
+    The category distribution of the samples is built once and cached next to
+    the annotation file, keyed by the hash of the file, the classes and the
+    samples kept from the file, see ``valid_sample_cfg`` of
+    :obj:`Custom3DDataset`. The class-balanced indices can then be cheaply
+    resampled at every epoch with :meth:`set_epoch`.
+
     Args:
         dataset (:obj:`CustomDataset`): The dataset to be class sampled.
+        seed (int, optional): Seed of the resampling. If given, the indices
+            of each epoch are drawn from ``seed + epoch`` and thus are
+            reproducible. Otherwise they are drawn from the global numpy
+            random state. Defaults to None.
+        cache (bool, optional): Whether to cache the category distribution
+            next to the annotation file. Defaults to True.
     """
 
-    def __init__(self, dataset):
+    def __init__(self, dataset, seed=None, cache=True):
         self.dataset = dataset
         self.CLASSES = dataset.CLASSES
         self.cat2id = {name: i for i, name in enumerate(self.CLASSES)}
-        self.sample_indices = self._get_sample_indices()
-        # self.dataset.data_infos = self.data_infos
-        if hasattr(self.dataset, 'flag'):
-            self.flag = np.array(
-                [self.dataset.flag[ind] for ind in self.sample_indices],
-                dtype=np.uint8)
+        self.seed = seed
+        self.cat_table = self._get_cat_table(cache)
+        self.set_epoch(0)
 
-    def _get_sample_indices(self):
-        """Load annotations from ann_file.
+    def _cache_file(self):
+        """Get the path of the cached category distribution.
+
+        Returns:
+            str | None: Path of the cache file, None if the annotation file
+                is not a local file.
+        """
+        ann_file = getattr(self.dataset, 'ann_file', None)
+        if not isinstance(ann_file, str) or not osp.isfile(ann_file):
+            return None
+        md5 = hashlib.md5()
+        with open(ann_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                md5.update(chunk)
+        md5.update(
+            repr((tuple(self.CLASSES),
+                  getattr(self.dataset, 'use_valid_flag',
+                          None), getattr(self.dataset, 'load_interval',
+                                         None))).encode())
+        # the samples removed by valid_sample_cfg depend on its options
+        valid_sample_inds = getattr(self.dataset, 'valid_sample_inds', None)
+        if valid_sample_inds is not None:
+            md5.update(np.asarray(valid_sample_inds, dtype=np.int64).tobytes())
+        return f'{osp.splitext(ann_file)[0]}_cbgs_{md5.hexdigest()[:8]}.pkl'
+
+    def _get_cat_table(self, cache=True):
+        """Get whether each sample contains boxes of each category.
 
         Args:
-            ann_file (str): Path of the annotation file.
+            cache (bool, optional): Whether to load and save the cache.
+                Defaults to True.
 
         Returns:
-            list[dict]: List of annotations after class sampling.
+            np.ndarray: Boolean array of shape (N, num_classes).
         """
-        class_sample_idxs = {cat_id: [] for cat_id in self.cat2id.values()}
-        for idx in range(len(self.dataset)):
-            sample_cat_ids = self.dataset.get_cat_ids(idx)
-            for cat_id in sample_cat_ids:
-                class_sample_idxs[cat_id].append(idx)
-        duplicated_samples = sum(
-            [len(v) for _, v in class_sample_idxs.items()])
-        class_distribution = {
-            k: len(v) / duplicated_samples
-            for k, v in class_sample_idxs.items()
-        }
+        cache_file = self._cache_file() if cache else None
+        if cache_file is not None and osp.isfile(cache_file):
+            cat_table = mmcv.load(cache_file)
+            if cat_table.shape == (len(self.dataset), len(self.CLASSES)):
+                return cat_table
 
-        sample_indices = []
+        if hasattr(self.dataset, 'get_cat_table'):
+            cat_table = self.dataset.get_cat_table()
+        else:
+            cat_table = np.zeros((len(self.dataset), len(self.CLASSES)),
+                                 dtype=bool)
+            for idx in range(len(self.dataset)):
+                cat_table[idx, self.dataset.get_cat_ids(idx)] = True
 
+        if cache_file is not None:
+            try:
+                mmcv.dump(cat_table, cache_file)
+            except OSError:
+                # the directory of the annotation file may be read-only
+                pass
+        return cat_table
+
+    def _get_sample_indices(self, rng):
+        """Draw the class-balanced sample indices.
+
+        Args:
+            rng (np.random.RandomState | module): Random state used for
+                sampling.
+
+        Returns:
+            np.ndarray: Indices of the samples after class sampling.
+        """
+        class_sample_idxs = [
+            np.nonzero(self.cat_table[:, cat_id])[0]
+            for cat_id in self.cat2id.values()
+        ]
+        duplicated_samples = sum([len(v) for v in class_sample_idxs])
         frac = 1.0 / len(self.CLASSES)
-        ratios = [frac / v for v in class_distribution.values()]
-        for cls_inds, ratio in zip(list(class_sample_idxs.values()), ratios):
-            sample_indices += np.random.choice(cls_inds,
-                                               int(len(cls_inds) *
-                                                   ratio)).tolist()
-        return sample_indices
+
+        sample_indices = []
+        for cls_inds in class_sample_idxs:
+            if len(cls_inds) == 0:
+                continue
+            ratio = frac / (len(cls_inds) / duplicated_samples)
+            sample_indices.append(
+                rng.choice(cls_inds, int(len(cls_inds) * ratio)))
+        if len(sample_indices) == 0:
+            return np.zeros((0, ), dtype=np.int64)
+        return np.concatenate(sample_indices)
+
+    def set_epoch(self, epoch):
+        """Resample the class-balanced indices for an epoch.
+
+        Args:
+            epoch (int): Index of the epoch.
+        """
+        self.epoch = epoch
+        if self.seed is None:
+            rng = np.random
+        else:
+            rng = np.random.RandomState(self.seed + epoch)
+        self.sample_indices = self._get_sample_indices(rng)
+        if hasattr(self.dataset, 'flag'):
+            self.flag = self.dataset.flag[self.sample_indices].astype(np.uint8)
 
     def __getitem__(self, idx):
         """Get item from infos according to the given index.
@@ -64,7 +151,7 @@ class CBGSDataset(object):
         Returns:
             dict: Data dictionary of the corresponding index.
         """
-        ori_idx = self.sample_indices[idx]
+        ori_idx = int(self.sample_indices[idx])
         return self.dataset[ori_idx]
 
     def __len__(self):
@@ -74,3 +161,192 @@ class CBGSDataset(object):
             int: Length of data infos.
         """
         return len(self.sample_indices)
+
+
+@DATASETS.register_module()
+class SceneStreamDataset(IterableDataset):
+    """A wrapper that streams a temporal dataset scene by scene.
+
+    Frames are yielded in timestamp order inside each scene. Scenes are
+    split across ranks in contiguous chunks of whole scenes and then
+    distributed among the data loading workers of each rank, so every
+    worker reads its scenes sequentially.
+
+    A state dict is carried between consecutive frames of the same scene and
+    is reset at every scene change. It is put into the pipeline input as
+    ``stream_state`` so that transforms can reuse work from the previous
+    frame (e.g. :obj:`LoadPointsFromMultiSweeps` caches the loaded sweeps in
+    it). ``scene_id``, ``frame_idx`` and ``start_of_scene`` are also added to
+    the pipeline input, the latter can be used by temporal models to reset
+    their memory.
+
+    Note:
+        This wrapper is meant for testing and streaming inference, the
+        order of the results can be restored with :meth:`restore_order`.
+        The frames without data info (see :attr:`skipped_inds`) are skipped,
+        thus they have no result.
+
+    Args:
+        dataset (:obj:`Custom3DDataset`): The dataset to be streamed. It
+            should be in test mode.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.CLASSES = dataset.CLASSES
+        self.scene_groups = group_by_scene(dataset)
+        self._skipped_inds = None
+
+    @property
+    def skipped_inds(self):
+        """set[int]: Indices of the frames which cannot be prepared as they
+        have no data info. They are skipped by the stream."""
+        if self._skipped_inds is None:
+            self._skipped_inds = {
+                i
+                for i in range(len(self.dataset))
+                if self.dataset.get_data_info(i) is None
+            }
+        return self._skipped_inds
+
+    def _scene_ids(self, rank, world_size, worker_id=0, num_workers=1):
+        """Get the scenes read by a worker of a rank."""
+        partitions = partition_scenes(self.scene_groups, world_size)
+        return partitions[rank][worker_id::num_workers]
+
+    def prepare_frame(self, index, state, frame_idx):
+        """Prepare the data of a frame in the stream.
+
+        Args:
+            index (int): Index of the frame in the wrapped dataset.
+            state (dict): State shared by the frames of the current scene.
+            frame_idx (int): Index of the frame inside its scene.
+
+        Returns:
+            dict: Data dict of the frame.
+        """
+        input_dict = self.dataset.get_data_info(index)
+        if input_dict is None:
+            return None
+        self.dataset.pre_pipeline(input_dict)
+        input_dict['scene_id'] = self.dataset.get_scene_id(index)
+        input_dict['frame_idx'] = frame_idx
+        input_dict['start_of_scene'] = frame_idx == 0
+        input_dict['stream_state'] = state
+        return self.dataset.pipeline(input_dict)
+
+    def __iter__(self):
+        rank, world_size = get_dist_info()
+        worker_info = get_worker_info()
+        if worker_info is None:
+            scene_ids = self._scene_ids(rank, world_size)
+        else:
+            scene_ids = self._scene_ids(rank, world_size, worker_info.id,
+                                        worker_info.num_workers)
+        for scene_id in scene_ids:
+            yield from self._iter_scene(scene_id)
+
+    def _iter_scene(self, scene_id):
+        """Yield the frames of a scene, except the skipped ones."""
+        state = dict()
+        frame_idx = 0
+        for index in self.scene_groups[scene_id]:
+            index = int(index)
+            if index in self.skipped_inds:
+                continue
+            data = self.prepare_frame(index, state, frame_idx)
+            if data is None:
+                raise RuntimeError(
+                    f'The pipeline drops the frame {index} of scene '
+                    f'{scene_id}, which is not in the stream indices.')
+            frame_idx += 1
+            yield data
+
+    def stream_indices(self,
+                       rank=0,
+                       world_size=1,
+                       num_workers=0,
+                       batch_size=1):
+        """Get the dataset indices in the order a data loader yields them.
+
+        The data loader fetches batches from its workers in a round-robin
+        manner and skips the workers that are exhausted.
+
+        Args:
+            rank (int, optional): Rank of the process. Defaults to 0.
+            world_size (int, optional): Number of ranks. Defaults to 1.
+            num_workers (int, optional): Number of data loading workers.
+                Defaults to 0.
+            batch_size (int, optional): Batch size of the data loader.
+                Defaults to 1.
+
+        Returns:
+            list[int]: Dataset indices in streaming order, without the
+                skipped frames.
+        """
+        num_workers = max(num_workers, 1)
+        worker_batches = []
+        for worker_id in range(num_workers):
+            scene_ids = self._scene_ids(rank, world_size, worker_id,
+                                        num_workers)
+            inds = [
+                int(i) for scene_id in scene_ids
+                for i in self.scene_groups[scene_id]
+                if int(i) not in self.skipped_inds
+            ]
+            worker_batches.append([
+                inds[i:i + batch_size] for i in range(0, len(inds), batch_size)
+            ])
+        indices = []
+        for batches in zip_longest(*worker_batches):
+            for batch in batches:
+                if batch is not None:
+                    indices.extend(batch)
+        return indices
+
+    def restore_order(self, part_list, num_workers=0, batch_size=1):
+        """Put results produced in streaming order back into dataset order.
+
+        The results of the skipped frames are None.
+
+        Args:
+            part_list (list[list]): Results of each rank, in the order they
+                were produced. For non-distributed testing, pass
+                ``[results]``.
+            num_workers (int, optional): Number of data loading workers of
+                each rank. Defaults to 0.
+            batch_size (int, optional): Batch size of the data loader of each
+                rank. Defaults to 1.
+
+        Returns:
+            list: Results ordered by dataset index.
+        """
+        world_size = len(part_list)
+        ordered_results = [None] * len(self.dataset)
+        for rank, part in enumerate(part_list):
+            inds = self.stream_indices(rank, world_size, num_workers,
+                                       batch_size)
+            assert len(inds) == len(part), \
+                f'Expect {len(inds)} results, got {len(part)}.'
+            for idx, res in zip(inds, part):
+                ordered_results[idx] = res
+        if len(self.skipped_inds) > 0:
+            warnings.warn(f'The frames {sorted(self.skipped_inds)} cannot be '
+                          'prepared, thus they have no result.')
+        return ordered_results
+
+    def format_results(self, *args, **kwargs):
+        """Call ``format_results`` of the wrapped dataset."""
+        return self.dataset.format_results(*args, **kwargs)
+
+    def evaluate(self, *args, **kwargs):
+        """Call ``evaluate`` of the wrapped dataset."""
+        return self.dataset.evaluate(*args, **kwargs)
+
+    def __len__(self):
+        """Return the length of the wrapped dataset.
+
+        Returns:
+            int: Length of the wrapped dataset.
+        """
+        return len(self.dataset)
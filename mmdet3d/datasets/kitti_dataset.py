@@ -131,7 +131,10 @@ class KittiDataset(Custom3DDataset):
             sample_idx=sample_idx,
             pts_filename=pts_filename,
             img_prefix=None,
-            img_info=dict(filename=img_filename),
+            img_info=dict(
+                filename=img_filename,
+                height=int(info['image']['image_shape'][0]),
+                width=int(info['image']['image_shape'][1])),
             lidar2img=lidar2img)
 
         if not self.test_mode:
@@ -330,7 +333,8 @@ class KittiDataset(Custom3DDataset):
                  submission_prefix=None,
                  show=False,
                  out_dir=None,
-                 pipeline=None):
+                 pipeline=None,
+                 nproc=1):
         """Evaluation in KITTI protocol.
 
         Args:
@@ -351,6 +355,8 @@ class KittiDataset(Custom3DDataset):
                 Default: None.
             pipeline (list[dict], optional): raw data loading for showing.
                 Default: None.
+            nproc (int, optional): Number of processes used to evaluate.
+                Default: 1.
 
         Returns:
             dict[str, float]: Results of each evaluation metric.
@@ -369,7 +375,8 @@ class KittiDataset(Custom3DDataset):
                     gt_annos,
                     result_files_,
                     self.CLASSES,
-                    eval_types=eval_types)
+                    eval_types=eval_types,
+                    nproc=nproc)
                 for ap_type, ap in ap_dict_.items():
                     ap_dict[f'{name}/{ap_type}'] = float('{:.4f}'.format(ap))
 
@@ -379,10 +386,14 @@ class KittiDataset(Custom3DDataset):
         else:
             if metric == 'img_bbox':
                 ap_result_str, ap_dict = kitti_eval(
-                    gt_annos, result_files, self.CLASSES, eval_types=['bbox'])
+                    gt_annos,
+                    result_files,
+                    self.CLASSES,
+                    eval_types=['bbox'],
+                    nproc=nproc)
             else:
-                ap_result_str, ap_dict = kitti_eval(gt_annos, result_files,
-                                                    self.CLASSES)
+                ap_result_str, ap_dict = kitti_eval(
+                    gt_annos, result_files, self.CLASSES, nproc=nproc)
             print_log('\n' + ap_result_str, logger=logger)
 
         if tmp_dir is not None:
@@ -391,6 +402,64 @@ class KittiDataset(Custom3DDataset):
             self.show(results, out_dir, show=show, pipeline=pipeline)
         return ap_dict
 
+    def build_accumulator(self, metric=None, **kwargs):
+        """Build an accumulator to evaluate the results batch by batch.
+
+        Args:
+            metric (str, optional): Metric to be evaluated. As in
+                :meth:`evaluate`, only the 2D boxes are evaluated for
+                'img_bbox', which are taken from the 'img_bbox' results.
+                Default: None.
+            kwargs (dict): Other options of :meth:`evaluate`, e.g. ``show``,
+                which do not apply to the accumulated evaluation.
+
+        Returns:
+            :obj:`KittiEvalAccumulator`: The accumulator.
+        """
+        from mmdet3d.core.evaluation import KittiEvalAccumulator
+        if metric == 'img_bbox':
+            accumulator = KittiEvalAccumulator(
+                self.CLASSES, eval_types=['bbox'])
+            accumulator.result_name = 'img_bbox'
+        else:
+            accumulator = KittiEvalAccumulator(self.CLASSES)
+            accumulator.result_name = 'pts_bbox'
+        return accumulator
+
+    def accumulate(self, accumulator, results, indices):
+        """Accumulate the detection results of a batch of samples.
+
+        The results of ``accumulator.result_name`` are taken out if the
+        results of several branches are given. Like in :meth:`evaluate`,
+        the 2D results, i.e. lists of boxes of each class, are converted by
+        :meth:`bbox2result_kitti2d` and the 3D ones by
+        :meth:`bbox2result_kitti`.
+
+        Args:
+            accumulator (:obj:`KittiEvalAccumulator`): The accumulator built
+                by :meth:`build_accumulator`.
+            results (list[dict | list[np.ndarray]]): Testing results of the
+                samples.
+            indices (list[int]): Indices of the samples in the dataset.
+        """
+        gt_annos, dt_annos = [], []
+        for idx, result in zip(indices, results):
+            if isinstance(result, dict) and \
+                    ('pts_bbox' in result or 'img_bbox' in result):
+                assert accumulator.result_name in result, \
+                    f'no {accumulator.result_name} in the results, ' \
+                    'set the metric accordingly'
+                result = result[accumulator.result_name]
+            info = self.data_infos[idx]
+            gt_annos.append(info['annos'])
+            if isinstance(result, dict):
+                dt_annos.append(
+                    self._result2kitti_anno(result, info, self.CLASSES))
+            else:
+                dt_annos.append(
+                    self._result2kitti_anno_2d(result, info, self.CLASSES))
+        accumulator.update(gt_annos, dt_annos)
+
     def bbox2result_kitti(self,
                           net_outputs,
                           class_names,
@@ -418,60 +487,9 @@ class KittiDataset(Custom3DDataset):
         print('\nConverting prediction to KITTI format')
         for idx, pred_dicts in enumerate(
                 mmcv.track_iter_progress(net_outputs)):
-            annos = []
             info = self.data_infos[idx]
             sample_idx = info['image']['image_idx']
-            image_shape = info['image']['image_shape'][:2]
-            box_dict = self.convert_valid_bboxes(pred_dicts, info)
-            anno = {
-                'name': [],
-                'truncated': [],
-                'occluded': [],
-                'alpha': [],
-                'bbox': [],
-                'dimensions': [],
-                'location': [],
-                'rotation_y': [],
-                'score': []
-            }
-            if len(box_dict['bbox']) > 0:
-                box_2d_preds = box_dict['bbox']
-                box_preds = box_dict['box3d_camera']
-                scores = box_dict['scores']
-                box_preds_lidar = box_dict['box3d_lidar']
-                label_preds = box_dict['label_preds']
-
-                for box, box_lidar, bbox, score, label in zip(
-                        box_preds, box_preds_lidar, box_2d_preds, scores,
-                        label_preds):
-                    bbox[2:] = np.minimum(bbox[2:], image_shape[::-1])
-                    bbox[:2] = np.maximum(bbox[:2], [0, 0])
-                    anno['name'].append(class_names[int(label)])
-                    anno['truncated'].append(0.0)
-                    anno['occluded'].append(0)
-                    anno['alpha'].append(
-                        -np.arctan2(-box_lidar[1], box_lidar[0]) + box[6])
-                    anno['bbox'].append(bbox)
-                    anno['dimensions'].append(box[3:6])
-                    anno['location'].append(box[:3])
-                    anno['rotation_y'].append(box[6])
-                    anno['score'].append(score)
-
-                anno = {k: np.stack(v) for k, v in anno.items()}
-                annos.append(anno)
-            else:
-                anno = {
-                    'name': np.array([]),
-                    'truncated': np.array([]),
-                    'occluded': np.array([]),
-                    'alpha': np.array([]),
-                    'bbox': np.zeros([0, 4]),
-                    'dimensions': np.zeros([0, 3]),
-                    'location': np.zeros([0, 3]),
-                    'rotation_y': np.array([]),
-                    'score': np.array([]),
-                }
-                annos.append(anno)
+            anno = self._result2kitti_anno(pred_dicts, info, class_names)
 
             if submission_prefix is not None:
                 curr_file = f'{submission_prefix}/{sample_idx:06d}.txt'
@@ -493,10 +511,7 @@ class KittiDataset(Custom3DDataset):
                                 anno['score'][idx]),
                             file=f)
 
-            annos[-1]['sample_idx'] = np.array(
-                [sample_idx] * len(annos[-1]['score']), dtype=np.int64)
-
-            det_annos += annos
+            det_annos.append(anno)
 
         if pklfile_prefix is not None:
             if not pklfile_prefix.endswith(('.pkl', '.pickle')):
@@ -506,6 +521,133 @@ class KittiDataset(Custom3DDataset):
 
         return det_annos
 
+    def _result2kitti_anno(self, pred_dicts, info, class_names):
+        """Convert the 3D detection result of a sample to kitti format.
+
+        Args:
+            pred_dicts (dict): Prediction results of the sample.
+            info (dict): Data info of the sample.
+            class_names (list[String]): A list of class names.
+
+        Returns:
+            dict: The predictions in kitti format.
+        """
+        sample_idx = info['image']['image_idx']
+        image_shape = info['image']['image_shape'][:2]
+        box_dict = self.convert_valid_bboxes(pred_dicts, info)
+        anno = {
+            'name': [],
+            'truncated': [],
+            'occluded': [],
+            'alpha': [],
+            'bbox': [],
+            'dimensions': [],
+            'location': [],
+            'rotation_y': [],
+            'score': []
+        }
+        if len(box_dict['bbox']) > 0:
+            box_2d_preds = box_dict['bbox']
+            box_preds = box_dict['box3d_camera']
+            scores = box_dict['scores']
+            box_preds_lidar = box_dict['box3d_lidar']
+            label_preds = box_dict['label_preds']
+
+            for box, box_lidar, bbox, score, label in zip(
+                    box_preds, box_preds_lidar, box_2d_preds, scores,
+                    label_preds):
+                bbox[2:] = np.minimum(bbox[2:], image_shape[::-1])
+                bbox[:2] = np.maximum(bbox[:2], [0, 0])
+                anno['name'].append(class_names[int(label)])
+                anno['truncated'].append(0.0)
+                anno['occluded'].append(0)
+                anno['alpha'].append(-np.arctan2(-box_lidar[1], box_lidar[0]) +
+                                     box[6])
+                anno['bbox'].append(bbox)
+                anno['dimensions'].append(box[3:6])
+                anno['location'].append(box[:3])
+                anno['rotation_y'].append(box[6])
+                anno['score'].append(score)
+
+            anno = {k: np.stack(v) for k, v in anno.items()}
+        else:
+            anno = {
+                'name': np.array([]),
+                'truncated': np.array([]),
+                'occluded': np.array([]),
+                'alpha': np.array([]),
+                'bbox': np.zeros([0, 4]),
+                'dimensions': np.zeros([0, 3]),
+                'location': np.zeros([0, 3]),
+                'rotation_y': np.array([]),
+                'score': np.array([]),
+            }
+        anno['sample_idx'] = np.array(
+            [sample_idx] * len(anno['score']), dtype=np.int64)
+        return anno
+
+    def _result2kitti_anno_2d(self, bboxes_per_sample, info, class_names):
+        """Convert the 2D detection result of a sample to kitti format.
+
+        Args:
+            bboxes_per_sample (list[np.ndarray]): Boxes and scores of each
+                class, in shape (N, 5).
+            info (dict): Data info of the sample.
+            class_names (list[String]): A list of class names.
+
+        Returns:
+            dict: The predictions in kitti format.
+        """
+        anno = dict(
+            name=[],
+            truncated=[],
+            occluded=[],
+            alpha=[],
+            bbox=[],
+            dimensions=[],
+            location=[],
+            rotation_y=[],
+            score=[])
+        sample_idx = info['image']['image_idx']
+
+        num_example = 0
+        for label in range(len(bboxes_per_sample)):
+            bbox = bboxes_per_sample[label]
+            for i in range(bbox.shape[0]):
+                anno['name'].append(class_names[int(label)])
+                anno['truncated'].append(0.0)
+                anno['occluded'].append(0)
+                anno['alpha'].append(0.0)
+                anno['bbox'].append(bbox[i, :4])
+                # set dimensions (height, width, length) to zero
+                anno['dimensions'].append(
+                    np.zeros(shape=[3], dtype=np.float32))
+                # set the 3D translation to (-1000, -1000, -1000)
+                anno['location'].append(
+                    np.ones(shape=[3], dtype=np.float32) * (-1000.0))
+                anno['rotation_y'].append(0.0)
+                anno['score'].append(bbox[i, 4])
+                num_example += 1
+
+        if num_example == 0:
+            anno = dict(
+                name=np.array([]),
+                truncated=np.array([]),
+                occluded=np.array([]),
+                alpha=np.array([]),
+                bbox=np.zeros([0, 4]),
+                dimensions=np.zeros([0, 3]),
+                location=np.zeros([0, 3]),
+                rotation_y=np.array([]),
+                score=np.array([]),
+            )
+        else:
+            anno = {k: np.stack(v) for k, v in anno.items()}
+
+        anno['sample_idx'] = np.array(
+            [sample_idx] * num_example, dtype=np.int64)
+        return anno
+
     def bbox2result_kitti2d(self,
                             net_outputs,
                             class_names,
@@ -530,58 +672,9 @@ class KittiDataset(Custom3DDataset):
         print('\nConverting prediction to KITTI format')
         for i, bboxes_per_sample in enumerate(
                 mmcv.track_iter_progress(net_outputs)):
-            annos = []
-            anno = dict(
-                name=[],
-                truncated=[],
-                occluded=[],
-                alpha=[],
-                bbox=[],
-                dimensions=[],
-                location=[],
-                rotation_y=[],
-                score=[])
-            sample_idx = self.data_infos[i]['image']['image_idx']
-
-            num_example = 0
-            for label in range(len(bboxes_per_sample)):
-                bbox = bboxes_per_sample[label]
-                for i in range(bbox.shape[0]):
-                    anno['name'].append(class_names[int(label)])
-                    anno['truncated'].append(0.0)
-                    anno['occluded'].append(0)
-                    anno['alpha'].append(0.0)
-                    anno['bbox'].append(bbox[i, :4])
-                    # set dimensions (height, width, length) to zero
-                    anno['dimensions'].append(
-                        np.zeros(shape=[3], dtype=np.float32))
-                    # set the 3D translation to (-1000, -1000, -1000)
-                    anno['location'].append(
-                        np.ones(shape=[3], dtype=np.float32) * (-1000.0))
-                    anno['rotation_y'].append(0.0)
-                    anno['score'].append(bbox[i, 4])
-                    num_example += 1
-
-            if num_example == 0:
-                annos.append(
-                    dict(
-                        name=np.array([]),
-                        truncated=np.array([]),
-                        occluded=np.array([]),
-                        alpha=np.array([]),
-                        bbox=np.zeros([0, 4]),
-                        dimensions=np.zeros([0, 3]),
-                        location=np.zeros([0, 3]),
-                        rotation_y=np.array([]),
-                        score=np.array([]),
-                    ))
-            else:
-                anno = {k: np.stack(v) for k, v in anno.items()}
-                annos.append(anno)
-
-            annos[-1]['sample_idx'] = np.array(
-                [sample_idx] * num_example, dtype=np.int64)
-            det_annos += annos
+            det_annos.append(
+                self._result2kitti_anno_2d(bboxes_per_sample,
+                                           self.data_infos[i], class_names))
 
         if pklfile_prefix is not None:
             # save file in pkl format
@@ -274,7 +274,8 @@ class LyftDataset(Custom3DDataset):
                          result_path,
                          logger=None,
                          metric='bbox',
-                         result_name='pts_bbox'):
+                         result_name='pts_bbox',
+                         nproc=1):
         """Evaluation for a single model in Lyft protocol.
 
         Args:
@@ -285,6 +286,8 @@ class LyftDataset(Custom3DDataset):
                 Default: 'bbox'.
             result_name (str, optional): Result name in the metric prefix.
                 Default: 'pts_bbox'.
+            nproc (int, optional): Number of processes used to evaluate the
+                classes. Default: 1.
 
         Returns:
             dict: Dictionary of evaluation details.
@@ -299,7 +302,8 @@ class LyftDataset(Custom3DDataset):
             'v1.01-train': 'val',
         }
         metrics = lyft_eval(lyft, self.data_root, result_path,
-                            eval_set_map[self.version], output_dir, logger)
+                            eval_set_map[self.version], output_dir, logger,
+                            nproc)
 
         # record metrics
         detail = dict()
@@ -372,7 +376,8 @@ class LyftDataset(Custom3DDataset):
                  result_names=['pts_bbox'],
                  show=False,
                  out_dir=None,
-                 pipeline=None):
+                 pipeline=None,
+                 nproc=1):
         """Evaluation in Lyft protocol.
 
         Args:
@@ -396,6 +401,8 @@ class LyftDataset(Custom3DDataset):
                 Default: None.
             pipeline (list[dict], optional): raw data loading for showing.
                 Default: None.
+            nproc (int, optional): Number of processes used to evaluate the
+                classes. Default: 1.
 
         Returns:
             dict[str, float]: Evaluation results.
@@ -407,10 +414,11 @@ class LyftDataset(Custom3DDataset):
             results_dict = dict()
             for name in result_names:
                 print(f'Evaluating bboxes of {name}')
-                ret_dict = self._evaluate_single(result_files[name])
+                ret_dict = self._evaluate_single(
+                    result_files[name], nproc=nproc)
             results_dict.update(ret_dict)
         elif isinstance(result_files, str):
-            results_dict = self._evaluate_single(result_files)
+            results_dict = self._evaluate_single(result_files, nproc=nproc)
 
         if tmp_dir is not None:
             tmp_dir.cleanup()
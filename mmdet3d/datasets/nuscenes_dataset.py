@@ -7,11 +7,24 @@ import numpy as np
 import pyquaternion
 from nuscenes.utils.data_classes import Box as NuScenesBox
 
+from mmdet3d.utils import track_parallel_progress_with_state
 from ..core import show_result
 from ..core.bbox import Box3DMode, Coord3DMode, LiDARInstance3DBoxes
+from ..core.evaluation.nuscenes_eval import (
+    NuScenesEvalAccumulator, axis_angle_to_quaternion, build_nuscenes_gts,
+    filter_nusc_boxes, lidar_boxes_to_global, nusc_boxes_to_records,
+    nuscenes_eval, transform_nusc_boxes)
 from .builder import DATASETS
 from .custom_3d import Custom3DDataset
 from .pipelines import Compose
+from .valid_samples import _cache_key
+
+
+def _format_chunk(format_args, inds):
+    """Convert a chunk of results, see :meth:`NuScenesDataset._format_bbox`.
+    """
+    dataset, results = format_args
+    return [dataset._format_sample(idx, results[idx]) for idx in inds]
 
 
 @DATASETS.register_module()
@@ -125,9 +138,11 @@ class NuScenesDataset(Custom3DDataset):
                  filter_empty_gt=True,
                  test_mode=False,
                  eval_version='detection_cvpr_2019',
-                 use_valid_flag=False):
+                 use_valid_flag=False,
+                 **kwargs):
         self.load_interval = load_interval
         self.use_valid_flag = use_valid_flag
+        self.with_velocity = with_velocity
         super().__init__(
             data_root=data_root,
             ann_file=ann_file,
@@ -136,9 +151,9 @@ class NuScenesDataset(Custom3DDataset):
             modality=modality,
             box_type_3d=box_type_3d,
             filter_empty_gt=filter_empty_gt,
-            test_mode=test_mode)
+            test_mode=test_mode,
+            **kwargs)
 
-        self.with_velocity = with_velocity
         self.eval_version = eval_version
         from nuscenes.eval.detection.config import config_factory
         self.eval_detection_configs = config_factory(self.eval_version)
@@ -151,6 +166,26 @@ class NuScenesDataset(Custom3DDataset):
                 use_external=False,
             )
 
+    def __getstate__(self):
+        """Get the state to pickle, e.g. for the spawned workers.
+
+        The evaluation config of the devkit holds dict views, which cannot
+        be pickled, thus it is serialized.
+        """
+        state = self.__dict__.copy()
+        if getattr(self, 'eval_detection_configs', None) is not None:
+            state['eval_detection_configs'] = \
+                self.eval_detection_configs.serialize()
+        return state
+
+    def __setstate__(self, state):
+        """Restore the state of a pickled dataset."""
+        from nuscenes.eval.detection.data_classes import DetectionConfig
+        if isinstance(state.get('eval_detection_configs'), dict):
+            state['eval_detection_configs'] = DetectionConfig.deserialize(
+                state['eval_detection_configs'])
+        self.__dict__.update(state)
+
     def get_cat_ids(self, idx):
         """Get category distribution of single scene.
 
@@ -175,6 +210,59 @@ class NuScenesDataset(Custom3DDataset):
                 cat_ids.append(self.cat2id[name])
         return cat_ids
 
+    def get_cat_table(self):
+        """Get the category distribution of all the samples at once.
+
+        Returns:
+            np.ndarray: Boolean array of shape (N, num_classes), indicating
+                whether each sample contains boxes of each category. Row
+                ``idx`` is the vectorized equivalent of ``get_cat_ids(idx)``.
+        """
+        if self.use_valid_flag:
+            names = [
+                info['gt_names'][info['valid_flag']]
+                for info in self.data_infos
+            ]
+        else:
+            names = [info['gt_names'] for info in self.data_infos]
+        sample_inds = np.repeat(
+            np.arange(len(names)), [len(name) for name in names])
+        cat_table = np.zeros((len(names), len(self.CLASSES)), dtype=bool)
+        if len(sample_inds) == 0:
+            return cat_table
+        # map every distinct name to its category once
+        unique_names, name_inds = np.unique(
+            np.concatenate(names), return_inverse=True)
+        unique_cat_ids = np.array(
+            [self.cat2id.get(name, -1) for name in unique_names])
+        cat_ids = unique_cat_ids[name_inds]
+        mask = cat_ids != -1
+        cat_table[sample_inds[mask], cat_ids[mask]] = True
+        return cat_table
+
+    def get_scene_id(self, index):
+        """Get the id of the scene a sample belongs to.
+
+        Info files generated before ``scene_token`` was recorded are split
+        into scenes where the gap between consecutive key frames exceeds
+        1.5 seconds (key frames are sampled at 2Hz).
+
+        Args:
+            index (int): Index of the sample data.
+
+        Returns:
+            str | int: Scene token or the id of the inferred scene.
+        """
+        info = self.data_infos[index]
+        if 'scene_token' in info:
+            return info['scene_token']
+        if getattr(self, '_inferred_scene_ids', None) is None:
+            timestamps = np.array(
+                [info['timestamp'] for info in self.data_infos])
+            gaps = np.diff(timestamps) > 1.5e6 * self.load_interval
+            self._inferred_scene_ids = np.insert(np.cumsum(gaps), 0, 0)
+        return int(self._inferred_scene_ids[index])
+
     def load_annotations(self, ann_file):
         """Load annotations from ann_file.
 
@@ -298,7 +386,26 @@ class NuScenesDataset(Custom3DDataset):
             gt_names=gt_names_3d)
         return anns_results
 
-    def _format_bbox(self, results, jsonfile_prefix=None):
+    def _format_sample(self, sample_id, det):
+        """Convert the result of a sample to nuScenes submission records.
+
+        Args:
+            sample_id (int): Index of the sample.
+            det (dict): Testing result of the sample.
+
+        Returns:
+            list[dict]: Detection records of the sample.
+        """
+        info = self.data_infos[sample_id]
+        boxes = output_to_nusc_boxes(det, self.with_velocity)
+        boxes = lidar_nusc_boxes_to_global(info, boxes, self.CLASSES,
+                                           self.eval_detection_configs,
+                                           self.eval_version)
+        names = np.array(self.CLASSES)[boxes['label']]
+        attrs = self.get_attr_names(boxes['label'], boxes['velocity'])
+        return nusc_boxes_to_records(boxes, info['token'], names, attrs)
+
+    def _format_bbox(self, results, jsonfile_prefix=None, nproc=1):
         """Convert the results to the standard format.
 
         Args:
@@ -306,56 +413,33 @@ class NuScenesDataset(Custom3DDataset):
             jsonfile_prefix (str): The prefix of the output jsonfile.
                 You can specify the output directory/filename by
                 modifying the jsonfile_prefix. Default: None.
+            nproc (int, optional): Number of processes used to convert the
+                results. Default: 1.
 
         Returns:
             str: Path of the output json file.
         """
-        nusc_annos = {}
-        mapped_class_names = self.CLASSES
-
         print('Start to convert detection format...')
-        for sample_id, det in enumerate(mmcv.track_iter_progress(results)):
-            annos = []
-            boxes = output_to_nusc_box(det, self.with_velocity)
-            sample_token = self.data_infos[sample_id]['token']
-            boxes = lidar_nusc_box_to_global(self.data_infos[sample_id], boxes,
-                                             mapped_class_names,
-                                             self.eval_detection_configs,
-                                             self.eval_version)
-            for i, box in enumerate(boxes):
-                name = mapped_class_names[box.label]
-                if np.sqrt(box.velocity[0]**2 + box.velocity[1]**2) > 0.2:
-                    if name in [
-                            'car',
-                            'construction_vehicle',
-                            'bus',
-                            'truck',
-                            'trailer',
-                    ]:
-                        attr = 'vehicle.moving'
-                    elif name in ['bicycle', 'motorcycle']:
-                        attr = 'cycle.with_rider'
-                    else:
-                        attr = NuScenesDataset.DefaultAttribute[name]
-                else:
-                    if name in ['pedestrian']:
-                        attr = 'pedestrian.standing'
-                    elif name in ['bus']:
-                        attr = 'vehicle.stopped'
-                    else:
-                        attr = NuScenesDataset.DefaultAttribute[name]
-
-                nusc_anno = dict(
-                    sample_token=sample_token,
-                    translation=box.center.tolist(),
-                    size=box.wlh.tolist(),
-                    rotation=box.orientation.elements.tolist(),
-                    velocity=box.velocity[:2].tolist(),
-                    detection_name=name,
-                    detection_score=box.score,
-                    attribute_name=attr)
-                annos.append(nusc_anno)
-            nusc_annos[sample_token] = annos
+        num_samples = len(results)
+        if nproc > 1:
+            chunk_size = max(1, -(-num_samples // (nproc * 4)))
+            tasks = [
+                range(i, min(i + chunk_size, num_samples))
+                for i in range(0, num_samples, chunk_size)
+            ]
+            chunks = track_parallel_progress_with_state(
+                _format_chunk, (self, results), tasks, nproc)
+            annos = sum(chunks, [])
+        else:
+            annos = [
+                self._format_sample(sample_id, det)
+                for sample_id, det in enumerate(
+                    mmcv.track_iter_progress(results))
+            ]
+        nusc_annos = {
+            self.data_infos[sample_id]['token']: annos[sample_id]
+            for sample_id in range(num_samples)
+        }
         nusc_submissions = {
             'meta': self.modality,
             'results': nusc_annos,
@@ -407,6 +491,20 @@ class NuScenesDataset(Custom3DDataset):
 
         # record metrics
         metrics = mmcv.load(osp.join(output_dir, 'metrics_summary.json'))
+        return self._format_metrics(metrics, result_name)
+
+    def _format_metrics(self, metrics, result_name='pts_bbox'):
+        """Flatten the metrics summary into a dict of evaluation details.
+
+        Args:
+            metrics (dict): Metrics in the format of the
+                ``metrics_summary.json`` of the devkit.
+            result_name (str, optional): Result name in the metric prefix.
+                Default: 'pts_bbox'.
+
+        Returns:
+            dict: Dictionary of evaluation details.
+        """
         detail = dict()
         metric_prefix = f'{result_name}_NuScenes'
         for name in self.CLASSES:
@@ -425,7 +523,207 @@ class NuScenesDataset(Custom3DDataset):
         detail['{}/mAP'.format(metric_prefix)] = metrics['mean_ap']
         return detail
 
-    def format_results(self, results, jsonfile_prefix=None):
+    def get_eval_gts(self, cache=True):
+        """Get the ground truths in the global frame for native evaluation.
+
+        The arrays are built once from the infos and cached next to the
+        annotation file, so neither the raw dataset nor the devkit tables
+        are loaded for evaluation.
+
+        Args:
+            cache (bool, optional): Whether to cache the arrays next to the
+                annotation file. Default: True.
+
+        Returns:
+            dict[str, np.ndarray]: Ground truths, see
+                :func:`build_nuscenes_gts`.
+        """
+        cache_file = None
+        if cache and isinstance(self.ann_file, str) and \
+                osp.isfile(self.ann_file):
+            key = _cache_key(self, build_nuscenes_gts, dict())
+            cache_file = osp.splitext(self.ann_file)[0] + \
+                f'_eval_gts_{key}.npz'
+            if osp.isfile(cache_file):
+                with np.load(cache_file) as data:
+                    return dict(data)
+
+        gts = build_nuscenes_gts(self.data_infos)
+        if cache_file is not None:
+            try:
+                np.savez(cache_file, **gts)
+            except OSError:
+                # the directory of the annotation file may be read-only
+                pass
+        return gts
+
+    def get_attr_names(self, labels, velocities):
+        """Get the attribute of each predicted box from its speed.
+
+        Args:
+            labels (np.ndarray): Labels of the boxes.
+            velocities (np.ndarray): Velocities of the boxes in the global
+                frame, with shape (N, 2).
+
+        Returns:
+            np.ndarray: Attribute names of the boxes.
+        """
+        moving_attrs, static_attrs = [], []
+        for name in self.CLASSES:
+            if name in [
+                    'car', 'construction_vehicle', 'bus', 'truck', 'trailer'
+            ]:
+                moving_attrs.append('vehicle.moving')
+            elif name in ['bicycle', 'motorcycle']:
+                moving_attrs.append('cycle.with_rider')
+            else:
+                moving_attrs.append(NuScenesDataset.DefaultAttribute[name])
+            if name in ['pedestrian']:
+                static_attrs.append('pedestrian.standing')
+            elif name in ['bus']:
+                static_attrs.append('vehicle.stopped')
+            else:
+                static_attrs.append(NuScenesDataset.DefaultAttribute[name])
+        moving = np.sqrt(velocities[:, 0]**2 + velocities[:, 1]**2) > 0.2
+        return np.where(moving,
+                        np.array(moving_attrs)[labels],
+                        np.array(static_attrs)[labels])
+
+    def results2arrays(self, results, indices=None):
+        """Convert the results to flat arrays of boxes in the global frame.
+
+        The boxes out of the range of their class are removed as in
+        :meth:`_format_bbox`, without building any ``NuScenesBox``.
+
+        Args:
+            results (list[dict]): Testing results of the dataset.
+            indices (list[int], optional): Indices of the samples of the
+                results in the dataset. Defaults to all the samples.
+
+        Returns:
+            dict[str, np.ndarray]: Predictions for :func:`nuscenes_eval`.
+        """
+        if indices is None:
+            indices = range(len(results))
+        class_range = self.eval_detection_configs.class_range
+        det_ranges = np.array([class_range[name] for name in self.CLASSES])
+        keys = ('sample_inds', 'labels', 'translation', 'size', 'yaw',
+                'velocity', 'scores', 'ego_dist')
+        preds = {key: [] for key in keys}
+        for sample_id, det in zip(indices, results):
+            box3d = det['boxes_3d']
+            labels = det['labels_3d'].numpy().astype(np.int64)
+            if self.with_velocity:
+                velocities = box3d.tensor[:, 7:9].numpy()
+            else:
+                velocities = np.zeros((len(box3d), 2))
+            info = self.data_infos[sample_id]
+            ego_centers, centers, yaws, velocities = lidar_boxes_to_global(
+                info, box3d.gravity_center.numpy(), box3d.yaw.numpy(),
+                velocities)
+            keep = np.linalg.norm(ego_centers[:, :2], axis=1) <= \
+                det_ranges[labels]
+            preds['sample_inds'].append(np.full(keep.sum(), sample_id))
+            preds['labels'].append(labels[keep])
+            preds['translation'].append(centers[keep])
+            preds['size'].append(box3d.dims.numpy()[keep])
+            preds['yaw'].append(yaws[keep])
+            preds['velocity'].append(velocities[keep])
+            preds['scores'].append(det['scores_3d'].numpy()[keep])
+            preds['ego_dist'].append(
+                np.linalg.norm(
+                    (centers[keep] -
+                     np.array(info['ego2global_translation']))[:, :2],
+                    axis=1))
+        preds = {key: np.concatenate(value) for key, value in preds.items()}
+        preds['translation'] = preds['translation'].reshape(-1, 3)
+        preds['size'] = preds['size'].reshape(-1, 3)
+        preds['velocity'] = preds['velocity'].reshape(-1, 2)
+        preds['names'] = np.array(self.CLASSES)[preds['labels']]
+        preds['attrs'] = self.get_attr_names(preds['labels'],
+                                             preds['velocity'])
+        return preds
+
+    def _evaluate_native(self, results, logger=None, result_name='pts_bbox'):
+        """Evaluation of a single model with the native nuScenes metrics.
+
+        Args:
+            results (list[dict]): Testing results of the dataset.
+            logger (logging.Logger | str, optional): Logger used for printing
+                related information during evaluation. Default: None.
+            result_name (str, optional): Result name in the metric prefix.
+                Default: 'pts_bbox'.
+
+        Returns:
+            dict: Dictionary of evaluation details.
+        """
+        metrics = nuscenes_eval(
+            self.get_eval_gts(),
+            self.results2arrays(results),
+            self.eval_detection_configs.serialize(),
+            logger=logger)
+        return self._format_metrics(metrics, result_name)
+
+    def build_accumulator(self,
+                          metric='bbox',
+                          result_names=['pts_bbox'],
+                          **kwargs):
+        """Build an accumulator to evaluate the results batch by batch.
+
+        It takes the same options as :meth:`evaluate`.
+
+        Args:
+            metric (str | list[str], optional): Metrics to be evaluated.
+                Default: 'bbox'.
+            result_names (list[str], optional): Result names in the metric
+                prefix, only a single one can be accumulated.
+                Default: ['pts_bbox'].
+            kwargs (dict): Other options of :meth:`evaluate`, e.g. ``show``,
+                which do not apply to the accumulated evaluation.
+
+        Returns:
+            :obj:`NuScenesEvalAccumulator`: The accumulator.
+        """
+        assert len(result_names) == 1, \
+            'only the results of a single branch can be accumulated'
+        accumulator = NuScenesEvalAccumulator(
+            self.eval_detection_configs.serialize())
+        accumulator.result_name = result_names[0]
+        return accumulator
+
+    def accumulate(self, accumulator, results, indices):
+        """Accumulate the 3D detection results of a batch of samples.
+
+        Args:
+            accumulator (:obj:`NuScenesEvalAccumulator`): The accumulator
+                built by :meth:`build_accumulator`.
+            results (list[dict]): Testing results of the samples.
+            indices (list[int]): Indices of the samples in the dataset.
+        """
+        results = [
+            result.get(accumulator.result_name, result) for result in results
+        ]
+        gts = build_nuscenes_gts([self.data_infos[idx] for idx in indices])
+        gts['sample_inds'] = np.asarray(
+            indices, dtype=np.int64)[gts['sample_inds']]
+        accumulator.update(gts, self.results2arrays(results, indices))
+
+    def evaluate_accumulator(self, accumulator, logger=None):
+        """Evaluate the statistics accumulated by :meth:`accumulate`.
+
+        Args:
+            accumulator (:obj:`NuScenesEvalAccumulator`): The accumulator.
+            logger (logging.Logger | str, optional): Logger used for printing
+                related information during evaluation. Default: None.
+
+        Returns:
+            dict[str, float]: Results of each evaluation metric, as returned
+                by :meth:`evaluate`.
+        """
+        metrics = accumulator.evaluate(logger=logger)
+        return self._format_metrics(metrics, accumulator.result_name)
+
+    def format_results(self, results, jsonfile_prefix=None, nproc=1):
         """Format the results to json (standard format for COCO evaluation).
 
         Args:
@@ -433,6 +731,8 @@ class NuScenesDataset(Custom3DDataset):
             jsonfile_prefix (str): The prefix of json files. It includes
                 the file path and the prefix of filename, e.g., "a/b/prefix".
                 If not specified, a temp file will be created. Default: None.
+            nproc (int, optional): Number of processes used to convert the
+                results. Default: 1.
 
         Returns:
             tuple: Returns (result_files, tmp_dir), where `result_files` is a
@@ -458,7 +758,7 @@ class NuScenesDataset(Custom3DDataset):
         # this is a workaround to enable evaluation of both formats on nuScenes
         # refer to https://github.com/open-mmlab/mmdetection3d/issues/449
         if not ('pts_bbox' in results[0] or 'img_bbox' in results[0]):
-            result_files = self._format_bbox(results, jsonfile_prefix)
+            result_files = self._format_bbox(results, jsonfile_prefix, nproc)
         else:
             # should take the inner dict out of 'pts_bbox' or 'img_bbox' dict
             result_files = dict()
@@ -467,7 +767,7 @@ class NuScenesDataset(Custom3DDataset):
                 results_ = [out[name] for out in results]
                 tmp_file_ = osp.join(jsonfile_prefix, name)
                 result_files.update(
-                    {name: self._format_bbox(results_, tmp_file_)})
+                    {name: self._format_bbox(results_, tmp_file_, nproc)})
         return result_files, tmp_dir
 
     def evaluate(self,
@@ -478,7 +778,9 @@ class NuScenesDataset(Custom3DDataset):
                  result_names=['pts_bbox'],
                  show=False,
                  out_dir=None,
-                 pipeline=None):
+                 pipeline=None,
+                 eval_backend='devkit',
+                 nproc=1):
         """Evaluation in nuScenes protocol.
 
         Args:
@@ -496,11 +798,34 @@ class NuScenesDataset(Custom3DDataset):
                 Default: None.
             pipeline (list[dict], optional): raw data loading for showing.
                 Default: None.
+            eval_backend (str, optional): 'devkit' to evaluate the json
+                results with ``NuScenesEval``, or 'native' to evaluate the
+                results in process with :func:`nuscenes_eval`, which needs
+                neither the raw dataset nor a json file. Default: 'devkit'.
+            nproc (int, optional): Number of processes used to convert the
+                results to json. Default: 1.
 
         Returns:
             dict[str, float]: Results of each evaluation metric.
         """
-        result_files, tmp_dir = self.format_results(results, jsonfile_prefix)
+        assert eval_backend in ['devkit', 'native'], \
+            f'invalid eval_backend {eval_backend}'
+        if eval_backend == 'native':
+            if 'pts_bbox' in results[0] or 'img_bbox' in results[0]:
+                results_dict = dict()
+                for name in result_names:
+                    print('Evaluating bboxes of {}'.format(name))
+                    results_dict.update(
+                        self._evaluate_native([out[name] for out in results],
+                                              logger, name))
+            else:
+                results_dict = self._evaluate_native(results, logger)
+            if show or out_dir:
+                self.show(results, out_dir, show=show, pipeline=pipeline)
+            return results_dict
+
+        result_files, tmp_dir = self.format_results(results, jsonfile_prefix,
+                                                    nproc)
 
         if isinstance(result_files, dict):
             results_dict = dict()
@@ -655,3 +980,65 @@ def lidar_nusc_box_to_global(info,
         box.translate(np.array(info['ego2global_translation']))
         box_list.append(box)
     return box_list
+
+
+def output_to_nusc_boxes(detection, with_velocity=True):
+    """Convert the output to the arrays of boxes in the nuScenes convention.
+
+    It is the batched equivalent of :func:`output_to_nusc_box`, see
+    :func:`transform_nusc_boxes` for the format of the boxes.
+
+    Args:
+        detection (dict): Detection results.
+
+            - boxes_3d (:obj:`BaseInstance3DBoxes`): Detection bbox.
+            - scores_3d (torch.Tensor): Detection scores.
+            - labels_3d (torch.Tensor): Predicted box labels.
+        with_velocity (bool, optional): Whether the boxes have velocities.
+            Default: True.
+
+    Returns:
+        dict[str, np.ndarray]: Boxes in the LiDAR frame.
+    """
+    box3d = detection['boxes_3d']
+    velocity = np.zeros((len(box3d), 3))
+    if with_velocity:
+        velocity[:, :2] = box3d.tensor[:, 7:9].numpy()
+    return dict(
+        center=box3d.gravity_center.numpy(),
+        # our LiDAR coordinate system -> nuScenes box coordinate system
+        wlh=box3d.dims.numpy()[:, [1, 0, 2]],
+        orientation=axis_angle_to_quaternion([0, 0, 1], box3d.yaw.numpy()),
+        velocity=velocity,
+        label=detection['labels_3d'].numpy().astype(np.int64),
+        score=detection['scores_3d'].numpy())
+
+
+def lidar_nusc_boxes_to_global(info,
+                               boxes,
+                               classes,
+                               eval_configs,
+                               eval_version='detection_cvpr_2019'):
+    """Convert the boxes from LiDAR to global coordinate.
+
+    It is the batched equivalent of :func:`lidar_nusc_box_to_global`.
+
+    Args:
+        info (dict): Info for a specific sample data, including the
+            calibration information.
+        boxes (dict[str, np.ndarray]): Boxes from
+            :func:`output_to_nusc_boxes`.
+        classes (list[str]): Mapped classes in the evaluation.
+        eval_configs (object): Evaluation configuration object.
+        eval_version (str, optional): Evaluation version.
+            Default: 'detection_cvpr_2019'
+
+    Returns:
+        dict[str, np.ndarray]: Boxes within the detection range of their
+            class, in the global coordinate.
+    """
+    boxes = transform_nusc_boxes(boxes, info['lidar2ego_rotation'],
+                                 info['lidar2ego_translation'])
+    boxes = filter_nusc_boxes(boxes, classes, eval_configs.class_range)
+    return transform_nusc_boxes(boxes, info['ego2global_rotation'],
+                                info['ego2global_translation'])
@@ -11,14 +11,26 @@ import torch
 from nuscenes.utils.data_classes import Box as NuScenesBox
 
 from mmdet3d.core import bbox3d2result, box3d_multiclass_nms, xywhr2xyxyr
+from mmdet3d.utils import track_parallel_progress_with_state
 from mmdet.datasets import CocoDataset
 from ..core import show_multi_modality_result
 from ..core.bbox import CameraInstance3DBoxes, get_box_type
+from ..core.evaluation.nuscenes_eval import (
+    axis_angle_to_quaternion, filter_nusc_boxes, nusc_boxes_to_records,
+    quaternion_multiply, quaternion_yaw, transform_nusc_boxes)
 from .builder import DATASETS
 from .pipelines import Compose
 from .utils import extract_result_dict, get_loading_pipeline
 
 
+def _format_frame(format_args, sample_id):
+    """Convert the results of a frame, see
+    :meth:`NuScenesMonoDataset._format_bbox`."""
+    dataset, results, cam_num = format_args
+    return dataset._format_frame(sample_id,
+                                 results[sample_id:sample_id + cam_num])
+
+
 @DATASETS.register_module()
 class NuScenesMonoDataset(CocoDataset):
     r"""Monocular 3D detection on NuScenes Dataset.
@@ -145,6 +157,26 @@ class NuScenesMonoDataset(CocoDataset):
                 use_map=False,
                 use_external=False)
 
+    def __getstate__(self):
+        """Get the state to pickle, e.g. for the spawned workers.
+
+        The evaluation config of the devkit holds dict views, which cannot
+        be pickled, thus it is serialized.
+        """
+        state = self.__dict__.copy()
+        if getattr(self, 'eval_detection_configs', None) is not None:
+            state['eval_detection_configs'] = \
+                self.eval_detection_configs.serialize()
+        return state
+
+    def __setstate__(self, state):
+        """Restore the state of a pickled dataset."""
+        from nuscenes.eval.detection.data_classes import DetectionConfig
+        if isinstance(state.get('eval_detection_configs'), dict):
+            state['eval_detection_configs'] = DetectionConfig.deserialize(
+                state['eval_detection_configs'])
+        self.__dict__.update(state)
+
     def pre_pipeline(self, results):
         """Initialization before data preparation.
 
@@ -320,7 +352,78 @@ class NuScenesMonoDataset(CocoDataset):
         else:
             return NuScenesMonoDataset.DefaultAttribute[label_name]
 
-    def _format_bbox(self, results, jsonfile_prefix=None):
+    def _format_frame(self, sample_id, dets):
+        """Convert the results of the images of a frame to submission records.
+
+        The boxes predicted in the images are merged in the frame of the
+        first camera, then the redundant predictions caused by the overlap of
+        the images are removed by NMS.
+
+        Args:
+            sample_id (int): Index of the first image of the frame.
+            dets (list[dict]): Testing results of the images of the frame.
+
+        Returns:
+            list[dict]: Detection records of the frame.
+        """
+        mapped_class_names = self.CLASSES
+        frame_boxes = []
+        for i, det in enumerate(dets):
+            boxes = output_to_nusc_boxes(det)
+            frame_boxes.append(
+                cam_nusc_boxes_to_global(self.data_infos[sample_id + i], boxes,
+                                         mapped_class_names,
+                                         self.eval_detection_configs,
+                                         self.eval_version))
+        boxes = {
+            key: np.concatenate([b[key] for b in frame_boxes])
+            for key in frame_boxes[0]
+        }
+        info = self.data_infos[sample_id]
+        boxes = global_nusc_boxes_to_cam(info, boxes, mapped_class_names,
+                                         self.eval_detection_configs,
+                                         self.eval_version)
+        cam_boxes3d, scores, labels = nusc_boxes_to_cam_box3d(boxes)
+        # box nms 3d over 6 images in a frame
+        # TODO: move this global setting into config
+        nms_cfg = dict(
+            use_rotate_nms=True,
+            nms_across_levels=False,
+            nms_pre=4096,
+            nms_thr=0.05,
+            score_thr=0.01,
+            min_bbox_size=0,
+            max_per_frame=500)
+        from mmcv import Config
+        nms_cfg = Config(nms_cfg)
+        cam_boxes3d_for_nms = xywhr2xyxyr(cam_boxes3d.bev)
+        boxes3d = cam_boxes3d.tensor
+        # generate attr scores from attr labels
+        attrs = labels.new_tensor(boxes['attr'])
+        boxes3d, scores, labels, attrs = box3d_multiclass_nms(
+            boxes3d,
+            cam_boxes3d_for_nms,
+            scores,
+            nms_cfg.score_thr,
+            nms_cfg.max_per_frame,
+            nms_cfg,
+            mlvl_attr_scores=attrs)
+        cam_boxes3d = CameraInstance3DBoxes(boxes3d, box_dim=9)
+        det = bbox3d2result(cam_boxes3d, scores, labels, attrs)
+        boxes = output_to_nusc_boxes(det)
+        boxes = cam_nusc_boxes_to_global(info, boxes, mapped_class_names,
+                                         self.eval_detection_configs,
+                                         self.eval_version)
+
+        names = np.array(mapped_class_names)[boxes['label']]
+        attrs = [
+            self.get_attr_name(attr, name)
+            for attr, name in zip(boxes['attr'].tolist(), names)
+        ]
+        sample_token = self.data_infos[sample_id + len(dets) - 1]['token']
+        return nusc_boxes_to_records(boxes, sample_token, names, attrs)
+
+    def _format_bbox(self, results, jsonfile_prefix=None, nproc=1):
         """Convert the results to the standard format.
 
         Args:
@@ -328,94 +431,33 @@ class NuScenesMonoDataset(CocoDataset):
             jsonfile_prefix (str): The prefix of the output jsonfile.
                 You can specify the output directory/filename by
                 modifying the jsonfile_prefix. Default: None.
+            nproc (int, optional): Number of processes used to convert the
+                results of the frames. Default: 1.
 
         Returns:
             str: Path of the output json file.
         """
-        nusc_annos = {}
-        mapped_class_names = self.CLASSES
-
         print('Start to convert detection format...')
 
         CAM_NUM = 6
 
-        for sample_id, det in enumerate(mmcv.track_iter_progress(results)):
-
-            if sample_id % CAM_NUM == 0:
-                boxes_per_frame = []
-                attrs_per_frame = []
-
-            # need to merge results from images of the same sample
-            annos = []
-            boxes, attrs = output_to_nusc_box(det)
-            sample_token = self.data_infos[sample_id]['token']
-            boxes, attrs = cam_nusc_box_to_global(self.data_infos[sample_id],
-                                                  boxes, attrs,
-                                                  mapped_class_names,
-                                                  self.eval_detection_configs,
-                                                  self.eval_version)
-
-            boxes_per_frame.extend(boxes)
-            attrs_per_frame.extend(attrs)
-            # Remove redundant predictions caused by overlap of images
-            if (sample_id + 1) % CAM_NUM != 0:
-                continue
-            boxes = global_nusc_box_to_cam(
-                self.data_infos[sample_id + 1 - CAM_NUM], boxes_per_frame,
-                mapped_class_names, self.eval_detection_configs,
-                self.eval_version)
-            cam_boxes3d, scores, labels = nusc_box_to_cam_box3d(boxes)
-            # box nms 3d over 6 images in a frame
-            # TODO: move this global setting into config
-            nms_cfg = dict(
-                use_rotate_nms=True,
-                nms_across_levels=False,
-                nms_pre=4096,
-                nms_thr=0.05,
-                score_thr=0.01,
-                min_bbox_size=0,
-                max_per_frame=500)
-            from mmcv import Config
-            nms_cfg = Config(nms_cfg)
-            cam_boxes3d_for_nms = xywhr2xyxyr(cam_boxes3d.bev)
-            boxes3d = cam_boxes3d.tensor
-            # generate attr scores from attr labels
-            attrs = labels.new_tensor([attr for attr in attrs_per_frame])
-            boxes3d, scores, labels, attrs = box3d_multiclass_nms(
-                boxes3d,
-                cam_boxes3d_for_nms,
-                scores,
-                nms_cfg.score_thr,
-                nms_cfg.max_per_frame,
-                nms_cfg,
-                mlvl_attr_scores=attrs)
-            cam_boxes3d = CameraInstance3DBoxes(boxes3d, box_dim=9)
-            det = bbox3d2result(cam_boxes3d, scores, labels, attrs)
-            boxes, attrs = output_to_nusc_box(det)
-            boxes, attrs = cam_nusc_box_to_global(
-                self.data_infos[sample_id + 1 - CAM_NUM], boxes, attrs,
-                mapped_class_names, self.eval_detection_configs,
-                self.eval_version)
-
-            for i, box in enumerate(boxes):
-                name = mapped_class_names[box.label]
-                attr = self.get_attr_name(attrs[i], name)
-                nusc_anno = dict(
-                    sample_token=sample_token,
-                    translation=box.center.tolist(),
-                    size=box.wlh.tolist(),
-                    rotation=box.orientation.elements.tolist(),
-                    velocity=box.velocity[:2].tolist(),
-                    detection_name=name,
-                    detection_score=box.score,
-                    attribute_name=attr)
-                annos.append(nusc_anno)
-            # other views results of the same frame should be concatenated
-            if sample_token in nusc_annos:
-                nusc_annos[sample_token].extend(annos)
-            else:
-                nusc_annos[sample_token] = annos
+        # need to merge results from images of the same sample
+        frame_ids = list(range(0, len(results) - CAM_NUM + 1, CAM_NUM))
+        if nproc > 1:
+            annos = track_parallel_progress_with_state(
+                _format_frame, (self, results, CAM_NUM), frame_ids, nproc)
+        else:
+            annos = [
+                self._format_frame(sample_id,
+                                   results[sample_id:sample_id + CAM_NUM])
+                for sample_id in mmcv.track_iter_progress(frame_ids)
+            ]
 
+        nusc_annos = {}
+        for sample_id, frame_annos in zip(frame_ids, annos):
+            sample_token = self.data_infos[sample_id + CAM_NUM - 1]['token']
+            # other views results of the same frame should be concatenated
+            nusc_annos.setdefault(sample_token, []).extend(frame_annos)
         nusc_submissions = {
             'meta': self.modality,
             'results': nusc_annos,
@@ -485,7 +527,7 @@ class NuScenesMonoDataset(CocoDataset):
         detail['{}/mAP'.format(metric_prefix)] = metrics['mean_ap']
         return detail
 
-    def format_results(self, results, jsonfile_prefix=None, **kwargs):
+    def format_results(self, results, jsonfile_prefix=None, nproc=1, **kwargs):
         """Format the results to json (standard format for COCO evaluation).
 
         Args:
@@ -494,6 +536,8 @@ class NuScenesMonoDataset(CocoDataset):
             jsonfile_prefix (str): The prefix of json files. It includes
                 the file path and the prefix of filename, e.g., "a/b/prefix".
                 If not specified, a temp file will be created. Default: None.
+            nproc (int, optional): Number of processes used to convert the
+                results. Default: 1.
 
         Returns:
             tuple: (result_files, tmp_dir), result_files is a dict containing
@@ -518,7 +562,7 @@ class NuScenesMonoDataset(CocoDataset):
         # this is a workaround to enable evaluation of both formats on nuScenes
         # refer to https://github.com/open-mmlab/mmdetection3d/issues/449
         if not ('pts_bbox' in results[0] or 'img_bbox' in results[0]):
-            result_files = self._format_bbox(results, jsonfile_prefix)
+            result_files = self._format_bbox(results, jsonfile_prefix, nproc)
         else:
             # should take the inner dict out of 'pts_bbox' or 'img_bbox' dict
             result_files = dict()
@@ -530,7 +574,7 @@ class NuScenesMonoDataset(CocoDataset):
                 results_ = [out[name] for out in results]
                 tmp_file_ = osp.join(jsonfile_prefix, name)
                 result_files.update(
-                    {name: self._format_bbox(results_, tmp_file_)})
+                    {name: self._format_bbox(results_, tmp_file_, nproc)})
 
         return result_files, tmp_dir
 
@@ -542,7 +586,8 @@ class NuScenesMonoDataset(CocoDataset):
                  result_names=['img_bbox'],
                  show=False,
                  out_dir=None,
-                 pipeline=None):
+                 pipeline=None,
+                 nproc=1):
         """Evaluation in nuScenes protocol.
 
         Args:
@@ -562,12 +607,15 @@ class NuScenesMonoDataset(CocoDataset):
                 Default: None.
             pipeline (list[dict], optional): raw data loading for showing.
                 Default: None.
+            nproc (int, optional): Number of processes used to convert the
+                results to json. Default: 1.
 
         Returns:
             dict[str, float]: Results of each evaluation metric.
         """
 
-        result_files, tmp_dir = self.format_results(results, jsonfile_prefix)
+        result_files, tmp_dir = self.format_results(results, jsonfile_prefix,
+                                                    nproc)
 
         if isinstance(result_files, dict):
             results_dict = dict()
@@ -809,31 +857,154 @@ def global_nusc_box_to_cam(info,
     return box_list
 
 
-def nusc_box_to_cam_box3d(boxes):
+def nusc_box_to_cam_box3d(boxes, device='cpu'):
     """Convert boxes from :obj:`NuScenesBox` to :obj:`CameraInstance3DBoxes`.
 
     Args:
         boxes (list[:obj:`NuScenesBox`]): List of predicted NuScenesBoxes.
+        device (str | torch.device, optional): Device of the converted boxes.
+            Default: 'cpu'.
 
     Returns:
         tuple (:obj:`CameraInstance3DBoxes` | torch.Tensor | torch.Tensor):
             Converted 3D bounding boxes, scores and labels.
     """
-    locs = torch.Tensor([b.center for b in boxes]).view(-1, 3)
-    dims = torch.Tensor([b.wlh for b in boxes]).view(-1, 3)
-    rots = torch.Tensor([b.orientation.yaw_pitch_roll[0]
-                         for b in boxes]).view(-1, 1)
-    velocity = torch.Tensor([b.velocity[0::2] for b in boxes]).view(-1, 2)
+    boxes = dict(
+        center=np.array([b.center for b in boxes]).reshape(-1, 3),
+        wlh=np.array([b.wlh for b in boxes]).reshape(-1, 3),
+        orientation=np.array([b.orientation.elements
+                              for b in boxes]).reshape(-1, 4),
+        velocity=np.array([b.velocity for b in boxes]).reshape(-1, 3),
+        label=np.array([b.label for b in boxes], dtype=np.int64),
+        score=np.array([b.score for b in boxes], dtype=np.float32))
+    return nusc_boxes_to_cam_box3d(boxes, device)
 
-    # convert nusbox to cambox convention
-    dims[:, [0, 1, 2]] = dims[:, [1, 2, 0]]
-    rots = -rots
 
-    boxes_3d = torch.cat([locs, dims, rots, velocity], dim=1).cuda()
+def output_to_nusc_boxes(detection):
+    """Convert the output to the arrays of boxes in the nuScenes convention.
+
+    It is the batched equivalent of :func:`output_to_nusc_box`, see
+    :func:`transform_nusc_boxes` for the format of the boxes. The predicted
+    attributes are kept in 'attr' if any.
+
+    Args:
+        detection (dict): Detection results.
+
+            - boxes_3d (:obj:`BaseInstance3DBoxes`): Detection bbox.
+            - scores_3d (torch.Tensor): Detection scores.
+            - labels_3d (torch.Tensor): Predicted box labels.
+            - attrs_3d (torch.Tensor, optional): Predicted attributes.
+
+    Returns:
+        dict[str, np.ndarray]: Boxes in the camera frame.
+    """
+    box3d = detection['boxes_3d']
+    velocity = np.zeros((len(box3d), 3))
+    velocity[:, 0::2] = box3d.tensor[:, 7:9].numpy()
+    # convert the dim/rot to nuscbox convention
+    quat = quaternion_multiply(
+        axis_angle_to_quaternion([1, 0, 0], np.pi / 2),
+        axis_angle_to_quaternion([0, 0, 1], -box3d.yaw.numpy()))
+    boxes = dict(
+        center=box3d.gravity_center.numpy(),
+        wlh=box3d.dims.numpy()[:, [2, 0, 1]],
+        orientation=quat,
+        velocity=velocity,
+        label=detection['labels_3d'].numpy().astype(np.int64),
+        score=detection['scores_3d'].numpy())
+    if 'attrs_3d' in detection:
+        boxes['attr'] = detection['attrs_3d'].numpy().astype(np.int64)
+    return boxes
+
+
+def cam_nusc_boxes_to_global(info,
+                             boxes,
+                             classes,
+                             eval_configs,
+                             eval_version='detection_cvpr_2019'):
+    """Convert the boxes from camera to global coordinate.
+
+    It is the batched equivalent of :func:`cam_nusc_box_to_global`.
+
+    Args:
+        info (dict): Info for a specific sample data, including the
+            calibration information.
+        boxes (dict[str, np.ndarray]): Boxes from
+            :func:`output_to_nusc_boxes`.
+        classes (list[str]): Mapped classes in the evaluation.
+        eval_configs (object): Evaluation configuration object.
+        eval_version (str, optional): Evaluation version.
+            Default: 'detection_cvpr_2019'
+
+    Returns:
+        dict[str, np.ndarray]: Boxes within the detection range of their
+            class, in the global coordinate.
+    """
+    boxes = transform_nusc_boxes(boxes, info['cam2ego_rotation'],
+                                 info['cam2ego_translation'])
+    boxes = filter_nusc_boxes(boxes, classes, eval_configs.class_range)
+    return transform_nusc_boxes(boxes, info['ego2global_rotation'],
+                                info['ego2global_translation'])
+
+
+def global_nusc_boxes_to_cam(info,
+                             boxes,
+                             classes,
+                             eval_configs,
+                             eval_version='detection_cvpr_2019'):
+    """Convert the boxes from global to camera coordinate.
+
+    It is the batched equivalent of :func:`global_nusc_box_to_cam`.
+
+    Args:
+        info (dict): Info for a specific sample data, including the
+            calibration information.
+        boxes (dict[str, np.ndarray]): Boxes in the global coordinate.
+        classes (list[str]): Mapped classes in the evaluation.
+        eval_configs (object): Evaluation configuration object.
+        eval_version (str, optional): Evaluation version.
+            Default: 'detection_cvpr_2019'
+
+    Returns:
+        dict[str, np.ndarray]: Boxes within the detection range of their
+            class, in the camera coordinate.
+    """
+    boxes = transform_nusc_boxes(
+        boxes,
+        info['ego2global_rotation'],
+        info['ego2global_translation'],
+        inverse=True)
+    boxes = filter_nusc_boxes(boxes, classes, eval_configs.class_range)
+    return transform_nusc_boxes(
+        boxes,
+        info['cam2ego_rotation'],
+        info['cam2ego_translation'],
+        inverse=True)
+
+
+def nusc_boxes_to_cam_box3d(boxes, device='cpu'):
+    """Convert arrays of nuScenes boxes to :obj:`CameraInstance3DBoxes`.
+
+    Args:
+        boxes (dict[str, np.ndarray]): Boxes in the camera coordinate.
+        device (str | torch.device, optional): Device of the converted boxes.
+            Default: 'cpu'.
+
+    Returns:
+        tuple (:obj:`CameraInstance3DBoxes` | torch.Tensor | torch.Tensor):
+            Converted 3D bounding boxes, scores and labels.
+    """
+    # convert nusbox to cambox convention
+    dims = boxes['wlh'][:, [1, 2, 0]]
+    rots = -quaternion_yaw(boxes['orientation'])
+    velocity = boxes['velocity'][:, 0::2]
+    boxes_3d = np.concatenate([boxes['center'], dims, rots[:, None], velocity],
+                              axis=1)
+    boxes_3d = torch.tensor(boxes_3d, dtype=torch.float32, device=device)
     cam_boxes3d = CameraInstance3DBoxes(
         boxes_3d, box_dim=9, origin=(0.5, 0.5, 0.5))
-    scores = torch.Tensor([b.score for b in boxes]).cuda()
-    labels = torch.LongTensor([b.label for b in boxes]).cuda()
+    scores = torch.tensor(boxes['score'], dtype=torch.float32, device=device)
+    labels = torch.tensor(boxes['label'], dtype=torch.long, device=device)
     nms_scores = scores.new_zeros(scores.shape[0], 10 + 1)
     indices = labels.new_tensor(list(range(scores.shape[0])))
     nms_scores[indices, labels] = scores
@@ -1,7 +1,17 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import io
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import cv2
 import mmcv
 import numpy as np
+from PIL import Image
 
+from mmdet3d.core.bbox import points_in_image
 from mmdet3d.core.points import BasePoints, get_points_type
 from mmdet.datasets.pipelines import LoadAnnotations, LoadImageFromFile
 from ..builder import PIPELINES
@@ -13,16 +23,141 @@ class LoadMultiViewImageFromFiles(object):
 
     Expects results['img_filename'] to be a list of filenames.
 
+    The views can be decoded in parallel by a small thread pool, as the
+    decoders release the GIL. If the images are downscaled later in the
+    pipeline, ``target_size`` allows JPEG images to be decoded at 1/2, 1/4
+    or 1/8 of their resolution, which is much cheaper than a full decoding
+    followed by a resize. In that case the projections to the images (i.e.
+    ``lidar2img``, ``depth2img``, ``cam2img`` and ``cam_intrinsic``) are
+    rescaled accordingly and ``scale_factor`` records the reduction.
+    The decoding time of each view can be recorded to measure its cost.
+
     Args:
         to_float32 (bool, optional): Whether to convert the img to float32.
             Defaults to False.
         color_type (str, optional): Color type of the file.
             Defaults to 'unchanged'.
+        num_workers (int, optional): Number of threads decoding the views.
+            The views are decoded sequentially if it is 0. Defaults to 0.
+        target_size (tuple[int], optional): The smallest (w, h) the images
+            are resized to in the pipeline. JPEG images are decoded at the
+            largest reduction that keeps both sides no smaller than it,
+            as color images unless ``color_type`` is 'grayscale'.
+            Defaults to None.
+        record_decode_time (bool, optional): Whether to record the decoding
+            time of each view in ``img_decode_time``. Defaults to False.
+        file_client_args (dict, optional): Config dict of file clients,
+            refer to
+            https://github.com/open-mmlab/mmcv/blob/master/mmcv/fileio/file_client.py
+            for more details. Defaults to dict(backend='disk').
     """
 
-    def __init__(self, to_float32=False, color_type='unchanged'):
+    # flags of OpenCV decoding JPEG images at a reduced resolution
+    _reduced_flags = {
+        'color': {
+            2: cv2.IMREAD_REDUCED_COLOR_2,
+            4: cv2.IMREAD_REDUCED_COLOR_4,
+            8: cv2.IMREAD_REDUCED_COLOR_8
+        },
+        'grayscale': {
+            2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+            4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+            8: cv2.IMREAD_REDUCED_GRAYSCALE_8
+        }
+    }
+
+    # projections to the images rescaled with the images
+    _projection_keys = ('lidar2img', 'depth2img', 'cam2img', 'cam_intrinsic')
+
+    def __init__(self,
+                 to_float32=False,
+                 color_type='unchanged',
+                 num_workers=0,
+                 target_size=None,
+                 record_decode_time=False,
+                 file_client_args=dict(backend='disk')):
         self.to_float32 = to_float32
         self.color_type = color_type
+        self.num_workers = num_workers
+        self.target_size = target_size
+        self.record_decode_time = record_decode_time
+        self.file_client_args = file_client_args.copy()
+        self.file_client = None
+        # the pool is created lazily in each data loader worker
+        self._pool = None
+        self._pool_pid = None
+
+    def _get_pool(self):
+        """Get the thread pool of the current process."""
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(self.num_workers)
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def _get_reduction(self, img_bytes, filename):
+        """Get the largest reduction of a view allowed by ``target_size``.
+
+        Returns:
+            tuple[int, tuple[int] | None]: The reduction and the size (w, h)
+                of the view if it is read from the header.
+        """
+        if self.target_size is None or \
+                not filename.lower().endswith(('.jpg', '.jpeg')):
+            return 1, None
+        # only the header is parsed to get the size
+        with Image.open(io.BytesIO(img_bytes)) as img:
+            w, h = img.size
+        target_w, target_h = self.target_size
+        for reduction in (8, 4, 2):
+            if w // reduction >= target_w and h // reduction >= target_h:
+                return reduction, (w, h)
+        return 1, (w, h)
+
+    def _decode(self, filename):
+        """Decode a view.
+
+        Returns:
+            tuple[np.ndarray, tuple[int], float]: The image, its size (w, h)
+                before the reduction and the decoding time in seconds.
+        """
+        start = time.perf_counter()
+        img_bytes = self.file_client.get(filename)
+        reduction, ori_size = self._get_reduction(img_bytes, filename)
+        if reduction > 1:
+            color_type = 'grayscale' \
+                if self.color_type == 'grayscale' else 'color'
+            img = cv2.imdecode(
+                np.frombuffer(img_bytes, np.uint8),
+                self._reduced_flags[color_type][reduction])
+        else:
+            img = mmcv.imfrombytes(img_bytes, flag=self.color_type)
+            ori_size = (img.shape[1], img.shape[0])
+        return img, ori_size, time.perf_counter() - start
+
+    @staticmethod
+    def _rescale_projection(proj, w_scale, h_scale):
+        """Rescale the projection of points to the images.
+
+        Args:
+            proj (np.ndarray | list): A projection matrix of shape (3, 3),
+                (3, 4) or (4, 4), or a list of them for each view.
+            w_scale (float): Scale of the width of the images.
+            h_scale (float): Scale of the height of the images.
+
+        Returns:
+            np.ndarray | list[np.ndarray]: The rescaled projections.
+        """
+        proj_array = np.asarray(proj)
+        if proj_array.ndim == 3:
+            return [
+                LoadMultiViewImageFromFiles._rescale_projection(
+                    view_proj, w_scale, h_scale) for view_proj in proj_array
+            ]
+        proj_array = proj_array.astype(
+            np.result_type(proj_array.dtype, np.float32))
+        proj_array[0] *= w_scale
+        proj_array[1] *= h_scale
+        return proj_array
 
     def __call__(self, results):
         """Call function to load multi-view image from files.
@@ -39,36 +174,80 @@ class LoadMultiViewImageFromFiles(object):
                 - img_shape (tuple[int]): Shape of multi-view image arrays.
                 - ori_shape (tuple[int]): Shape of original image arrays.
                 - pad_shape (tuple[int]): Shape of padded image arrays.
-                - scale_factor (float): Scale factor.
+                - scale_factor (float | np.ndarray): Scale factor.
                 - img_norm_cfg (dict): Normalization configuration of images.
+                - img_decode_time (list[float]): Decoding time of each view
+                    in seconds, if ``record_decode_time`` is True.
         """
+        if self.file_client is None:
+            self.file_client = mmcv.FileClient(**self.file_client_args)
         filename = results['img_filename']
-        # img is of shape (h, w, c, num_views)
-        img = np.stack(
-            [mmcv.imread(name, self.color_type) for name in filename], axis=-1)
-        if self.to_float32:
-            img = img.astype(np.float32)
+        if self.num_workers > 0 and len(filename) > 1:
+            decoded = list(self._get_pool().map(self._decode, filename))
+        else:
+            decoded = [self._decode(name) for name in filename]
+        imgs, ori_sizes, decode_time = zip(*decoded)
+        for img in imgs[1:]:
+            assert img.shape == imgs[0].shape, \
+                'All the views should have the same shape'
+
+        # copy the views into a single buffer, which also converts them to
+        # float32, the views stay contiguous so that no copy is needed later
+        dtype = np.float32 if self.to_float32 else imgs[0].dtype
+        buffer = np.empty((len(imgs), ) + imgs[0].shape, dtype=dtype)
+        for i, img in enumerate(imgs):
+            buffer[i] = img
+        # shape of (h, w, c, num_views), as the stacked images used to be
+        img_shape = buffer.shape[1:] + (len(imgs), )
+        ori_w, ori_h = ori_sizes[0]
+        ori_shape = (ori_h, ori_w) + img_shape[2:]
+
         results['filename'] = filename
         # unravel to list, see `DefaultFormatBundle` in formatting.py
         # which will transpose each image separately and then stack into array
-        results['img'] = [img[..., i] for i in range(img.shape[-1])]
-        results['img_shape'] = img.shape
-        results['ori_shape'] = img.shape
+        results['img'] = list(buffer)
+        results['img_shape'] = img_shape
+        results['ori_shape'] = ori_shape
         # Set initial values for default meta_keys
-        results['pad_shape'] = img.shape
-        results['scale_factor'] = 1.0
-        num_channels = 1 if len(img.shape) < 3 else img.shape[2]
+        results['pad_shape'] = img_shape
+        if ori_shape == img_shape:
+            results['scale_factor'] = 1.0
+        else:
+            w_scale = img_shape[1] / ori_w
+            h_scale = img_shape[0] / ori_h
+            results['scale_factor'] = np.array(
+                [w_scale, h_scale, w_scale, h_scale], dtype=np.float32)
+            for key in self._projection_keys:
+                if key in results:
+                    results[key] = self._rescale_projection(
+                        results[key], w_scale, h_scale)
+        if self.record_decode_time:
+            results['img_decode_time'] = list(decode_time)
+        num_channels = 1 if len(img_shape) < 4 else img_shape[2]
         results['img_norm_cfg'] = dict(
             mean=np.zeros(num_channels, dtype=np.float32),
             std=np.ones(num_channels, dtype=np.float32),
             to_rgb=False)
         return results
 
+    def __getstate__(self):
+        # the thread pool cannot be pickled to the data loader workers
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
     def __repr__(self):
         """str: Return a string that describes the module."""
         repr_str = self.__class__.__name__
         repr_str += f'(to_float32={self.to_float32}, '
-        repr_str += f"color_type='{self.color_type}')"
+        repr_str += f"color_type='{self.color_type}'"
+        if self.num_workers > 0:
+            repr_str += f', num_workers={self.num_workers}'
+        if self.target_size is not None:
+            repr_str += f', target_size={self.target_size}'
+        if self.record_decode_time:
+            repr_str += ', record_decode_time=True'
+        repr_str += ')'
         return repr_str
 
 
@@ -168,6 +347,28 @@ class LoadPointsFromMultiSweeps(object):
                 points = np.fromfile(pts_filename, dtype=np.float32)
         return points
 
+    def _load_sweep(self, pts_filename, sweep_cache=None):
+        """Load a sweep, reusing the cached one if possible.
+
+        Args:
+            pts_filename (str): Filename of the sweep.
+            sweep_cache (OrderedDict, optional): Cache of the raw sweeps
+                loaded for the previous frames. Defaults to None.
+
+        Returns:
+            np.ndarray: An array containing point clouds data.
+        """
+        if sweep_cache is None:
+            return self._load_points(pts_filename)
+        if pts_filename in sweep_cache:
+            sweep_cache.move_to_end(pts_filename)
+            return sweep_cache[pts_filename]
+        points = self._load_points(pts_filename)
+        sweep_cache[pts_filename] = points
+        while len(sweep_cache) > 2 * self.sweeps_num:
+            sweep_cache.popitem(last=False)
+        return points
+
     def _remove_close(self, points, radius=1.0):
         """Removes point too close within a certain radius from origin.
 
@@ -222,9 +423,16 @@ class LoadPointsFromMultiSweeps(object):
             else:
                 choices = np.random.choice(
                     len(results['sweeps']), self.sweeps_num, replace=False)
+            # when streaming a scene, keep the raw sweeps in the state shared
+            # by consecutive frames so that they are only read once
+            sweep_cache = None
+            if 'stream_state' in results:
+                sweep_cache = results['stream_state'].setdefault(
+                    'sweep_cache', OrderedDict())
             for idx in choices:
                 sweep = results['sweeps'][idx]
-                points_sweep = self._load_points(sweep['data_path'])
+                points_sweep = self._load_sweep(sweep['data_path'],
+                                                sweep_cache)
                 points_sweep = np.copy(points_sweep).reshape(-1, self.load_dim)
                 if self.remove_close:
                     points_sweep = self._remove_close(points_sweep)
@@ -342,11 +550,21 @@ class NormalizePointsColor(object):
         return repr_str
 
 
+@lru_cache(maxsize=16)
+def _memmap_points(pts_filename):
+    """Memory-map a packed points file, which is kept open for the other
+    frames packed in the same file."""
+    return np.memmap(pts_filename, dtype=np.float32, mode='r')
+
+
 @PIPELINES.register_module()
 class LoadPointsFromFile(object):
     """Load Points From File.
 
-    Load points from file.
+    Load points from file. If 'pts_packed_range' is given in the results,
+    the file packs the points of several frames, e.g. a Waymo segment
+    converted in the 'packed' format, and only the rows of this range are
+    read from the memory-mapped file.
 
     Args:
         coord_type (str): The type of coordinates of points cloud.
@@ -367,6 +585,11 @@ class LoadPointsFromFile(object):
             refer to
             https://github.com/open-mmlab/mmcv/blob/master/mmcv/fileio/file_client.py
             for more details. Defaults to dict(backend='disk').
+        crop_to_image (bool, optional): Whether to only keep the points
+            projected inside the image with 'lidar2img', as
+            :obj:`PointsInImageFilter` does, before building the points.
+            The image shape is either in 'img_shape' or given by the
+            'height' and 'width' of 'img_info'. Defaults to False.
     """
 
     def __init__(self,
@@ -375,9 +598,11 @@ class LoadPointsFromFile(object):
                  use_dim=[0, 1, 2],
                  shift_height=False,
                  use_color=False,
-                 file_client_args=dict(backend='disk')):
+                 file_client_args=dict(backend='disk'),
+                 crop_to_image=False):
         self.shift_height = shift_height
         self.use_color = use_color
+        self.crop_to_image = crop_to_image
         if isinstance(use_dim, int):
             use_dim = list(range(use_dim))
         assert max(use_dim) < load_dim, \
@@ -413,6 +638,24 @@ class LoadPointsFromFile(object):
 
         return points
 
+    def _load_packed_points(self, pts_filename, packed_range):
+        """Private function to load the points of a frame from a file
+        packing several frames.
+
+        Args:
+            pts_filename (str): Filename of the packed point clouds data.
+            packed_range (tuple[int]): Range of the rows of the frame.
+
+        Returns:
+            np.ndarray: An array containing point clouds data.
+        """
+        start, end = (int(i) * self.load_dim for i in packed_range)
+        if self.file_client_args.get('backend', 'disk') == 'disk':
+            return np.array(_memmap_points(pts_filename)[start:end])
+        # other backends can not map the file, thus read all of it
+        points = self._load_points(pts_filename)
+        return points[start:end].copy()
+
     def __call__(self, results):
         """Call function to load points data from file.
 
@@ -426,8 +669,20 @@ class LoadPointsFromFile(object):
                 - points (:obj:`BasePoints`): Point clouds data.
         """
         pts_filename = results['pts_filename']
-        points = self._load_points(pts_filename)
+        packed_range = results.get('pts_packed_range', None)
+        if packed_range is not None:
+            points = self._load_packed_points(pts_filename, packed_range)
+        else:
+            points = self._load_points(pts_filename)
         points = points.reshape(-1, self.load_dim)
+        if self.crop_to_image:
+            if 'img_shape' in results:
+                image_shape = results['img_shape'][:2]
+            else:
+                img_info = results['img_info']
+                image_shape = (img_info['height'], img_info['width'])
+            points = points[points_in_image(points, results['lidar2img'],
+                                            image_shape)]
         points = points[:, self.use_dim]
         attribute_dims = None
 
@@ -464,7 +719,8 @@ class LoadPointsFromFile(object):
         repr_str += f'use_color={self.use_color}, '
         repr_str += f'file_client_args={self.file_client_args}, '
         repr_str += f'load_dim={self.load_dim}, '
-        repr_str += f'use_dim={self.use_dim})'
+        repr_str += f'use_dim={self.use_dim}, '
+        repr_str += f'crop_to_image={self.crop_to_image})'
         return repr_str
 
 
@@ -9,7 +9,8 @@ from mmcv.utils import build_from_cfg
 
 from mmdet3d.core import VoxelGenerator
 from mmdet3d.core.bbox import (CameraInstance3DBoxes, DepthInstance3DBoxes,
-                               LiDARInstance3DBoxes, box_np_ops)
+                               LiDARInstance3DBoxes, box_np_ops,
+                               points_in_image)
 from mmdet3d.datasets.pipelines.compose import Compose
 from mmdet.datasets.pipelines import RandomCrop, RandomFlip, Rotate
 from ..builder import OBJECTSAMPLERS, PIPELINES
@@ -983,6 +984,69 @@ class PointsRangeFilter(object):
         return repr_str
 
 
+@PIPELINES.register_module()
+class PointsInImageFilter(object):
+    """Filter points outside of the image of the front camera.
+
+    The points are projected with 'lidar2img', e.g. ``P2 @ R0_rect @
+    Tr_velo_to_cam`` for KITTI, and those out of the image bounds or depth
+    range are removed as in the reduced point clouds of KITTI. It needs the
+    points in the original lidar coordinate, thus it should be used before
+    any augmentation.
+
+    Args:
+        near_clip (float, optional): Nearest depth of the points.
+            Defaults to 0.001.
+        far_clip (float, optional): Farthest depth of the points.
+            Defaults to 100.
+    """
+
+    def __init__(self, near_clip=0.001, far_clip=100):
+        self.near_clip = near_clip
+        self.far_clip = far_clip
+
+    def __call__(self, input_dict):
+        """Call function to filter points outside of the image.
+
+        Args:
+            input_dict (dict): Result dict from loading pipeline, with
+                'lidar2img' and the image shape either in 'img_shape' or as
+                the 'height' and 'width' of 'img_info'.
+
+        Returns:
+            dict: Results after filtering, 'points', 'pts_instance_mask'
+                and 'pts_semantic_mask' keys are updated in the result dict.
+        """
+        if 'img_shape' in input_dict:
+            image_shape = input_dict['img_shape'][:2]
+        else:
+            img_info = input_dict['img_info']
+            image_shape = (img_info['height'], img_info['width'])
+        points = input_dict['points']
+        points_mask = points_in_image(points.tensor.numpy(),
+                                      input_dict['lidar2img'], image_shape,
+                                      self.near_clip, self.far_clip)
+        input_dict['points'] = points[points_mask]
+
+        pts_instance_mask = input_dict.get('pts_instance_mask', None)
+        pts_semantic_mask = input_dict.get('pts_semantic_mask', None)
+
+        if pts_instance_mask is not None:
+            input_dict['pts_instance_mask'] = pts_instance_mask[points_mask]
+
+        if pts_semantic_mask is not None:
+            input_dict['pts_semantic_mask'] = pts_semantic_mask[points_mask]
+
+        return input_dict
+
+    def __repr__(self):
+        """str: Return a string that describes the module."""
+        repr_str = self.__class__.__name__
+        repr_str += f'(near_clip={self.near_clip}, '
+        repr_str += f'far_clip={self.far_clip})'
+        return repr_str
+
+
 @PIPELINES.register_module()
 class ObjectNameFilter(object):
     """Filter GT objects by their names.
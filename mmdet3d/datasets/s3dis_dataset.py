@@ -340,6 +340,9 @@ class S3DISSegDataset(_S3DISSegDataset):
         scene_idxs (list[np.ndarray] | list[str], optional): Precomputed index
             to load data. For scenes with many points, we may sample it several
             times. Defaults to None.
+        valid_sample_cfg (dict, optional): Config to remove the scenes
+            without valid semantic labels from the scene_idxs of each area,
+            see :class:`Custom3DSegDataset`. Defaults to None.
     """
 
     def __init__(self,
@@ -352,6 +355,7 @@ class S3DISSegDataset(_S3DISSegDataset):
                  test_mode=False,
                  ignore_index=None,
                  scene_idxs=None,
+                 valid_sample_cfg=None,
                  **kwargs):
 
         # make sure that ann_files and scene_idxs have same length
@@ -382,12 +386,14 @@ class S3DISSegDataset(_S3DISSegDataset):
                 test_mode=test_mode,
                 ignore_index=ignore_index,
                 scene_idxs=scene_idxs[i],
+                valid_sample_cfg=valid_sample_cfg,
                 **kwargs) for i in range(len(ann_files))
         ]
 
         # data_infos and scene_idxs need to be concat
         self.concat_data_infos([dst.data_infos for dst in datasets])
-        self.concat_scene_idxs([dst.scene_idxs for dst in datasets])
+        self.concat_scene_idxs([dst.scene_idxs for dst in datasets],
+                               [len(dst.data_infos) for dst in datasets])
 
         # set group flag for the sampler
         if not self.test_mode:
@@ -403,20 +409,27 @@ class S3DISSegDataset(_S3DISSegDataset):
             info for one_data_infos in data_infos for info in one_data_infos
         ]
 
-    def concat_scene_idxs(self, scene_idxs):
+    def concat_scene_idxs(self, scene_idxs, num_scenes=None):
         """Concat scene_idxs from several datasets to form self.scene_idxs.
 
         Needs to manually add offset to scene_idxs[1, 2, ...].
 
         Args:
             scene_idxs (list[np.ndarray])
+            num_scenes (list[int], optional): Number of scenes in the
+                data_infos of each dataset, so that the offsets are right
+                even if the last scenes are not sampled. Defaults to None.
         """
         self.scene_idxs = np.array([], dtype=np.int32)
         offset = 0
-        for one_scene_idxs in scene_idxs:
+        for i, one_scene_idxs in enumerate(scene_idxs):
             self.scene_idxs = np.concatenate(
                 [self.scene_idxs, one_scene_idxs + offset]).astype(np.int32)
-            offset = np.unique(self.scene_idxs).max() + 1
+            one_num_scenes = one_scene_idxs.max() + 1 \
+                if len(one_scene_idxs) > 0 else 0
+            if num_scenes is not None:
+                one_num_scenes = max(one_num_scenes, num_scenes[i])
+            offset += one_num_scenes
 
     @staticmethod
     def _duplicate_to_list(x, num):
@@ -0,0 +1,5 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from .scene_sampler import (SceneSequentialSampler, group_by_scene,
+                            partition_scenes)
+
+__all__ = ['SceneSequentialSampler', 'group_by_scene', 'partition_scenes']
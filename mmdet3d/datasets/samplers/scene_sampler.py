@@ -0,0 +1,124 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from collections import OrderedDict
+
+import numpy as np
+from mmcv.runner import get_dist_info
+from torch.utils.data import Sampler
+
+
+def group_by_scene(dataset):
+    """Group the indices of a dataset by scene in timestamp order.
+
+    The dataset is expected to implement ``get_scene_id`` and
+    ``get_timestamp`` (see :obj:`Custom3DDataset`). Scenes keep the order
+    in which they first appear in the dataset, frames inside each scene are
+    sorted by timestamp.
+
+    Args:
+        dataset (:obj:`Custom3DDataset`): Dataset to be grouped.
+
+    Returns:
+        list[np.ndarray]: Indices of the frames of each scene.
+    """
+    scenes = OrderedDict()
+    for idx in range(len(dataset)):
+        scenes.setdefault(dataset.get_scene_id(idx), []).append(idx)
+    groups = []
+    for inds in scenes.values():
+        timestamps = np.array([dataset.get_timestamp(i) for i in inds])
+        order = np.argsort(timestamps, kind='stable')
+        groups.append(np.array(inds, dtype=np.int64)[order])
+    return groups
+
+
+def partition_scenes(groups, num_replicas):
+    """Split scenes into contiguous, frame-balanced chunks for each rank.
+
+    Scenes are never split across ranks. Boundaries are placed where the
+    cumulative number of frames crosses ``k * total / num_replicas``, so
+    every rank reads a contiguous run of whole scenes.
+
+    Args:
+        groups (list[np.ndarray]): Indices of each scene.
+        num_replicas (int): Number of ranks.
+
+    Returns:
+        list[list[int]]: Scene ids (positions in ``groups``) of each rank.
+    """
+    sizes = np.array([len(g) for g in groups], dtype=np.int64)
+    if len(sizes) == 0:
+        return [[] for _ in range(num_replicas)]
+    # use the center of each scene so that a scene falls on the rank that
+    # covers most of its frames
+    centers = np.cumsum(sizes) - sizes / 2.
+    owner = np.floor(centers * num_replicas / sizes.sum()).astype(np.int64)
+    owner = np.clip(owner, 0, num_replicas - 1)
+    return [np.nonzero(owner == r)[0].tolist() for r in range(num_replicas)]
+
+
+class SceneSequentialSampler(Sampler):
+    """Sampler that iterates whole scenes in timestamp order.
+
+    It is meant for evaluation of temporal datasets such as nuScenes and
+    Waymo: every rank reads a contiguous set of whole scenes, frame after
+    frame, so that sweep caches and the readahead of the file system can be
+    exploited. Unlike :obj:`DistributedSampler`, ranks may get a different
+    number of samples and no sample is padded, thus the results need to be
+    put back into dataset order with :meth:`restore_order`.
+
+    Args:
+        dataset (:obj:`Custom3DDataset`): Dataset to sample from.
+        num_replicas (int, optional): Number of ranks. Defaults to the world
+            size of the current process group.
+        rank (int, optional): Rank of the current process. Defaults to the
+            rank of the current process.
+    """
+
+    def __init__(self, dataset, num_replicas=None, rank=None):
+        _rank, _num_replicas = get_dist_info()
+        if num_replicas is None:
+            num_replicas = _num_replicas
+        if rank is None:
+            rank = _rank
+        self.dataset = dataset
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.scene_groups = group_by_scene(dataset)
+        self.partitions = partition_scenes(self.scene_groups, num_replicas)
+        self.rank_indices = [
+            self._concat([self.scene_groups[i] for i in scenes])
+            for scenes in self.partitions
+        ]
+        self.indices = self.rank_indices[rank]
+
+    @staticmethod
+    def _concat(groups):
+        if len(groups) == 0:
+            return np.zeros((0, ), dtype=np.int64)
+        return np.concatenate(groups)
+
+    def __iter__(self):
+        return iter(self.indices.tolist())
+
+    def __len__(self):
+        return len(self.indices)
+
+    def restore_order(self, part_list):
+        """Put results produced in sampling order back into dataset order.
+
+        Args:
+            part_list (list[list]): Results of each rank, in the order they
+                were produced. For non-distributed testing, pass
+                ``[results]``.
+
+        Returns:
+            list: Results ordered by dataset index.
+        """
+        assert len(part_list) == self.num_replicas
+        ordered_results = [None] * len(self.dataset)
+        for inds, part in zip(self.rank_indices, part_list):
+            assert len(inds) == len(part), \
+                f'Expect {len(inds)} results, got {len(part)}.'
+            for idx, res in zip(inds.tolist(), part):
+                ordered_results[idx] = res
+        return ordered_results
@@ -559,7 +559,8 @@ class ScanNetInstanceSegDataset(Custom3DSegDataset):
                  logger=None,
                  show=False,
                  out_dir=None,
-                 pipeline=None):
+                 pipeline=None,
+                 nproc=1):
         """Evaluation in instance segmentation protocol.
 
         Args:
@@ -574,6 +575,8 @@ class ScanNetInstanceSegDataset(Custom3DSegDataset):
                 Defaults to None.
             pipeline (list[dict], optional): raw data loading for showing.
                 Default: None.
+            nproc (int, optional): Number of processes used to match the
+                instances of the scenes. Default: 1.
 
         Returns:
             dict: Evaluation results.
@@ -606,7 +609,8 @@ class ScanNetInstanceSegDataset(Custom3DSegDataset):
             valid_class_ids=self.VALID_CLASS_IDS,
             class_labels=self.CLASSES,
             options=options,
-            logger=logger)
+            logger=logger,
+            nproc=nproc)
 
         if show:
             raise NotImplementedError('show is not implemented for now')
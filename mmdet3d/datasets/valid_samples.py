@@ -0,0 +1,316 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import hashlib
+import os
+from os import path as osp
+
+import mmcv
+import numpy as np
+from mmcv.utils import print_log
+
+from mmdet3d.utils import track_parallel_progress_with_state
+from ..core.bbox import CameraInstance3DBoxes
+from .pipelines import GlobalRotScaleTrans
+
+
+def _bev_range_bounds(bev_range):
+    """Get the interval of BEV center radius that may fall in the range."""
+    x_min, y_min, x_max, y_max = bev_range
+    corners = np.array([[x_min, y_min], [x_min, y_max], [x_max, y_min],
+                        [x_max, y_max]])
+    r_max = np.linalg.norm(corners, axis=1).max()
+    nearest = np.clip(np.zeros(2), [x_min, y_min], [x_max, y_max])
+    r_min = np.linalg.norm(nearest)
+    return r_min, r_max
+
+
+def get_augmentation_margin(pipeline, point_cloud_range, num_std=3.):
+    """Get the margin of the range within which boxes may be brought into the
+    range by the global augmentations of a pipeline.
+
+    Boxes may be scaled towards the origin by ``scale_ratio_range`` and
+    translated by up to ``num_std`` times ``translation_std`` by
+    ``GlobalRotScaleTrans``. The rotation is accounted for by the
+    ``rotation_invariant`` check of :func:`check_sample_validity`.
+
+    Args:
+        pipeline (:obj:`Compose` | None): Pipeline of the dataset.
+        point_cloud_range (list[float]): Range of the boxes.
+        num_std (float, optional): Number of standard deviations of the
+            translation covered by the margin. Defaults to 3.
+
+    Returns:
+        float: Margin to add to the range.
+    """
+    margin = 0.
+    extent = np.abs(np.array(point_cloud_range, dtype=np.float32)).max()
+    for transform in getattr(pipeline, 'transforms', []):
+        if isinstance(transform, GlobalRotScaleTrans):
+            # a box at distance d / min_scale is scaled to distance d
+            min_scale = min(transform.scale_ratio_range)
+            margin += extent * max(1. / min_scale - 1., 0.)
+            margin += num_std * max(transform.translation_std)
+    return float(margin)
+
+
+def check_sample_validity(dataset,
+                          index,
+                          point_cloud_range=None,
+                          rotation_invariant=True,
+                          margin=0.):
+    """Check whether a training sample may yield valid ground truths.
+
+    A sample is dead if none of its boxes belongs to the classes of the
+    dataset, or if none of them may fall in ``point_cloud_range``, in which
+    case ``ObjectNameFilter`` and ``ObjectRangeFilter`` will always remove
+    all the boxes and the sample is dropped by the dataset.
+
+    Args:
+        dataset (:obj:`Custom3DDataset`): The dataset in training mode.
+        index (int): Index of the sample.
+        point_cloud_range (list[float], optional): Range of the points and
+            boxes, as in ``ObjectRangeFilter``. Defaults to None.
+        rotation_invariant (bool, optional): Whether boxes may be rotated
+            around the origin by augmentations, in which case a box is kept
+            if its BEV radius is within the radii covered by the range.
+            Defaults to True.
+        margin (float, optional): Margin added to the range to account for
+            global translation and scaling, see
+            :func:`get_augmentation_margin`. With no margin, samples whose
+            boxes are just outside the range are dead even if the
+            augmentations may bring them into the range. Defaults to 0.
+
+    Returns:
+        bool: Whether the sample may yield valid ground truths.
+    """
+    annos = dataset.get_ann_info(index)
+    labels = np.asarray(annos['gt_labels_3d'])
+    mask = labels != -1
+    if point_cloud_range is None or not mask.any():
+        return bool(mask.any())
+
+    pcd_range = np.array(point_cloud_range, dtype=np.float32)
+    gt_bboxes_3d = annos['gt_bboxes_3d']
+    if isinstance(gt_bboxes_3d, CameraInstance3DBoxes):
+        bev_range = pcd_range[[0, 2, 3, 5]]
+    else:
+        bev_range = pcd_range[[0, 1, 3, 4]]
+    bev_range = bev_range + np.array([-margin, -margin, margin, margin])
+    centers = gt_bboxes_3d.bev[:, :2].numpy()[mask]
+    if rotation_invariant:
+        r_min, r_max = _bev_range_bounds(bev_range)
+        radius = np.linalg.norm(centers, axis=1)
+        in_range = (radius >= r_min) & (radius <= r_max)
+    else:
+        in_range = ((centers[:, 0] > bev_range[0]) &
+                    (centers[:, 1] > bev_range[1]) &
+                    (centers[:, 0] < bev_range[2]) &
+                    (centers[:, 1] < bev_range[3]))
+    return bool(in_range.any())
+
+
+def check_scene_validity(dataset, index):
+    """Check whether a training scene may yield valid semantic labels.
+
+    A scene is dead if none of its points is annotated with a class of the
+    dataset, in which case all of its points are mapped to ``ignore_index``
+    by ``PointSegClassMapping``.
+
+    Args:
+        dataset (:obj:`Custom3DSegDataset`): The dataset in training mode.
+        index (int): Index of the scene in ``data_infos``.
+
+    Returns:
+        bool: Whether the scene may yield valid semantic labels.
+    """
+    annos = dataset.get_ann_info(index)
+    mask_bytes = dataset.file_client.get(annos['pts_semantic_mask_path'])
+    pts_semantic_mask = np.frombuffer(mask_bytes, dtype=np.int64)
+    return bool(np.isin(pts_semantic_mask, dataset.VALID_CLASS_IDS).any())
+
+
+def _check_chunk(dataset, task):
+    """Check a chunk of samples of the dataset."""
+    check_func, inds, kwargs = task
+    return [check_func(dataset, idx, **kwargs) for idx in inds]
+
+
+def _cache_key(dataset, check_func, kwargs):
+    """Get the key identifying the valid index of a dataset."""
+    stat = os.stat(dataset.ann_file)
+    key = repr((type(dataset).__name__, check_func.__name__,
+                tuple(dataset.CLASSES), sorted(kwargs.items()),
+                len(dataset.data_infos), stat.st_size, stat.st_mtime,
+                getattr(dataset, 'use_valid_flag',
+                        None), getattr(dataset, 'load_interval', None)))
+    return hashlib.md5(key.encode()).hexdigest()[:8]
+
+
+def _find_valid(dataset, check_func, kwargs, nproc, cache):
+    """Check all the samples of a dataset, see :func:`find_valid_samples`."""
+    cache_file = None
+    if cache and isinstance(dataset.ann_file, str) and \
+            osp.isfile(dataset.ann_file):
+        cache_file = osp.splitext(dataset.ann_file)[0] + \
+            f'_valid_{_cache_key(dataset, check_func, kwargs)}.pkl'
+        if osp.isfile(cache_file):
+            valid = mmcv.load(cache_file)
+            if len(valid) == len(dataset.data_infos):
+                return valid
+
+    num_samples = len(dataset.data_infos)
+    if nproc > 1:
+        chunk_size = max(1, -(-num_samples // (nproc * 4)))
+        tasks = [(check_func, range(i, min(i + chunk_size,
+                                           num_samples)), kwargs)
+                 for i in range(0, num_samples, chunk_size)]
+        chunks = track_parallel_progress_with_state(_check_chunk, dataset,
+                                                    tasks, nproc)
+        valid = sum(chunks, [])
+    else:
+        valid = [
+            check_func(dataset, idx, **kwargs) for idx in range(num_samples)
+        ]
+    valid = np.array(valid, dtype=bool)
+
+    if cache_file is not None:
+        try:
+            mmcv.dump(valid, cache_file)
+        except OSError:
+            # the directory of the annotation file may be read-only
+            pass
+    return valid
+
+
+def find_valid_samples(dataset,
+                       point_cloud_range=None,
+                       rotation_invariant=True,
+                       margin=None,
+                       nproc=1,
+                       cache=True):
+    """Find the training samples that may yield valid ground truths.
+
+    The result is cached next to the annotation file, keyed by the dataset
+    type, the classes, the checking options and the annotation file, so that
+    the check only runs once.
+
+    The samples are checked before augmentation, thus by default the range is
+    enlarged by the margin within which ``GlobalRotScaleTrans`` of the
+    pipeline may bring boxes into the range, so that the samples used in
+    training do not change. Boxes pasted by ``ObjectSample`` are not
+    accounted for.
+
+    Args:
+        dataset (:obj:`Custom3DDataset`): The dataset in training mode.
+        point_cloud_range (list[float], optional): Range of the boxes, see
+            :func:`check_sample_validity`. Defaults to None.
+        rotation_invariant (bool, optional): See
+            :func:`check_sample_validity`. Defaults to True.
+        margin (float, optional): See :func:`check_sample_validity`. If
+            None, it is given by :func:`get_augmentation_margin` from the
+            pipeline of the dataset. Defaults to None.
+        nproc (int, optional): Number of processes used for checking.
+            Defaults to 1.
+        cache (bool, optional): Whether to cache the result next to the
+            annotation file. Defaults to True.
+
+    Returns:
+        np.ndarray: Boolean mask of the valid samples.
+    """
+    if margin is None:
+        margin = 0. if point_cloud_range is None else \
+            get_augmentation_margin(
+                getattr(dataset, 'pipeline', None), point_cloud_range)
+    kwargs = dict(
+        point_cloud_range=point_cloud_range,
+        rotation_invariant=rotation_invariant,
+        margin=margin)
+    return _find_valid(dataset, check_sample_validity, kwargs, nproc, cache)
+
+
+def find_valid_scenes(dataset, nproc=1, cache=True):
+    """Find the training scenes of a segmentation dataset that may yield
+    valid semantic labels.
+
+    The result is cached as in :func:`find_valid_samples`.
+
+    Args:
+        dataset (:obj:`Custom3DSegDataset`): The dataset in training mode.
+        nproc (int, optional): Number of processes used for checking.
+            Defaults to 1.
+        cache (bool, optional): Whether to cache the result next to the
+            annotation file. Defaults to True.
+
+    Returns:
+        np.ndarray: Boolean mask of the valid scenes in ``data_infos``.
+    """
+    return _find_valid(dataset, check_scene_validity, dict(), nproc, cache)
+
+
+class RetryStatistics(object):
+    """Statistics of the samples that fail to yield valid training data.
+
+    Datasets retry with another sample whenever the pipeline returns None,
+    which repeats the full loading and augmentation work. This class counts
+    the failures of each sample and periodically logs the retry rate.
+
+    Args:
+        num_samples (int): Number of samples in the dataset.
+        log_interval (int, optional): Log the statistics every
+            ``log_interval`` attempts. No log if it is 0. Defaults to 1000.
+        logger (str, optional): Name of the logger. Defaults to 'mmdet'.
+        name (str, optional): Name of the dataset used in the log.
+            Defaults to ''.
+    """
+
+    def __init__(self,
+                 num_samples,
+                 log_interval=1000,
+                 logger='mmdet',
+                 name=''):
+        self.failures = np.zeros(num_samples, dtype=np.int64)
+        self.num_attempts = 0
+        self.log_interval = log_interval
+        self.logger = logger
+        self.name = name
+
+    @property
+    def num_failures(self):
+        """int: Number of failed attempts."""
+        return int(self.failures.sum())
+
+    @property
+    def retry_rate(self):
+        """float: Ratio of the attempts that failed."""
+        return self.num_failures / max(self.num_attempts, 1)
+
+    def update(self, idx, success):
+        """Record an attempt to prepare a sample.
+
+        Args:
+            idx (int): Index of the sample.
+            success (bool): Whether valid data was obtained.
+        """
+        self.num_attempts += 1
+        if not success:
+            self.failures[idx] += 1
+        if self.log_interval > 0 and \
+                self.num_attempts % self.log_interval == 0 and \
+                self.num_failures > 0:
+            print_log(self.summary(), logger=self.logger)
+
+    def summary(self, topk=5):
+        """Summarize the statistics.
+
+        Args:
+            topk (int, optional): Number of the most failing samples to show.
+                Defaults to 5.
+
+        Returns:
+            str: Summary of the retry rate and the most failing samples.
+        """
+        worst = np.argsort(-self.failures, kind='stable')[:topk]
+        worst = ', '.join(f'{i}({self.failures[i]})' for i in worst
+                          if self.failures[i] > 0)
+        return (f'{self.name} retry rate: {self.num_failures}/'
+                f'{self.num_attempts} ({self.retry_rate:.2%}) in pid '
+                f'{os.getpid()}, most failing samples: {worst}')
@@ -8,7 +8,8 @@ import numpy as np
 import torch
 from mmcv.utils import print_log
 
-from ..core.bbox import Box3DMode, points_cam2img
+from ..core.bbox import Box3DMode, LiDARInstance3DBoxes, points_cam2img
+from ..core.evaluation.waymo_eval import waymo_eval
 from .builder import DATASETS
 from .kitti_dataset import KittiDataset
 
@@ -92,6 +93,33 @@ class WaymoDataset(KittiDataset):
                                 f'{idx:07d}.bin')
         return pts_filename
 
+    def get_scene_id(self, index):
+        """Get the id of the segment a frame belongs to.
+
+        Args:
+            index (int): Index of the sample data.
+
+        Returns:
+            int: Segment id, which is the frame index without its last
+                three digits (see :obj:`Waymo2KITTI`).
+        """
+        return int(self.data_infos[index]['image']['image_idx']) // 1000
+
+    def get_timestamp(self, index):
+        """Get the timestamp of a frame.
+
+        Args:
+            index (int): Index of the sample data.
+
+        Returns:
+            int: Timestamp of the frame, or its index in the segment if no
+                timestamp is recorded in the info.
+        """
+        info = self.data_infos[index]
+        if 'timestamp' in info:
+            return int(info['timestamp'])
+        return int(info['image']['image_idx']) % 1000
+
     def get_data_info(self, index):
         """Get data info according to the given index.
 
@@ -104,6 +132,9 @@ class WaymoDataset(KittiDataset):
 
                 - sample_idx (str): sample index
                 - pts_filename (str): filename of point clouds
+                - pts_packed_range (np.ndarray, optional): rows of the
+                    points in the file, if the frame was converted in the
+                    'packed' format
                 - img_prefix (str): prefix of image files
                 - img_info (dict): image info
                 - lidar2img (list[np.ndarray], optional): transformations from
@@ -128,6 +159,12 @@ class WaymoDataset(KittiDataset):
             img_prefix=None,
             img_info=dict(filename=img_filename),
             lidar2img=lidar2img)
+        if 'packed_range' in info['point_cloud']:
+            # the points of the frame are memory-mapped from its segment
+            input_dict['pts_filename'] = osp.join(
+                self.data_root, info['point_cloud']['velodyne_path'])
+            input_dict['pts_packed_range'] = info['point_cloud'][
+                'packed_range']
 
         if not self.test_mode:
             annos = self.get_ann_info(index)
@@ -231,7 +268,10 @@ class WaymoDataset(KittiDataset):
         Args:
             results (list[dict]): Testing results of the dataset.
             metric (str | list[str], optional): Metrics to be evaluated.
-                Default: 'waymo'. Another supported metric is 'kitti'.
+                Default: 'waymo'. Other supported metrics are 'kitti' and
+                'waymo_native', which computes the Waymo metrics in process
+                with :func:`waymo_eval` instead of the external
+                `compute_detection_metrics_main` binary.
             logger (logging.Logger | str, optional): Logger used for printing
                 related information during evaluation. Default: None.
             pklfile_prefix (str, optional): The prefix of pkl files including
@@ -249,9 +289,12 @@ class WaymoDataset(KittiDataset):
         Returns:
             dict[str: float]: results of each evaluation metric
         """
-        assert ('waymo' in metric or 'kitti' in metric), \
+        metrics = metric if isinstance(metric, list) else [metric]
+        assert all(m in ['waymo', 'kitti', 'waymo_native'] for m in metrics), \
             f'invalid metric {metric}'
-        if 'kitti' in metric:
+        ap_dict = dict()
+        tmp_dir = None
+        if 'kitti' in metrics:
             result_files, tmp_dir = self.format_results(
                 results,
                 pklfile_prefix,
@@ -283,7 +326,7 @@ class WaymoDataset(KittiDataset):
                     self.CLASSES,
                     eval_types=['bev', '3d'])
                 print_log('\n' + ap_result_str, logger=logger)
-        if 'waymo' in metric:
+        if 'waymo' in metrics:
             waymo_root = osp.join(
                 self.data_root.split('kitti_format')[0], 'waymo_format')
             if pklfile_prefix is None:
@@ -349,6 +392,15 @@ class WaymoDataset(KittiDataset):
                  ap_dict['Cyclist/L2 mAPH']) / 3
             if eval_tmp_dir is not None:
                 eval_tmp_dir.cleanup()
+        if 'waymo_native' in metrics:
+            if 'pts_bbox' in results[0]:
+                for name in results[0]:
+                    ap_dict_ = self._evaluate_native(
+                        [out[name] for out in results], logger)
+                    for ap_type, ap in ap_dict_.items():
+                        ap_dict[f'{name}/{ap_type}'] = ap
+            else:
+                ap_dict.update(self._evaluate_native(results, logger))
 
         if tmp_dir is not None:
             tmp_dir.cleanup()
@@ -547,3 +599,70 @@ class WaymoDataset(KittiDataset):
                 label_preds=np.zeros([0, 4]),
                 sample_idx=sample_idx,
             )
+
+    def get_eval_gts(self):
+        """Get the ground truths of all the samples for :func:`waymo_eval`.
+
+        Returns:
+            dict[str, np.ndarray]: Sample indices, labels, gravity center
+                boxes in lidar coordinates and numbers of lidar points of the
+                ground truths of the evaluated classes.
+        """
+        sample_inds, labels, boxes, num_points = [], [], [], []
+        for idx, info in enumerate(self.data_infos):
+            ann_info = self.get_ann_info(idx)
+            mask = ann_info['gt_labels_3d'] >= 0
+            gt_bboxes = ann_info['gt_bboxes_3d'][torch.from_numpy(mask)]
+            annos = self.remove_dontcare(info['annos'])
+            sample_inds.append(np.full(int(mask.sum()), idx))
+            labels.append(ann_info['gt_labels_3d'][mask])
+            boxes.append(self._eval_boxes(gt_bboxes))
+            num_points.append(annos['num_points_in_gt'][mask])
+        return dict(
+            sample_inds=np.concatenate(sample_inds).astype(np.int64),
+            labels=np.concatenate(labels).astype(np.int64),
+            boxes=np.concatenate(boxes),
+            num_points=np.concatenate(num_points))
+
+    @staticmethod
+    def _eval_boxes(boxes):
+        """Get the (x, y, z, dx, dy, dz, yaw) boxes of :func:`waymo_eval`,
+        with z at the gravity center."""
+        return torch.cat(
+            [boxes.gravity_center, boxes.dims, boxes.yaw[:, None]],
+            dim=1).numpy().astype(np.float64)
+
+    def _evaluate_native(self, results, logger=None):
+        """Evaluate the results with :func:`waymo_eval`.
+
+        Args:
+            results (list[dict]): Testing results of the dataset.
+            logger (logging.Logger | str, optional): Logger used for printing
+                related information during evaluation. Default: None.
+
+        Returns:
+            dict[str, float]: The mAP and mAPH of each class at each level.
+        """
+        assert len(results) == len(self.data_infos), \
+            'invalid list length of network outputs'
+        sample_inds, labels, boxes, scores = [], [], [], []
+        for idx, (result, info) in enumerate(zip(results, self.data_infos)):
+            box_dict = self.convert_valid_bboxes(result, info)
+            box3d_lidar = box_dict['box3d_lidar']
+            pred_bboxes = LiDARInstance3DBoxes(
+                box3d_lidar, box_dim=box3d_lidar.shape[-1])
+            sample_inds.append(np.full(len(box3d_lidar), idx))
+            labels.append(box_dict['label_preds'].reshape(-1))
+            boxes.append(self._eval_boxes(pred_bboxes))
+            scores.append(box_dict['scores'])
+        preds = dict(
+            sample_inds=np.concatenate(sample_inds).astype(np.int64),
+            labels=np.concatenate(labels).astype(np.int64),
+            boxes=np.concatenate(boxes),
+            scores=np.concatenate(scores).astype(np.float64))
+        return waymo_eval(
+            self.get_eval_gts(),
+            preds,
+            self.CLASSES,
+            num_samples=len(self.data_infos),
+            logger=logger)
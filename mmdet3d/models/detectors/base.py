@@ -6,13 +6,17 @@ import torch
 from mmcv.parallel import DataContainer as DC
 from mmcv.runner import auto_fp16
 
-from mmdet3d.core import Box3DMode, Coord3DMode, show_result
+from mmdet3d.core import Box3DMode, Coord3DMode, show_result, unpack_inputs
 from mmdet.models.detectors import BaseDetector
 
 
 class Base3DDetector(BaseDetector):
     """Base class for detectors."""
 
+    # whether `extract_feat` accepts the points of a batch packed into a
+    # single tensor by `packed_collate`, otherwise they are split into lists
+    accept_packed_points = False
+
     def forward_test(self, points, img_metas, img=None, **kwargs):
         """
         Args:
@@ -56,6 +60,8 @@ class Base3DDetector(BaseDetector):
         list[list[dict]]), with the outer list indicating test time
         augmentations.
         """
+        kwargs = unpack_inputs(
+            kwargs, unpack_points=not self.accept_packed_points)
         if return_loss:
             return self.forward_train(**kwargs)
         else:
@@ -11,8 +11,13 @@ from .voxelnet import VoxelNet
 class DynamicVoxelNet(VoxelNet):
     r"""VoxelNet using `dynamic voxelization
         <https://arxiv.org/abs/1910.06528>`_.
+
+    The points of a batch can be packed into a single tensor (see
+    :func:`packed_collate`), they are then voxelized at once.
     """
 
+    accept_packed_points = True
+
     def __init__(self,
                  voxel_layer,
                  voxel_encoder,
@@ -37,7 +42,18 @@ class DynamicVoxelNet(VoxelNet):
             init_cfg=init_cfg)
 
     def extract_feat(self, points, img_metas):
-        """Extract features from points."""
+        """Extract features from points.
+
+        Args:
+            points (list[torch.Tensor] | torch.Tensor): Points of each
+                sample, or the points of the batch packed into a tensor of
+                shape (N, C + 1), whose first column is the index of the
+                sample.
+            img_metas (list[dict]): Meta information of each sample.
+
+        Returns:
+            tuple[torch.Tensor]: Features of the batch.
+        """
         voxels, coors = self.voxelize(points)
         voxel_features, feature_coors = self.voxel_encoder(voxels, coors)
         batch_size = coors[-1, 0].item() + 1
@@ -53,11 +69,22 @@ class DynamicVoxelNet(VoxelNet):
         """Apply dynamic voxelization to points.
 
         Args:
-            points (list[torch.Tensor]): Points of each sample.
+            points (list[torch.Tensor] | torch.Tensor): Points of each
+                sample, or the packed points of the batch.
 
         Returns:
             tuple[torch.Tensor]: Concatenated points and coordinates.
         """
+        if isinstance(points, torch.Tensor):
+            # the coordinates of a point do not depend on the other points,
+            # so the packed points are voxelized at once and their sample
+            # indices are the batch indices of the coordinates
+            sample_inds = points[:, :1]
+            points = points[:, 1:].contiguous()
+            coors = self.voxel_layer(points)
+            coors_batch = torch.cat([sample_inds.to(coors.dtype), coors],
+                                    dim=1)
+            return points, coors_batch
         coors = []
         # dynamic voxelization only provide a coors mapping
         for res in points:
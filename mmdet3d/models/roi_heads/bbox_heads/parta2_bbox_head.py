@@ -9,7 +9,9 @@ if IS_SPCONV2_AVAILABLE:
     from spconv.pytorch import (SparseConvTensor, SparseMaxPool3d,
                                 SparseSequential)
 else:
-    from mmcv.ops import SparseConvTensor, SparseMaxPool3d, SparseSequential
+    from mmcv.ops import SparseConvTensor, SparseSequential
+
+    from mmdet3d.ops.spconv import SparseMaxPool3d
 
 from mmcv.runner import BaseModule
 from torch import nn as nn
@@ -1,14 +1,13 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import torch
 from mmcv.cnn import ConvModule
-from mmcv.ops import furthest_point_sample
 from mmcv.runner import BaseModule
 from torch import nn as nn
 from torch.nn import functional as F
 
 from mmdet3d.models.builder import HEADS, build_loss
 from mmdet3d.models.model_utils import VoteModule
-from mmdet3d.ops import build_sa_module
+from mmdet3d.ops import build_sa_module, furthest_point_sample
 from mmdet.core import multi_apply
 
 
@@ -7,7 +7,7 @@ import torch
 from mmcv.parallel import DataContainer as DC
 from mmcv.runner import auto_fp16
 
-from mmdet3d.core import show_seg_result
+from mmdet3d.core import show_seg_result, unpack_inputs
 from mmseg.models.segmentors import BaseSegmentor
 
 
@@ -63,6 +63,7 @@ class Base3DSegmentor(BaseSegmentor):
         list[list[dict]]), with the outer list indicating test time
         augmentations.
         """
+        kwargs = unpack_inputs(kwargs)
         if return_loss:
             return self.forward_train(**kwargs)
         else:
@@ -2,26 +2,20 @@
 from mmcv.ops import (RoIAlign, SigmoidFocalLoss, get_compiler_version,
                       get_compiling_cuda_version, nms, roi_align,
                       sigmoid_focal_loss)
-from mmcv.ops.assign_score_withk import assign_score_withk
-from mmcv.ops.ball_query import ball_query
-from mmcv.ops.furthest_point_sample import (furthest_point_sample,
-                                            furthest_point_sample_with_dist)
-from mmcv.ops.gather_points import gather_points
-from mmcv.ops.group_points import GroupAll, QueryAndGroup, grouping_operation
-from mmcv.ops.knn import knn
 from mmcv.ops.points_in_boxes import (points_in_boxes_all, points_in_boxes_cpu,
                                       points_in_boxes_part)
-from mmcv.ops.points_sampler import PointsSampler as Points_Sampler
 from mmcv.ops.roiaware_pool3d import RoIAwarePool3d
 from mmcv.ops.roipoint_pool3d import RoIPointPool3d
 from mmcv.ops.scatter_points import DynamicScatter, dynamic_scatter
-from mmcv.ops.three_interpolate import three_interpolate
-from mmcv.ops.three_nn import three_nn
 from mmcv.ops.voxelize import Voxelization, voxelization
 
 from .dgcnn_modules import DGCNNFAModule, DGCNNFPModule, DGCNNGFModule
 from .norm import NaiveSyncBatchNorm1d, NaiveSyncBatchNorm2d
 from .paconv import PAConv, PAConvCUDA
+from .point_ops import (GroupAll, Points_Sampler, QueryAndGroup,
+                        assign_score_withk, ball_query, furthest_point_sample,
+                        furthest_point_sample_with_dist, gather_points,
+                        grouping_operation, knn, three_interpolate, three_nn)
 from .pointnet_modules import (PAConvCUDASAModule, PAConvCUDASAModuleMSG,
                                PAConvSAModule, PAConvSAModuleMSG,
                                PointFPModule, PointSAModule, PointSAModuleMSG,
@@ -0,0 +1,22 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from mmcv.ops import GroupAll
+
+from .group_points import QueryAndGroup
+from .ops import (assign_score_withk, assign_score_withk_cpu, ball_query,
+                  ball_query_cpu, furthest_point_sample,
+                  furthest_point_sample_cpu, furthest_point_sample_with_dist,
+                  furthest_point_sample_with_dist_cpu, gather_points,
+                  gather_points_cpu, grouping_operation,
+                  grouping_operation_cpu, knn, knn_cpu, three_interpolate,
+                  three_interpolate_cpu, three_nn, three_nn_cpu)
+from .points_sampler import Points_Sampler
+
+__all__ = [
+    'furthest_point_sample', 'furthest_point_sample_with_dist', 'ball_query',
+    'knn', 'three_nn', 'three_interpolate', 'gather_points',
+    'grouping_operation', 'assign_score_withk', 'furthest_point_sample_cpu',
+    'furthest_point_sample_with_dist_cpu', 'ball_query_cpu', 'knn_cpu',
+    'three_nn_cpu', 'three_interpolate_cpu', 'gather_points_cpu',
+    'grouping_operation_cpu', 'assign_score_withk_cpu', 'GroupAll',
+    'QueryAndGroup', 'Points_Sampler'
+]
@@ -0,0 +1,515 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import torch
+from mmcv.ops import assign_score_withk as assign_score_withk_cuda
+from mmcv.ops import ball_query as ball_query_cuda
+from mmcv.ops import furthest_point_sample as furthest_point_sample_cuda
+from mmcv.ops import \
+    furthest_point_sample_with_dist as furthest_point_sample_with_dist_cuda
+from mmcv.ops import gather_points as gather_points_cuda
+from mmcv.ops import grouping_operation as grouping_operation_cuda
+from mmcv.ops import knn as knn_cuda
+from mmcv.ops import three_interpolate as three_interpolate_cuda
+from mmcv.ops import three_nn as three_nn_cuda
+
+# maximum number of pairwise distances computed at once, the queries are
+# split into chunks of centers so that the distance matrices fit in memory
+MAX_DIST_NUMEL = 2**24
+
+
+def _chunks(num_centers, num_pairs_per_center):
+    """Split the centers into slices of at most :obj:`MAX_DIST_NUMEL`
+    pairs."""
+    chunk_size = max(1, MAX_DIST_NUMEL // max(1, num_pairs_per_center))
+    for start in range(0, num_centers, chunk_size):
+        yield slice(start, min(start + chunk_size, num_centers))
+
+
+def _pairwise_sq_dist(center_xyz, points_xyz_t):
+    """Squared Euclidean distances between each center and each point.
+
+    The differences of the coordinates are computed explicitly rather than
+    with a matrix multiplication, as in the CUDA kernels, so that the
+    distances are exact for coincident points and are not affected by the
+    magnitude of the coordinates.
+
+    Args:
+        center_xyz (torch.Tensor): (B, npoint, 3) Coordinates of the centers.
+        points_xyz_t (torch.Tensor): (B, 3, N) Transposed coordinates of
+            the points.
+
+    Returns:
+        torch.Tensor: (B, npoint, N) Squared distances.
+    """
+    center_xyz = center_xyz.float()
+    points_xyz_t = points_xyz_t.float()
+    sq_dist = torch.sub(center_xyz[:, :, None, 0], points_xyz_t[:, None,
+                                                                0]).square_()
+    diff = torch.empty_like(sq_dist)
+    for i in (1, 2):
+        torch.sub(
+            center_xyz[:, :, None, i], points_xyz_t[:, None, i], out=diff)
+        sq_dist.addcmul_(diff, diff)
+    return sq_dist
+
+
+def _batch_gather(features, indices):
+    """Gather the rows of batched features.
+
+    Args:
+        features (torch.Tensor): (B, N, ...) Features to gather.
+        indices (torch.Tensor): (B, ...) Indices of the rows in each batch.
+
+    Returns:
+        torch.Tensor: (B, ..., ...) Gathered features.
+    """
+    batch_inds = torch.arange(
+        features.shape[0],
+        device=features.device).view(-1, *([1] * (indices.dim() - 1)))
+    return features[batch_inds, indices.long()]
+
+
+def furthest_point_sample_cpu(points_xyz, num_points):
+    """Pure PyTorch implementation of :func:`furthest_point_sample`.
+
+    All the batches are sampled at once, with one iteration per sampled
+    point, which updates the distances of the points to the sampled ones in
+    place. The first point is always sampled, and ties are broken by the
+    smallest index.
+
+    Args:
+        points_xyz (torch.Tensor): (B, N, 3) Coordinates of the points.
+        num_points (int): Number of points to sample.
+
+    Returns:
+        torch.Tensor: (B, num_points) Indices of the sampled points.
+    """
+    points_xyz = points_xyz[..., :3].float()
+    B, N, _ = points_xyz.shape
+    # the coordinates of all the points are read at each iteration, which
+    # is faster with the points contiguous for each coordinate
+    points_xyz_t = points_xyz.transpose(1, 2).contiguous()
+    batch_inds = torch.arange(B, device=points_xyz.device)
+    indices = points_xyz.new_zeros((B, num_points), dtype=torch.long)
+    min_dist = points_xyz.new_full((B, N), 1e10)
+    dist = torch.empty_like(min_dist)
+    diff = torch.empty_like(min_dist)
+    last = indices[:, 0]
+    for i in range(1, num_points):
+        last_xyz = points_xyz[batch_inds, last]
+        torch.sub(points_xyz_t[:, 0], last_xyz[:, :1], out=dist).square_()
+        for j in (1, 2):
+            torch.sub(points_xyz_t[:, j], last_xyz[:, j:j + 1], out=diff)
+            dist.addcmul_(diff, diff)
+        torch.minimum(min_dist, dist, out=min_dist)
+        last = min_dist.argmax(dim=1)
+        indices[:, i] = last
+    return indices.int()
+
+
+def furthest_point_sample_with_dist_cpu(points_dist, num_points):
+    """Pure PyTorch implementation of
+    :func:`furthest_point_sample_with_dist`.
+
+    Args:
+        points_dist (torch.Tensor): (B, N, N) Distances between the points.
+        num_points (int): Number of points to sample.
+
+    Returns:
+        torch.Tensor: (B, num_points) Indices of the sampled points.
+    """
+    points_dist = points_dist.float()
+    B, N, _ = points_dist.shape
+    batch_inds = torch.arange(B, device=points_dist.device)
+    indices = points_dist.new_zeros((B, num_points), dtype=torch.long)
+    min_dist = points_dist.new_full((B, N), 1e10)
+    last = indices[:, 0]
+    for i in range(1, num_points):
+        torch.minimum(min_dist, points_dist[batch_inds, last], out=min_dist)
+        last = min_dist.argmax(dim=1)
+        indices[:, i] = last
+    return indices.int()
+
+
+def ball_query_cpu(min_radius, max_radius, sample_num, xyz, center_xyz):
+    """Pure PyTorch implementation of :func:`ball_query`.
+
+    The distances between the centers and the points are computed by chunks
+    of centers. The first ``sample_num`` points in each ball are kept in the
+    order of their indices, and the missing ones are filled with the first
+    point, or with 0 for an empty ball.
+
+    Args:
+        min_radius (float): Minimum radius of the balls.
+        max_radius (float): Maximum radius of the balls.
+        sample_num (int): Maximum number of points in the balls.
+        xyz (torch.Tensor): (B, N, 3) Coordinates of the points.
+        center_xyz (torch.Tensor): (B, npoint, 3) Centers of the balls.
+
+    Returns:
+        torch.Tensor: (B, npoint, sample_num) Indices of the points in the
+            balls.
+    """
+    B, N, _ = xyz.shape
+    npoint = center_xyz.shape[1]
+    xyz_t = xyz.transpose(1, 2).contiguous()
+    indices = xyz.new_full((B, npoint, sample_num), -1, dtype=torch.long)
+    for chunk in _chunks(npoint, B * N):
+        sq_dist = _pairwise_sq_dist(center_xyz[:, chunk], xyz_t)
+        in_ball = sq_dist < max_radius**2
+        if min_radius > 0:
+            in_ball &= (sq_dist == 0) | (sq_dist >= min_radius**2)
+        # the points in the balls are in the order of the centers and of
+        # their indices, their rank in each ball is their offset from the
+        # first point of the ball
+        batch_inds, center_inds, point_inds = in_ball.nonzero(as_tuple=True)
+        num_centers = in_ball.shape[1]
+        balls = batch_inds * num_centers + center_inds
+        counts = torch.bincount(balls, minlength=B * num_centers)
+        ranks = torch.arange(len(balls), device=xyz.device) - \
+            (counts.cumsum(0) - counts)[balls]
+        keep = ranks < sample_num
+        chunk_indices = indices.new_full((B * num_centers, sample_num), -1)
+        chunk_indices[balls[keep], ranks[keep]] = point_inds[keep]
+        indices[:, chunk] = chunk_indices.view(B, num_centers, sample_num)
+    indices = torch.where(indices >= 0, indices, indices[..., :1])
+    return indices.clamp(min=0).int()
+
+
+def knn_cpu(k, xyz, center_xyz=None, transposed=False):
+    """Pure PyTorch implementation of :func:`knn`.
+
+    Args:
+        k (int): Number of nearest neighbors.
+        xyz (torch.Tensor): (B, N, 3) if transposed == False, else
+            (B, 3, N). Coordinates of the points.
+        center_xyz (torch.Tensor, optional): (B, npoint, 3) if
+            transposed == False, else (B, 3, npoint). Coordinates of the
+            centers. Defaults to None, i.e. the points themselves.
+        transposed (bool, optional): Whether the coordinates are transposed.
+            Defaults to False.
+
+    Returns:
+        torch.Tensor: (B, k, npoint) Indices of the nearest neighbors, sorted
+            by distance.
+    """
+    if center_xyz is None:
+        center_xyz = xyz
+    if transposed:
+        xyz_t = xyz.contiguous()
+        center_xyz = center_xyz.transpose(1, 2)
+    else:
+        xyz_t = xyz.transpose(1, 2).contiguous()
+    B, _, N = xyz_t.shape
+    npoint = center_xyz.shape[1]
+    indices = xyz_t.new_zeros((B, npoint, k), dtype=torch.long)
+    num_nearest = min(k, N)
+    for chunk in _chunks(npoint, B * N):
+        sq_dist = _pairwise_sq_dist(center_xyz[:, chunk], xyz_t)
+        indices[:, chunk, :num_nearest] = sq_dist.topk(
+            num_nearest, dim=-1, largest=False)[1]
+    return indices.transpose(1, 2).int().contiguous()
+
+
+def three_nn_cpu(target, source):
+    """Pure PyTorch implementation of :func:`three_nn`.
+
+    Args:
+        target (torch.Tensor): (B, N, 3) Points to find the neighbors of.
+        source (torch.Tensor): (B, M, 3) Points to find the neighbors in,
+            with M >= 3.
+
+    Returns:
+        tuple[torch.Tensor, torch.Tensor]: (B, N, 3) Distances to the three
+            nearest neighbors and their indices, sorted by distance.
+    """
+    assert source.shape[1] >= 3, \
+        'three_nn needs at least 3 source points.'
+    B, N, _ = target.shape
+    source_t = source.transpose(1, 2).contiguous()
+    sq_dist = target.new_zeros((B, N, 3), dtype=torch.float)
+    indices = target.new_zeros((B, N, 3), dtype=torch.long)
+    for chunk in _chunks(N, B * source.shape[1]):
+        sq_dist[:, chunk], indices[:, chunk] = _pairwise_sq_dist(
+            target[:, chunk], source_t).topk(
+                3, dim=-1, largest=False)
+    return sq_dist.sqrt(), indices.int()
+
+
+def three_interpolate_cpu(features, indices, weight):
+    """Pure PyTorch implementation of :func:`three_interpolate`.
+
+    Args:
+        features (torch.Tensor): (B, C, M) Features to interpolate.
+        indices (torch.Tensor): (B, N, 3) Indices of the three neighbors.
+        weight (torch.Tensor): (B, N, 3) Weights of the three neighbors.
+
+    Returns:
+        torch.Tensor: (B, C, N) Interpolated features.
+    """
+    B, C, _ = features.shape
+    N = indices.shape[1]
+    neighbor_features = features.gather(
+        2,
+        indices.long().view(B, 1, N * 3).expand(-1, C, -1))
+    return (neighbor_features.view(B, C, N, 3) * weight[:, None]).sum(dim=-1)
+
+
+def gather_points_cpu(features, indices):
+    """Pure PyTorch implementation of :func:`gather_points`.
+
+    Args:
+        features (torch.Tensor): (B, C, N) Features to gather.
+        indices (torch.Tensor): (B, M) Indices of the points.
+
+    Returns:
+        torch.Tensor: (B, C, M) Gathered features.
+    """
+    return features.gather(
+        2,
+        indices.long()[:, None].expand(-1, features.shape[1], -1))
+
+
+def grouping_operation_cpu(features, indices):
+    """Pure PyTorch implementation of :func:`grouping_operation`.
+
+    Args:
+        features (torch.Tensor): (B, C, N) Features to group.
+        indices (torch.Tensor): (B, npoint, nsample) Indices of the points
+            in each group.
+
+    Returns:
+        torch.Tensor: (B, C, npoint, nsample) Grouped features.
+    """
+    B, npoint, nsample = indices.shape
+    return gather_points_cpu(features,
+                             indices.reshape(B,
+                                             -1)).view(B, -1, npoint, nsample)
+
+
+def assign_score_withk_cpu(scores,
+                           point_features,
+                           center_features,
+                           knn_idx,
+                           aggregate='sum'):
+    """Pure PyTorch implementation of :func:`assign_score_withk`.
+
+    The neighbor features are gathered for one weight matrix of the weight
+    bank at a time, to avoid the (B, npoint, K, M, out_dim) intermediate
+    tensor.
+
+    Args:
+        scores (torch.Tensor): (B, npoint, K, M) Scores of the weight
+            matrices in the weight bank.
+        point_features (torch.Tensor): (B, N, M, out_dim) Pre-computed
+            point features to be aggregated.
+        center_features (torch.Tensor): (B, N, M, out_dim) Pre-computed
+            center features to be aggregated.
+        knn_idx (torch.Tensor): (B, npoint, K) Indices of the neighbors, the
+            first one of each row being the center.
+        aggregate (str, optional): Aggregation method, only 'sum' is
+            supported. Defaults to 'sum'.
+
+    Returns:
+        torch.Tensor: (B, out_dim, npoint, K) Aggregated features.
+    """
+    assert aggregate == 'sum', \
+        f'Aggregation method {aggregate} is not supported.'
+    output = 0
+    for m in range(scores.shape[-1]):
+        neighbor = _batch_gather(point_features[:, :, m], knn_idx)
+        center = _batch_gather(center_features[:, :, m], knn_idx[..., :1])
+        output = output + scores[..., m:m + 1] * (neighbor - center)
+    return output.permute(0, 3, 1, 2).contiguous()
+
+
+def furthest_point_sample(points_xyz, num_points):
+    """Sample points with the furthest point sampling.
+
+    The CUDA op of mmcv is used for the tensors on GPU, and
+    :func:`furthest_point_sample_cpu` otherwise.
+
+    Args:
+        points_xyz (torch.Tensor): (B, N, 3) Coordinates of the points.
+        num_points (int): Number of points to sample.
+
+    Returns:
+        torch.Tensor: (B, num_points) Indices of the sampled points.
+    """
+    if points_xyz.is_cuda:
+        return furthest_point_sample_cuda(points_xyz, num_points)
+    return furthest_point_sample_cpu(points_xyz, num_points)
+
+
+def furthest_point_sample_with_dist(points_dist, num_points):
+    """Sample points with the furthest point sampling from their distances.
+
+    Args:
+        points_dist (torch.Tensor): (B, N, N) Distances between the points.
+        num_points (int): Number of points to sample.
+
+    Returns:
+        torch.Tensor: (B, num_points) Indices of the sampled points.
+    """
+    if points_dist.is_cuda:
+        return furthest_point_sample_with_dist_cuda(points_dist, num_points)
+    return furthest_point_sample_with_dist_cpu(points_dist, num_points)
+
+
+def ball_query(min_radius,
+               max_radius,
+               sample_num,
+               xyz,
+               center_xyz,
+               xyz_batch_cnt=None,
+               center_xyz_batch_cnt=None):
+    """Find the points in the balls around the centers.
+
+    Only the batched inputs are supported on CPU, the stacked inputs are
+    passed to the CUDA op.
+
+    Args:
+        min_radius (float): Minimum radius of the balls.
+        max_radius (float): Maximum radius of the balls.
+        sample_num (int): Maximum number of points in the balls.
+        xyz (torch.Tensor): (B, N, 3) Coordinates of the points, or stacked
+            inputs (N1 + N2 ..., 3).
+        center_xyz (torch.Tensor): (B, npoint, 3) Centers of the balls, or
+            stacked inputs (M1 + M2 ..., 3).
+        xyz_batch_cnt (torch.Tensor, optional): (B) Number of the points in
+            each batch of the stacked inputs. Defaults to None.
+        center_xyz_batch_cnt (torch.Tensor, optional): (B) Number of the
+            centers in each batch of the stacked inputs. Defaults to None.
+
+    Returns:
+        torch.Tensor: (B, npoint, sample_num) or (M1 + M2 ..., sample_num)
+            Indices of the points in the balls.
+    """
+    if xyz.is_cuda or xyz_batch_cnt is not None:
+        return ball_query_cuda(min_radius, max_radius, sample_num, xyz,
+                               center_xyz, xyz_batch_cnt, center_xyz_batch_cnt)
+    return ball_query_cpu(min_radius, max_radius, sample_num, xyz, center_xyz)
+
+
+def knn(k, xyz, center_xyz=None, transposed=False):
+    """Find the k nearest neighbors of the centers.
+
+    Args:
+        k (int): Number of nearest neighbors.
+        xyz (torch.Tensor): (B, N, 3) if transposed == False, else
+            (B, 3, N). Coordinates of the points.
+        center_xyz (torch.Tensor, optional): (B, npoint, 3) if
+            transposed == False, else (B, 3, npoint). Coordinates of the
+            centers. Defaults to None, i.e. the points themselves.
+        transposed (bool, optional): Whether the coordinates are transposed.
+            Defaults to False.
+
+    Returns:
+        torch.Tensor: (B, k, npoint) Indices of the nearest neighbors.
+    """
+    if xyz.is_cuda:
+        return knn_cuda(k, xyz, center_xyz, transposed)
+    return knn_cpu(k, xyz, center_xyz, transposed)
+
+
+def three_nn(target, source):
+    """Find the three nearest neighbors of the target points.
+
+    Args:
+        target (torch.Tensor): (B, N, 3) Points to find the neighbors of.
+        source (torch.Tensor): (B, M, 3) Points to find the neighbors in.
+
+    Returns:
+        tuple[torch.Tensor, torch.Tensor]: (B, N, 3) Distances to the three
+            nearest neighbors and their indices.
+    """
+    if target.is_cuda:
+        return three_nn_cuda(target, source)
+    return three_nn_cpu(target, source)
+
+
+def three_interpolate(features, indices, weight):
+    """Interpolate features with the weighted three nearest neighbors.
+
+    Args:
+        features (torch.Tensor): (B, C, M) Features to interpolate.
+        indices (torch.Tensor): (B, N, 3) Indices of the three neighbors.
+        weight (torch.Tensor): (B, N, 3) Weights of the three neighbors.
+
+    Returns:
+        torch.Tensor: (B, C, N) Interpolated features.
+    """
+    if features.is_cuda:
+        return three_interpolate_cuda(features, indices, weight)
+    return three_interpolate_cpu(features, indices, weight)
+
+
+def gather_points(features, indices):
+    """Gather the features of points.
+
+    Args:
+        features (torch.Tensor): (B, C, N) Features to gather.
+        indices (torch.Tensor): (B, M) Indices of the points.
+
+    Returns:
+        torch.Tensor: (B, C, M) Gathered features.
+    """
+    if features.is_cuda:
+        return gather_points_cuda(features, indices)
+    return gather_points_cpu(features, indices)
+
+
+def grouping_operation(features,
+                       indices,
+                       features_batch_cnt=None,
+                       indices_batch_cnt=None):
+    """Group the features of points.
+
+    Only the batched inputs are supported on CPU, the stacked inputs are
+    passed to the CUDA op.
+
+    Args:
+        features (torch.Tensor): (B, C, N) Features to group, or stacked
+            inputs (N1 + N2 ..., C).
+        indices (torch.Tensor): (B, npoint, nsample) Indices of the points
+            in each group, or stacked inputs (M1 + M2 ..., nsample).
+        features_batch_cnt (torch.Tensor, optional): (B) Number of the
+            features in each batch of the stacked inputs. Defaults to None.
+        indices_batch_cnt (torch.Tensor, optional): (B) Number of the groups
+            in each batch of the stacked inputs. Defaults to None.
+
+    Returns:
+        torch.Tensor: (B, C, npoint, nsample) or (M1 + M2 ..., C, nsample)
+            Grouped features.
+    """
+    if features.is_cuda or features_batch_cnt is not None:
+        return grouping_operation_cuda(features, indices, features_batch_cnt,
+                                       indices_batch_cnt)
+    return grouping_operation_cpu(features, indices)
+
+
+def assign_score_withk(scores,
+                       point_features,
+                       center_features,
+                       knn_idx,
+                       aggregate='sum'):
+    """Assemble the features of the neighbors with the scores of the weight
+    matrices, see :func:`assign_score_withk_cpu`.
+
+    Args:
+        scores (torch.Tensor): (B, npoint, K, M) Scores of the weight
+            matrices in the weight bank.
+        point_features (torch.Tensor): (B, N, M, out_dim) Pre-computed
+            point features to be aggregated.
+        center_features (torch.Tensor): (B, N, M, out_dim) Pre-computed
+            center features to be aggregated.
+        knn_idx (torch.Tensor): (B, npoint, K) Indices of the neighbors.
+        aggregate (str, optional): Aggregation method. Defaults to 'sum'.
+
+    Returns:
+        torch.Tensor: (B, out_dim, npoint, K) Aggregated features.
+    """
+    if scores.is_cuda:
+        return assign_score_withk_cuda(scores, point_features, center_features,
+                                       knn_idx, aggregate)
+    return assign_score_withk_cpu(scores, point_features, center_features,
+                                  knn_idx, aggregate)
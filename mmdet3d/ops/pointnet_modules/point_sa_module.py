@@ -1,13 +1,11 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import torch
 from mmcv.cnn import ConvModule
-from mmcv.ops import GroupAll
-from mmcv.ops import PointsSampler as Points_Sampler
-from mmcv.ops import QueryAndGroup, gather_points
 from torch import nn as nn
 from torch.nn import functional as F
 
 from mmdet3d.ops import PAConv
+from ..point_ops import GroupAll, Points_Sampler, QueryAndGroup, gather_points
 from .builder import SA_MODULES
 
 
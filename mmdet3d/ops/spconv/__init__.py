@@ -1,5 +1,6 @@
 # Copyright (c) OpenMMLab. All rights reserved.
-from .overwrite_spconv.write_spconv2 import register_spconv2
+from .overwrite_spconv import (SparseMaxPool2d, SparseMaxPool3d,
+                               register_cpu_spconv, register_spconv2)
 
 try:
     import spconv
@@ -11,4 +12,8 @@ else:
     else:
         IS_SPCONV2_AVAILABLE = False
 
-__all__ = ['IS_SPCONV2_AVAILABLE']
+if not IS_SPCONV2_AVAILABLE:
+    # the mmcv sparse convolutions only run on GPU
+    register_cpu_spconv()
+
+__all__ = ['IS_SPCONV2_AVAILABLE', 'SparseMaxPool2d', 'SparseMaxPool3d']
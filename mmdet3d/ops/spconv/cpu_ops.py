@@ -0,0 +1,287 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import torch
+from mmcv.ops.sparse_ops import get_conv_output_size, get_deconv_output_size
+
+
+def _to_list(value, ndim):
+    if not isinstance(value, (list, tuple)):
+        return [value] * ndim
+    return list(value)
+
+
+def _kernel_offsets(kernel_size, device):
+    """Get the offsets of a kernel, in the order of the flattened weight.
+
+    Args:
+        kernel_size (list[int]): Size of the kernel.
+        device (torch.device): Device of the offsets.
+
+    Returns:
+        torch.Tensor: (K, ndim) Offsets of the kernel.
+    """
+    grids = torch.meshgrid(
+        *[torch.arange(size, device=device) for size in kernel_size],
+        indexing='ij')
+    return torch.stack([grid.reshape(-1) for grid in grids], dim=-1)
+
+
+def _hash_coors(batch_inds, coors, spatial_shape):
+    """Hash voxel coordinates to unique keys.
+
+    Args:
+        batch_inds (torch.Tensor): (N, ) Batch indices of the voxels.
+        coors (torch.Tensor): (N, ndim) Coordinates of the voxels, inside the
+            spatial shape.
+        spatial_shape (list[int]): Spatial shape of the voxels.
+
+    Returns:
+        torch.Tensor: (N, ) Keys of the voxels, in the order of the batch
+            indices and of the coordinates.
+    """
+    keys = batch_inds.long()
+    for i, size in enumerate(spatial_shape):
+        keys = keys * size + coors[:, i]
+    return keys
+
+
+def _unhash_coors(keys, spatial_shape):
+    """Get the batch indices and coordinates of voxels from their keys.
+
+    Args:
+        keys (torch.Tensor): (N, ) Keys of the voxels.
+        spatial_shape (list[int]): Spatial shape of the voxels.
+
+    Returns:
+        torch.Tensor: (N, ndim + 1) Batch indices and coordinates.
+    """
+    coors = []
+    for size in spatial_shape[::-1]:
+        coors.append(keys % size)
+        keys = torch.div(keys, size, rounding_mode='floor')
+    coors.append(keys)
+    return torch.stack(coors[::-1], dim=-1)
+
+
+def _in_shape(coors, spatial_shape):
+    """Whether each voxel coordinate is inside the spatial shape."""
+    return ((coors >= 0) &
+            (coors < coors.new_tensor(spatial_shape))).all(dim=-1)
+
+
+class VoxelHashTable(object):
+    """Table of the indices of voxels, looked up by their coordinates.
+
+    The coordinates are hashed to keys which are sorted once, so that each
+    lookup is a binary search of the keys.
+
+    Args:
+        indices (torch.Tensor): (N, ndim + 1) Batch indices and coordinates
+            of the voxels.
+        spatial_shape (list[int]): Spatial shape of the voxels.
+    """
+
+    def __init__(self, indices, spatial_shape):
+        self.spatial_shape = list(spatial_shape)
+        keys = _hash_coors(indices[:, 0], indices[:, 1:].long(),
+                           self.spatial_shape)
+        self.keys, self.inds = keys.sort()
+
+    def lookup(self, batch_inds, coors):
+        """Find voxels by their coordinates.
+
+        Args:
+            batch_inds (torch.Tensor): (M, ) Batch indices of the queries.
+            coors (torch.Tensor): (M, ndim) Coordinates of the queries.
+
+        Returns:
+            torch.Tensor: (M, ) Indices of the voxels, -1 for the missing
+                ones.
+        """
+        valid = _in_shape(coors, self.spatial_shape)
+        keys = _hash_coors(batch_inds, coors, self.spatial_shape)
+        if len(self.keys) == 0:
+            return torch.full_like(keys, -1)
+        pos = torch.searchsorted(self.keys, keys).clamp(max=len(self.keys) - 1)
+        found = valid & (self.keys[pos] == keys)
+        return torch.where(found, self.inds[pos], keys.new_tensor(-1))
+
+
+def get_indice_pairs_cpu(indices,
+                         batch_size,
+                         spatial_shape,
+                         ksize=3,
+                         stride=1,
+                         padding=0,
+                         dilation=1,
+                         out_padding=0,
+                         subm=False,
+                         transpose=False):
+    """Pure PyTorch implementation of
+    :func:`mmcv.ops.sparse_ops.get_indice_pairs`.
+
+    It builds the rulebook of a sparse convolution, i.e. the pairs of input
+    and output voxels for each offset of the kernel, in the format of the
+    CUDA op. An input voxel at ``out * stride - padding + k * dilation``
+    contributes to the output voxel ``out`` with the kernel offset ``k``
+    (the roles are swapped for the transposed convolution). The output
+    voxels of submanifold convolutions are the input ones, and the inputs
+    of each of them are looked up in a :class:`VoxelHashTable`. The output
+    voxels of regular convolutions are the unique voxels reached by the
+    input ones, sorted by batch and coordinates.
+
+    Args:
+        indices (torch.Tensor): (N, ndim + 1) Batch indices and coordinates
+            of the input voxels.
+        batch_size (int): Batch size.
+        spatial_shape (list[int]): Spatial shape of the input voxels.
+        ksize (int | list[int], optional): Size of the kernel. Default: 3.
+        stride (int | list[int], optional): Stride. Default: 1.
+        padding (int | list[int], optional): Padding. Default: 0.
+        dilation (int | list[int], optional): Dilation. Default: 1.
+        out_padding (int | list[int], optional): Output padding of the
+            transposed convolution. Default: 0.
+        subm (bool, optional): Whether it is a submanifold convolution.
+            Default: False.
+        transpose (bool, optional): Whether it is a transposed convolution.
+            Default: False.
+
+    Returns:
+        tuple[torch.Tensor]: (M, ndim + 1) Batch indices and coordinates of
+            the output voxels, (K, 2, N) indices of the input and output
+            voxels of the pairs of each kernel offset, padded with -1, and
+            (K, ) number of pairs of each kernel offset.
+    """
+    ndim = indices.shape[1] - 1
+    ksize = _to_list(ksize, ndim)
+    stride = _to_list(stride, ndim)
+    padding = _to_list(padding, ndim)
+    dilation = _to_list(dilation, ndim)
+    out_padding = _to_list(out_padding, ndim)
+    for d, s in zip(dilation, stride):
+        assert any([s == 1, d == 1]), "don't support this."
+    if subm:
+        out_shape = list(spatial_shape)
+    elif transpose:
+        out_shape = get_deconv_output_size(spatial_shape, ksize, stride,
+                                           padding, dilation, out_padding)
+    else:
+        out_shape = get_conv_output_size(spatial_shape, ksize, stride, padding,
+                                         dilation)
+
+    device = indices.device
+    num_in = indices.shape[0]
+    batch_inds = indices[:, 0].long()
+    coors = indices[:, 1:].long()
+    offsets = _kernel_offsets(ksize, device) * coors.new_tensor(dilation)
+    stride = coors.new_tensor(stride)
+    padding = coors.new_tensor(padding)
+    in_inds, out_inds = [], []
+    if subm:
+        outids = indices
+        table = VoxelHashTable(indices, spatial_shape)
+        out_range = torch.arange(num_in, device=device)
+        for offset in offsets:
+            inds = table.lookup(batch_inds, coors - padding + offset)
+            found = inds >= 0
+            in_inds.append(inds[found])
+            out_inds.append(out_range[found])
+    else:
+        out_keys = []
+        for offset in offsets:
+            if transpose:
+                out_coors = coors * stride - padding + offset
+                valid = _in_shape(out_coors, out_shape)
+            else:
+                out_coors = coors + padding - offset
+                valid = (out_coors % stride == 0).all(dim=-1)
+                out_coors = torch.div(out_coors, stride, rounding_mode='floor')
+                valid &= _in_shape(out_coors, out_shape)
+            in_inds.append(torch.nonzero(valid)[:, 0])
+            out_keys.append(
+                _hash_coors(batch_inds[valid], out_coors[valid], out_shape))
+        out_keys, inverse = torch.unique(
+            torch.cat(out_keys), return_inverse=True)
+        outids = _unhash_coors(out_keys, out_shape).int()
+        out_inds = inverse.split([len(inds) for inds in in_inds])
+
+    indice_pairs = indices.new_full((len(offsets), 2, num_in), -1)
+    indice_pair_num = indices.new_zeros(len(offsets))
+    for k, (in_ind, out_ind) in enumerate(zip(in_inds, out_inds)):
+        indice_pairs[k, 0, :len(in_ind)] = in_ind
+        indice_pairs[k, 1, :len(out_ind)] = out_ind
+        indice_pair_num[k] = len(in_ind)
+    return outids.int(), indice_pairs.int(), indice_pair_num.int()
+
+
+def indice_conv_cpu(features,
+                    filters,
+                    indice_pairs,
+                    indice_pair_num,
+                    num_activate_out,
+                    inverse=False):
+    """Pure PyTorch implementation of the sparse convolutions.
+
+    For each kernel offset, the features of the input voxels of its pairs
+    are gathered, multiplied with the weight of the offset and scattered to
+    the output voxels. The gradients are computed by autograd.
+
+    Args:
+        features (torch.Tensor): (N, in_channels) Features of the input
+            voxels.
+        filters (torch.Tensor): (*kernel_size, in_channels, out_channels)
+            Weight of the convolution.
+        indice_pairs (torch.Tensor): (K, 2, N) Indices of the input and
+            output voxels of the pairs of each kernel offset.
+        indice_pair_num (torch.Tensor): (K, ) Number of pairs of each kernel
+            offset.
+        num_activate_out (int): Number of output voxels.
+        inverse (bool, optional): Whether it is an inverse convolution, i.e.
+            the pairs are the ones of the convolution it inverts, with the
+            roles of the input and output voxels swapped. Default: False.
+
+    Returns:
+        torch.Tensor: (num_activate_out, out_channels) Features of the
+            output voxels.
+    """
+    filters = filters.reshape(-1, *filters.shape[-2:])
+    in_row, out_row = (1, 0) if inverse else (0, 1)
+    output = features.new_zeros((num_activate_out, filters.shape[-1]))
+    for k, num_pairs in enumerate(indice_pair_num.tolist()):
+        if num_pairs == 0:
+            continue
+        in_inds = indice_pairs[k, in_row, :num_pairs].long()
+        out_inds = indice_pairs[k, out_row, :num_pairs].long()
+        output.index_add_(0, out_inds, features[in_inds] @ filters[k])
+    return output
+
+
+def indice_maxpool_cpu(features, indice_pairs, indice_pair_num,
+                       num_activate_out):
+    """Pure PyTorch implementation of the sparse max pooling.
+
+    As the CUDA op, the features are pooled with zeros, i.e. the output
+    features are not negative.
+
+    Args:
+        features (torch.Tensor): (N, C) Features of the input voxels.
+        indice_pairs (torch.Tensor): (K, 2, N) Indices of the input and
+            output voxels of the pairs of each kernel offset.
+        indice_pair_num (torch.Tensor): (K, ) Number of pairs of each kernel
+            offset.
+        num_activate_out (int): Number of output voxels.
+
+    Returns:
+        torch.Tensor: (num_activate_out, C) Features of the output voxels.
+    """
+    in_inds = torch.cat([
+        indice_pairs[k, 0, :num_pairs]
+        for k, num_pairs in enumerate(indice_pair_num.tolist())
+    ]).long()
+    out_inds = torch.cat([
+        indice_pairs[k, 1, :num_pairs]
+        for k, num_pairs in enumerate(indice_pair_num.tolist())
+    ]).long()
+    output = features.new_zeros((num_activate_out, features.shape[1]))
+    return output.scatter_reduce(
+        0, out_inds[:, None].expand(-1, features.shape[1]), features[in_inds],
+        'amax')
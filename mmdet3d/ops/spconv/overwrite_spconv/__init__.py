@@ -1,4 +1,9 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+from .write_cpu_spconv import (SparseMaxPool2d, SparseMaxPool3d,
+                               register_cpu_spconv)
 from .write_spconv2 import register_spconv2
 
-__all__ = ['register_spconv2']
+__all__ = [
+    'register_spconv2', 'register_cpu_spconv', 'SparseMaxPool2d',
+    'SparseMaxPool3d'
+]
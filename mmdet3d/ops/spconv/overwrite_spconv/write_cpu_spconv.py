@@ -0,0 +1,158 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import numpy as np
+from mmcv.cnn.bricks.registry import CONV_LAYERS
+from mmcv.ops import SparseConv2d as _SparseConv2d
+from mmcv.ops import SparseConv3d as _SparseConv3d
+from mmcv.ops import SparseConvTensor
+from mmcv.ops import SparseConvTranspose2d as _SparseConvTranspose2d
+from mmcv.ops import SparseConvTranspose3d as _SparseConvTranspose3d
+from mmcv.ops import SparseInverseConv2d as _SparseInverseConv2d
+from mmcv.ops import SparseInverseConv3d as _SparseInverseConv3d
+from mmcv.ops import SparseMaxPool2d as _SparseMaxPool2d
+from mmcv.ops import SparseMaxPool3d as _SparseMaxPool3d
+from mmcv.ops import SubMConv2d as _SubMConv2d
+from mmcv.ops import SubMConv3d as _SubMConv3d
+from mmcv.ops.sparse_ops import get_conv_output_size, get_deconv_output_size
+
+from ..cpu_ops import get_indice_pairs_cpu, indice_conv_cpu, indice_maxpool_cpu
+
+
+class CPUSparseConvMixin(object):
+    """Mixin running the sparse convolutions of mmcv on CPU.
+
+    The sparse tensors on GPU are convolved with the CUDA ops of mmcv, and
+    the other ones with the pure PyTorch ops in
+    :mod:`mmdet3d.ops.spconv.cpu_ops`. As the CUDA path, the rulebooks are
+    cached in the ``indice_dict`` of the sparse tensors by ``indice_key``,
+    so that the submanifold convolutions with the same key and the inverse
+    convolutions reuse them.
+    """
+
+    def forward(self, input):
+        assert isinstance(input, SparseConvTensor)
+        if input.features.is_cuda or self.conv1x1:
+            return super().forward(input)
+        features = input.features
+        indices = input.indices
+        spatial_shape = input.spatial_shape
+        batch_size = input.batch_size
+        if self.subm:
+            out_spatial_shape = spatial_shape
+        elif self.transposed:
+            out_spatial_shape = get_deconv_output_size(
+                spatial_shape, self.kernel_size, self.stride, self.padding,
+                self.dilation, self.output_padding)
+        else:
+            out_spatial_shape = get_conv_output_size(spatial_shape,
+                                                     self.kernel_size,
+                                                     self.stride, self.padding,
+                                                     self.dilation)
+
+        data = input.find_indice_pair(self.indice_key)
+        if self.inverse:
+            assert data is not None and self.indice_key is not None
+            _, outids, indice_pairs, indice_pair_num, out_spatial_shape = data
+            assert indice_pairs.shape[0] == np.prod(
+                self.kernel_size
+            ), 'inverse conv must have same kernel size as its couple conv'
+        elif data is not None:
+            outids, _, indice_pairs, indice_pair_num, _ = data
+        else:
+            outids, indice_pairs, indice_pair_num = get_indice_pairs_cpu(
+                indices, batch_size, spatial_shape, self.kernel_size,
+                self.stride, self.padding, self.dilation, self.output_padding,
+                self.subm, self.transposed)
+            input.indice_dict[self.indice_key] = (outids, indices,
+                                                  indice_pairs,
+                                                  indice_pair_num,
+                                                  spatial_shape)
+
+        out_features = indice_conv_cpu(features, self.weight, indice_pairs,
+                                       indice_pair_num, outids.shape[0],
+                                       self.inverse)
+        if self.bias is not None:
+            out_features = out_features + self.bias
+        out_tensor = SparseConvTensor(out_features, outids, out_spatial_shape,
+                                      batch_size)
+        out_tensor.indice_dict = input.indice_dict
+        out_tensor.grid = input.grid
+        return out_tensor
+
+
+class CPUSparseMaxPoolMixin(object):
+    """Mixin running the sparse max poolings of mmcv on CPU."""
+
+    def forward(self, input):
+        assert isinstance(input, SparseConvTensor)
+        if input.features.is_cuda:
+            return super().forward(input)
+        spatial_shape = input.spatial_shape
+        batch_size = input.batch_size
+        if self.subm:
+            out_spatial_shape = spatial_shape
+        else:
+            out_spatial_shape = get_conv_output_size(spatial_shape,
+                                                     self.kernel_size,
+                                                     self.stride, self.padding,
+                                                     self.dilation)
+        outids, indice_pairs, indice_pair_num = get_indice_pairs_cpu(
+            input.indices, batch_size, spatial_shape, self.kernel_size,
+            self.stride, self.padding, self.dilation, 0, self.subm)
+
+        out_features = indice_maxpool_cpu(input.features, indice_pairs,
+                                          indice_pair_num, outids.shape[0])
+        out_tensor = SparseConvTensor(out_features, outids, out_spatial_shape,
+                                      batch_size)
+        out_tensor.indice_dict = input.indice_dict
+        out_tensor.grid = input.grid
+        return out_tensor
+
+
+class SparseConv2d(CPUSparseConvMixin, _SparseConv2d):
+    """:class:`mmcv.ops.SparseConv2d` which also runs on CPU."""
+
+
+class SparseConv3d(CPUSparseConvMixin, _SparseConv3d):
+    """:class:`mmcv.ops.SparseConv3d` which also runs on CPU."""
+
+
+class SparseConvTranspose2d(CPUSparseConvMixin, _SparseConvTranspose2d):
+    """:class:`mmcv.ops.SparseConvTranspose2d` which also runs on CPU."""
+
+
+class SparseConvTranspose3d(CPUSparseConvMixin, _SparseConvTranspose3d):
+    """:class:`mmcv.ops.SparseConvTranspose3d` which also runs on CPU."""
+
+
+class SparseInverseConv2d(CPUSparseConvMixin, _SparseInverseConv2d):
+    """:class:`mmcv.ops.SparseInverseConv2d` which also runs on CPU."""
+
+
+class SparseInverseConv3d(CPUSparseConvMixin, _SparseInverseConv3d):
+    """:class:`mmcv.ops.SparseInverseConv3d` which also runs on CPU."""
+
+
+class SubMConv2d(CPUSparseConvMixin, _SubMConv2d):
+    """:class:`mmcv.ops.SubMConv2d` which also runs on CPU."""
+
+
+class SubMConv3d(CPUSparseConvMixin, _SubMConv3d):
+    """:class:`mmcv.ops.SubMConv3d` which also runs on CPU."""
+
+
+class SparseMaxPool2d(CPUSparseMaxPoolMixin, _SparseMaxPool2d):
+    """:class:`mmcv.ops.SparseMaxPool2d` which also runs on CPU."""
+
+
+class SparseMaxPool3d(CPUSparseMaxPoolMixin, _SparseMaxPool3d):
+    """:class:`mmcv.ops.SparseMaxPool3d` which also runs on CPU."""
+
+
+def register_cpu_spconv():
+    """This func registers the sparse convolutions running on CPU to
+    overwrite the default mmcv spconv ops, when spconv 2.x is not
+    available."""
+    for conv in (SparseConv2d, SparseConv3d, SparseConvTranspose2d,
+                 SparseConvTranspose3d, SparseInverseConv2d,
+                 SparseInverseConv3d, SubMConv2d, SubMConv3d):
+        CONV_LAYERS._register_module(conv, conv.__name__, force=True)
@@ -5,10 +5,11 @@ from .collect_env import collect_env
 from .compat_cfg import compat_cfg
 from .logger import get_root_logger
 from .misc import find_latest_checkpoint
+from .parallel import track_parallel_progress_with_state
 from .setup_env import setup_multi_processes
 
 __all__ = [
     'Registry', 'build_from_cfg', 'get_root_logger', 'collect_env',
     'print_log', 'setup_multi_processes', 'find_latest_checkpoint',
-    'compat_cfg'
+    'compat_cfg', 'track_parallel_progress_with_state'
 ]
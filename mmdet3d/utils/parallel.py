@@ -0,0 +1,47 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from functools import partial
+
+import mmcv
+
+_WORKER_STATE = None
+
+
+def _set_worker_state(state):
+    """Keep the state sent to a worker by the initializer of the pool."""
+    global _WORKER_STATE
+    _WORKER_STATE = state
+
+
+def _call_with_state(func, task):
+    """Run a task with the state of the worker."""
+    return func(_WORKER_STATE, task)
+
+
+def track_parallel_progress_with_state(func, state, tasks, nproc, **kwargs):
+    """Track the progress of parallel tasks sharing a large state.
+
+    The state, e.g. a dataset, is sent once to each worker by the
+    initializer of the pool instead of with every task, thus it works with
+    any start method of the processes, i.e. fork, spawn or forkserver.
+
+    Args:
+        func (callable): Function applied to each task, which is called as
+            ``func(state, task)``. It must be picklable, e.g. defined at the
+            top level of a module.
+        state (object): State shared by all the tasks, which must be
+            picklable unless the processes are forked.
+        tasks (list): Tasks to run.
+        nproc (int): Number of processes.
+        kwargs (dict): Other arguments of
+            :func:`mmcv.track_parallel_progress`.
+
+    Returns:
+        list: Results of the tasks.
+    """
+    return mmcv.track_parallel_progress(
+        partial(_call_with_state, func),
+        tasks,
+        nproc,
+        initializer=_set_worker_state,
+        initargs=(state, ),
+        **kwargs)
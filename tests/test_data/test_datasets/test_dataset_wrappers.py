@@ -1,5 +1,12 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import os
+import shutil
+import tempfile
+from os import path as osp
+
+import mmcv
 import numpy as np
+import pytest
 import torch
 
 from mmdet3d.datasets.builder import build_dataset
@@ -53,6 +60,7 @@ def test_getitem():
         use_external=False)
     dataset_cfg = dict(
         type='CBGSDataset',
+        cache=False,
         dataset=dict(
             type='NuScenesDataset',
             data_root='tests/data/nuscenes',
@@ -77,3 +85,167 @@ def test_getitem():
     assert data['img_metas'].data['flip'] is False
     assert data['img_metas'].data['pcd_horizontal_flip'] is False
     assert data['points']._data.shape == (901, 5)
+
+
+def test_cbgs_resample():
+    from mmdet3d.datasets import CBGSDataset, NuScenesDataset
+
+    class_names = [
+        'car', 'truck', 'trailer', 'bus', 'construction_vehicle', 'bicycle',
+        'motorcycle', 'pedestrian', 'traffic_cone', 'barrier'
+    ]
+    nus_dataset = NuScenesDataset(
+        'tests/data/nuscenes/nus_info.pkl',
+        None,
+        'tests/data/nuscenes',
+        classes=class_names,
+        use_valid_flag=True)
+    cat_table = nus_dataset.get_cat_table()
+    assert cat_table.shape == (2, 10)
+    for idx in range(2):
+        assert np.nonzero(cat_table[idx])[0].tolist() == sorted(
+            nus_dataset.get_cat_ids(idx))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ann_file = osp.join(tmp_dir, 'nus_info.pkl')
+        shutil.copy('tests/data/nuscenes/nus_info.pkl', ann_file)
+        nus_dataset.ann_file = ann_file
+        cbgs_dataset = CBGSDataset(nus_dataset, seed=0)
+        cache_files = [f for f in os.listdir(tmp_dir) if 'cbgs' in f]
+        assert len(cache_files) == 1
+        assert np.array_equal(
+            mmcv.load(osp.join(tmp_dir, cache_files[0])), cat_table)
+
+        indices = cbgs_dataset.sample_indices.copy()
+        assert len(cbgs_dataset) == 20
+        # resampling is reproducible from the seed and the epoch
+        cbgs_dataset.set_epoch(1)
+        assert len(cbgs_dataset) == 20
+        assert np.array_equal(
+            CBGSDataset(nus_dataset, seed=1).sample_indices,
+            cbgs_dataset.sample_indices)
+        cbgs_dataset.set_epoch(0)
+        assert np.array_equal(cbgs_dataset.sample_indices, indices)
+
+        # the samples kept by different filters of valid_sample_cfg have
+        # different cached category distributions, even if of the same size
+        data_infos = nus_dataset.data_infos
+        data_infos[1] = dict(
+            data_infos[1], valid_flag=data_infos[1]['gt_names'] == 'car')
+        for i in range(2):
+            nus_dataset.data_infos = data_infos[i:i + 1]
+            nus_dataset.valid_sample_inds = np.array([i])
+            cbgs_dataset = CBGSDataset(nus_dataset, seed=0)
+            assert np.array_equal(cbgs_dataset.cat_table,
+                                  nus_dataset.get_cat_table())
+        assert cbgs_dataset.cat_table.sum() == 1
+        cache_files = [f for f in os.listdir(tmp_dir) if 'cbgs' in f]
+        assert len(cache_files) == 3
+
+
+class _ToySceneDataset(object):
+    """A toy dataset with interleaved frames of three scenes."""
+
+    CLASSES = ('car', )
+
+    def __init__(self, invalid_inds=(), dropped_inds=()):
+        self.scene_ids = [0, 1, 0, 2, 1, 0, 2, 2, 1, 2]
+        self.timestamps = [3, 2, 1, 4, 1, 2, 1, 2, 3, 3]
+        self.invalid_inds = invalid_inds
+        self.dropped_inds = dropped_inds
+
+    def __len__(self):
+        return len(self.scene_ids)
+
+    def get_scene_id(self, index):
+        return self.scene_ids[index]
+
+    def get_timestamp(self, index):
+        return self.timestamps[index]
+
+    def get_data_info(self, index):
+        if index in self.invalid_inds:
+            return None
+        return dict(index=index)
+
+    def pre_pipeline(self, results):
+        pass
+
+    def pipeline(self, results):
+        if results['index'] in self.dropped_inds:
+            return None
+        state = results['stream_state']
+        results['prev_index'] = state.get('index')
+        state['index'] = results['index']
+        return results
+
+
+def test_scene_sequential_sampler():
+    from mmdet3d.datasets import SceneSequentialSampler
+    from mmdet3d.datasets.samplers import group_by_scene
+
+    dataset = _ToySceneDataset()
+    groups = group_by_scene(dataset)
+    assert [g.tolist() for g in groups] == [[2, 5, 0], [4, 1, 8], [6, 7, 9, 3]]
+
+    sampler = SceneSequentialSampler(dataset, num_replicas=1, rank=0)
+    assert list(sampler) == [2, 5, 0, 4, 1, 8, 6, 7, 9, 3]
+
+    # whole scenes are assigned to each rank
+    samplers = [
+        SceneSequentialSampler(dataset, num_replicas=2, rank=r)
+        for r in range(2)
+    ]
+    assert list(samplers[0]) == [2, 5, 0, 4, 1, 8]
+    assert list(samplers[1]) == [6, 7, 9, 3]
+    part_list = [[f'res{i}' for i in s] for s in samplers]
+    results = samplers[0].restore_order(part_list)
+    assert results == [f'res{i}' for i in range(len(dataset))]
+
+
+def test_scene_stream_dataset():
+    from mmdet3d.datasets import SceneStreamDataset
+
+    dataset = SceneStreamDataset(_ToySceneDataset())
+    assert len(dataset) == 10
+    frames = list(dataset)
+    assert [f['index'] for f in frames] == [2, 5, 0, 4, 1, 8, 6, 7, 9, 3]
+    # the state is carried inside a scene and reset between scenes
+    assert [f['prev_index']
+            for f in frames] == [None, 2, 5, None, 4, 1, None, 6, 7, 9]
+    assert [f['start_of_scene'] for f in frames] == [
+        True, False, False, True, False, False, True, False, False, False
+    ]
+
+    # round-robin order of two workers with batches of two frames
+    assert dataset.stream_indices(
+        num_workers=2, batch_size=2) == [2, 5, 4, 1, 0, 6, 8, 7, 9, 3]
+    part_list = [[f'res{i}' for i in dataset.stream_indices(r, 2)]
+                 for r in range(2)]
+    results = dataset.restore_order(part_list)
+    assert results == [f'res{i}' for i in range(10)]
+
+    # the frames that cannot be prepared are skipped and have no result
+    dataset = SceneStreamDataset(_ToySceneDataset(invalid_inds=(2, 5, 1)))
+    assert dataset.skipped_inds == {1, 2, 5}
+    frames = list(dataset)
+    assert [f['index'] for f in frames] == [0, 4, 8, 6, 7, 9, 3]
+    assert [f['start_of_scene']
+            for f in frames] == [True, True, False, True, False, False, False]
+    assert [f['index'] for f in frames] == dataset.stream_indices()
+    part_list = [[f['index'] for f in frames]]
+    with pytest.warns(UserWarning, match=r'\[1, 2, 5\]'):
+        results = dataset.restore_order(part_list)
+    assert results == [0, None, None, 3, 4, None, 6, 7, 8, 9]
+    assert dataset.stream_indices(
+        num_workers=2, batch_size=2) == [0, 6, 4, 8, 7, 9, 3]
+
+    dataset = SceneStreamDataset(_ToySceneDataset(invalid_inds=(2, 5, 0)))
+    frames = list(dataset)
+    assert [f['index'] for f in frames] == [4, 1, 8, 6, 7, 9, 3]
+    assert [f['index'] for f in frames] == dataset.stream_indices()
+
+    # the frames dropped by the pipeline would shift the results
+    dataset = SceneStreamDataset(_ToySceneDataset(dropped_inds=(1, )))
+    with pytest.raises(RuntimeError, match='frame 1 of scene 1'):
+        list(dataset)
@@ -1,5 +1,6 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import math
+import multiprocessing as mp
 import os
 import tempfile
 
@@ -8,6 +9,7 @@ import pytest
 import torch
 
 from mmdet3d.core.bbox import LiDARInstance3DBoxes, limit_period
+from mmdet3d.core.evaluation import kitti_eval
 from mmdet3d.datasets import KittiDataset
 
 
@@ -258,6 +260,63 @@ def test_evaluate():
                       3.0303030303030307)
 
 
+def test_accumulate_img_bbox():
+    data_root, ann_file, classes, pts_prefix, \
+        pipeline, modality, split = _generate_kitti_dataset_config()
+    kitti_dataset = KittiDataset(data_root, ann_file, split, pts_prefix,
+                                 pipeline, classes, modality)
+    # 2D boxes of each class, the pedestrian matches the ground truth
+    img_bbox = [
+        np.array([[712.4, 143.0, 810.73, 307.92, 0.9],
+                  [100.0, 100.0, 150.0, 200.0, 0.5]]),
+        np.zeros((0, 5)),
+        np.array([[300.0, 150.0, 400.0, 250.0, 0.7]])
+    ]
+    gt_annos = [info['annos'] for info in kitti_dataset.data_infos]
+    dt_annos = kitti_dataset.bbox2result_kitti2d([img_bbox], classes)
+    _, ap_dict = kitti_eval(gt_annos, dt_annos, classes, eval_types=['bbox'])
+
+    # the 2D boxes are taken from the results of several branches
+    accumulator = kitti_dataset.build_accumulator('img_bbox', show=False)
+    assert accumulator.eval_types == ['bbox']
+    kitti_dataset.accumulate(accumulator, [dict(img_bbox=img_bbox)], [0])
+    assert kitti_dataset.evaluate_accumulator(accumulator) == ap_dict
+    assert ap_dict['KITTI/Overall_2D_AP11_easy'] > 0
+
+    accumulator = kitti_dataset.build_accumulator('img_bbox')
+    kitti_dataset.accumulate(accumulator, [img_bbox], [0])
+    assert kitti_dataset.evaluate_accumulator(accumulator) == ap_dict
+
+    # the 2D results are never evaluated as 3D boxes
+    accumulator = kitti_dataset.build_accumulator('img_bbox')
+    with pytest.raises(AssertionError):
+        kitti_dataset.accumulate(accumulator, [dict(pts_bbox=dict())], [0])
+
+
+def test_find_valid_samples_spawn():
+    from mmdet3d.datasets import find_valid_samples
+    data_root, ann_file, classes, pts_prefix, \
+        pipeline, modality, split = _generate_kitti_dataset_config()
+    kitti_dataset = KittiDataset(data_root, ann_file, split, pts_prefix,
+                                 pipeline, classes, modality)
+    # the dataset is sent to the workers whatever their start method
+    default_method = mp.get_start_method(allow_none=True)
+    mp.set_start_method('spawn', force=True)
+    try:
+        valid = [
+            find_valid_samples(
+                kitti_dataset,
+                point_cloud_range=point_cloud_range,
+                nproc=2,
+                cache=False).tolist()
+            for point_cloud_range in [[0, -40, -3, 70.4, 40, 1],
+                                      [20, -40, -3, 70.4, 40, 1]]
+        ]
+    finally:
+        mp.set_start_method(default_method, force=True)
+    assert valid == [[True], [False]]
+
+
 def test_show():
     from os import path as osp
 
@@ -139,6 +139,9 @@ def test_evaluate():
     car_precision = ap_dict['pts_bbox_Lyft/car_AP']
     assert car_precision == 0.6
 
+    ap_dict = lyft_dataset.evaluate(results, 'bbox', nproc=2)
+    assert ap_dict['pts_bbox_Lyft/car_AP'] == 0.6
+
 
 def test_show():
     from os import path as osp
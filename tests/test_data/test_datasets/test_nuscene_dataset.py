@@ -1,4 +1,5 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import multiprocessing as mp
 import tempfile
 
 import numpy as np
@@ -116,3 +117,178 @@ def test_show():
     mmcv.check_file_exist(gt_file_path)
     mmcv.check_file_exist(pred_file_path)
     tmp_dir.cleanup()
+
+
+def test_valid_sample_cfg():
+    from mmdet3d.datasets.valid_samples import (RetryStatistics,
+                                                find_valid_samples)
+
+    # the motorcycle is 45.1m away in the first sample and 19.4m away in
+    # the second one
+    nus_dataset = NuScenesDataset(
+        'tests/data/nuscenes/nus_info.pkl',
+        None,
+        'tests/data/nuscenes',
+        classes=['motorcycle'],
+        valid_sample_cfg=dict(
+            point_cloud_range=[-25, -25, -5, 25, 25, 3], cache=False))
+    assert len(nus_dataset) == 1
+    assert nus_dataset.data_infos[0]['timestamp'] == 1533201470948018
+    assert len(nus_dataset.flag) == 1
+
+    # the motorcycle of the first sample may be scaled into the range
+    for scale_ratio_range, translation_std, margin, num_samples in [
+        ([0.7, 1.3], [0, 0, 0], None, 2),
+        ([0.7, 1.3], [0, 0, 0], 0., 1),
+        ([1., 1.], [2, 2, 0], None, 1),
+        ([1., 1.], [3, 3, 0], None, 2),
+    ]:
+        nus_dataset = NuScenesDataset(
+            'tests/data/nuscenes/nus_info.pkl', [
+                dict(
+                    type='GlobalRotScaleTrans',
+                    scale_ratio_range=scale_ratio_range,
+                    translation_std=translation_std)
+            ],
+            'tests/data/nuscenes',
+            classes=['motorcycle'],
+            valid_sample_cfg=dict(
+                point_cloud_range=[-25, -25, -5, 25, 25, 3],
+                margin=margin,
+                cache=False))
+        assert len(nus_dataset) == num_samples
+
+    nus_dataset = NuScenesDataset(
+        'tests/data/nuscenes/nus_info.pkl',
+        None,
+        'tests/data/nuscenes',
+        classes=['motorcycle'])
+    valid = find_valid_samples(
+        nus_dataset, point_cloud_range=[-50, -50, -5, 50, 50, 3], cache=False)
+    assert valid.tolist() == [True, True]
+    valid = find_valid_samples(
+        nus_dataset,
+        point_cloud_range=[-15, -15, -5, 15, 15, 3],
+        rotation_invariant=False,
+        cache=False)
+    assert valid.tolist() == [False, False]
+
+    stats = RetryStatistics(4, log_interval=0)
+    for idx, success in [(0, False), (1, True), (0, False), (2, False)]:
+        stats.update(idx, success)
+    assert stats.num_attempts == 4
+    assert stats.num_failures == 3
+    assert stats.failures.tolist() == [2, 0, 1, 0]
+    assert '3/4 (75.00%)' in stats.summary()
+    assert stats.summary().endswith('0(2), 2(1)')
+
+
+def test_format_results():
+    import mmcv
+
+    from mmdet3d.core.bbox import LiDARInstance3DBoxes
+    from mmdet3d.datasets.nuscenes_dataset import (lidar_nusc_box_to_global,
+                                                   output_to_nusc_box)
+
+    np.random.seed(0)
+    nus_dataset = NuScenesDataset(
+        'tests/data/nuscenes/nus_info.pkl',
+        None,
+        'tests/data/nuscenes',
+        test_mode=True)
+    results = []
+    for _ in range(len(nus_dataset)):
+        num_boxes = 50
+        centers = np.random.uniform(-60, 60, (num_boxes, 3))
+        dims = np.random.uniform(0.5, 5, (num_boxes, 3))
+        yaws = np.random.uniform(-np.pi, np.pi, (num_boxes, 1))
+        velocities = np.random.normal(size=(num_boxes, 2))
+        boxes = np.concatenate([centers, dims, yaws, velocities], axis=1)
+        results.append(
+            dict(
+                boxes_3d=LiDARInstance3DBoxes(
+                    torch.tensor(boxes, dtype=torch.float32), box_dim=9),
+                scores_3d=torch.rand(num_boxes),
+                labels_3d=torch.randint(0, 10, (num_boxes, ))))
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    result_file = nus_dataset._format_bbox(results, tmp_dir.name)
+    submissions = mmcv.load(result_file)['results']
+    assert mmcv.load(nus_dataset._format_bbox(
+        results, tmp_dir.name, nproc=2))['results'] == submissions
+    # the dataset is sent to the workers, which are not forked by spawn
+    start_method = mp.get_start_method()
+    mp.set_start_method('spawn', force=True)
+    try:
+        assert mmcv.load(
+            nus_dataset._format_bbox(results, tmp_dir.name,
+                                     nproc=2))['results'] == submissions
+    finally:
+        mp.set_start_method(start_method, force=True)
+    # labels loaded from pickled results may be floats
+    float_results = [
+        dict(det, labels_3d=det['labels_3d'].float()) for det in results
+    ]
+    assert mmcv.load(nus_dataset._format_bbox(
+        float_results, tmp_dir.name))['results'] == submissions
+
+    # same records as converting the NuScenesBoxes one by one
+    for info, det in zip(nus_dataset.data_infos, results):
+        boxes = lidar_nusc_box_to_global(info, output_to_nusc_box(det),
+                                         nus_dataset.CLASSES,
+                                         nus_dataset.eval_detection_configs)
+        records = submissions[info['token']]
+        assert 0 < len(records) == len(boxes) < 50
+        for box, record in zip(boxes, records):
+            assert np.allclose(record['translation'], box.center)
+            assert np.allclose(record['size'], box.wlh)
+            assert np.allclose(record['rotation'], box.orientation.elements)
+            assert np.allclose(record['velocity'], box.velocity[:2])
+            assert record['detection_name'] == nus_dataset.CLASSES[box.label]
+            assert np.isclose(record['detection_score'], box.score)
+    tmp_dir.cleanup()
+
+
+def test_accumulate():
+    from mmdet3d.core.bbox import LiDARInstance3DBoxes
+
+    np.random.seed(0)
+    nus_dataset = NuScenesDataset(
+        'tests/data/nuscenes/nus_info.pkl',
+        None,
+        'tests/data/nuscenes',
+        test_mode=True)
+    results = []
+    for info in nus_dataset.data_infos:
+        # noisy copies of the ground truths
+        gt_boxes = info['gt_boxes'][:, :7]
+        num_boxes = len(gt_boxes)
+        boxes = np.concatenate([
+            gt_boxes + np.random.normal(scale=0.2, size=gt_boxes.shape),
+            info['gt_velocity']
+        ],
+                               axis=1)
+        labels = [
+            nus_dataset.CLASSES.index(name)
+            if name in nus_dataset.CLASSES else 0 for name in info['gt_names']
+        ]
+        results.append(
+            dict(
+                img_bbox=dict(
+                    boxes_3d=LiDARInstance3DBoxes(
+                        torch.tensor(boxes, dtype=torch.float32), box_dim=9),
+                    scores_3d=torch.rand(num_boxes),
+                    labels_3d=torch.tensor(labels))))
+    eval_kwargs = dict(metric='bbox', result_names=['img_bbox'])
+    ret_dict = nus_dataset.evaluate(
+        results, eval_backend='native', **eval_kwargs)
+
+    # the same options and metrics as the evaluation of all the results
+    accumulator = nus_dataset.build_accumulator(**eval_kwargs)
+    for i in range(len(results)):
+        nus_dataset.accumulate(accumulator, results[i:i + 1], [i])
+    accumulated = nus_dataset.evaluate_accumulator(accumulator)
+    assert accumulated.keys() == ret_dict.keys()
+    for key, value in ret_dict.items():
+        assert np.isclose(accumulated[key], value, equal_nan=True)
+    assert ret_dict['img_bbox_NuScenes/mAP'] > 0
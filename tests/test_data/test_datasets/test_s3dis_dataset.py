@@ -347,3 +347,19 @@ def test_multi_areas():
         scene_idxs=[[0, 0, 1, 2, 2], [0, 1, 2, 3, 3, 4], [0, 1, 1, 2, 2, 2]])
     assert np.all(s3dis_dataset.scene_idxs == np.array(
         [0, 0, 1, 2, 2, 3, 4, 5, 6, 6, 7, 8, 9, 9, 10, 10, 10]))
+
+    # the areas without the classes are not sampled
+    s3dis_dataset = S3DISSegDataset(
+        data_root=root_path,
+        ann_files=[ann_file for _ in range(repeat_num)],
+        classes=('board', ),
+        scene_idxs=[[0, 0] for _ in range(repeat_num)],
+        valid_sample_cfg=dict(cache=False))
+    assert len(s3dis_dataset) == 0
+    s3dis_dataset = S3DISSegDataset(
+        data_root=root_path,
+        ann_files=[ann_file for _ in range(repeat_num)],
+        classes=('board', 'clutter'),
+        scene_idxs=[[0, 0] for _ in range(repeat_num)],
+        valid_sample_cfg=dict(cache=False))
+    assert s3dis_dataset.scene_idxs.tolist() == [0, 0, 1, 1, 2, 2]
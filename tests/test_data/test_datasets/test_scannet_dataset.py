@@ -535,6 +535,39 @@ def test_seg_getitem():
     assert np.all(scannet_dataset.scene_idxs == np.array([0]))
 
 
+def test_seg_valid_sample_cfg():
+    from mmdet3d.datasets import find_valid_scenes
+    root_path = './tests/data/scannet/'
+    ann_file = './tests/data/scannet/scannet_infos.pkl'
+
+    # the scene contains toilets but no bathtub
+    scannet_dataset = ScanNetSegDataset(
+        data_root=root_path,
+        ann_file=ann_file,
+        classes=('toilet', ),
+        scene_idxs=[0, 0],
+        valid_sample_cfg=dict(cache=False))
+    assert len(scannet_dataset) == 2
+    assert len(scannet_dataset.flag) == 2
+    scannet_dataset = ScanNetSegDataset(
+        data_root=root_path,
+        ann_file=ann_file,
+        classes=('bathtub', ),
+        scene_idxs=[0, 0],
+        valid_sample_cfg=dict(cache=False))
+    assert len(scannet_dataset) == 0
+    assert find_valid_scenes(scannet_dataset, cache=False).tolist() == [False]
+
+    # the scenes are kept for testing
+    scannet_dataset = ScanNetSegDataset(
+        data_root=root_path,
+        ann_file=ann_file,
+        classes=('bathtub', ),
+        test_mode=True,
+        valid_sample_cfg=dict(cache=False))
+    assert len(scannet_dataset) == 1
+
+
 def test_seg_evaluate():
     if not torch.cuda.is_available():
         pytest.skip()
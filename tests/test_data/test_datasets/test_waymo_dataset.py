@@ -1,6 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import tempfile
 
+import mmcv
 import numpy as np
 import pytest
 import torch
@@ -124,6 +125,66 @@ def test_getitem():
     assert torch.all(gt_labels_3d == expected_gt_labels_3d)
 
 
+def test_getitem_packed(tmp_path):
+    data_root, ann_file, classes, pts_prefix, _, modality, split = \
+        _generate_waymo_val_dataset_config()
+    pipeline = [
+        dict(
+            type='LoadPointsFromFile',
+            coord_type='LIDAR',
+            load_dim=6,
+            use_dim=5,
+            file_client_args=dict(backend='disk')),
+        dict(
+            type='DefaultFormatBundle3D',
+            class_names=classes,
+            with_label=False),
+        dict(type='Collect3D', keys=['points'])
+    ]
+    # pack the frame after the points of another one
+    other_points = np.fromfile(
+        data_root + 'training/velodyne/0000000.bin', dtype=np.float32)
+    points = np.fromfile(
+        data_root + 'training/velodyne/1000000.bin', dtype=np.float32)
+    packed_path = str(tmp_path / '0000.bin')
+    np.concatenate([other_points, points]).tofile(packed_path)
+    infos = mmcv.load(ann_file)
+    infos[0]['point_cloud']['velodyne_path'] = packed_path
+    infos[0]['point_cloud']['packed_range'] = np.array(
+        [len(other_points) // 6, (len(other_points) + len(points)) // 6])
+    packed_ann_file = str(tmp_path / 'waymo_infos_packed.pkl')
+    mmcv.dump(infos, packed_ann_file)
+
+    waymo_dataset = WaymoDataset(
+        data_root,
+        ann_file,
+        split,
+        pts_prefix,
+        pipeline,
+        classes,
+        modality,
+        test_mode=True)
+    packed_dataset = WaymoDataset(
+        data_root,
+        packed_ann_file,
+        split,
+        pts_prefix,
+        pipeline,
+        classes,
+        modality,
+        test_mode=True)
+    input_dict = packed_dataset.get_data_info(0)
+    assert input_dict['pts_filename'] == packed_path
+    assert np.all(input_dict['pts_packed_range'] == infos[0]['point_cloud']
+                  ['packed_range'])
+    # only the points of the frame are decoded from the packed file
+    expected_points = torch.from_numpy(points.reshape(-1, 6)[:, :5])
+    packed_points = packed_dataset[0]['points']._data
+    assert packed_points.shape == (800, 5)
+    assert torch.equal(packed_points, expected_points)
+    assert torch.equal(waymo_dataset[0]['points']._data, expected_points)
+
+
 def test_evaluate():
     if not torch.cuda.is_available():
         pytest.skip('test requires GPU and torch+cuda')
@@ -168,6 +229,41 @@ def test_evaluate():
     assert np.isclose(ap_dict['Overall/L2 mAPH'], 0.3333333333333333)
 
 
+def test_evaluate_native():
+    from mmdet3d.core.bbox import LiDARInstance3DBoxes
+    data_root, ann_file, classes, pts_prefix, pipeline, \
+        modality, split = _generate_waymo_val_dataset_config()
+    waymo_dataset = WaymoDataset(data_root, ann_file, split, pts_prefix,
+                                 pipeline, classes, modality)
+    boxes_3d = LiDARInstance3DBoxes(
+        torch.tensor([[
+            6.9684e+01, 3.3335e+01, 4.1465e-02, 4.3600e+00, 2.0100e+00,
+            1.4600e+00, 9.0000e-02 - np.pi / 2
+        ]]))
+    labels_3d = torch.tensor([0])
+    scores_3d = torch.tensor([0.8])
+    result = dict(boxes_3d=boxes_3d, labels_3d=labels_3d, scores_3d=scores_3d)
+
+    # same results as the waymo protocol, without the external binary
+    ap_dict = waymo_dataset.evaluate([result], metric='waymo_native')
+    assert np.isclose(ap_dict['Vehicle/L1 mAP'], 1.)
+    assert np.isclose(ap_dict['Pedestrian/L1 mAP'], 0.)
+    assert np.isclose(ap_dict['Overall/L1 mAP'], 0.3333333333333333)
+    assert np.isclose(ap_dict['Overall/L2 mAP'], 0.3333333333333333)
+    assert np.isclose(ap_dict['Overall/L1 mAPH'], 0.3333333333333333)
+    assert np.isclose(ap_dict['Overall/L2 mAPH'], 0.3333333333333333)
+    assert np.isclose(ap_dict['Overall/L1 BEV mAP'], 0.3333333333333333)
+
+    # a box in the opposite direction only counts for the mAP
+    boxes_3d.tensor[:, 6] += np.pi
+    ap_dict = waymo_dataset.evaluate([result], metric=['waymo_native'])
+    assert np.isclose(ap_dict['Vehicle/L1 mAP'], 1.)
+    assert np.isclose(ap_dict['Vehicle/L1 mAPH'], 0.)
+
+    with pytest.raises(AssertionError):
+        waymo_dataset.evaluate([result], metric='waymo_eval')
+
+
 def test_show():
     from os import path as osp
 
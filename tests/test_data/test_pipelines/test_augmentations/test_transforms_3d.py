@@ -6,16 +6,16 @@ import torch
 
 from mmdet3d.core import (Box3DMode, CameraInstance3DBoxes,
                           DepthInstance3DBoxes, LiDARInstance3DBoxes)
-from mmdet3d.core.bbox import Coord3DMode
+from mmdet3d.core.bbox import Coord3DMode, box_np_ops
 from mmdet3d.core.points import DepthPoints, LiDARPoints
 # yapf: disable
 from mmdet3d.datasets import (AffineResize, BackgroundPointsFilter,
                               GlobalAlignment, GlobalRotScaleTrans,
                               MultiViewWrapper, ObjectNameFilter, ObjectNoise,
                               ObjectRangeFilter, ObjectSample, PointSample,
-                              PointShuffle, PointsRangeFilter,
-                              RandomDropPointsColor, RandomFlip3D,
-                              RandomJitterPoints, RandomRotate,
+                              PointShuffle, PointsInImageFilter,
+                              PointsRangeFilter, RandomDropPointsColor,
+                              RandomFlip3D, RandomJitterPoints, RandomRotate,
                               RandomShiftScale, RangeLimitedRandomCrop,
                               VoxelBasedPointSampler)
 
@@ -276,6 +276,54 @@ def test_points_range_filter():
     assert repr_str == expected_repr_str
 
 
+def test_points_in_image_filter():
+    np.random.seed(0)
+    info = mmcv.load('./tests/data/kitti/kitti_infos_train.pkl')[0]
+    calib = info['calib']
+    image_shape = info['image']['image_shape']
+    lidar2img = calib['P2'] @ calib['R0_rect'] @ calib['Tr_velo_to_cam']
+    points = np.fromfile(
+        './tests/data/kitti/training/velodyne_reduced/000000.bin',
+        np.float32).reshape(-1, 4)
+    sem_mask = np.random.randint(0, 4, len(points))
+    input_dict = dict(
+        points=LiDARPoints(points.copy(), points_dim=4),
+        pts_semantic_mask=sem_mask.copy(),
+        lidar2img=lidar2img,
+        img_info=dict(height=image_shape[0], width=image_shape[1]))
+    points_in_image_filter = PointsInImageFilter()
+    results = points_in_image_filter(input_dict)
+    expected_points = box_np_ops.remove_outside_points(
+        points, calib['R0_rect'], calib['Tr_velo_to_cam'], calib['P2'],
+        image_shape)
+    assert torch.allclose(results['points'].tensor,
+                          torch.from_numpy(expected_points))
+    assert len(results['pts_semantic_mask']) == len(expected_points)
+
+    # the shape of the loaded image takes precedence, e.g. of a crop
+    input_dict = dict(
+        points=LiDARPoints(points.copy(), points_dim=4),
+        pts_semantic_mask=sem_mask.copy(),
+        lidar2img=lidar2img,
+        img_shape=(200, 600, 3),
+        img_info=dict(height=image_shape[0], width=image_shape[1]))
+    results = PointsInImageFilter(far_clip=50)(input_dict)
+    pts_img = np.concatenate([points[:, :3], np.ones((len(points), 1))],
+                             axis=1) @ lidar2img.T
+    depth = pts_img[:, 2]
+    u, v = pts_img[:, 0] / depth, pts_img[:, 1] / depth
+    expected_mask = (depth >= 0.001) & (depth <= 50) & (u >= 0) & \
+        (u <= 600) & (v >= 0) & (v <= 200)
+    assert expected_mask.sum() == 439
+    assert torch.allclose(results['points'].tensor,
+                          torch.from_numpy(points[expected_mask]))
+    assert np.all(results['pts_semantic_mask'] == sem_mask[expected_mask])
+
+    repr_str = repr(points_in_image_filter)
+    expected_repr_str = 'PointsInImageFilter(near_clip=0.001, far_clip=100)'
+    assert repr_str == expected_repr_str
+
+
 def test_object_range_filter():
     point_cloud_range = [0, -40, -3, 70.4, 40, 1]
     object_range_filter = ObjectRangeFilter(point_cloud_range)
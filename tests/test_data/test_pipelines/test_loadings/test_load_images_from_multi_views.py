@@ -1,4 +1,5 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import mmcv
 import numpy as np
 import torch
 from mmcv.parallel import DataContainer
@@ -44,3 +45,62 @@ def test_load_multi_view_image_from_files():
 
     assert isinstance(img, DataContainer)
     assert img._data.shape == torch.Size((num_views, 3, 1280, 1920))
+
+
+def test_load_multi_view_image_reduced():
+    num_views = 6
+    filename = 'tests/data/nuscenes/samples/CAM_BACK_LEFT/' \
+        'n015-2018-07-18-11-07-57+0800__CAM_BACK_LEFT__1531883530447423.jpg'
+    filenames = [filename for _ in range(num_views)]
+    lidar2img = [np.eye(4) for _ in range(num_views)]
+
+    full_loader = LoadMultiViewImageFromFiles(num_workers=2)
+    results = full_loader(dict(img_filename=filenames, lidar2img=lidar2img))
+    assert results['img_shape'] == results['ori_shape'] == \
+        (900, 1600, 3, num_views)
+    assert 'img_decode_time' not in results
+    full_img = results['img'][0]
+
+    # the decoding time of each view is recorded on demand
+    timed_loader = LoadMultiViewImageFromFiles(
+        num_workers=2, record_decode_time=True)
+    assert 'record_decode_time=True' in repr(timed_loader)
+    results = timed_loader(dict(img_filename=filenames, lidar2img=lidar2img))
+    assert len(results['img_decode_time']) == num_views
+    assert all(t > 0 for t in results['img_decode_time'])
+
+    # a target size of (704, 256) allows to decode at 1/2 of the resolution
+    reduced_loader = LoadMultiViewImageFromFiles(
+        num_workers=2, target_size=(704, 256))
+    cam2img = [[1266.4, 0., 816.3], [0., 1266.4, 491.5], [0., 0., 1.]]
+    cam_intrinsic = [np.array(cam2img) for _ in range(num_views)]
+    results = reduced_loader(
+        dict(
+            img_filename=filenames,
+            lidar2img=lidar2img,
+            cam2img=cam2img,
+            cam_intrinsic=cam_intrinsic))
+    assert len(results['img']) == num_views
+    assert results['img'][0].shape == (450, 800, 3)
+    assert results['img_shape'] == (450, 800, 3, num_views)
+    assert results['ori_shape'] == (900, 1600, 3, num_views)
+    assert np.allclose(results['scale_factor'], 0.5)
+    assert np.allclose(results['lidar2img'][0], np.diag([0.5, 0.5, 1, 1]))
+    # the intrinsics are rescaled with the images
+    expected_cam2img = np.array([[633.2, 0., 408.15], [0., 633.2, 245.75],
+                                 [0., 0., 1.]])
+    assert np.allclose(results['cam2img'], expected_cam2img)
+    assert len(results['cam_intrinsic']) == num_views
+    for intrinsic in results['cam_intrinsic']:
+        assert np.allclose(intrinsic, expected_cam2img)
+    assert np.allclose(cam_intrinsic[0], cam2img)
+    assert 'img_decode_time' not in results
+    assert np.all(results['img'][0] == results['img'][-1])
+    resized = mmcv.imresize(full_img, (800, 450), interpolation='area')
+    assert np.abs(results['img'][0].astype(np.float32) - resized).mean() < 10
+
+    repr_str = repr(reduced_loader)
+    expected_str = 'LoadMultiViewImageFromFiles(to_float32=False, ' \
+                   "color_type='unchanged', num_workers=2, " \
+                   'target_size=(704, 256))'
+    assert repr_str == expected_str
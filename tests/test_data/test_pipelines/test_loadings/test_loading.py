@@ -48,7 +48,8 @@ def test_load_points_from_indoor_file():
     expected_repr_str = 'LoadPointsFromFile(shift_height=True, ' \
                         'use_color=False, ' \
                         'file_client_args={\'backend\': \'disk\'}, ' \
-                        'load_dim=6, use_dim=[0, 1, 2])'
+                        'load_dim=6, use_dim=[0, 1, 2], ' \
+                        'crop_to_image=False)'
     assert repr_str == expected_repr_str
     assert scannet_point_cloud.shape == (100, 4)
 
@@ -120,6 +121,24 @@ def test_load_points_from_outdoor_file():
     with pytest.raises(AssertionError):
         LoadPointsFromFile(coord_type='LIDAR', load_dim=4, use_dim=5)
 
+    # only keep the points in the image of the front camera
+    info = mmcv.load('tests/data/kitti/kitti_infos_train.pkl')[0]
+    calib = info['calib']
+    image_shape = info['image']['image_shape']
+    load_points_from_file = LoadPointsFromFile(
+        coord_type='LIDAR', load_dim=4, use_dim=3, crop_to_image=True)
+    results = dict(
+        pts_filename='tests/data/kitti/training/velodyne/000000.bin',
+        lidar2img=calib['P2'] @ calib['R0_rect'] @ calib['Tr_velo_to_cam'],
+        img_info=dict(height=image_shape[0], width=image_shape[1]))
+    results = load_points_from_file(results)
+    reduced_points = np.fromfile(
+        'tests/data/kitti/training/velodyne_reduced/000000.bin',
+        np.float32).reshape(-1, 4)
+    points = results['points'].tensor.numpy()
+    assert points.shape == (len(reduced_points), 3)
+    assert np.allclose(points, reduced_points[:, :3])
+
 
 def test_load_annotations3D():
     # Test scannet LoadAnnotations3D
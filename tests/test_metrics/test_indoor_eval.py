@@ -3,7 +3,9 @@ import numpy as np
 import pytest
 import torch
 
-from mmdet3d.core.evaluation.indoor_eval import average_precision, indoor_eval
+from mmdet3d.core.evaluation.indoor_eval import (IndoorEvalAccumulator,
+                                                 average_precision,
+                                                 greedy_match, indoor_eval)
 
 
 def test_indoor_eval():
@@ -181,8 +183,82 @@ def test_indoor_eval_less_classes():
     assert np.isclose(ret_value['mAR_0.25'], 0.666667)
 
 
+def test_indoor_eval_accumulator():
+    if not torch.cuda.is_available():
+        pytest.skip()
+    from mmdet3d.core.bbox.structures import Box3DMode, DepthInstance3DBoxes
+    det_infos = [{
+        'labels_3d':
+        torch.tensor([0, 2, 2]),
+        'boxes_3d':
+        DepthInstance3DBoxes(
+            torch.tensor([[1., 1., 1., 1., 1., 1., 0.],
+                          [0., 0., 0., 1., 1., 1., 0.],
+                          [0.2, 0., 0., 1., 1., 1., 0.]])),
+        'scores_3d':
+        torch.tensor([.5, .8, .6])
+    }, {
+        'labels_3d':
+        torch.tensor([1]),
+        'boxes_3d':
+        DepthInstance3DBoxes(torch.tensor([[1., 1., 1., 1., 1., 1., 0.]])),
+        'scores_3d':
+        torch.tensor([.7])
+    }]
+    label2cat = {0: 'cabinet', 1: 'bed', 2: 'chair'}
+    gt_annos = [{
+        'gt_num':
+        2,
+        'gt_boxes_upright_depth':
+        np.array([[0., 0., 0., 1., 1., 1., 0.], [1., 1., 1., 1., 1., 1., 0.]]),
+        'class':
+        np.array([2, 0])
+    }, {
+        'gt_num':
+        1,
+        'gt_boxes_upright_depth':
+        np.array([[0., 0., 0., 1., 1., 1., 0.]]),
+        'class':
+        np.array([1])
+    }]
+    expected = indoor_eval(
+        gt_annos,
+        det_infos, [0.25, 0.5],
+        label2cat,
+        box_type_3d=DepthInstance3DBoxes,
+        box_mode_3d=Box3DMode.DEPTH)
+
+    accumulators = []
+    for gt_anno, det_info in zip(gt_annos, det_infos):
+        accumulator = IndoorEvalAccumulator([0.25, 0.5],
+                                            label2cat,
+                                            box_type_3d=DepthInstance3DBoxes,
+                                            box_mode_3d=Box3DMode.DEPTH)
+        accumulator.update([gt_anno], [det_info])
+        accumulators.append(accumulator)
+    ret_value = accumulators[0].merge(accumulators[1:]).evaluate()
+    assert ret_value.keys() == expected.keys()
+    for key, value in expected.items():
+        assert np.isclose(ret_value[key], value), key
+
+
 def test_average_precision():
     ap = average_precision(
         np.array([[0.25, 0.5, 0.75], [0.25, 0.5, 0.75]]),
         np.array([[1., 1., 1.], [1., 1., 1.]]), '11points')
     assert abs(ap[0] - 0.06611571) < 0.001
+
+
+def test_greedy_match():
+    # detections sorted by descending score against 2 ground truths
+    ious = np.array([[0.6, 0.1], [0.7, 0.2], [0.3, 0.4], [0.0, 0.6],
+                     [0.0, 0.0]])
+    tp = greedy_match(ious, [0.25, 0.5])
+    # the second detection is a duplicate of the first one, the third one
+    # is only matched at the lower threshold
+    assert np.all(tp == np.array([[True, True], [False, False], [True, False],
+                                  [False, True], [False, False]]))
+
+    tp = greedy_match((np.array([0.9, 0.9]), np.array([3, 3])), [0.5])
+    assert np.all(tp == np.array([[True], [False]]))
+    assert greedy_match(np.zeros((0, 2)), [0.25, 0.5]).shape == (0, 2)
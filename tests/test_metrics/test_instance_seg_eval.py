@@ -1,8 +1,15 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import multiprocessing as mp
+
 import numpy as np
 import torch
 
 from mmdet3d.core import instance_seg_eval
+from mmdet3d.core.evaluation.instance_seg_eval import (aggregate_predictions,
+                                                       encode_predictions,
+                                                       rename_gt)
+from mmdet3d.core.evaluation.scannet_utils import (scannet_eval,
+                                                   scannet_eval_encoded)
 
 
 def test_instance_seg_eval():
@@ -21,9 +28,9 @@ def test_instance_seg_eval():
     pred_instance_labels = []
     pred_instance_scores = []
     for n_points, gt_labels in zip(n_points_list, gt_labels_list):
-        gt_instance_mask = np.ones(n_points, dtype=np.int) * -1
-        gt_semantic_mask = np.ones(n_points, dtype=np.int) * -1
-        pred_instance_mask = np.ones(n_points, dtype=np.int) * -1
+        gt_instance_mask = np.ones(n_points, dtype=np.int64) * -1
+        gt_semantic_mask = np.ones(n_points, dtype=np.int64) * -1
+        pred_instance_mask = np.ones(n_points, dtype=np.int64) * -1
         labels = []
         scores = []
         for i, gt_label in enumerate(gt_labels):
@@ -73,3 +80,61 @@ def test_instance_seg_eval():
     assert abs(ret_value['classes']['bed']['ap25%'] - 0.5) < 0.01
     assert abs(ret_value['classes']['chair']['ap50%'] - 0.375) < 0.01
     assert abs(ret_value['classes']['chair']['ap25%'] - 1.0) < 0.01
+
+
+def test_scannet_eval_encoded():
+    valid_class_ids = (3, 4, 5, 6)
+    class_labels = ('cabinet', 'bed', 'chair', 'sofa')
+    id_to_label = dict(zip(valid_class_ids, class_labels))
+    rng = np.random.RandomState(0)
+    gt_semantic_masks, gt_instance_masks = [], []
+    pred_masks, pred_labels, pred_scores = [], [], []
+    for _ in range(3):
+        n_points, n_instances = 5000, 12
+        gt_instance_mask = rng.randint(-1, n_instances, n_points)
+        # label 4 is not a valid class
+        instance_labels = rng.randint(0, 5, n_instances + 1)
+        gt_semantic_mask = instance_labels[gt_instance_mask + 1]
+        # noisy predictions, some of them of another class
+        pred_mask = gt_instance_mask.copy()
+        noise = rng.rand(n_points) < 0.3
+        pred_mask[noise] = rng.randint(-1, n_instances + 2, noise.sum())
+        n_preds = pred_mask.max() + 1
+        pred_label = rng.randint(0, 4, n_preds)
+        pred_label[:n_instances] = np.where(
+            rng.rand(n_instances) < 0.8, instance_labels[1:] % 4,
+            pred_label[:n_instances])
+        gt_semantic_masks.append(torch.tensor(gt_semantic_mask))
+        gt_instance_masks.append(torch.tensor(gt_instance_mask))
+        pred_masks.append(torch.tensor(pred_mask))
+        pred_labels.append(torch.tensor(pred_label))
+        pred_scores.append(torch.tensor(rng.rand(n_preds)))
+
+    gts = rename_gt(gt_semantic_masks, gt_instance_masks, valid_class_ids)
+    expected = scannet_eval(
+        aggregate_predictions(pred_masks, pred_labels, pred_scores,
+                              valid_class_ids), gts, None, valid_class_ids,
+        class_labels, id_to_label)
+    preds = encode_predictions(pred_masks, pred_labels, pred_scores,
+                               valid_class_ids)
+    for nproc in [1, 2]:
+        metrics = scannet_eval_encoded(preds, gts, None, valid_class_ids,
+                                       class_labels, id_to_label, nproc)
+        for key in ['all_ap', 'all_ap_50%', 'all_ap_25%']:
+            assert np.isclose(metrics[key], expected[key])
+        for label in class_labels:
+            for key, ap in expected['classes'][label].items():
+                assert np.isclose(metrics['classes'][label][key], ap)
+    assert expected['all_ap_25%'] > 0
+
+    # the workers get the scans whatever their start method
+    if 'forkserver' in mp.get_all_start_methods():
+        default_method = mp.get_start_method(allow_none=True)
+        mp.set_start_method('forkserver', force=True)
+        try:
+            metrics = scannet_eval_encoded(preds, gts, None, valid_class_ids,
+                                           class_labels, id_to_label, 2)
+        finally:
+            mp.set_start_method(default_method, force=True)
+        for key in ['all_ap', 'all_ap_50%', 'all_ap_25%']:
+            assert np.isclose(metrics[key], expected[key])
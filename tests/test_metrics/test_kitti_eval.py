@@ -3,6 +3,7 @@ import numpy as np
 import pytest
 import torch
 
+from mmdet3d.core.evaluation.kitti_utils import KittiEvalAccumulator
 from mmdet3d.core.evaluation.kitti_utils.eval import (do_eval, eval_class,
                                                       kitti_eval)
 
@@ -265,3 +266,71 @@ def test_eval_class():
     assert np.isclose(recall_sum, 16)
     assert np.isclose(precision_sum, 16)
     assert np.isclose(orientation_sum, 10.252829201850309)
+
+    # the (class, difficulty) cells evaluated by several processes
+    ret_dict = eval_class([gt_anno], [dt_anno],
+                          current_classes,
+                          difficultys,
+                          metric,
+                          min_overlaps,
+                          True,
+                          1,
+                          nproc=2)
+    assert np.isclose(np.sum(ret_dict['recall']), recall_sum)
+    assert np.isclose(np.sum(ret_dict['precision']), precision_sum)
+    assert np.isclose(np.sum(ret_dict['orientation']), orientation_sum)
+
+
+def test_kitti_eval_accumulator():
+    gt_anno = dict(
+        name=np.array(['Pedestrian', 'Cyclist', 'Car', 'Car', 'DontCare']),
+        truncated=np.array([0., 0., 0., 0.3, -1.]),
+        occluded=np.array([0, 0, 1, 2, -1]),
+        alpha=np.array([-1.57, 1.85, -1.65, 0.3, -10.]),
+        bbox=np.array([[674.9179, 165.48549, 693.23694, 193.42134],
+                       [676.21954, 165.70988, 691.63745, 193.83748],
+                       [389.4093, 182.48041, 421.49072, 202.13422],
+                       [232.0577, 186.16724, 301.94623, 217.4024],
+                       [532.37, 176.35, 542.68, 185.27]]),
+        dimensions=np.array([[0.8, 1.8, 0.6], [1.7, 1.7, 0.6], [3.9, 1.5, 1.6],
+                             [4.0, 1.5, 1.6], [-1., -1., -1.]]),
+        location=np.array([[4.7, 1.5, 39.4], [-16.5, 2.4, 58.5],
+                           [4.6, 1.3, 45.8], [-18.6, 2.3, 39.3],
+                           [-1000., -1000., -1000.]]),
+        rotation_y=np.array([-1.56, 1.57, -1.55, 0.5, -10.]))
+    dt_anno = dict(
+        name=np.array(['Pedestrian', 'Cyclist', 'Car', 'Car', 'Car']),
+        alpha=np.array([-1.5, 1.2775835, 1.82563, 0.2, -1.7676563]),
+        bbox=np.array([[674.9179, 165.48549, 693.23694, 193.42134],
+                       [676.21954, 165.70988, 691.63745, 193.83748],
+                       [390.4093, 182.48041, 422.49072, 203.13422],
+                       [232.0577, 186.16724, 301.94623, 217.4024],
+                       [758.6537, 172.98509, 816.32434, 212.76743]]),
+        dimensions=gt_anno['dimensions'].copy(),
+        location=gt_anno['location'].copy(),
+        rotation_y=np.array([-1.5, 1.3778262, 1.550529, 0.5, -1.5330327]),
+        score=np.array([0.18151495, 0.57920843, 0.27795696, 0.9, 0.21541929]))
+    empty_anno = dict(
+        name=np.array([]),
+        alpha=np.array([]),
+        bbox=np.zeros((0, 4)),
+        dimensions=np.zeros((0, 3)),
+        location=np.zeros((0, 3)),
+        rotation_y=np.array([]),
+        score=np.array([]))
+    gt_annos = [gt_anno, gt_anno, gt_anno]
+    dt_annos = [dt_anno, empty_anno, dt_anno]
+    classes = ['Pedestrian', 'Cyclist', 'Car']
+    _, expected = kitti_eval(gt_annos, dt_annos, classes, eval_types=['bbox'])
+
+    # accumulate the samples in two batches of two ranks
+    accumulator = KittiEvalAccumulator(classes, eval_types=['bbox'])
+    accumulator.update(gt_annos[:1], dt_annos[:1])
+    accumulator.update(gt_annos[1:2], dt_annos[1:2])
+    other = KittiEvalAccumulator(classes, eval_types=['bbox'])
+    other.update(gt_annos[2:], dt_annos[2:])
+    ret_dict = accumulator.merge([other]).evaluate()
+    assert accumulator.num_samples == 3
+    assert ret_dict.keys() == expected.keys()
+    for key, value in expected.items():
+        assert np.isclose(ret_dict[key], value), key
@@ -0,0 +1,89 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import numpy as np
+import pytest
+
+pytest.importorskip('lyft_dataset_sdk')
+
+
+def _generate_lyft_boxes(seed, num_samples=5, num_gts=40, num_preds=80):
+    from pyquaternion import Quaternion
+    rng = np.random.RandomState(seed)
+    names = ['car', 'pedestrian']
+    gts = []
+    for _ in range(num_gts):
+        yaw = rng.uniform(-np.pi, np.pi)
+        gts.append(
+            dict(
+                sample_token=str(rng.randint(num_samples)),
+                translation=rng.uniform(-10, 10, 3).tolist(),
+                size=rng.uniform(1, 5, 3).tolist(),
+                rotation=Quaternion(axis=[0, 0, 1],
+                                    radians=yaw).elements.tolist(),
+                name=names[rng.randint(2)]))
+    preds = []
+    for _ in range(num_preds):
+        if rng.rand() < 0.7:
+            # noisy copies of the ground truths, with small pitch and roll
+            gt = gts[rng.randint(num_gts)]
+            translation = np.array(gt['translation']) + \
+                rng.normal(0, 0.05, 3)
+            size = np.array(gt['size']) * rng.uniform(0.95, 1.05, 3)
+            rotation = np.array(gt['rotation']) + rng.normal(0, 0.01, 4)
+            sample_token, name = gt['sample_token'], gt['name']
+        else:
+            translation = rng.uniform(-10, 10, 3)
+            size = rng.uniform(1, 5, 3)
+            rotation = rng.normal(0, 1, 4)
+            # including samples without ground truth
+            sample_token = str(rng.randint(num_samples + 2))
+            name = names[rng.randint(2)]
+        preds.append(
+            dict(
+                sample_token=sample_token,
+                translation=translation.tolist(),
+                size=size.tolist(),
+                rotation=rotation.tolist(),
+                name=name,
+                score=float(np.round(rng.rand(), 1))))
+    return gts, preds
+
+
+def test_compute_single_class_aps():
+    from mmdet3d.core.evaluation.lyft_eval import (compute_single_class_aps,
+                                                   get_single_class_aps,
+                                                   lyft_boxes_to_arrays)
+    iou_thresholds = [0.5, 0.7, 0.9]
+    for seed in range(2):
+        gts, preds = _generate_lyft_boxes(seed)
+        gts = [gt for gt in gts if gt['name'] == 'car']
+        preds = [pred for pred in preds if pred['name'] == 'car']
+        expected = get_single_class_aps(gts, preds, iou_thresholds)
+        results = compute_single_class_aps(
+            lyft_boxes_to_arrays(gts), lyft_boxes_to_arrays(preds),
+            iou_thresholds)
+        assert expected[2].max() > 0
+        for result, expected_result in zip(results, expected):
+            assert np.allclose(result, expected_result)
+
+
+def test_get_classwise_aps():
+    from mmdet3d.core.evaluation.lyft_eval import (get_class_names,
+                                                   get_classwise_aps,
+                                                   get_single_class_aps)
+    iou_thresholds = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95]
+    gts, preds = _generate_lyft_boxes(0)
+    class_names = get_class_names(gts) + ['bus']
+    average_precisions = get_classwise_aps(gts, preds, class_names,
+                                           iou_thresholds)
+    for class_name, aps in zip(class_names[:2], average_precisions):
+        expected_aps = get_single_class_aps(
+            [gt for gt in gts if gt['name'] == class_name],
+            [pred for pred in preds if pred['name'] == class_name],
+            iou_thresholds)[2]
+        assert np.allclose(aps, expected_aps)
+    # no prediction of bus
+    assert np.all(average_precisions[2] == 0)
+
+    parallel_aps = get_classwise_aps(
+        gts, preds, class_names, iou_thresholds, nproc=2)
+    assert np.allclose(parallel_aps, average_precisions)
@@ -0,0 +1,138 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import mmcv
+import numpy as np
+
+from mmdet3d.core.evaluation.nuscenes_eval import (NUSCENES_EVAL_CFG,
+                                                   TP_METRICS,
+                                                   NuScenesEvalAccumulator,
+                                                   build_nuscenes_gts,
+                                                   nuscenes_eval)
+
+
+def _to_eval_boxes(boxes, num_samples, is_gt):
+    from nuscenes.eval.common.data_classes import EvalBoxes
+    from nuscenes.eval.detection.data_classes import DetectionBox
+    from pyquaternion import Quaternion
+    eval_boxes = EvalBoxes()
+    for sample_id in range(num_samples):
+        inds = np.nonzero(boxes['sample_inds'] == sample_id)[0]
+        eval_boxes.add_boxes(
+            str(sample_id), [
+                DetectionBox(
+                    sample_token=str(sample_id),
+                    translation=tuple(boxes['translation'][i]),
+                    size=tuple(boxes['size'][i]),
+                    rotation=tuple(
+                        Quaternion(axis=[0, 0, 1],
+                                   radians=boxes['yaw'][i]).elements),
+                    velocity=tuple(boxes['velocity'][i]),
+                    num_pts=int(boxes['num_pts'][i]) if is_gt else -1,
+                    detection_name=str(boxes['names'][i]),
+                    detection_score=-1.
+                    if is_gt else float(boxes['scores'][i]),
+                    attribute_name=str(boxes['attrs'][i])) for i in inds
+            ])
+    return eval_boxes
+
+
+def test_nuscenes_eval():
+    from nuscenes.eval.common.utils import center_distance
+    from nuscenes.eval.detection.algo import accumulate, calc_ap, calc_tp
+
+    np.random.seed(0)
+    data_infos = mmcv.load('tests/data/nuscenes/nus_info.pkl')['infos']
+    attrs = np.array(['', 'vehicle.moving', 'vehicle.parked'])
+    for info in data_infos:
+        info['gt_attr_names'] = attrs[np.random.randint(
+            0, 3, len(info['gt_names']))]
+    gts = build_nuscenes_gts(data_infos)
+    assert int(gts['num_samples']) == 2
+    assert len(gts['names']) == 75
+
+    # jittered ground truths plus false positives as the predictions
+    num_gts = len(gts['names'])
+    preds = {
+        key: gts[key].copy()
+        for key in ['sample_inds', 'names', 'size', 'yaw', 'ego_dist']
+    }
+    preds['translation'] = gts['translation'] + np.random.normal(
+        0, 0.5, (num_gts, 3))
+    preds['velocity'] = np.random.normal(0, 1, (num_gts, 2))
+    preds['attrs'] = attrs[np.random.randint(1, 3, num_gts)]
+    preds['scores'] = np.random.rand(num_gts)
+    preds['translation'][::4] += 3
+    keep = np.random.rand(num_gts) < 0.8
+    preds = {key: value[keep] for key, value in preds.items()}
+
+    metrics = nuscenes_eval(gts, preds)
+    assert 0 < metrics['mean_ap'] < 1
+    assert 0 < metrics['nd_score'] < 1
+    assert np.isnan(metrics['label_tp_errors']['barrier']['vel_err'])
+
+    # compare with the devkit
+    valid = gts['num_pts'] > 0
+    dist = np.array(
+        [NUSCENES_EVAL_CFG['class_range'][name] for name in gts['names']])
+    gt_boxes = _to_eval_boxes(
+        {
+            k: v[valid & (gts['ego_dist'] < dist)]
+            for k, v in gts.items() if k != 'num_samples'
+        }, 2, True)
+    dist = np.array(
+        [NUSCENES_EVAL_CFG['class_range'][name] for name in preds['names']])
+    pred_boxes = _to_eval_boxes(
+        {k: v[preds['ego_dist'] < dist]
+         for k, v in preds.items()}, 2, False)
+    for name in ['car', 'pedestrian', 'traffic_cone']:
+        for dist_th, ap in metrics['label_aps'][name].items():
+            md = accumulate(gt_boxes, pred_boxes, name, center_distance,
+                            dist_th)
+            assert np.isclose(ap, calc_ap(md, 0.1, 0.1))
+        md = accumulate(gt_boxes, pred_boxes, name, center_distance, 2.0)
+        for metric_name in TP_METRICS:
+            error = metrics['label_tp_errors'][name][metric_name]
+            if not np.isnan(error):
+                assert np.isclose(error, calc_tp(md, 0.1, metric_name))
+
+
+def test_nuscenes_eval_accumulator():
+    np.random.seed(0)
+    data_infos = mmcv.load('tests/data/nuscenes/nus_info.pkl')['infos'] * 3
+    gts = build_nuscenes_gts(data_infos)
+    num_gts = len(gts['names'])
+    preds = {
+        key: gts[key].copy()
+        for key in ['sample_inds', 'names', 'size', 'yaw', 'ego_dist']
+    }
+    preds['translation'] = gts['translation'] + np.random.normal(
+        0, 0.5, (num_gts, 3))
+    preds['velocity'] = np.random.normal(0, 1, (num_gts, 2))
+    preds['attrs'] = np.full(num_gts, 'vehicle.moving')
+    # coarse scores to check the order of the ties
+    preds['scores'] = np.random.randint(0, 5, num_gts) / 5.
+    preds['translation'][::4] += 3
+    expected = nuscenes_eval(gts, preds)
+
+    def subset(boxes, sample_inds):
+        mask = np.isin(boxes['sample_inds'], sample_inds)
+        return {k: v[mask] for k, v in boxes.items() if k != 'num_samples'}
+
+    # the samples of each rank in batches, out of order
+    accumulators = []
+    for rank_batches in [[[4], [0, 1]], [[5, 2], [3]]]:
+        accumulator = NuScenesEvalAccumulator()
+        for batch in rank_batches:
+            accumulator.update(subset(gts, batch), subset(preds, batch))
+        accumulators.append(accumulator)
+    metrics = accumulators[0].merge(accumulators[1:]).evaluate()
+    assert np.isclose(metrics['mean_ap'], expected['mean_ap'])
+    assert np.isclose(metrics['nd_score'], expected['nd_score'])
+    for name, aps in expected['label_aps'].items():
+        for dist_th, ap in aps.items():
+            assert np.isclose(metrics['label_aps'][name][dist_th], ap)
+    for name, errors in expected['label_tp_errors'].items():
+        for metric_name, error in errors.items():
+            assert np.allclose(
+                metrics['label_tp_errors'][name][metric_name],
+                error,
+                equal_nan=True)
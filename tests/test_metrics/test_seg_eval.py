@@ -3,7 +3,8 @@ import numpy as np
 import pytest
 import torch
 
-from mmdet3d.core.evaluation.seg_eval import seg_eval
+from mmdet3d.core.evaluation.seg_eval import (SegEvalAccumulator, fast_hist,
+                                              seg_eval)
 
 
 def test_indoor_eval():
@@ -37,3 +38,90 @@ def test_indoor_eval():
     assert np.isclose(ret_value['acc'], 0.7)
     assert np.isclose(ret_value['acc_cls'], 0.7)
     assert np.isclose(ret_value['miou'], 0.547619048)
+
+
+def _generate_seg_results(seed, num_scenes=4, num_classes=5):
+    rng = np.random.RandomState(seed)
+    gt_labels, seg_preds = [], []
+    for _ in range(num_scenes):
+        num_points = rng.randint(50, 100)
+        gt_label = rng.randint(0, num_classes, num_points)
+        gt_label[rng.rand(num_points) < 0.1] = 255
+        gt_labels.append(torch.from_numpy(gt_label))
+        seg_preds.append(
+            torch.from_numpy(rng.randint(0, num_classes, num_points)))
+    return gt_labels, seg_preds
+
+
+def test_fast_hist():
+    preds = np.array([0, 1, 1, 2, 2])
+    labels = np.array([0, 1, 2, 2, -1])
+    hist = fast_hist(preds, labels, 3)
+    assert np.all(hist == [[1, 0, 0], [0, 1, 0], [0, 1, 1]])
+    hist_tensor = fast_hist(
+        torch.from_numpy(preds), torch.from_numpy(labels), 3)
+    assert isinstance(hist_tensor, torch.Tensor)
+    assert np.all(hist_tensor.numpy() == hist)
+
+
+def test_seg_eval_accumulator():
+    label2cat = {i: str(i) for i in range(5)}
+    gt_labels, seg_preds = _generate_seg_results(0)
+    expected = seg_eval(gt_labels, seg_preds, label2cat, ignore_index=255)
+
+    accumulator = SegEvalAccumulator(label2cat, ignore_index=255)
+    for i in range(0, len(gt_labels), 3):
+        accumulator.update(gt_labels[i:i + 3], seg_preds[i:i + 3])
+    ret_value = accumulator.evaluate()
+    assert ret_value.keys() == expected.keys()
+    for key in expected:
+        assert np.isclose(ret_value[key], expected[key])
+
+    # accumulators of several ranks
+    accumulator = SegEvalAccumulator(label2cat, ignore_index=255)
+    other = SegEvalAccumulator(label2cat, ignore_index=255)
+    accumulator.update(gt_labels[:1], seg_preds[:1])
+    other.update(gt_labels[1:], seg_preds[1:])
+    ret_value = accumulator.merge([other]).evaluate()
+    for key in expected:
+        assert np.isclose(ret_value[key], expected[key])
+
+    # all_reduce does nothing without distributed environment
+    hist = accumulator.hist.clone()
+    assert torch.equal(accumulator.all_reduce().hist, hist)
+
+    if torch.cuda.is_available():
+        accumulator = SegEvalAccumulator(
+            label2cat, ignore_index=255, device='cuda')
+        accumulator.update(gt_labels, seg_preds)
+        assert accumulator.hist.is_cuda
+        ret_value = accumulator.evaluate()
+        for key in expected:
+            assert np.isclose(ret_value[key], expected[key])
+
+
+def test_seg_eval_accumulator_nccl(monkeypatch):
+    if not torch.cuda.is_available():
+        pytest.skip('test requires GPU and torch+cuda')
+    from torch import distributed as dist
+
+    reduced_devices = []
+
+    def all_reduce(tensor, op):
+        reduced_devices.append(tensor.device.type)
+        tensor.mul_(2)
+
+    # NCCL rejects the CPU tensors, so the CPU matrix is reduced on GPU
+    monkeypatch.setattr(dist, 'is_initialized', lambda: True)
+    monkeypatch.setattr(dist, 'get_world_size', lambda: 2)
+    monkeypatch.setattr(dist, 'get_backend', lambda: 'nccl')
+    monkeypatch.setattr(dist, 'all_reduce', all_reduce)
+    label2cat = {i: str(i) for i in range(5)}
+    gt_labels, seg_preds = _generate_seg_results(0)
+    accumulator = SegEvalAccumulator(label2cat, ignore_index=255)
+    accumulator.update(gt_labels, seg_preds)
+    hist = accumulator.hist.clone()
+    accumulator.all_reduce()
+    assert reduced_devices == ['cuda']
+    assert accumulator.hist.device.type == 'cpu'
+    assert torch.equal(accumulator.hist, hist * 2)
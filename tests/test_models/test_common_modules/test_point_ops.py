@@ -0,0 +1,220 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import numpy as np
+import pytest
+import torch
+
+from mmdet3d.ops import (Points_Sampler, QueryAndGroup, assign_score_withk,
+                         ball_query, furthest_point_sample,
+                         furthest_point_sample_with_dist, gather_points,
+                         grouping_operation, knn, three_interpolate, three_nn)
+from mmdet3d.ops.point_ops import (ball_query_cpu, furthest_point_sample_cpu,
+                                   knn_cpu, three_nn_cpu)
+
+
+def test_furthest_point_sample():
+    torch.manual_seed(0)
+    xyz = torch.rand(2, 50, 3)
+    idx = furthest_point_sample(xyz, 10)
+    assert idx.shape == torch.Size([2, 10])
+    assert idx.dtype == torch.int32
+
+    # naive furthest point sampling
+    for points, inds in zip(xyz.numpy(), idx.numpy()):
+        expected = [0]
+        min_dist = np.full(len(points), 1e10)
+        for _ in range(9):
+            dist = ((points - points[expected[-1]])**2).sum(axis=-1)
+            min_dist = np.minimum(min_dist, dist)
+            expected.append(int(min_dist.argmax()))
+        assert np.array_equal(inds, expected)
+
+    # sampling with the distances of the coordinates gives the same indices
+    dist = torch.cdist(xyz, xyz).square()
+    idx_with_dist = furthest_point_sample_with_dist(dist, 10)
+    assert torch.equal(idx_with_dist, idx)
+
+
+def test_ball_query():
+    torch.manual_seed(0)
+    xyz = torch.rand(2, 60, 3)
+    center_xyz = xyz[:, :8].clone()
+    idx = ball_query(0.1, 0.3, 5, xyz, center_xyz)
+    assert idx.shape == torch.Size([2, 8, 5])
+    assert idx.dtype == torch.int32
+
+    for points, centers, inds in zip(xyz, center_xyz, idx):
+        dist = (centers[:, None] - points[None]).norm(dim=-1)
+        for i in range(len(centers)):
+            in_ball = torch.nonzero((dist[i] == 0)
+                                    | ((dist[i] >= 0.1)
+                                       & (dist[i] < 0.3)))[:, 0][:5]
+            expected = torch.cat(
+                [in_ball, in_ball[:1].repeat(5 - len(in_ball))])
+            assert torch.equal(inds[i].long(), expected)
+
+    # empty balls are filled with 0
+    far_xyz = center_xyz + 10
+    idx = ball_query(0, 0.3, 5, xyz, far_xyz)
+    assert torch.all(idx == 0)
+
+    # more samples than points
+    idx = ball_query(0, 10, 8, xyz[:, :4], center_xyz)
+    assert torch.equal(idx[..., :4].long(), torch.arange(4).expand(2, 8, -1))
+    assert torch.all(idx[..., 4:] == 0)
+
+
+def test_knn():
+    torch.manual_seed(0)
+    xyz = torch.rand(2, 40, 3)
+    center_xyz = torch.rand(2, 6, 3)
+    idx = knn(4, xyz, center_xyz)
+    assert idx.shape == torch.Size([2, 4, 6])
+    assert idx.dtype == torch.int32
+    expected = torch.cdist(center_xyz, xyz).argsort(dim=-1)[..., :4]
+    assert torch.equal(idx.long(), expected.transpose(1, 2))
+
+    idx_transposed = knn(4, xyz.transpose(1, 2), center_xyz.transpose(1, 2),
+                         True)
+    assert torch.equal(idx_transposed, idx)
+
+    # the nearest neighbor of each point is itself
+    idx = knn(1, xyz)
+    assert torch.equal(idx[:, 0].long(), torch.arange(40).expand(2, -1))
+
+
+def test_three_nn_and_three_interpolate():
+    torch.manual_seed(0)
+    target = torch.rand(2, 20, 3)
+    source = torch.rand(2, 7, 3)
+    dist, idx = three_nn(target, source)
+    assert dist.shape == idx.shape == torch.Size([2, 20, 3])
+    assert idx.dtype == torch.int32
+    all_dist = torch.cdist(target, source)
+    expected_dist, expected_idx = all_dist.sort(dim=-1)
+    assert torch.equal(idx.long(), expected_idx[..., :3])
+    assert torch.allclose(dist, expected_dist[..., :3])
+
+    features = torch.rand(2, 5, 7, requires_grad=True)
+    weight = torch.rand(2, 20, 3)
+    output = three_interpolate(features, idx, weight)
+    assert output.shape == torch.Size([2, 5, 20])
+    expected = torch.stack([
+        features[b][:, idx[b].long()].mul(weight[b]).sum(dim=-1)
+        for b in range(2)
+    ])
+    assert torch.allclose(output, expected)
+    output.sum().backward()
+    expected_grad = torch.zeros(2, 7)
+    expected_grad.scatter_add_(1, idx.long().view(2, -1), weight.view(2, -1))
+    assert torch.allclose(features.grad,
+                          expected_grad[:, None].expand_as(features.grad))
+
+
+def test_gather_points_and_grouping_operation():
+    torch.manual_seed(0)
+    features = torch.rand(2, 4, 10, requires_grad=True)
+    idx = torch.randint(0, 10, (2, 6)).int()
+    output = gather_points(features, idx)
+    assert output.shape == torch.Size([2, 4, 6])
+    for b in range(2):
+        assert torch.equal(output[b], features[b][:, idx[b].long()])
+    output.sum().backward()
+    expected_grad = torch.zeros(2, 10).scatter_add_(1, idx.long(),
+                                                    torch.ones(2, 6))
+    assert torch.equal(features.grad, expected_grad[:, None].expand(-1, 4, -1))
+
+    group_idx = torch.randint(0, 10, (2, 3, 5)).int()
+    output = grouping_operation(features, group_idx)
+    assert output.shape == torch.Size([2, 4, 3, 5])
+    for b in range(2):
+        assert torch.equal(output[b], features[b][:, group_idx[b].long()])
+
+
+def test_assign_score_withk():
+    torch.manual_seed(0)
+    B, N, npoint, K, M, out_dim = 2, 12, 5, 4, 3, 6
+    scores = torch.rand(B, npoint, K, M)
+    point_features = torch.rand(B, N, M, out_dim)
+    center_features = torch.rand(B, N, M, out_dim)
+    knn_idx = torch.randint(0, N, (B, npoint, K))
+    output = assign_score_withk(scores, point_features, center_features,
+                                knn_idx)
+    assert output.shape == torch.Size([B, out_dim, npoint, K])
+
+    expected = torch.zeros(B, out_dim, npoint, K)
+    for b in range(B):
+        for n in range(npoint):
+            center = center_features[b, knn_idx[b, n, 0]]
+            for k in range(K):
+                neighbor = point_features[b, knn_idx[b, n, k]] - center
+                expected[b, :, n, k] = scores[b, n, k] @ neighbor
+    assert torch.allclose(output, expected, atol=1e-6)
+
+    with pytest.raises(AssertionError):
+        assign_score_withk(scores, point_features, center_features, knn_idx,
+                           'max')
+
+
+def test_point_ops_chunks(monkeypatch):
+    from mmdet3d.ops.point_ops import ops
+
+    torch.manual_seed(0)
+    xyz = torch.rand(2, 30, 3)
+    center_xyz = torch.rand(2, 9, 3)
+    ball_idx = ball_query_cpu(0, 0.4, 6, xyz, center_xyz)
+    knn_idx = knn_cpu(5, xyz, center_xyz)
+    dist, nn_idx = three_nn_cpu(center_xyz, xyz)
+    # the results do not depend on the number of centers per chunk
+    monkeypatch.setattr(ops, 'MAX_DIST_NUMEL', 100)
+    assert torch.equal(ball_query_cpu(0, 0.4, 6, xyz, center_xyz), ball_idx)
+    assert torch.equal(knn_cpu(5, xyz, center_xyz), knn_idx)
+    chunk_dist, chunk_nn_idx = three_nn_cpu(center_xyz, xyz)
+    assert torch.equal(chunk_dist, dist)
+    assert torch.equal(chunk_nn_idx, nn_idx)
+
+
+def test_point_ops_cuda():
+    if not torch.cuda.is_available():
+        pytest.skip('test requires GPU and torch+cuda')
+    torch.manual_seed(0)
+    xyz = torch.rand(2, 256, 3).cuda()
+    center_xyz = xyz[:, :32].contiguous()
+    # the CUDA ops and the pure PyTorch ones give the same results
+    assert torch.equal(
+        furthest_point_sample(xyz, 32).cpu(),
+        furthest_point_sample_cpu(xyz.cpu(), 32))
+    assert torch.equal(
+        ball_query(0, 0.2, 8, xyz, center_xyz).cpu(),
+        ball_query_cpu(0, 0.2, 8, xyz.cpu(), center_xyz.cpu()))
+    dist, idx = three_nn(center_xyz, xyz)
+    cpu_dist, cpu_idx = three_nn_cpu(center_xyz.cpu(), xyz.cpu())
+    assert torch.allclose(dist.cpu(), cpu_dist, atol=1e-5)
+    assert torch.equal(idx.cpu(), cpu_idx)
+
+
+def test_query_and_group_and_points_sampler():
+    torch.manual_seed(0)
+    xyz = torch.rand(1, 100, 3)
+    features = torch.rand(1, 4, 100)
+
+    sampler = Points_Sampler([16], ['D-FPS'], [-1])
+    idx = sampler(xyz, features)
+    assert torch.equal(idx, furthest_point_sample(xyz, 16))
+    sampler = Points_Sampler([8, 8], ['F-FPS', 'D-FPS'], [50, -1])
+    idx = sampler(xyz, features)
+    assert idx.shape == torch.Size([1, 16])
+    assert torch.all(idx[:, :8] < 50) and torch.all(idx[:, 8:] >= 50)
+
+    center_xyz = xyz[:, :16]
+    grouper = QueryAndGroup(0.3, 8, return_grouped_idx=True)
+    new_features, grouped_idx = grouper(xyz, center_xyz, features)
+    assert new_features.shape == torch.Size([1, 7, 16, 8])
+    assert torch.equal(grouped_idx, ball_query(0, 0.3, 8, xyz, center_xyz))
+    assert torch.equal(new_features[:, 3:],
+                       grouping_operation(features, grouped_idx))
+
+    grouper = QueryAndGroup(None, 8, return_grouped_idx=True)
+    new_features, grouped_idx = grouper(xyz, center_xyz, features)
+    assert torch.equal(grouped_idx, knn(8, xyz, center_xyz).transpose(1, 2))
+    # the nearest neighbor of each center is itself
+    assert torch.all(new_features[:, :3, :, 0] == 0)
@@ -0,0 +1,143 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import pytest
+import torch
+import torch.nn.functional as F
+from mmcv.cnn import build_conv_layer
+from mmcv.ops import SparseConvTensor
+
+from mmdet3d.ops.spconv import IS_SPCONV2_AVAILABLE, SparseMaxPool3d
+from mmdet3d.ops.spconv.cpu_ops import VoxelHashTable, get_indice_pairs_cpu
+
+if IS_SPCONV2_AVAILABLE:
+    pytest.skip(
+        'the CPU sparse convolutions are only used without spconv 2.x',
+        allow_module_level=True)
+
+
+def _random_sparse_tensor(spatial_shape, batch_size, num_voxels, channels):
+    num_sites = batch_size * int(torch.tensor(spatial_shape).prod())
+    keys = torch.randperm(num_sites)[:num_voxels]
+    coors = []
+    for size in spatial_shape[::-1]:
+        coors.append(keys % size)
+        keys = keys // size
+    coors.append(keys)
+    indices = torch.stack(coors[::-1], dim=-1).int()
+    features = torch.rand(num_voxels, channels, dtype=torch.float64)
+    return SparseConvTensor(features, indices, spatial_shape, batch_size)
+
+
+def _sample(dense, indices):
+    batch_inds, *coors = indices.long().unbind(dim=-1)
+    return dense[(batch_inds, slice(None), *coors)]
+
+
+def test_voxel_hash_table():
+    indices = torch.tensor([[0, 1, 2, 3], [1, 0, 0, 0], [0, 4, 4, 4]])
+    table = VoxelHashTable(indices, [5, 5, 5])
+    batch_inds = torch.tensor([1, 0, 0, 1, 0])
+    coors = torch.tensor([[0, 0, 0], [4, 4, 4], [1, 2, 3], [1, 2, 3],
+                          [-1, 2, 3]])
+    assert torch.equal(
+        table.lookup(batch_inds, coors), torch.tensor([1, 2, 0, -1, -1]))
+
+
+@pytest.mark.parametrize('conv_cfg', [
+    dict(type='SubMConv3d', kernel_size=3, padding=1),
+    dict(type='SubMConv3d', kernel_size=3, padding=2, dilation=2),
+    dict(type='SparseConv3d', kernel_size=3, stride=2, padding=1),
+    dict(type='SparseConv3d', kernel_size=(3, 1, 1), stride=(2, 1, 1)),
+    dict(type='SparseConvTranspose3d', kernel_size=3, stride=2, padding=1)
+])
+def test_sparse_conv_cpu(conv_cfg):
+    torch.manual_seed(0)
+    x = _random_sparse_tensor([7, 9, 8], 2, 120, 4)
+    conv_cfg = conv_cfg.copy()
+    conv_type = conv_cfg.pop('type')
+    conv = build_conv_layer(dict(type=conv_type), 4, 5, **conv_cfg).double()
+    y = conv(x)
+    assert type(conv).__module__.startswith('mmdet3d.ops.spconv')
+
+    dense = x.dense()
+    if conv_type == 'SparseConvTranspose3d':
+        expected = F.conv_transpose3d(dense,
+                                      conv.weight.permute(3, 4, 0, 1, 2),
+                                      conv.bias, conv.stride, conv.padding)
+    else:
+        expected = F.conv3d(dense, conv.weight.permute(4, 3, 0, 1,
+                                                       2), conv.bias,
+                            conv.stride, conv.padding, conv.dilation)
+    assert list(y.spatial_shape) == list(expected.shape[2:])
+    if conv_type == 'SubMConv3d':
+        assert torch.equal(y.indices, x.indices)
+    elif conv_type == 'SparseConv3d':
+        # the output voxels are all the ones reached by the input voxels
+        active = (dense != 0).any(dim=1, keepdim=True).double()
+        reached = F.conv3d(active, active.new_ones((1, 1, *conv.kernel_size)),
+                           None, conv.stride, conv.padding)
+        assert len(y.indices) == int((reached > 0).sum())
+    assert torch.allclose(y.features, _sample(expected, y.indices))
+
+
+def test_sparse_conv_cpu_indice_key():
+    torch.manual_seed(0)
+    x = _random_sparse_tensor([9, 8, 10], 2, 150, 4)
+    subm1 = build_conv_layer(
+        dict(type='SubMConv3d', indice_key='subm1'), 4, 6, 3,
+        padding=1).double()
+    subm2 = build_conv_layer(
+        dict(type='SubMConv3d', indice_key='subm1'), 6, 6, 3,
+        padding=1).double()
+    down = build_conv_layer(
+        dict(type='SparseConv3d', indice_key='spconv1'),
+        6,
+        8,
+        3,
+        stride=2,
+        padding=1).double()
+    up = build_conv_layer(
+        dict(type='SparseInverseConv3d', indice_key='spconv1'), 8, 4,
+        3).double()
+
+    y = subm1(x)
+    rulebook = y.indice_dict['subm1']
+    y = subm2(y)
+    # the submanifold convolutions with the same key share their rulebook
+    assert y.indice_dict['subm1'] is rulebook
+    y = down(y)
+    assert torch.equal(y.indice_dict['spconv1'][0], y.indices)
+    y = up(y)
+    # the inverse convolution restores the input voxels
+    assert torch.equal(y.indices, x.indices)
+    assert y.spatial_shape == x.spatial_shape
+
+    # the rulebooks of the CPU ops are the ones of the CUDA ops
+    outids, indice_pairs, indice_pair_num = get_indice_pairs_cpu(
+        x.indices, 2, [9, 8, 10], 3, 2, 1)
+    assert outids.dtype == indice_pairs.dtype == torch.int32
+    assert indice_pairs.shape == torch.Size([27, 2, 150])
+    assert torch.all(indice_pairs[:, :, indice_pair_num.max():] == -1)
+
+
+def test_sparse_max_pool_cpu():
+    torch.manual_seed(0)
+    x = _random_sparse_tensor([7, 6, 8], 2, 100, 3)
+    pool = SparseMaxPool3d(3, 2, 1)
+    y = pool(x)
+    # the CUDA op pools the features with zeros
+    expected = F.max_pool3d(x.dense(), 3, 2, 1).clamp(min=0)
+    assert torch.equal(y.features, _sample(expected, y.indices))
+
+
+def test_sparse_conv_cpu_backward():
+    torch.manual_seed(0)
+    x = _random_sparse_tensor([5, 6, 4], 1, 30, 2)
+    features = x.features.requires_grad_()
+    conv = build_conv_layer(
+        dict(type='SparseConv3d'), 2, 3, 3, stride=2, padding=1).double()
+    assert torch.autograd.gradcheck(
+        lambda feats: conv(
+            SparseConvTensor(feats, x.indices, x.spatial_shape, 1)).features,
+        (features, ))
+    conv(x).features.sum().backward()
+    assert conv.weight.grad is not None
@@ -86,6 +86,14 @@ def test_get_dynamic_voxelnet():
     feats = self.extract_feat(points, None)
     assert feats[0].shape == torch.Size([2, 512, 200, 176])
 
+    # the packed points of the batch are voxelized at once
+    from mmdet3d.core import pack_batch
+    assert self.accept_packed_points
+    voxels, coors = self.voxelize(points)
+    packed_voxels, packed_coors = self.voxelize(pack_batch(points))
+    assert torch.equal(packed_voxels, voxels)
+    assert torch.equal(packed_coors, coors)
+
 
 def test_voxel_net():
     if not torch.cuda.is_available():
@@ -360,3 +360,75 @@ def test_single_gpu_test():
     assert bboxes_3d.tensor.shape[1] == 7
     assert scores_3d.shape[0] >= 0
     assert labels_3d.shape[0] >= 0
+
+
+def test_train_detector_set_epoch(monkeypatch, tmp_path):
+    from mmcv import Config
+
+    from mmdet3d.apis import train
+    from mmdet3d.datasets import CBGSDataset
+
+    class ToyDataset(torch.utils.data.Dataset):
+        CLASSES = ('car', 'pedestrian')
+        flag = np.zeros(8, dtype=np.uint8)
+
+        def __len__(self):
+            return 8
+
+        def get_cat_ids(self, idx):
+            # pedestrians only appear in the first two samples
+            return [0, 1] if idx < 2 else [0]
+
+        def __getitem__(self, idx):
+            return idx
+
+    class ToyModel(torch.nn.Module):
+
+        def __init__(self):
+            super().__init__()
+            self.linear = torch.nn.Linear(1, 1)
+            self.samples = []
+
+        def cuda(self, device=None):
+            return self
+
+        def train_step(self, data, optimizer):
+            self.samples.extend(data.tolist())
+            loss = self.linear(data.float()[:, None]).sum()
+            return dict(loss=loss, log_vars=dict(), num_samples=len(data))
+
+    # train on CPU without the data parallel wrapper
+    monkeypatch.setattr(train, 'MMDataParallel',
+                        lambda model, device_ids: model)
+    cfg = Config(
+        dict(
+            data=dict(samples_per_gpu=2, workers_per_gpu=0),
+            gpu_ids=[0],
+            seed=0,
+            log_level='INFO',
+            optimizer=dict(type='SGD', lr=0.),
+            optimizer_config=dict(),
+            lr_config=None,
+            checkpoint_config=None,
+            log_config=dict(interval=1, hooks=[]),
+            runner=dict(type='EpochBasedRunner', max_epochs=2),
+            workflow=[('train', 1)],
+            work_dir=str(tmp_path),
+            resume_from=None,
+            load_from=None))
+    model = ToyModel()
+    dataset = CBGSDataset(ToyDataset(), seed=0)
+    indices = dataset.sample_indices.copy()
+    train.train_detector(model, dataset, cfg)
+
+    # the samples of the second epoch are resampled
+    num_samples = len(dataset)
+    assert len(model.samples) == 2 * num_samples
+    epoch_samples = [
+        sorted(model.samples[:num_samples]),
+        sorted(model.samples[num_samples:])
+    ]
+    assert epoch_samples[0] == sorted(indices.tolist())
+    dataset.set_epoch(1)
+    assert epoch_samples[1] == sorted(dataset.sample_indices.tolist())
+    assert epoch_samples[0] != epoch_samples[1]
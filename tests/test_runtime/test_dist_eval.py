@@ -0,0 +1,95 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import mmcv
+import numpy as np
+import pytest
+import torch
+from torch import distributed as dist
+from torch import multiprocessing as mp
+
+from mmdet3d.apis import reduce_accumulator
+from mmdet3d.core.evaluation import (NuScenesEvalAccumulator,
+                                     SegEvalAccumulator, build_nuscenes_gts,
+                                     nuscenes_eval, seg_eval)
+
+
+def _seg_data():
+    torch.manual_seed(0)
+    gt_labels = [torch.randint(0, 4, (100, )) for _ in range(6)]
+    seg_preds = [
+        torch.where(torch.rand(100) < 0.7, gt, torch.randint(0, 4, (100, )))
+        for gt in gt_labels
+    ]
+    for gt in gt_labels:
+        gt[:5] = 255
+    return gt_labels, seg_preds
+
+
+def _nuscenes_data():
+    np.random.seed(0)
+    data_infos = mmcv.load('tests/data/nuscenes/nus_info.pkl')['infos'] * 3
+    gts = build_nuscenes_gts(data_infos)
+    num_gts = len(gts['names'])
+    preds = {
+        key: gts[key].copy()
+        for key in ['sample_inds', 'names', 'size', 'yaw', 'ego_dist']
+    }
+    preds['translation'] = gts['translation'] + np.random.normal(
+        0, 0.5, (num_gts, 3))
+    preds['velocity'] = np.random.normal(0, 1, (num_gts, 2))
+    preds['attrs'] = np.full(num_gts, 'vehicle.moving')
+    preds['scores'] = np.random.randint(0, 5, num_gts) / 5.
+    preds['translation'][::4] += 3
+    return gts, preds
+
+
+def _subset(boxes, sample_inds):
+    mask = np.isin(boxes['sample_inds'], sample_inds)
+    return {k: v[mask] for k, v in boxes.items() if k != 'num_samples'}
+
+
+def _dist_eval_worker(rank, world_size, init_method):
+    dist.init_process_group(
+        'gloo', init_method=init_method, rank=rank, world_size=world_size)
+    try:
+        # each rank only evaluates its own samples
+        label2cat = {0: 'car', 1: 'bicycle', 2: 'motorcycle', 3: 'truck'}
+        gt_labels, seg_preds = _seg_data()
+        accumulator = SegEvalAccumulator(label2cat, ignore_index=255)
+        accumulator.update(gt_labels[rank::world_size],
+                           seg_preds[rank::world_size])
+        ret_value = reduce_accumulator(accumulator).evaluate()
+        expected = seg_eval(gt_labels, seg_preds, label2cat, 255)
+        for key in expected:
+            assert np.isclose(ret_value[key], expected[key]), key
+
+        gts, preds = _nuscenes_data()
+        sample_inds = np.arange(int(gts['num_samples']))[rank::world_size]
+        accumulator = NuScenesEvalAccumulator()
+        for sample_ind in sample_inds:
+            accumulator.update(
+                _subset(gts, [sample_ind]), _subset(preds, [sample_ind]))
+        metrics = reduce_accumulator(accumulator).evaluate()
+        expected = nuscenes_eval(gts, preds)
+        assert np.isclose(metrics['mean_ap'], expected['mean_ap'])
+        assert np.isclose(metrics['nd_score'], expected['nd_score'])
+    finally:
+        dist.destroy_process_group()
+
+
+def test_reduce_accumulator(tmp_path):
+    if not dist.is_available():
+        pytest.skip('test requires torch.distributed')
+    world_size = 2
+    mp.spawn(
+        _dist_eval_worker,
+        args=(world_size, f'file://{tmp_path}/dist_init'),
+        nprocs=world_size)
+
+    # nothing is reduced without distributed environment
+    label2cat = {0: 'car', 1: 'bicycle', 2: 'motorcycle', 3: 'truck'}
+    gt_labels, seg_preds = _seg_data()
+    accumulator = SegEvalAccumulator(label2cat, ignore_index=255)
+    accumulator.update(gt_labels, seg_preds)
+    hist = accumulator.hist.clone()
+    assert reduce_accumulator(accumulator) is accumulator
+    assert torch.equal(accumulator.hist, hist)
@@ -0,0 +1,143 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import copy
+import multiprocessing as mp
+import os
+import shutil
+from os import path as osp
+
+import mmcv
+import numpy as np
+import pytest
+
+from tools.data_converter.create_gt_database import GTDatabaseCreater
+
+
+def _make_kitti_data(data_path, num_samples=4):
+    """Copy the KITTI test sample as several samples of a dataset."""
+    info = mmcv.load('tests/data/kitti/kitti_infos_train.pkl')[0]
+    mmcv.mkdir_or_exist(osp.join(data_path, 'training', 'velodyne'))
+    infos = []
+    for idx in range(num_samples):
+        shutil.copy(
+            'tests/data/kitti/training/velodyne/000000.bin',
+            osp.join(data_path, 'training', 'velodyne', f'{idx:06d}.bin'))
+        sample_info = copy.deepcopy(info)
+        sample_info['image']['image_idx'] = idx
+        infos.append(sample_info)
+    info_path = osp.join(data_path, 'kitti_infos_train.pkl')
+    mmcv.dump(infos, info_path)
+    return info_path
+
+
+def _create(data_path, info_path, name, **kwargs):
+    GTDatabaseCreater(
+        'KittiDataset',
+        data_path,
+        'kitti',
+        info_path,
+        database_save_path=osp.join(data_path, f'{name}_gt_database'),
+        db_info_save_path=osp.join(data_path, f'{name}_dbinfos_train.pkl'),
+        **kwargs).create()
+    return mmcv.load(osp.join(data_path, f'{name}_dbinfos_train.pkl'))
+
+
+def _assert_db_infos_equal(db_infos, expected_db_infos):
+    assert list(db_infos) == list(expected_db_infos)
+    for name, name_db_infos in expected_db_infos.items():
+        assert len(db_infos[name]) == len(name_db_infos)
+        for db_info, expected_db_info in zip(db_infos[name], name_db_infos):
+            assert db_info.keys() == expected_db_info.keys()
+            for key, value in expected_db_info.items():
+                np.testing.assert_equal(db_info[key], value)
+
+
+def test_create_gt_database_num_worker(tmpdir):
+    if 'spawn' not in mp.get_all_start_methods():
+        pytest.skip('spawn is not available')
+    data_path = str(tmpdir)
+    info_path = _make_kitti_data(data_path)
+    db_infos = _create(data_path, info_path, 'serial', num_worker=1)
+    assert sum(len(v) for v in db_infos.values()) > 0
+    image_inds = [info['image_idx'] for info in db_infos['Pedestrian']]
+    assert image_inds == sorted(image_inds)
+
+    # the creater is sent to the workers, which are not forked by spawn
+    start_method = mp.get_start_method()
+    mp.set_start_method('spawn', force=True)
+    try:
+        parallel_db_infos = _create(
+            data_path, info_path, 'parallel', num_worker=2)
+    finally:
+        mp.set_start_method(start_method, force=True)
+    _assert_db_infos_equal(parallel_db_infos, db_infos)
+    serial_files = sorted(
+        os.listdir(osp.join(data_path, 'serial_gt_database')))
+    # the manifest is removed once the database is complete
+    assert sorted(os.listdir(osp.join(data_path,
+                                      'parallel_gt_database'))) == serial_files
+    for filename in serial_files:
+        with open(osp.join(data_path, 'serial_gt_database', filename),
+                  'rb') as f:
+            data = f.read()
+        with open(osp.join(data_path, 'parallel_gt_database', filename),
+                  'rb') as f:
+            assert f.read() == data
+
+
+def test_create_gt_database_resume(tmpdir, monkeypatch):
+    data_path = str(tmpdir)
+    info_path = _make_kitti_data(data_path)
+    expected_db_infos = _create(data_path, info_path, 'expected', num_worker=1)
+
+    create_single = GTDatabaseCreater.create_single
+    created = []
+
+    def interrupted_create_single(self, input_dict, writer=None):
+        if len(created) == 2:
+            raise KeyboardInterrupt
+        created.append(input_dict['sample_idx'])
+        return create_single(self, input_dict, writer)
+
+    # flush the manifest after every sample and interrupt the third one
+    monkeypatch.setattr(GTDatabaseCreater, 'create_single',
+                        interrupted_create_single)
+    with pytest.raises(KeyboardInterrupt):
+        _create(data_path, info_path, 'kitti', num_worker=1, buffer_size=0)
+    assert created == [0, 1]
+    database_save_path = osp.join(data_path, 'kitti_gt_database')
+    manifest_dir, = [
+        osp.join(database_save_path, filename)
+        for filename in os.listdir(database_save_path)
+        if filename.startswith('.manifest')
+    ]
+    assert sorted(os.listdir(manifest_dir)) == ['00000000.pkl', '00000001.pkl']
+    # a manifest file truncated by the interruption is never visible
+    with open(osp.join(manifest_dir, '00000002.pkl.0.tmp'), 'wb') as f:
+        f.write(b'\x80')
+
+    def recorded_create_single(self, input_dict, writer=None):
+        created.append(input_dict['sample_idx'])
+        return create_single(self, input_dict, writer)
+
+    created.clear()
+    monkeypatch.setattr(GTDatabaseCreater, 'create_single',
+                        recorded_create_single)
+    db_infos = _create(
+        data_path, info_path, 'kitti', num_worker=1, buffer_size=0)
+    assert created == [2, 3]
+    _assert_db_infos_equal(db_infos, expected_db_infos)
+    assert not osp.exists(manifest_dir)
+
+    # a run which does not resume starts over
+    created.clear()
+    with pytest.raises(KeyboardInterrupt):
+        monkeypatch.setattr(GTDatabaseCreater, 'create_single',
+                            interrupted_create_single)
+        _create(data_path, info_path, 'kitti', num_worker=1, buffer_size=0)
+    monkeypatch.setattr(GTDatabaseCreater, 'create_single',
+                        recorded_create_single)
+    created.clear()
+    db_infos = _create(
+        data_path, info_path, 'kitti', num_worker=1, resume=False)
+    assert created == [0, 1, 2, 3]
+    _assert_db_infos_equal(db_infos, expected_db_infos)
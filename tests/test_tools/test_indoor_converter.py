@@ -0,0 +1,168 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import os
+from os import path as osp
+
+import mmcv
+import numpy as np
+import pytest
+
+from tools.data_converter.s3dis_data_utils import S3DISData, S3DISSegData
+from tools.data_converter.scannet_data_utils import ScanNetData, ScanNetSegData
+
+
+def _assert_infos_equal(infos, expected_infos):
+    if isinstance(expected_infos, dict):
+        assert infos.keys() == expected_infos.keys()
+        for key in expected_infos:
+            _assert_infos_equal(infos[key], expected_infos[key])
+    elif isinstance(expected_infos, (list, tuple)):
+        assert len(infos) == len(expected_infos)
+        for info, expected_info in zip(infos, expected_infos):
+            _assert_infos_equal(info, expected_info)
+    else:
+        np.testing.assert_equal(infos, expected_infos)
+
+
+def _serial_scene_idxs_and_label_weight(seg_data):
+    """The scene indices and label weights computed scene by scene with a
+    histogram, as before the labels were counted with a bincount."""
+    num_classes = len(seg_data.cat_ids)
+    num_point_all = []
+    label_weight = np.zeros((num_classes + 1, ))  # ignore_index
+    for data_info in seg_data.data_infos:
+        label = seg_data._convert_to_label(
+            osp.join(seg_data.data_root, data_info['pts_semantic_mask_path']))
+        num_point_all.append(label.shape[0])
+        class_count, _ = np.histogram(label, range(num_classes + 2))
+        label_weight += class_count
+
+    sample_prob = np.array(num_point_all) / float(np.sum(num_point_all))
+    num_iter = int(np.sum(num_point_all) / float(seg_data.num_points))
+    scene_idxs = []
+    for idx in range(len(seg_data.data_infos)):
+        scene_idxs.extend([idx] * int(round(sample_prob[idx] * num_iter)))
+    scene_idxs = np.array(scene_idxs).astype(np.int32)
+
+    label_weight = label_weight[:-1].astype(np.float32)
+    label_weight = label_weight / label_weight.sum()
+    label_weight = seg_data.label_weight_func(label_weight).astype(np.float32)
+    return scene_idxs, label_weight
+
+
+def _make_scenes(dataset, sample_ids, truncate=False):
+    """Make scenes from the scene of the test data, of different sizes if
+    ``truncate``."""
+    info = mmcv.load(f'tests/data/{dataset}/{dataset}_infos.pkl')[0]
+    points = np.fromfile(
+        osp.join(f'tests/data/{dataset}', info['pts_path']),
+        dtype=np.float32).reshape(-1, 6)
+    instance_mask = np.fromfile(
+        osp.join(f'tests/data/{dataset}', info['pts_instance_mask_path']),
+        dtype=np.int64)
+    semantic_mask = np.fromfile(
+        osp.join(f'tests/data/{dataset}', info['pts_semantic_mask_path']),
+        dtype=np.int64)
+    scenes = []
+    for i, sample_idx in enumerate(sample_ids):
+        num_points = len(points)
+        if truncate:
+            num_points = num_points * (i + 1) // len(sample_ids)
+        scenes.append((sample_idx, points[:num_points],
+                       instance_mask[:num_points], semantic_mask[:num_points]))
+    return scenes
+
+
+@pytest.mark.parametrize('dataset', ['scannet', 's3dis'])
+def test_seg_infos(tmpdir, dataset):
+    data_path = str(tmpdir)
+    mmcv.mkdir_or_exist(osp.join(data_path, 'semantic_mask'))
+    infos = []
+    for sample_idx, _, _, semantic_mask in _make_scenes(
+            dataset, ['a', 'b', 'c'], truncate=True):
+        semantic_mask.tofile(
+            osp.join(data_path, 'semantic_mask', f'{sample_idx}.bin'))
+        infos.append(
+            dict(
+                pts_semantic_mask_path=osp.join('semantic_mask',
+                                                f'{sample_idx}.bin')))
+    ann_file = osp.join(data_path, 'infos.pkl')
+    mmcv.dump(infos, ann_file)
+
+    seg_data_class = ScanNetSegData if dataset == 'scannet' else S3DISSegData
+    seg_data = seg_data_class(
+        data_root=data_path, ann_file=ann_file, split='train', num_points=16)
+    expected_scene_idxs, expected_label_weight = \
+        _serial_scene_idxs_and_label_weight(seg_data)
+    assert len(expected_scene_idxs) > len(infos)
+    for num_workers in [1, 2]:
+        scene_idxs, label_weight = seg_data.get_scene_idxs_and_label_weight(
+            num_workers)
+        assert scene_idxs.dtype == expected_scene_idxs.dtype
+        assert np.array_equal(scene_idxs, expected_scene_idxs)
+        assert label_weight.dtype == expected_label_weight.dtype
+        assert np.allclose(label_weight, expected_label_weight)
+
+
+def test_scannet_infos(tmpdir, capsys):
+    data_path = str(tmpdir)
+    sample_ids = ['scene0000_00', 'scene0001_00', 'scene0002_00']
+    mmcv.mkdir_or_exist(osp.join(data_path, 'meta_data'))
+    mmcv.mkdir_or_exist(osp.join(data_path, 'scannet_instance_data'))
+    with open(osp.join(data_path, 'meta_data', 'scannetv2_train.txt'),
+              'w') as f:
+        f.write('\n'.join(sample_ids))
+    rng = np.random.RandomState(0)
+    for sample_idx, points, instance_mask, semantic_mask in _make_scenes(
+            'scannet', sample_ids):
+        prefix = osp.join(data_path, 'scannet_instance_data', sample_idx)
+        np.save(f'{prefix}_vert.npy', points)
+        np.save(f'{prefix}_ins_label.npy', instance_mask)
+        np.save(f'{prefix}_sem_label.npy', semantic_mask)
+        boxes = np.concatenate(
+            [rng.rand(3, 6), rng.choice([3, 4, 39], (3, 1))], axis=1)
+        np.save(f'{prefix}_aligned_bbox.npy', boxes)
+        np.save(f'{prefix}_unaligned_bbox.npy', boxes + 1)
+        np.save(f'{prefix}_axis_align_matrix.npy', np.eye(4))
+
+    dataset = ScanNetData(data_path, split='train')
+    infos = dataset.get_infos(num_workers=1)
+    assert [info['point_cloud']['lidar_idx'] for info in infos] == sample_ids
+    assert infos[0]['annos']['gt_num'] == 3
+    out = capsys.readouterr().out
+    for stage in [
+            'point loading', 'point export', 'mask export', 'box computation'
+    ]:
+        assert stage in out
+    # the same infos as the serial processing, in the same order
+    _assert_infos_equal(dataset.get_infos(num_workers=2), infos)
+    _assert_infos_equal(
+        [dataset.process_single_scene(idx) for idx in sample_ids], infos)
+
+
+def test_s3dis_infos(tmpdir, capsys):
+    data_path = str(tmpdir)
+    sample_ids = ['office_1', 'office_2', 'office_3']
+    mmcv.mkdir_or_exist(osp.join(data_path, 's3dis_data'))
+    for sample_idx, points, instance_mask, semantic_mask in _make_scenes(
+            's3dis', sample_ids):
+        os.makedirs(
+            osp.join(data_path, 'Stanford3dDataset_v1.2_Aligned_Version',
+                     'Area_1', sample_idx))
+        prefix = osp.join(data_path, 's3dis_data', f'Area_1_{sample_idx}')
+        # the boxes are computed from the consecutive instance ids
+        instance_mask = np.unique(instance_mask, return_inverse=True)[1] + 1
+        np.save(f'{prefix}_point.npy', points)
+        np.save(f'{prefix}_ins_label.npy', instance_mask)
+        np.save(f'{prefix}_sem_label.npy', semantic_mask)
+
+    dataset = S3DISData(data_path, split='Area_1')
+    dataset.sample_id_list = sample_ids
+    infos = dataset.get_infos(num_workers=1)
+    assert [info['point_cloud']['lidar_idx']
+            for info in infos] == [f'Area_1_{idx}' for idx in sample_ids]
+    out = capsys.readouterr().out
+    for stage in ['point loading', 'mask export', 'box computation']:
+        assert stage in out
+    _assert_infos_equal(dataset.get_infos(num_workers=2), infos)
+    _assert_infos_equal(
+        [dataset.process_single_scene(idx) for idx in sample_ids], infos)
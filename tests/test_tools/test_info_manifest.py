@@ -0,0 +1,113 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import os
+from os import path as osp
+
+import mmcv
+
+from tools.data_converter.info_manifest import update_infos
+
+
+class _ToyConverter(object):
+    """A toy converter whose info of a sample is the content of its files."""
+
+    def __init__(self, data_path):
+        self.data_path = data_path
+        self.created = []
+
+    def get_files(self, sample_id):
+        return [
+            osp.join(self.data_path, f'{sample_id}.txt'),
+            osp.join(self.data_path, f'{sample_id}_label.txt')
+        ]
+
+    def create_infos(self, sample_ids):
+        self.created.extend(sample_ids)
+        infos = []
+        for sample_id in sample_ids:
+            contents = []
+            for filename in self.get_files(sample_id):
+                if osp.isfile(filename):
+                    with open(filename) as f:
+                        contents.append(f.read())
+            infos.append(dict(sample_id=sample_id, contents=contents))
+        return infos
+
+    def write(self, sample_id, content, suffix=''):
+        with open(osp.join(self.data_path, f'{sample_id}{suffix}.txt'),
+                  'w') as f:
+            f.write(content)
+
+
+def test_update_infos(tmpdir):
+    data_path = str(tmpdir)
+    info_path = osp.join(data_path, 'infos.pkl')
+    converter = _ToyConverter(data_path)
+    sample_ids = ['a', 'b', 'c']
+    for sample_id in sample_ids:
+        converter.write(sample_id, sample_id)
+        converter.write(sample_id, f'{sample_id} label', '_label')
+
+    def update(sample_ids, options=None):
+        converter.created = []
+        infos = update_infos(
+            info_path,
+            sample_ids,
+            converter.get_files,
+            converter.create_infos,
+            options=options,
+            incremental=True)
+        assert mmcv.load(info_path) == infos
+        return infos
+
+    expected_infos = converter.create_infos(sample_ids)
+    assert update(sample_ids) == expected_infos
+    assert converter.created == sample_ids
+    # the manifest only indexes the info file
+    manifest = mmcv.load(f'{info_path}.manifest', file_format='pkl')
+    assert [index for _, index in manifest['samples'].values()] == [0, 1, 2]
+
+    # all the infos are reused
+    assert update(sample_ids) == expected_infos
+    assert converter.created == []
+
+    # only the modification time of a file changed
+    os.utime(osp.join(data_path, 'b.txt'), ns=(0, 0))
+    assert update(sample_ids) == expected_infos
+    assert converter.created == []
+
+    # a file changed
+    converter.write('b', 'new b')
+    expected_infos[1]['contents'][0] = 'new b'
+    assert update(sample_ids) == expected_infos
+    assert converter.created == ['b']
+
+    # a file is removed
+    os.remove(osp.join(data_path, 'c_label.txt'))
+    expected_infos[2]['contents'] = ['c']
+    assert update(sample_ids) == expected_infos
+    assert converter.created == ['c']
+
+    # samples are reordered, added and removed
+    converter.write('d', 'd')
+    info_d = dict(sample_id='d', contents=['d'])
+    assert update(['d', 'c', 'a']) == \
+        [info_d, expected_infos[2], expected_infos[0]]
+    assert converter.created == ['d']
+    assert update(['c', 'a']) == [expected_infos[2], expected_infos[0]]
+    assert converter.created == []
+
+    # the options changed
+    update(['c', 'a'], options=dict(with_plane=True))
+    assert converter.created == ['c', 'a']
+
+    # the info file was written without the manifest
+    mmcv.dump([], info_path)
+    update(['c', 'a'], options=dict(with_plane=True))
+    assert converter.created == ['c', 'a']
+
+    # the infos are created without the manifest
+    converter.created = []
+    infos = update_infos(info_path, ['a'], converter.get_files,
+                         converter.create_infos)
+    assert mmcv.load(info_path) == infos == [expected_infos[0]]
+    assert converter.created == ['a']
@@ -0,0 +1,71 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import copy
+import multiprocessing as mp
+import os
+
+import mmcv
+import pytest
+
+from tools.data_converter.nuscenes_converter import map_samples_by_scene
+
+
+def _summarize_info(nusc, info, num_sweeps=0):
+    """Summarize an info with the devkit, in the process running it."""
+    return (nusc[info['token']], info['timestamp'],
+            len(info['sweeps'][:num_sweeps]), os.getpid())
+
+
+def _load_infos(num_infos=8, scene_tokens=None):
+    """Copy the nuScenes test infos as several samples."""
+    infos = mmcv.load('tests/data/nuscenes/nus_info.pkl')['infos']
+    samples = []
+    for i in range(num_infos):
+        info = copy.deepcopy(infos[i % len(infos)])
+        info['token'] = f"{info['token']}_{i}"
+        if scene_tokens is not None:
+            info['scene_token'] = scene_tokens[i]
+        samples.append(info)
+    # the devkit only needs to be picklable here
+    nusc = {info['token']: i for i, info in enumerate(samples)}
+    return nusc, samples
+
+
+def test_map_samples_by_scene():
+    # the samples of a scene are not contiguous
+    nusc, infos = _load_infos(scene_tokens=['a', 'b'] * 4)
+    results = map_samples_by_scene(nusc, infos, _summarize_info, num_sweeps=2)
+    parallel_results = map_samples_by_scene(
+        nusc, infos, _summarize_info, workers=2, num_sweeps=2)
+    assert [result[:3] for result in parallel_results] == \
+        [result[:3] for result in results]
+    assert [result[0] for result in results] == list(range(8))
+    # each scene is processed as a whole by a worker
+    for scene_token in ['a', 'b']:
+        pids = {
+            result[3]
+            for info, result in zip(infos, parallel_results)
+            if info['scene_token'] == scene_token
+        }
+        assert len(pids) == 1
+
+    # the infos created before 'scene_token' was added
+    nusc, infos = _load_infos()
+    assert all('scene_token' not in info for info in infos)
+    results = map_samples_by_scene(nusc, infos, _summarize_info)
+    with pytest.warns(UserWarning, match='partitioned by index'):
+        parallel_results = map_samples_by_scene(
+            nusc, infos, _summarize_info, workers=2)
+    assert [result[:3] for result in parallel_results] == \
+        [result[:3] for result in results]
+
+    # the devkit is sent to the workers, which are not forked by spawn
+    if 'spawn' in mp.get_all_start_methods():
+        start_method = mp.get_start_method()
+        mp.set_start_method('spawn', force=True)
+        try:
+            parallel_results = map_samples_by_scene(
+                nusc, infos, _summarize_info, workers=2)
+        finally:
+            mp.set_start_method(start_method, force=True)
+        assert [result[:3] for result in parallel_results] == \
+            [result[:3] for result in results]
@@ -0,0 +1,78 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import copy
+from os import path as osp
+
+import mmcv
+import pytest
+
+from tools.update_data_coords import (UPDATERS, _assert_equal,
+                                      update_data_coords, update_info_file)
+
+
+def _make_kitti_dbinfos():
+    dbinfos = mmcv.load('tests/data/kitti/kitti_dbinfos_train.pkl')
+    item = dbinfos['Pedestrian'][0]
+    items = []
+    for i in range(5):
+        item = copy.deepcopy(item)
+        item['box3d_lidar'][6] += i
+        items.append(item)
+    return dict(Pedestrian=items[:3], Car=items[3:], Cyclist=[])
+
+
+def _make_nuscenes_infos():
+    data = mmcv.load('tests/data/nuscenes/nus_info.pkl')
+    empty_info = copy.deepcopy(data['infos'][0])
+    empty_info['gt_boxes'] = empty_info['gt_boxes'][:0]
+    data['infos'].append(empty_info)
+    return data
+
+
+def _make_sunrgbd_infos():
+    infos = mmcv.load('tests/data/sunrgbd/sunrgbd_infos.pkl')
+    return infos + [copy.deepcopy(infos[0]) for _ in range(2)]
+
+
+@pytest.mark.parametrize('kind,make_data', [
+    ('outdoor_dbinfos', _make_kitti_dbinfos),
+    ('nuscenes_or_lyft_infos', _make_nuscenes_infos),
+    ('sunrgbd_infos', _make_sunrgbd_infos),
+])
+def test_update_info_file(tmpdir, kind, make_data):
+    root_dir = osp.join(str(tmpdir), 'in')
+    out_dir = osp.join(str(tmpdir), 'out')
+    mmcv.mkdir_or_exist(out_dir)
+    data = make_data()
+    mmcv.dump(data, osp.join(root_dir, 'infos.pkl'))
+
+    # the entries updated one by one, as before the boxes were concatenated
+    get_entries, _, update_entry = UPDATERS[kind]
+    expected_entries = get_entries(copy.deepcopy(data))
+    for entry in expected_entries:
+        update_entry(entry)
+
+    num_entries = update_info_file('infos.pkl', root_dir, out_dir, kind)
+    assert num_entries == len(expected_entries)
+    entries = get_entries(mmcv.load(osp.join(out_dir, 'infos.pkl')))
+    _assert_equal(entries, expected_entries)
+    # the input file is unchanged
+    _assert_equal(
+        get_entries(mmcv.load(osp.join(root_dir, 'infos.pkl'))),
+        get_entries(data))
+
+
+def test_update_data_coords(tmpdir):
+    root_dir = osp.join(str(tmpdir), 'in')
+    out_dir = osp.join(str(tmpdir), 'out')
+    mmcv.dump(_make_kitti_dbinfos(), osp.join(root_dir, 'dbinfos.pkl'))
+    mmcv.dump(_make_nuscenes_infos(), osp.join(root_dir, 'infos.pkl'))
+    pkl_files = [('dbinfos.pkl', 'outdoor_dbinfos'),
+                 ('infos.pkl', 'nuscenes_or_lyft_infos')]
+    update_data_coords(root_dir, out_dir, pkl_files, workers=2)
+    for pkl_file, kind in pkl_files:
+        get_entries, _, update_entry = UPDATERS[kind]
+        expected_entries = get_entries(mmcv.load(osp.join(root_dir, pkl_file)))
+        for entry in expected_entries:
+            update_entry(entry)
+        entries = get_entries(mmcv.load(osp.join(out_dir, pkl_file)))
+        _assert_equal(entries, expected_entries)
@@ -1680,6 +1680,55 @@ def test_points_cam2img():
     assert torch.allclose(point_2d_res, expected_point_2d_res, 1e-3)
 
 
+def test_project_points():
+    from mmdet3d.core.bbox.projection import (depth_map_to_points,
+                                              points_img_bbox, points_in_image,
+                                              project_points)
+    torch.manual_seed(0)
+    points = torch.rand([5, 3])
+    proj_mat = torch.rand([4, 4])
+    # batched projection with 3 matrices, the second one is proj_mat
+    proj_mats = torch.stack([torch.eye(4), proj_mat, proj_mat * 2])
+    uvd = project_points(points, proj_mats, with_depth=True)
+    assert uvd.shape == (3, 5, 3)
+    assert torch.allclose(uvd[1],
+                          points_cam2img(points, proj_mat, with_depth=True))
+    assert torch.allclose(uvd[0, :, :2], points[:, :2] / points[:, 2:])
+    uvd_np = project_points(points.numpy(), proj_mats.numpy(), True)
+    assert uvd_np.dtype == np.float32
+    assert np.allclose(uvd_np, uvd.numpy())
+
+    mask = points_in_image(points, proj_mats, (0.7, 0.6))
+    expected_mask = (uvd[..., 0] >= 0) & (uvd[..., 0] <= 0.6) & \
+        (uvd[..., 1] >= 0) & (uvd[..., 1] <= 0.7) & (uvd[..., 2] >= 0.001)
+    assert mask.dtype == torch.bool
+    assert torch.equal(mask, expected_mask)
+    assert np.array_equal(
+        points_in_image(points.numpy(), proj_mats.numpy(), (0.7, 0.6)),
+        mask.numpy())
+
+    corners = torch.rand([2, 8, 3])
+    bbox = points_img_bbox(corners, proj_mat)
+    uv = points_cam2img(corners, proj_mat)
+    assert torch.allclose(
+        bbox, torch.cat([uv.min(dim=1)[0], uv.max(dim=1)[0]], dim=1))
+
+    # the projection of depth maps is affine
+    proj_mat[3] = torch.tensor([0., 0., 0., 1.])
+    depth = torch.rand([4, 6]) + 0.05
+    depth_points = depth_map_to_points(depth, proj_mat, trunc_pixel=1)
+    assert depth_points.shape == (int((depth[1:] > 0.1).sum()), 3)
+    uvd = project_points(depth_points, proj_mat, with_depth=True)
+    v, u = torch.nonzero(depth[1:] > 0.1, as_tuple=True)
+    assert torch.allclose(uvd[:, 0], u.float(), atol=1e-3)
+    assert torch.allclose(uvd[:, 1], v.float() + 1, atol=1e-3)
+    assert torch.allclose(uvd[:, 2], depth[v + 1, u], atol=1e-4)
+    assert np.allclose(
+        depth_map_to_points(depth.numpy(), proj_mat.numpy(), trunc_pixel=1),
+        depth_points.numpy(),
+        atol=1e-4)
+
+
 def test_points_in_boxes():
     if not torch.cuda.is_available():
         pytest.skip('test requires GPU and torch+cuda')
@@ -81,3 +81,77 @@ def test_points_in_convex_polygon_jit():
     res = points_in_convex_polygon_jit(points, polygons, clockwise=True)
     expected_res = np.array([[1, 0, 1], [0, 0, 1], [0, 1, 0]]).astype(np.bool)
     assert np.allclose(res, expected_res)
+
+
+def test_points_in_image():
+    import mmcv
+
+    from mmdet3d.core.bbox.box_np_ops import (
+        camera_to_lidar, corner_to_surfaces_3d_jit, get_frustum,
+        points_in_convex_polygon_3d_jit, points_in_image,
+        projection_matrix_to_CRT_kitti, remove_outside_points)
+    info = mmcv.load('tests/data/kitti/kitti_infos_train.pkl')[0]
+    calib = info['calib']
+    image_shape = info['image']['image_shape']
+    rng = np.random.RandomState(0)
+    points = np.concatenate(
+        [rng.uniform(-80, 80, (2000, 2)),
+         rng.uniform(-3, 3, (2000, 2))], 1).astype(np.float32)
+    proj_mat = calib['P2'] @ calib['R0_rect'] @ calib['Tr_velo_to_cam']
+    mask = points_in_image(points, proj_mat, image_shape)
+    # test against the surfaces of the frustum of the image
+    C, R, T = projection_matrix_to_CRT_kitti(calib['P2'])
+    frustum = get_frustum([0, 0, image_shape[1], image_shape[0]], C)
+    frustum = (np.linalg.inv(R) @ (frustum - T).T).T
+    frustum = camera_to_lidar(frustum, calib['R0_rect'],
+                              calib['Tr_velo_to_cam'])
+    expected_mask = points_in_convex_polygon_3d_jit(
+        points[:, :3], corner_to_surfaces_3d_jit(frustum[np.newaxis]))[:, 0]
+    assert mask.dtype == np.bool_
+    assert 0 < mask.sum() < len(points)
+    assert np.array_equal(mask, expected_mask)
+    assert np.array_equal(
+        remove_outside_points(points, calib['R0_rect'],
+                              calib['Tr_velo_to_cam'], calib['P2'],
+                              image_shape), points[mask])
+
+    mask = points_in_image(points, proj_mat, image_shape, far_clip=20)
+    depth = points[:, :3] @ proj_mat[2, :3] + proj_mat[2, 3]
+    assert np.all(depth[mask] <= 20)
+
+
+def test_depth_to_lidar_points():
+    from mmdet3d.core.bbox.box_np_ops import (camera_to_lidar,
+                                              depth_to_lidar_points,
+                                              depth_to_points)
+    rng = np.random.RandomState(0)
+    depth = rng.uniform(0, 2, (20, 30)).astype(np.float32)
+    P2 = np.array([[700., 0., 15., 40.], [0., 700., 10., 0.2],
+                   [0., 0., 1., 0.003], [0., 0., 0., 1.]])
+    r_rect = np.eye(4)
+    r_rect[:3, :3] = np.array([[1., 0.01, 0.], [-0.01, 1., 0.], [0., 0., 1.]])
+    velo2cam = np.array([[0., -1., 0., 0.], [0., 0., -1., -0.08],
+                         [1., 0., 0., -0.27], [0., 0., 0., 1.]])
+    lidar_points = depth_to_lidar_points(depth, 5, P2, r_rect, velo2cam)
+
+    pts = depth_to_points(depth, 5)
+    pts = np.concatenate([pts, np.ones((len(pts), 1))], axis=-1)
+    expected = camera_to_lidar(pts @ np.linalg.inv(P2.T), r_rect, velo2cam)
+    assert lidar_points.shape == (int((depth[5:] > 0.1).sum()), 3)
+    assert np.allclose(lidar_points, expected, atol=1e-4)
+
+
+def test_box3d_to_bbox():
+    from mmdet3d.core.bbox import points_cam2img
+    from mmdet3d.core.bbox.box_np_ops import (box3d_to_bbox,
+                                              center_to_corner_box3d)
+    box3d = np.array([[1.5, 1.6, 10.2, 1.2, 1.5, 3.9, 0.3],
+                      [-4.1, 1.7, 25.6, 0.6, 1.8, 0.8, -1.2]])
+    P2 = np.array([[721.5, 0., 609.6, 44.9], [0., 721.5, 172.9, 0.2],
+                   [0., 0., 1., 0.003], [0., 0., 0., 1.]])
+    bbox = box3d_to_bbox(box3d, P2)
+    corners = points_cam2img(
+        center_to_corner_box3d(box3d[:, :3], box3d[:, 3:6], box3d[:, 6]), P2)
+    expected = np.concatenate([corners.min(axis=1), corners.max(axis=1)], 1)
+    assert bbox.shape == (2, 4)
+    assert np.allclose(bbox, expected)
@@ -0,0 +1,22 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import multiprocessing as mp
+import operator
+
+import pytest
+
+from mmdet3d.utils import track_parallel_progress_with_state
+
+
+@pytest.mark.parametrize('start_method', ['fork', 'spawn', 'forkserver'])
+def test_track_parallel_progress_with_state(start_method):
+    if start_method not in mp.get_all_start_methods():
+        pytest.skip(f'{start_method} is not available')
+    default_method = mp.get_start_method(allow_none=True)
+    mp.set_start_method(start_method, force=True)
+    try:
+        # the state is sent to the workers whatever the start method
+        results = track_parallel_progress_with_state(operator.add, 10,
+                                                     [1, 2, 3, 4], 2)
+    finally:
+        mp.set_start_method(default_method, force=True)
+    assert results == [11, 12, 13, 14]
@@ -286,3 +286,93 @@ def test_generate_keypoints():
 
     assert keypoints2d_list[0].shape == (3, 10, 3)
     assert keypoints_depth_mask_list[0].shape == (3, 3)
+
+
+def test_pack_batch():
+    from mmdet3d.core import pack_batch, unpack_batch
+    tensors = [torch.rand(3, 4), torch.rand(0, 4), torch.rand(5, 4)]
+    packed = pack_batch(tensors)
+    assert packed.shape == (8, 5)
+    assert packed[:, 0].tolist() == [0, 0, 0, 2, 2, 2, 2, 2]
+    unpacked = unpack_batch(packed, num_samples=3)
+    assert len(unpacked) == 3
+    for tensor, expected in zip(unpacked, tensors):
+        assert torch.equal(tensor, expected)
+
+    # the trailing empty samples are only kept with `num_samples`
+    labels = [torch.tensor([1, 2]), torch.tensor([], dtype=torch.long)]
+    unpacked = unpack_batch(pack_batch(labels))
+    assert len(unpacked) == 1
+    unpacked = unpack_batch(pack_batch(labels), num_samples=2)
+    assert unpacked[0].view(-1).tolist() == [1, 2]
+    assert unpacked[1].shape == (0, 1)
+
+
+def test_packed_collate():
+    from mmcv.parallel import DataContainer as DC
+
+    from mmdet3d.core import unpack_inputs
+    from mmdet3d.core.bbox import LiDARInstance3DBoxes
+    from mmdet3d.datasets.collate import PackedDataContainer, packed_collate
+
+    batch = []
+    for num_points, num_boxes in [(10, 2), (6, 0)]:
+        batch.append(
+            dict(
+                points=DC(torch.rand(num_points, 4)),
+                gt_labels_3d=DC(torch.arange(num_boxes)),
+                gt_bboxes_3d=DC(
+                    LiDARInstance3DBoxes(torch.rand(num_boxes, 7)),
+                    cpu_only=True),
+                img_metas=DC(
+                    dict(box_type_3d=LiDARInstance3DBoxes), cpu_only=True)))
+    data = packed_collate(batch, samples_per_gpu=2)
+    for key in ['points', 'gt_labels_3d', 'gt_bboxes_3d']:
+        assert isinstance(data[key], PackedDataContainer)
+        assert not data[key].cpu_only
+    assert data['points'].data[0].shape == (16, 5)
+    assert data['gt_bboxes_3d'].data[0].shape == (2, 8)
+
+    inputs = unpack_inputs(
+        dict(
+            points=data['points'].data[0],
+            gt_labels_3d=data['gt_labels_3d'].data[0],
+            gt_bboxes_3d=data['gt_bboxes_3d'].data[0],
+            img_metas=data['img_metas'].data[0]))
+    for i, sample in enumerate(batch):
+        assert torch.equal(inputs['points'][i], sample['points'].data)
+        assert torch.equal(inputs['gt_labels_3d'][i],
+                           sample['gt_labels_3d'].data)
+        assert isinstance(inputs['gt_bboxes_3d'][i], LiDARInstance3DBoxes)
+        assert torch.allclose(inputs['gt_bboxes_3d'][i].tensor,
+                              sample['gt_bboxes_3d'].data.tensor)
+
+    # the points are kept packed for the models accepting them
+    inputs = unpack_inputs(
+        dict(
+            points=data['points'].data[0],
+            gt_labels_3d=data['gt_labels_3d'].data[0],
+            img_metas=data['img_metas'].data[0]),
+        unpack_points=False)
+    assert inputs['points'] is data['points'].data[0]
+    assert len(inputs['gt_labels_3d']) == 2
+
+    # the semantic masks of the segmentors are not packed
+    batch = [
+        dict(
+            points=DC(torch.rand(num_points, 6)),
+            pts_semantic_mask=DC(torch.randint(0, 3, (num_points, ))),
+            img_metas=DC(dict(), cpu_only=True)) for num_points in [5, 7]
+    ]
+    data = packed_collate(batch, samples_per_gpu=2)
+    assert isinstance(data['points'], PackedDataContainer)
+    inputs = unpack_inputs(
+        dict(
+            points=data['points'].data[0],
+            pts_semantic_mask=data['pts_semantic_mask'].data[0],
+            img_metas=data['img_metas'].data[0]))
+    for i, sample in enumerate(batch):
+        assert torch.equal(inputs['points'][i], sample['points'].data)
+        assert inputs['points'][i].is_contiguous()
+        assert torch.equal(inputs['pts_semantic_mask'][i],
+                           sample['pts_semantic_mask'].data)
@@ -0,0 +1,110 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import argparse
+import time
+
+import torch
+
+from mmdet3d.ops import (assign_score_withk, ball_query, furthest_point_sample,
+                         gather_points, grouping_operation, knn,
+                         three_interpolate, three_nn)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the point ops of PointNet++ models')
+    parser.add_argument(
+        '--device', default='cpu', help='device to run the ops on')
+    parser.add_argument('--batch-size', type=int, default=2, help='batch size')
+    parser.add_argument(
+        '--num-points', type=int, default=16384, help='number of points')
+    parser.add_argument(
+        '--num-centers',
+        type=int,
+        default=1024,
+        help='number of sampled centers')
+    parser.add_argument(
+        '--sample-num',
+        type=int,
+        default=32,
+        help='number of points grouped around each center')
+    parser.add_argument(
+        '--channels', type=int, default=64, help='number of feature channels')
+    parser.add_argument(
+        '--repeats', type=int, default=5, help='number of timed runs')
+    args = parser.parse_args()
+    return args
+
+
+def benchmark(name, func, num_items, repeats, device):
+    """Time an op and print its throughput.
+
+    Args:
+        name (str): Name of the op.
+        func (callable): Function running the op.
+        num_items (int): Number of items processed by a run, e.g. the
+            number of queried centers.
+        repeats (int): Number of timed runs.
+        device (torch.device): Device of the op.
+    """
+    # the first run may be slow so skip it
+    func()
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+    elapsed = (time.perf_counter() - start_time) / repeats
+    print(f'{name:<22} {elapsed * 1000:>10.2f} ms '
+          f'{num_items / elapsed / 1e6:>10.3f} M items / s')
+
+
+def main():
+    args = parse_args()
+    device = torch.device(args.device)
+    torch.manual_seed(0)
+    B, N, npoint = args.batch_size, args.num_points, args.num_centers
+    K, C = args.sample_num, args.channels
+
+    xyz = torch.rand(B, N, 3, device=device) * 40
+    features = torch.rand(B, C, N, device=device)
+    center_idx = furthest_point_sample(xyz, npoint)
+    center_xyz = gather_points(xyz.transpose(1, 2).contiguous(),
+                               center_idx).transpose(1, 2).contiguous()
+    group_idx = ball_query(0, 2.0, K, xyz, center_xyz)
+    _, nn_idx = three_nn(xyz, center_xyz)
+    weight = torch.rand(B, N, 3, device=device)
+    center_features = torch.rand(B, C, npoint, device=device)
+    M, out_dim = 8, 16
+    scores = torch.rand(B, npoint, K, M, device=device)
+    point_features = torch.rand(B, N, M, out_dim, device=device)
+
+    print(f'B={B}, N={N}, npoint={npoint}, sample_num={K}, C={C} '
+          f'on {device}')
+    print(f'{"op":<22} {"time":>13} {"throughput":>21}')
+    benchmark('furthest_point_sample',
+              lambda: furthest_point_sample(xyz, npoint), B * npoint,
+              args.repeats, device)
+    benchmark('ball_query', lambda: ball_query(0, 2.0, K, xyz, center_xyz),
+              B * npoint, args.repeats, device)
+    benchmark('knn', lambda: knn(K, xyz, center_xyz), B * npoint, args.repeats,
+              device)
+    benchmark('three_nn', lambda: three_nn(xyz, center_xyz), B * N,
+              args.repeats, device)
+    benchmark('gather_points', lambda: gather_points(features, center_idx),
+              B * npoint, args.repeats, device)
+    benchmark('grouping_operation',
+              lambda: grouping_operation(features, group_idx), B * npoint * K,
+              args.repeats, device)
+    benchmark('three_interpolate',
+              lambda: three_interpolate(center_features, nn_idx, weight),
+              B * N, args.repeats, device)
+    benchmark(
+        'assign_score_withk', lambda: assign_score_withk(
+            scores, point_features, point_features, group_idx), B * npoint * K,
+        args.repeats, device)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import argparse
+import time
+
+import torch
+import torch.nn.functional as F
+from mmcv.cnn import build_conv_layer
+from mmcv.ops import SparseConvTensor
+
+# registers the CPU sparse convolutions when spconv 2.x is not available
+import mmdet3d.ops  # noqa: F401
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the sparse convolutions against the dense ones')
+    parser.add_argument(
+        '--device', default='cpu', help='device to run the convolutions on')
+    parser.add_argument('--batch-size', type=int, default=1, help='batch size')
+    parser.add_argument(
+        '--sparse-shape',
+        type=int,
+        nargs=3,
+        default=[41, 1600, 1408],
+        help='spatial shape of the voxels, as the KITTI configs')
+    parser.add_argument(
+        '--num-voxels',
+        type=int,
+        default=16000,
+        help='number of non-empty voxels of each sample')
+    parser.add_argument(
+        '--channels', type=int, default=16, help='number of feature channels')
+    parser.add_argument(
+        '--dense-fraction',
+        type=float,
+        default=1 / 32,
+        help='fraction of the last axis the dense convolutions are timed '
+        'on, their time is extrapolated to the whole grid as the dense '
+        'grid of KITTI does not fit in the memory of most machines')
+    parser.add_argument(
+        '--repeats', type=int, default=3, help='number of timed runs')
+    args = parser.parse_args()
+    return args
+
+
+def benchmark(func, repeats, device):
+    """Time a function.
+
+    Args:
+        func (callable): Function to time.
+        repeats (int): Number of timed runs.
+        device (torch.device): Device of the function.
+
+    Returns:
+        float: Average time of a run in seconds.
+    """
+    # the first run may be slow so skip it
+    func()
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start_time) / repeats
+
+
+def main():
+    args = parse_args()
+    device = torch.device(args.device)
+    torch.manual_seed(0)
+    B, C = args.batch_size, args.channels
+    sparse_shape = args.sparse_shape
+
+    # sample the voxels as in a LiDAR sweep, i.e. mostly at the bottom of
+    # the grid, without duplicates
+    indices = []
+    for batch_idx in range(B):
+        coors = torch.stack(
+            [(torch.rand(args.num_voxels * 2, device=device)**2 *
+              sparse_shape[0]).long(),
+             torch.randint(
+                 sparse_shape[1], (args.num_voxels * 2, ), device=device),
+             torch.randint(
+                 sparse_shape[2], (args.num_voxels * 2, ), device=device)],
+            dim=-1)
+        coors = torch.unique(coors, dim=0)
+        coors = coors[torch.randperm(len(coors),
+                                     device=device)[:args.num_voxels]]
+        indices.append(F.pad(coors, (1, 0), value=batch_idx))
+    indices = torch.cat(indices).int()
+    features = torch.rand(len(indices), C, device=device)
+    dense_width = max(int(sparse_shape[2] * args.dense_fraction), 1)
+    dense_input = torch.rand(
+        B, C, *sparse_shape[:2], dense_width, device=device)
+    scale = sparse_shape[2] / dense_width
+
+    print(f'B={B}, sparse_shape={sparse_shape}, '
+          f'num_voxels={len(indices)}, C={C} on {device}')
+    print(f'{"conv":<24} {"sparse":>13} {"dense (extrapolated)":>24} '
+          f'{"speedup":>9}')
+    convs = [('SubMConv3d k3', 'SubMConv3d', dict(padding=1)),
+             ('SparseConv3d k3 s2', 'SparseConv3d', dict(stride=2, padding=1))]
+    for name, conv_type, conv_kwargs in convs:
+        conv = build_conv_layer(
+            dict(type=conv_type, indice_key=None), C, C, 3,
+            **conv_kwargs).to(device)
+        weight = conv.weight.detach().permute(4, 3, 0, 1, 2).contiguous()
+
+        def sparse_conv():
+            with torch.no_grad():
+                conv(SparseConvTensor(features, indices, sparse_shape, B))
+
+        def dense_conv():
+            with torch.no_grad():
+                F.conv3d(dense_input, weight, None, conv.stride, conv.padding)
+
+        sparse_time = benchmark(sparse_conv, args.repeats, device)
+        dense_time = benchmark(dense_conv, args.repeats, device) * scale
+        print(f'{name:<24} {sparse_time * 1000:>10.2f} ms '
+              f'{dense_time * 1000:>21.2f} ms '
+              f'{dense_time / sparse_time:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
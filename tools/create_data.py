@@ -6,15 +6,16 @@ from tools.data_converter import indoor_converter as indoor
 from tools.data_converter import kitti_converter as kitti
 from tools.data_converter import lyft_converter as lyft_converter
 from tools.data_converter import nuscenes_converter as nuscenes_converter
-from tools.data_converter.create_gt_database import (
-    GTDatabaseCreater, create_groundtruth_database)
+from tools.data_converter.create_gt_database import GTDatabaseCreater
 
 
 def kitti_data_prep(root_path,
                     info_prefix,
                     version,
                     out_dir,
-                    with_plane=False):
+                    with_plane=False,
+                    workers=4,
+                    incremental=False):
     """Prepare data related to Kitti dataset.
 
     Related data consists of '.pkl' files recording basic infos,
@@ -27,9 +28,15 @@ def kitti_data_prep(root_path,
         out_dir (str): Output directory of the groundtruth database info.
         with_plane (bool, optional): Whether to use plane information.
             Default: False.
+        workers (int, optional): Number of processes creating the reduced
+            point clouds and the groundtruth database. Default: 4.
+        incremental (bool, optional): Whether to only create the infos of
+            the frames whose raw files changed since the last run.
+            Default: False.
     """
-    kitti.create_kitti_info_file(root_path, info_prefix, with_plane)
-    kitti.create_reduced_point_cloud(root_path, info_prefix)
+    kitti.create_kitti_info_file(
+        root_path, info_prefix, with_plane, incremental=incremental)
+    kitti.create_reduced_point_cloud(root_path, info_prefix, workers=workers)
 
     info_train_path = osp.join(root_path, f'{info_prefix}_infos_train.pkl')
     info_val_path = osp.join(root_path, f'{info_prefix}_infos_val.pkl')
@@ -41,14 +48,15 @@ def kitti_data_prep(root_path,
     kitti.export_2d_annotation(root_path, info_trainval_path)
     kitti.export_2d_annotation(root_path, info_test_path)
 
-    create_groundtruth_database(
+    GTDatabaseCreater(
         'KittiDataset',
         root_path,
         info_prefix,
         f'{out_dir}/{info_prefix}_infos_train.pkl',
         relative_path=False,
         mask_anno_path='instances_train.json',
-        with_mask=(version == 'mask'))
+        with_mask=(version == 'mask'),
+        num_worker=workers).create()
 
 
 def nuscenes_data_prep(root_path,
@@ -56,7 +64,8 @@ def nuscenes_data_prep(root_path,
                        version,
                        dataset_name,
                        out_dir,
-                       max_sweeps=10):
+                       max_sweeps=10,
+                       workers=4):
     """Prepare data related to nuScenes dataset.
 
     Related data consists of '.pkl' files recording basic infos,
@@ -70,27 +79,37 @@ def nuscenes_data_prep(root_path,
         out_dir (str): Output directory of the groundtruth database info.
         max_sweeps (int, optional): Number of input consecutive frames.
             Default: 10
+        workers (int, optional): Number of processes creating the infos,
+            the 2D annotations and the groundtruth database. Default: 4.
     """
     nuscenes_converter.create_nuscenes_infos(
-        root_path, info_prefix, version=version, max_sweeps=max_sweeps)
+        root_path,
+        info_prefix,
+        version=version,
+        max_sweeps=max_sweeps,
+        workers=workers)
 
     if version == 'v1.0-test':
         info_test_path = osp.join(root_path, f'{info_prefix}_infos_test.pkl')
         nuscenes_converter.export_2d_annotation(
-            root_path, info_test_path, version=version)
+            root_path, info_test_path, version=version, workers=workers)
         return
 
     info_train_path = osp.join(root_path, f'{info_prefix}_infos_train.pkl')
     info_val_path = osp.join(root_path, f'{info_prefix}_infos_val.pkl')
     nuscenes_converter.export_2d_annotation(
-        root_path, info_train_path, version=version)
+        root_path, info_train_path, version=version, workers=workers)
     nuscenes_converter.export_2d_annotation(
-        root_path, info_val_path, version=version)
-    create_groundtruth_database(dataset_name, root_path, info_prefix,
-                                f'{out_dir}/{info_prefix}_infos_train.pkl')
+        root_path, info_val_path, version=version, workers=workers)
+    GTDatabaseCreater(
+        dataset_name,
+        root_path,
+        info_prefix,
+        f'{out_dir}/{info_prefix}_infos_train.pkl',
+        num_worker=workers).create()
 
 
-def lyft_data_prep(root_path, info_prefix, version, max_sweeps=10):
+def lyft_data_prep(root_path, info_prefix, version, max_sweeps=10, workers=4):
     """Prepare data related to Lyft dataset.
 
     Related data consists of '.pkl' files recording basic infos.
@@ -103,12 +122,22 @@ def lyft_data_prep(root_path, info_prefix, version, max_sweeps=10):
         version (str): Dataset version.
         max_sweeps (int, optional): Number of input consecutive frames.
             Defaults to 10.
+        workers (int, optional): Number of processes creating the infos.
+            Defaults to 4.
     """
     lyft_converter.create_lyft_infos(
-        root_path, info_prefix, version=version, max_sweeps=max_sweeps)
+        root_path,
+        info_prefix,
+        version=version,
+        max_sweeps=max_sweeps,
+        workers=workers)
 
 
-def scannet_data_prep(root_path, info_prefix, out_dir, workers):
+def scannet_data_prep(root_path,
+                      info_prefix,
+                      out_dir,
+                      workers,
+                      incremental=False):
     """Prepare the info file for scannet dataset.
 
     Args:
@@ -116,12 +145,23 @@ def scannet_data_prep(root_path, info_prefix, out_dir, workers):
         info_prefix (str): The prefix of info filenames.
         out_dir (str): Output directory of the generated info file.
         workers (int): Number of threads to be used.
+        incremental (bool, optional): Whether to only create the infos of
+            the scenes whose raw files changed since the last run.
+            Default: False.
     """
     indoor.create_indoor_info_file(
-        root_path, info_prefix, out_dir, workers=workers)
+        root_path,
+        info_prefix,
+        out_dir,
+        workers=workers,
+        incremental=incremental)
 
 
-def s3dis_data_prep(root_path, info_prefix, out_dir, workers):
+def s3dis_data_prep(root_path,
+                    info_prefix,
+                    out_dir,
+                    workers,
+                    incremental=False):
     """Prepare the info file for s3dis dataset.
 
     Args:
@@ -129,12 +169,24 @@ def s3dis_data_prep(root_path, info_prefix, out_dir, workers):
         info_prefix (str): The prefix of info filenames.
         out_dir (str): Output directory of the generated info file.
         workers (int): Number of threads to be used.
+        incremental (bool, optional): Whether to only create the infos of
+            the scenes whose raw files changed since the last run.
+            Default: False.
     """
     indoor.create_indoor_info_file(
-        root_path, info_prefix, out_dir, workers=workers)
+        root_path,
+        info_prefix,
+        out_dir,
+        workers=workers,
+        incremental=incremental)
 
 
-def sunrgbd_data_prep(root_path, info_prefix, out_dir, workers, num_points):
+def sunrgbd_data_prep(root_path,
+                      info_prefix,
+                      out_dir,
+                      workers,
+                      num_points,
+                      incremental=False):
     """Prepare the info file for sunrgbd dataset.
 
     Args:
@@ -142,13 +194,17 @@ def sunrgbd_data_prep(root_path, info_prefix, out_dir, workers, num_points):
         info_prefix (str): The prefix of info filenames.
         out_dir (str): Output directory of the generated info file.
         workers (int): Number of threads to be used.
+        incremental (bool, optional): Whether to only create the infos of
+            the scenes whose raw files changed since the last run.
+            Default: False.
     """
     indoor.create_indoor_info_file(
         root_path,
         info_prefix,
         out_dir,
         workers=workers,
-        num_points=num_points)
+        num_points=num_points,
+        incremental=incremental)
 
 
 def waymo_data_prep(root_path,
@@ -156,7 +212,9 @@ def waymo_data_prep(root_path,
                     version,
                     out_dir,
                     workers,
-                    max_sweeps=5):
+                    max_sweeps=5,
+                    packed=False,
+                    incremental=False):
     """Prepare the info file for waymo dataset.
 
     Args:
@@ -167,6 +225,12 @@ def waymo_data_prep(root_path,
         max_sweeps (int, optional): Number of input consecutive frames.
             Default: 5. Here we store pose information of these frames
             for later use.
+        packed (bool, optional): Whether to save the point clouds, calibs,
+            poses and labels of each segment as a single packed shard
+            instead of separate files for each frame. Default: False.
+        incremental (bool, optional): Whether to only create the infos of
+            the frames whose converted files changed since the last run.
+            Default: False.
     """
     from tools.data_converter import waymo_converter as waymo
 
@@ -182,12 +246,18 @@ def waymo_data_prep(root_path,
             save_dir,
             prefix=str(i),
             workers=workers,
-            test_mode=(split == 'testing'))
+            test_mode=(split == 'testing'),
+            save_format='packed' if packed else 'kitti')
         converter.convert()
     # Generate waymo infos
     out_dir = osp.join(out_dir, 'kitti_format')
     kitti.create_waymo_info_file(
-        out_dir, info_prefix, max_sweeps=max_sweeps, workers=workers)
+        out_dir,
+        info_prefix,
+        max_sweeps=max_sweeps,
+        workers=workers,
+        packed=packed,
+        incremental=incremental)
     GTDatabaseCreater(
         'WaymoDataset',
         out_dir,
@@ -221,6 +291,15 @@ parser.add_argument(
     '--with-plane',
     action='store_true',
     help='Whether to use plane information for kitti.')
+parser.add_argument(
+    '--packed',
+    action='store_true',
+    help='Whether to save each segment of waymo as a packed shard.')
+parser.add_argument(
+    '--incremental',
+    action='store_true',
+    help='Whether to only create the infos of the samples whose raw files '
+    'changed since the last run, for kitti, waymo and indoor datasets.')
 parser.add_argument(
     '--num-points',
     type=int,
@@ -244,7 +323,9 @@ if __name__ == '__main__':
             info_prefix=args.extra_tag,
             version=args.version,
             out_dir=args.out_dir,
-            with_plane=args.with_plane)
+            with_plane=args.with_plane,
+            workers=args.workers,
+            incremental=args.incremental)
     elif args.dataset == 'nuscenes' and args.version != 'v1.0-mini':
         train_version = f'{args.version}-trainval'
         nuscenes_data_prep(
@@ -253,7 +334,8 @@ if __name__ == '__main__':
             version=train_version,
             dataset_name='NuScenesDataset',
             out_dir=args.out_dir,
-            max_sweeps=args.max_sweeps)
+            max_sweeps=args.max_sweeps,
+            workers=args.workers)
         test_version = f'{args.version}-test'
         nuscenes_data_prep(
             root_path=args.root_path,
@@ -261,7 +343,8 @@ if __name__ == '__main__':
             version=test_version,
             dataset_name='NuScenesDataset',
             out_dir=args.out_dir,
-            max_sweeps=args.max_sweeps)
+            max_sweeps=args.max_sweeps,
+            workers=args.workers)
     elif args.dataset == 'nuscenes' and args.version == 'v1.0-mini':
         train_version = f'{args.version}'
         nuscenes_data_prep(
@@ -270,20 +353,23 @@ if __name__ == '__main__':
             version=train_version,
             dataset_name='NuScenesDataset',
             out_dir=args.out_dir,
-            max_sweeps=args.max_sweeps)
+            max_sweeps=args.max_sweeps,
+            workers=args.workers)
     elif args.dataset == 'lyft':
         train_version = f'{args.version}-train'
         lyft_data_prep(
             root_path=args.root_path,
             info_prefix=args.extra_tag,
             version=train_version,
-            max_sweeps=args.max_sweeps)
+            max_sweeps=args.max_sweeps,
+            workers=args.workers)
         test_version = f'{args.version}-test'
         lyft_data_prep(
             root_path=args.root_path,
             info_prefix=args.extra_tag,
             version=test_version,
-            max_sweeps=args.max_sweeps)
+            max_sweeps=args.max_sweeps,
+            workers=args.workers)
     elif args.dataset == 'waymo':
         waymo_data_prep(
             root_path=args.root_path,
@@ -291,23 +377,28 @@ if __name__ == '__main__':
             version=args.version,
             out_dir=args.out_dir,
             workers=args.workers,
-            max_sweeps=args.max_sweeps)
+            max_sweeps=args.max_sweeps,
+            packed=args.packed,
+            incremental=args.incremental)
     elif args.dataset == 'scannet':
         scannet_data_prep(
             root_path=args.root_path,
             info_prefix=args.extra_tag,
             out_dir=args.out_dir,
-            workers=args.workers)
+            workers=args.workers,
+            incremental=args.incremental)
     elif args.dataset == 's3dis':
         s3dis_data_prep(
             root_path=args.root_path,
             info_prefix=args.extra_tag,
             out_dir=args.out_dir,
-            workers=args.workers)
+            workers=args.workers,
+            incremental=args.incremental)
     elif args.dataset == 'sunrgbd':
         sunrgbd_data_prep(
             root_path=args.root_path,
             info_prefix=args.extra_tag,
             num_points=args.num_points,
             out_dir=args.out_dir,
-            workers=args.workers)
+            workers=args.workers,
+            incremental=args.incremental)
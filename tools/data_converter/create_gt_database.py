@@ -1,5 +1,8 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import hashlib
+import os
 import pickle
+import shutil
 from os import path as osp
 
 import mmcv
@@ -11,6 +14,7 @@ from pycocotools.coco import COCO
 
 from mmdet3d.core.bbox import box_np_ops as box_np_ops
 from mmdet3d.datasets import build_dataset
+from mmdet3d.utils import track_parallel_progress_with_state
 from mmdet.core.evaluation.bbox_overlaps import bbox_overlaps
 
 
@@ -107,42 +111,8 @@ def crop_image_patch(pos_proposals, gt_masks, pos_assigned_gt_inds, org_img):
     return img_patches, masks
 
 
-def create_groundtruth_database(dataset_class_name,
-                                data_path,
-                                info_prefix,
-                                info_path=None,
-                                mask_anno_path=None,
-                                used_classes=None,
-                                database_save_path=None,
-                                db_info_save_path=None,
-                                relative_path=True,
-                                add_rgb=False,
-                                lidar_only=False,
-                                bev_only=False,
-                                coors_range=None,
-                                with_mask=False):
-    """Given the raw data, generate the ground truth database.
-
-    Args:
-        dataset_class_name (str): Name of the input dataset.
-        data_path (str): Path of the data.
-        info_prefix (str): Prefix of the info file.
-        info_path (str, optional): Path of the info file.
-            Default: None.
-        mask_anno_path (str, optional): Path of the mask_anno.
-            Default: None.
-        used_classes (list[str], optional): Classes have been used.
-            Default: None.
-        database_save_path (str, optional): Path to save database.
-            Default: None.
-        db_info_save_path (str, optional): Path to save db_info.
-            Default: None.
-        relative_path (bool, optional): Whether to use relative path.
-            Default: True.
-        with_mask (bool, optional): Whether to use mask.
-            Default: False.
-    """
-    print(f'Create GT Database of {dataset_class_name}')
+def _build_dataset_cfg(dataset_class_name, data_path, info_path, with_mask):
+    """Build the config of the dataset loading the points and boxes."""
     dataset_cfg = dict(
         type=dataset_class_name, data_root=data_path, ann_file=info_path)
     if dataset_class_name == 'KittiDataset':
@@ -215,134 +185,165 @@ def create_groundtruth_database(dataset_class_name,
                     with_label_3d=True,
                     file_client_args=file_client_args)
             ])
+    return dataset_cfg
 
-    dataset = build_dataset(dataset_cfg)
-
-    if database_save_path is None:
-        database_save_path = osp.join(data_path, f'{info_prefix}_gt_database')
-    if db_info_save_path is None:
-        db_info_save_path = osp.join(data_path,
-                                     f'{info_prefix}_dbinfos_train.pkl')
-    mmcv.mkdir_or_exist(database_save_path)
-    all_db_infos = dict()
-    if with_mask:
-        coco = COCO(osp.join(data_path, mask_anno_path))
-        imgIds = coco.getImgIds()
-        file2id = dict()
-        for i in imgIds:
-            info = coco.loadImgs([i])[0]
-            file2id.update({info['file_name']: i})
-
-    group_counter = 0
-    for j in track_iter_progress(list(range(len(dataset)))):
-        input_dict = dataset.get_data_info(j)
-        dataset.pre_pipeline(input_dict)
-        example = dataset.pipeline(input_dict)
-        annos = example['ann_info']
-        image_idx = example['sample_idx']
-        points = example['points'].tensor.numpy()
-        gt_boxes_3d = annos['gt_bboxes_3d'].tensor.numpy()
-        names = annos['gt_names']
-        group_dict = dict()
-        if 'group_ids' in annos:
-            group_ids = annos['group_ids']
-        else:
-            group_ids = np.arange(gt_boxes_3d.shape[0], dtype=np.int64)
-        difficulty = np.zeros(gt_boxes_3d.shape[0], dtype=np.int32)
-        if 'difficulty' in annos:
-            difficulty = annos['difficulty']
 
-        num_obj = gt_boxes_3d.shape[0]
-        point_indices = box_np_ops.points_in_rbbox(points, gt_boxes_3d)
-
-        if with_mask:
-            # prepare masks
-            gt_boxes = annos['gt_bboxes']
-            img_path = osp.split(example['img_info']['filename'])[-1]
-            if img_path not in file2id.keys():
-                print(f'skip image {img_path} for empty mask')
-                continue
-            img_id = file2id[img_path]
-            kins_annIds = coco.getAnnIds(imgIds=img_id)
-            kins_raw_info = coco.loadAnns(kins_annIds)
-            kins_ann_info = _parse_coco_ann_info(kins_raw_info)
-            h, w = annos['img_shape'][:2]
-            gt_masks = [
-                _poly2mask(mask, h, w) for mask in kins_ann_info['masks']
-            ]
-            # get mask inds based on iou mapping
-            bbox_iou = bbox_overlaps(kins_ann_info['bboxes'], gt_boxes)
-            mask_inds = bbox_iou.argmax(axis=0)
-            valid_inds = (bbox_iou.max(axis=0) > 0.5)
+def create_groundtruth_database(dataset_class_name,
+                                data_path,
+                                info_prefix,
+                                info_path=None,
+                                mask_anno_path=None,
+                                used_classes=None,
+                                database_save_path=None,
+                                db_info_save_path=None,
+                                relative_path=True,
+                                add_rgb=False,
+                                lidar_only=False,
+                                bev_only=False,
+                                coors_range=None,
+                                with_mask=False,
+                                num_worker=1,
+                                resume=True):
+    """Given the raw data, generate the ground truth database.
 
-            # mask the image
-            # use more precise crop when it is ready
-            # object_img_patches = np.ascontiguousarray(
-            #     np.stack(object_img_patches, axis=0).transpose(0, 3, 1, 2))
-            # crop image patches using roi_align
-            # object_img_patches = crop_image_patch_v2(
-            #     torch.Tensor(gt_boxes),
-            #     torch.Tensor(mask_inds).long(), object_img_patches)
-            object_img_patches, object_masks = crop_image_patch(
-                gt_boxes, gt_masks, mask_inds, annos['img'])
+    It is a shortcut of :class:`GTDatabaseCreater`, which runs in the
+    current process by default.
 
-        for i in range(num_obj):
-            filename = f'{image_idx}_{names[i]}_{i}.bin'
-            abs_filepath = osp.join(database_save_path, filename)
-            rel_filepath = osp.join(f'{info_prefix}_gt_database', filename)
+    Args:
+        dataset_class_name (str): Name of the input dataset.
+        data_path (str): Path of the data.
+        info_prefix (str): Prefix of the info file.
+        info_path (str, optional): Path of the info file.
+            Default: None.
+        mask_anno_path (str, optional): Path of the mask_anno.
+            Default: None.
+        used_classes (list[str], optional): Classes have been used.
+            Default: None.
+        database_save_path (str, optional): Path to save database.
+            Default: None.
+        db_info_save_path (str, optional): Path to save db_info.
+            Default: None.
+        relative_path (bool, optional): Whether to use relative path.
+            Default: True.
+        with_mask (bool, optional): Whether to use mask.
+            Default: False.
+        num_worker (int, optional): The number of parallel workers to use.
+            Default: 1.
+        resume (bool, optional): Whether to resume from the samples
+            completed by an interrupted run. Default: True.
+    """
+    GTDatabaseCreater(
+        dataset_class_name,
+        data_path,
+        info_prefix,
+        info_path=info_path,
+        mask_anno_path=mask_anno_path,
+        used_classes=used_classes,
+        database_save_path=database_save_path,
+        db_info_save_path=db_info_save_path,
+        relative_path=relative_path,
+        add_rgb=add_rgb,
+        lidar_only=lidar_only,
+        bev_only=bev_only,
+        coors_range=coors_range,
+        with_mask=with_mask,
+        num_worker=num_worker,
+        resume=resume).create()
+
+
+class DatabaseWriter:
+    """Buffered writer of the ground truth database.
+
+    The point files of the objects are kept in memory and written together
+    once their total size reaches ``buffer_size``. The db infos of the
+    samples are then recorded in a new file of the completion manifest, so
+    a sample is only considered complete once all its files are written.
 
-            # save point clouds and image patches for each object
-            gt_points = points[point_indices[:, i]]
-            gt_points[:, :3] -= gt_boxes_3d[i, :3]
+    Args:
+        manifest_dir (str): Directory of the completion manifest.
+        buffer_size (int, optional): Number of bytes to buffer before
+            writing the files. Default: 64 MB.
+    """
 
-            if with_mask:
-                if object_masks[i].sum() == 0 or not valid_inds[i]:
-                    # Skip object for empty or invalid mask
-                    continue
-                img_patch_path = abs_filepath + '.png'
-                mask_patch_path = abs_filepath + '.mask.png'
-                mmcv.imwrite(object_img_patches[i], img_patch_path)
-                mmcv.imwrite(object_masks[i], mask_patch_path)
+    def __init__(self, manifest_dir, buffer_size=64 * 1024**2):
+        self.manifest_dir = manifest_dir
+        self.buffer_size = buffer_size
+        self.files = []
+        self.num_bytes = 0
+        self.db_infos = dict()
+
+    def write(self, filepath, points):
+        """Buffer the points of an object.
+
+        Args:
+            filepath (str): Path of the point file.
+            points (np.ndarray): Points of the object.
+        """
+        data = points.tobytes()
+        self.files.append((filepath, data))
+        self.num_bytes += len(data)
+
+    def complete(self, idx, db_infos):
+        """Record a sample whose objects are all buffered.
+
+        Args:
+            idx (int): Index of the sample in the dataset.
+            db_infos (dict[str, list[dict]]): Database infos of the sample.
+        """
+        self.db_infos[idx] = db_infos
+        if self.num_bytes >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered files and record their samples as complete."""
+        for filepath, data in self.files:
+            with open(filepath, 'wb') as f:
+                f.write(data)
+        if len(self.db_infos) > 0:
+            # the samples of each flush are disjoint, so is the first one
+            manifest_file = osp.join(self.manifest_dir,
+                                     f'{min(self.db_infos):08d}.pkl')
+            tmp_file = f'{manifest_file}.{os.getpid()}.tmp'
+            mmcv.dump(self.db_infos, tmp_file, file_format='pkl')
+            # only complete manifest files are ever visible
+            os.replace(tmp_file, manifest_file)
+        self.files = []
+        self.num_bytes = 0
+        self.db_infos = dict()
+
+
+def load_manifest(manifest_dir):
+    """Load the database infos of the samples completed so far.
 
-            with open(abs_filepath, 'w') as f:
-                gt_points.tofile(f)
+    Args:
+        manifest_dir (str): Directory of the completion manifest.
 
-            if (used_classes is None) or names[i] in used_classes:
-                db_info = {
-                    'name': names[i],
-                    'path': rel_filepath,
-                    'image_idx': image_idx,
-                    'gt_idx': i,
-                    'box3d_lidar': gt_boxes_3d[i],
-                    'num_points_in_gt': gt_points.shape[0],
-                    'difficulty': difficulty[i],
-                }
-                local_group_id = group_ids[i]
-                # if local_group_id >= 0:
-                if local_group_id not in group_dict:
-                    group_dict[local_group_id] = group_counter
-                    group_counter += 1
-                db_info['group_id'] = group_dict[local_group_id]
-                if 'score' in annos:
-                    db_info['score'] = annos['score'][i]
-                if with_mask:
-                    db_info.update({'box2d_camera': gt_boxes[i]})
-                if names[i] in all_db_infos:
-                    all_db_infos[names[i]].append(db_info)
-                else:
-                    all_db_infos[names[i]] = [db_info]
+    Returns:
+        dict[int, dict]: Database infos of each completed sample.
+    """
+    db_infos = dict()
+    if not osp.isdir(manifest_dir):
+        return db_infos
+    for filename in sorted(os.listdir(manifest_dir)):
+        if filename.endswith('.pkl'):
+            db_infos.update(mmcv.load(osp.join(manifest_dir, filename)))
+    return db_infos
 
-    for k, v in all_db_infos.items():
-        print(f'load {len(v)} {k} database infos')
 
-    with open(db_info_save_path, 'wb') as f:
-        pickle.dump(all_db_infos, f)
+def _create_chunk(creater, inds):
+    """Create the database of a chunk of samples, see
+    :meth:`GTDatabaseCreater.create_chunk`."""
+    return creater.create_chunk(inds)
 
 
 class GTDatabaseCreater:
-    """Given the raw data, generate the ground truth database. This is the
-    parallel version. For serialized version, please refer to
-    `create_groundtruth_database`
+    """Given the raw data, generate the ground truth database.
+
+    The samples are processed by chunks in parallel workers, which write
+    the files of the objects through a :class:`DatabaseWriter`. The samples
+    completed by an interrupted run are read from the completion manifest
+    instead of being processed again. The database infos are merged in the
+    order of the samples, thus they do not depend on the number of workers.
 
     Args:
         dataset_class_name (str): Name of the input dataset.
@@ -364,6 +365,10 @@ class GTDatabaseCreater:
             Default: False.
         num_worker (int, optional): the number of parallel workers to use.
             Default: 8.
+        resume (bool, optional): Whether to resume from the samples
+            completed by an interrupted run. Default: True.
+        buffer_size (int, optional): Number of bytes buffered by each
+            worker before writing. Default: 64 MB.
     """
 
     def __init__(self,
@@ -381,7 +386,9 @@ class GTDatabaseCreater:
                  bev_only=False,
                  coors_range=None,
                  with_mask=False,
-                 num_worker=8) -> None:
+                 num_worker=8,
+                 resume=True,
+                 buffer_size=64 * 1024**2) -> None:
         self.dataset_class_name = dataset_class_name
         self.data_path = data_path
         self.info_prefix = info_prefix
@@ -397,9 +404,25 @@ class GTDatabaseCreater:
         self.coors_range = coors_range
         self.with_mask = with_mask
         self.num_worker = num_worker
+        self.resume = resume
+        self.buffer_size = buffer_size
+        self.dataset = None
         self.pipeline = None
+        self.manifest_dir = None
+
+    def create_single(self, input_dict, writer=None):
+        """Create the database of a sample.
+
+        Args:
+            input_dict (dict): Input of the pipeline of the sample.
+            writer (:obj:`DatabaseWriter`, optional): Writer buffering the
+                point files. They are written right away if not given.
+                Default: None.
 
-    def create_single(self, input_dict):
+        Returns:
+            dict[str, list[dict]]: Database infos of the sample by class,
+                with group ids starting from 0.
+        """
         group_counter = 0
         single_db_infos = dict()
         example = self.pipeline(input_dict)
@@ -470,8 +493,11 @@ class GTDatabaseCreater:
                 mmcv.imwrite(object_img_patches[i], img_patch_path)
                 mmcv.imwrite(object_masks[i], mask_patch_path)
 
-            with open(abs_filepath, 'w') as f:
-                gt_points.tofile(f)
+            if writer is not None:
+                writer.write(abs_filepath, gt_points)
+            else:
+                with open(abs_filepath, 'w') as f:
+                    gt_points.tofile(f)
 
             if (self.used_classes is None) or names[i] in self.used_classes:
                 db_info = {
@@ -500,84 +526,44 @@ class GTDatabaseCreater:
 
         return single_db_infos
 
+    def create_chunk(self, inds):
+        """Create the database of a chunk of samples.
+
+        Args:
+            inds (list[int]): Indices of the samples in the dataset.
+
+        Returns:
+            dict[int, dict]: Database infos of each sample.
+        """
+        writer = DatabaseWriter(self.manifest_dir, self.buffer_size)
+        chunk_db_infos = dict()
+        for idx in inds:
+            input_dict = self.dataset.get_data_info(idx)
+            self.dataset.pre_pipeline(input_dict)
+            chunk_db_infos[idx] = self.create_single(input_dict, writer)
+            writer.complete(idx, chunk_db_infos[idx])
+        writer.flush()
+        return chunk_db_infos
+
+    def _manifest_key(self):
+        """Get the key identifying the database to create."""
+        key = [
+            self.dataset_class_name, self.info_prefix, self.database_save_path,
+            self.used_classes, self.with_mask,
+            len(self.dataset)
+        ]
+        if isinstance(self.info_path, str) and osp.isfile(self.info_path):
+            stat = os.stat(self.info_path)
+            key += [stat.st_size, stat.st_mtime]
+        return hashlib.md5(repr(key).encode()).hexdigest()[:8]
+
     def create(self):
         print(f'Create GT Database of {self.dataset_class_name}')
-        dataset_cfg = dict(
-            type=self.dataset_class_name,
-            data_root=self.data_path,
-            ann_file=self.info_path)
-        if self.dataset_class_name == 'KittiDataset':
-            file_client_args = dict(backend='disk')
-            dataset_cfg.update(
-                test_mode=False,
-                split='training',
-                modality=dict(
-                    use_lidar=True,
-                    use_depth=False,
-                    use_lidar_intensity=True,
-                    use_camera=self.with_mask,
-                ),
-                pipeline=[
-                    dict(
-                        type='LoadPointsFromFile',
-                        coord_type='LIDAR',
-                        load_dim=4,
-                        use_dim=4,
-                        file_client_args=file_client_args),
-                    dict(
-                        type='LoadAnnotations3D',
-                        with_bbox_3d=True,
-                        with_label_3d=True,
-                        file_client_args=file_client_args)
-                ])
-
-        elif self.dataset_class_name == 'NuScenesDataset':
-            dataset_cfg.update(
-                use_valid_flag=True,
-                pipeline=[
-                    dict(
-                        type='LoadPointsFromFile',
-                        coord_type='LIDAR',
-                        load_dim=5,
-                        use_dim=5),
-                    dict(
-                        type='LoadPointsFromMultiSweeps',
-                        sweeps_num=10,
-                        use_dim=[0, 1, 2, 3, 4],
-                        pad_empty_sweeps=True,
-                        remove_close=True),
-                    dict(
-                        type='LoadAnnotations3D',
-                        with_bbox_3d=True,
-                        with_label_3d=True)
-                ])
-
-        elif self.dataset_class_name == 'WaymoDataset':
-            file_client_args = dict(backend='disk')
-            dataset_cfg.update(
-                test_mode=False,
-                split='training',
-                modality=dict(
-                    use_lidar=True,
-                    use_depth=False,
-                    use_lidar_intensity=True,
-                    use_camera=False,
-                ),
-                pipeline=[
-                    dict(
-                        type='LoadPointsFromFile',
-                        coord_type='LIDAR',
-                        load_dim=6,
-                        use_dim=6,
-                        file_client_args=file_client_args),
-                    dict(
-                        type='LoadAnnotations3D',
-                        with_bbox_3d=True,
-                        with_label_3d=True,
-                        file_client_args=file_client_args)
-                ])
-
+        dataset_cfg = _build_dataset_cfg(self.dataset_class_name,
+                                         self.data_path, self.info_path,
+                                         self.with_mask)
         dataset = build_dataset(dataset_cfg)
+        self.dataset = dataset
         self.pipeline = dataset.pipeline
         if self.database_save_path is None:
             self.database_save_path = osp.join(
@@ -594,19 +580,38 @@ class GTDatabaseCreater:
                 info = self.coco.loadImgs([i])[0]
                 self.file2id.update({info['file_name']: i})
 
-        def loop_dataset(i):
-            input_dict = dataset.get_data_info(i)
-            dataset.pre_pipeline(input_dict)
-            return input_dict
+        self.manifest_dir = osp.join(self.database_save_path,
+                                     f'.manifest_{self._manifest_key()}')
+        if not self.resume and osp.isdir(self.manifest_dir):
+            shutil.rmtree(self.manifest_dir)
+        mmcv.mkdir_or_exist(self.manifest_dir)
+        multi_db_infos = load_manifest(self.manifest_dir)
+        if len(multi_db_infos) > 0:
+            print(f'Resume from {len(multi_db_infos)} completed samples')
+        inds = [i for i in range(len(dataset)) if i not in multi_db_infos]
+
+        if self.num_worker > 1 and len(inds) > 0:
+            chunk_size = max(1, -(-len(inds) // (self.num_worker * 4)))
+            chunks = [
+                inds[i:i + chunk_size] for i in range(0, len(inds), chunk_size)
+            ]
+            for chunk_db_infos in track_parallel_progress_with_state(
+                    _create_chunk, self, chunks, self.num_worker):
+                multi_db_infos.update(chunk_db_infos)
+        else:
+            writer = DatabaseWriter(self.manifest_dir, self.buffer_size)
+            for idx in track_iter_progress(inds):
+                input_dict = dataset.get_data_info(idx)
+                dataset.pre_pipeline(input_dict)
+                multi_db_infos[idx] = self.create_single(input_dict, writer)
+                writer.complete(idx, multi_db_infos[idx])
+            writer.flush()
 
-        multi_db_infos = mmcv.track_parallel_progress(
-            self.create_single, ((loop_dataset(i)
-                                  for i in range(len(dataset))), len(dataset)),
-            self.num_worker)
         print('Make global unique group id')
         group_counter_offset = 0
         all_db_infos = dict()
-        for single_db_infos in track_iter_progress(multi_db_infos):
+        for idx in track_iter_progress(sorted(multi_db_infos)):
+            single_db_infos = multi_db_infos[idx]
             group_id = -1
             for name, name_db_infos in single_db_infos.items():
                 for db_info in name_db_infos:
@@ -622,3 +627,5 @@ class GTDatabaseCreater:
 
         with open(self.db_info_save_path, 'wb') as f:
             pickle.dump(all_db_infos, f)
+        # the database is complete, a new run starts over
+        shutil.rmtree(self.manifest_dir)
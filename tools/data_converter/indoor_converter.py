@@ -1,18 +1,38 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import os
+from functools import partial
 
 import mmcv
 import numpy as np
 
+from tools.data_converter.info_manifest import update_infos
 from tools.data_converter.s3dis_data_utils import S3DISData, S3DISSegData
 from tools.data_converter.scannet_data_utils import ScanNetData, ScanNetSegData
 from tools.data_converter.sunrgbd_data_utils import SUNRGBDData
 
 
+def _get_infos(dataset,
+               filename,
+               workers,
+               has_label=True,
+               incremental=False,
+               options=None):
+    """Get the infos of a dataset and save them, only creating those of the
+    changed scenes if ``incremental``."""
+    return update_infos(
+        filename,
+        list(dataset.sample_id_list),
+        dataset.get_sample_files,
+        partial(dataset.get_infos, num_workers=workers, has_label=has_label),
+        options=dict(options or {}, has_label=has_label),
+        incremental=incremental)
+
+
 def create_indoor_info_file(data_path,
                             pkl_prefix='sunrgbd',
                             save_path=None,
                             workers=4,
+                            incremental=False,
                             **kwargs):
     """Create indoor information file.
 
@@ -23,7 +43,12 @@ def create_indoor_info_file(data_path,
         pkl_prefix (str, optional): Prefix of the pkl to be saved.
             Default: 'sunrgbd'.
         save_path (str, optional): Path of the pkl to be saved. Default: None.
-        workers (int, optional): Number of threads to be used. Default: 4.
+        workers (int, optional): Number of processes to be used.
+            Default: 4.
+        incremental (bool, optional): Whether to keep a manifest next to
+            each info file and only create the infos of the scenes whose
+            raw files changed since the last run, see
+            :class:`InfoManifest`. Default: False.
         kwargs (dict): Additional parameters for dataset-specific Data class.
             May include `use_v1` for SUN RGB-D and `num_points`.
     """
@@ -32,6 +57,12 @@ def create_indoor_info_file(data_path,
         f'unsupported indoor dataset {pkl_prefix}'
     save_path = data_path if save_path is None else save_path
     assert os.path.exists(save_path)
+    # time of each stage of the conversion
+    timer = mmcv.Timer()
+
+    # options the infos depend on, besides the raw files
+    options = dict(num_points=kwargs.get('num_points', -1)) \
+        if pkl_prefix == 'sunrgbd' else None
 
     # generate infos for both detection and segmentation task
     if pkl_prefix in ['sunrgbd', 'scannet']:
@@ -60,20 +91,20 @@ def create_indoor_info_file(data_path,
             test_filename = os.path.join(save_path,
                                          f'{pkl_prefix}_infos_test.pkl')
 
-        infos_train = train_dataset.get_infos(
-            num_workers=workers, has_label=True)
-        mmcv.dump(infos_train, train_filename, 'pkl')
-        print(f'{pkl_prefix} info train file is saved to {train_filename}')
+        _get_infos(train_dataset, train_filename, workers, True, incremental,
+                   options)
+        print(f'{pkl_prefix} info train file is saved to {train_filename} '
+              f'in {timer.since_last_check():.1f}s')
 
-        infos_val = val_dataset.get_infos(num_workers=workers, has_label=True)
-        mmcv.dump(infos_val, val_filename, 'pkl')
-        print(f'{pkl_prefix} info val file is saved to {val_filename}')
+        _get_infos(val_dataset, val_filename, workers, True, incremental,
+                   options)
+        print(f'{pkl_prefix} info val file is saved to {val_filename} '
+              f'in {timer.since_last_check():.1f}s')
 
     if pkl_prefix == 'scannet':
-        infos_test = test_dataset.get_infos(
-            num_workers=workers, has_label=False)
-        mmcv.dump(infos_test, test_filename, 'pkl')
-        print(f'{pkl_prefix} info test file is saved to {test_filename}')
+        _get_infos(test_dataset, test_filename, workers, False, incremental)
+        print(f'{pkl_prefix} info test file is saved to {test_filename} '
+              f'in {timer.since_last_check():.1f}s')
 
     # generate infos for the semantic segmentation task
     # e.g. re-sampled scene indexes and label weights
@@ -97,8 +128,10 @@ def create_indoor_info_file(data_path,
             num_points=num_points,
             label_weight_func=lambda x: 1.0 / np.log(1.2 + x))
         # no need to generate for test set
-        train_dataset.get_seg_infos()
-        val_dataset.get_seg_infos()
+        train_dataset.get_seg_infos(num_workers=workers)
+        val_dataset.get_seg_infos(num_workers=workers)
+        print(f'{pkl_prefix} seg infos are saved '
+              f'in {timer.since_last_check():.1f}s')
     elif pkl_prefix == 's3dis':
         # S3DIS doesn't have a fixed train-val split
         # it has 6 areas instead, so we generate info file for each of them
@@ -106,11 +139,11 @@ def create_indoor_info_file(data_path,
         splits = [f'Area_{i}' for i in [1, 2, 3, 4, 5, 6]]
         for split in splits:
             dataset = S3DISData(root_path=data_path, split=split)
-            info = dataset.get_infos(num_workers=workers, has_label=True)
             filename = os.path.join(save_path,
                                     f'{pkl_prefix}_infos_{split}.pkl')
-            mmcv.dump(info, filename, 'pkl')
-            print(f'{pkl_prefix} info {split} file is saved to {filename}')
+            _get_infos(dataset, filename, workers, True, incremental)
+            print(f'{pkl_prefix} info {split} file is saved to {filename} '
+                  f'in {timer.since_last_check():.1f}s')
             num_points = kwargs.get('num_points', 4096)
             seg_dataset = S3DISSegData(
                 data_root=data_path,
@@ -118,4 +151,6 @@ def create_indoor_info_file(data_path,
                 split=split,
                 num_points=num_points,
                 label_weight_func=lambda x: 1.0 / np.log(1.2 + x))
-            seg_dataset.get_seg_infos()
+            seg_dataset.get_seg_infos(num_workers=workers)
+            print(f'{pkl_prefix} seg infos of {split} are saved '
+                  f'in {timer.since_last_check():.1f}s')
@@ -0,0 +1,188 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import hashlib
+import os
+from os import path as osp
+
+import mmcv
+
+
+class InfoManifest(object):
+    """Manifest of the infos generated for each sample.
+
+    The manifest stores a digest of the contents of the raw files of each
+    sample and of the converter options, with the index of the info of the
+    sample in the info file. When the infos are generated again, only the
+    samples whose digest changed, or which are not in the manifest yet, are
+    processed, and the others are taken from the existing info file. The
+    digests of the files are cached with their size and modification time,
+    so the unchanged files are not read again either.
+
+    The size and modification time of the info file are stored too, so the
+    manifest is ignored if the info file was written without it.
+
+    Args:
+        path (str): Path of the manifest, usually next to the info file.
+        info_path (str): Path of the info file indexed by the manifest.
+        options (dict, optional): Converter options the infos depend on.
+            Default: None.
+    """
+
+    def __init__(self, path, info_path, options=None):
+        self.path = path
+        self.info_path = info_path
+        self.options_digest = hashlib.sha1(
+            repr(sorted((options or {}).items())).encode()).hexdigest()
+        # {filename: (size, mtime_ns, digest)}
+        self.files = dict()
+        # {sample_id: (digest, index in the info file)}
+        self.samples = dict()
+        if osp.isfile(path):
+            manifest = mmcv.load(path, file_format='pkl')
+            self.files = manifest['files']
+            info_stat = self._info_stat()
+            if info_stat is not None and \
+                    manifest.get('info_stat') == info_stat:
+                self.samples = manifest['samples']
+
+    def _info_stat(self):
+        """Get the size and modification time of the info file."""
+        try:
+            stat = os.stat(self.info_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def file_digest(self, filename):
+        """Get the digest of the content of a file.
+
+        Args:
+            filename (str): Path of the file.
+
+        Returns:
+            str: Digest of the file, or None if the file does not exist.
+        """
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return None
+        cached = self.files.get(filename)
+        if cached is not None and cached[:2] == (stat.st_size,
+                                                 stat.st_mtime_ns):
+            return cached[2]
+        sha1 = hashlib.sha1()
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(1024**2), b''):
+                sha1.update(block)
+        digest = sha1.hexdigest()
+        self.files[filename] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+    def sample_digest(self, filenames):
+        """Get the digest of a sample from its raw files and the options.
+
+        Args:
+            filenames (list[str]): Raw files of the sample. Missing files
+                are part of the digest too.
+
+        Returns:
+            str: Digest of the sample.
+        """
+        sha1 = hashlib.sha1(self.options_digest.encode())
+        for filename in filenames:
+            sha1.update(f'{filename}:{self.file_digest(filename)};'.encode())
+        return sha1.hexdigest()
+
+    def update(self, sample_ids, get_files, create_infos):
+        """Get the infos of samples, only creating the changed ones.
+
+        Args:
+            sample_ids (list): Ids of the samples.
+            get_files (callable): Function returning the raw files of a
+                sample id.
+            create_infos (callable): Function creating the infos of a list
+                of sample ids, in the same order.
+
+        Returns:
+            list[dict]: Infos of the samples, in the order of `sample_ids`.
+        """
+        sample_files = [get_files(sample_id) for sample_id in sample_ids]
+        digests = [self.sample_digest(files) for files in sample_files]
+        # forget the files of the samples which are gone
+        used_files = set(f for files in sample_files for f in files)
+        self.files = {
+            filename: cached
+            for filename, cached in self.files.items()
+            if filename in used_files
+        }
+        stale = [
+            i
+            for i, (sample_id, digest) in enumerate(zip(sample_ids, digests))
+            if self.samples.get(sample_id, (None, ))[0] != digest
+        ]
+        print(f'Reuse the infos of {len(sample_ids) - len(stale)} samples, '
+              f'create the infos of {len(stale)} samples')
+        infos = [None] * len(sample_ids)
+        if len(stale) < len(sample_ids):
+            old_infos = mmcv.load(self.info_path, file_format='pkl')
+            for i in sorted(set(range(len(sample_ids))) - set(stale)):
+                infos[i] = old_infos[self.samples[sample_ids[i]][1]]
+        if len(stale) > 0:
+            new_infos = create_infos([sample_ids[i] for i in stale])
+            assert len(new_infos) == len(stale)
+            for i, info in zip(stale, new_infos):
+                infos[i] = info
+        # only keep the samples of this output, indexed as in `infos`
+        self.samples = {
+            sample_id: (digest, i)
+            for i, (sample_id, digest) in enumerate(zip(sample_ids, digests))
+        }
+        return infos
+
+    def dump(self):
+        """Save the manifest, after the infos are saved to the info file."""
+        tmp_path = f'{self.path}.tmp'
+        mmcv.dump(
+            dict(
+                files=self.files,
+                samples=self.samples,
+                info_stat=self._info_stat()),
+            tmp_path,
+            file_format='pkl')
+        os.replace(tmp_path, self.path)
+
+
+def update_infos(info_path,
+                 sample_ids,
+                 get_files,
+                 create_infos,
+                 options=None,
+                 incremental=False):
+    """Create the infos of samples and save them to the info file.
+
+    Args:
+        info_path (str): Path of the info file.
+        sample_ids (list): Ids of the samples.
+        get_files (callable): Function returning the raw files of a sample
+            id.
+        create_infos (callable): Function creating the infos of a list of
+            sample ids, in the same order.
+        options (dict, optional): Converter options the infos depend on.
+            Default: None.
+        incremental (bool, optional): Whether to keep an
+            :class:`InfoManifest` next to the info file and only create the
+            infos of the samples which changed since the last run. Otherwise
+            the infos of all the samples are created. Default: False.
+
+    Returns:
+        list[dict]: Infos of the samples, in the order of `sample_ids`.
+    """
+    info_path = str(info_path)
+    if not incremental:
+        infos = create_infos(sample_ids)
+        mmcv.dump(infos, info_path, file_format='pkl')
+        return infos
+    manifest = InfoManifest(f'{info_path}.manifest', info_path, options)
+    infos = manifest.update(sample_ids, get_files, create_infos)
+    mmcv.dump(infos, info_path, file_format='pkl')
+    manifest.dump()
+    return infos
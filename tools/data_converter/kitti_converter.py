@@ -1,13 +1,16 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 from collections import OrderedDict
+from functools import partial
 from pathlib import Path
 
 import mmcv
 import numpy as np
 from nuscenes.utils.geometry_utils import view_points
 
-from mmdet3d.core.bbox import box_np_ops, points_cam2img
-from .kitti_data_utils import WaymoInfoGatherer, get_kitti_image_info
+from mmdet3d.core.bbox import box_np_ops, points_cam2img, points_in_image
+from .info_manifest import update_infos
+from .kitti_data_utils import (WaymoInfoGatherer, get_kitti_image_info,
+                               get_kitti_sample_files)
 from .nuscenes_converter import post_process_coords
 
 kitti_categories = ('Pedestrian', 'Cyclist', 'Car')
@@ -80,9 +83,17 @@ class _NumPointsInGTCalculater:
             v_path = str(Path(self.data_path) / pc_info['velodyne_path'])
         else:
             v_path = pc_info['velodyne_path']
-        points_v = np.fromfile(
-            v_path, dtype=np.float32,
-            count=-1).reshape([-1, self.num_features])
+        if 'packed_range' in pc_info:
+            # only read the rows of the frame in the packed segment
+            start, end = pc_info['packed_range']
+            points_v = np.fromfile(
+                v_path,
+                dtype=np.float32,
+                count=(end - start) * self.num_features,
+                offset=start * self.num_features * 4)
+        else:
+            points_v = np.fromfile(v_path, dtype=np.float32, count=-1)
+        points_v = points_v.reshape([-1, self.num_features])
         rect = calib['R0_rect']
         Trv2c = calib['Tr_velo_to_cam']
         P2 = calib['P2']
@@ -158,7 +169,8 @@ def create_kitti_info_file(data_path,
                            pkl_prefix='kitti',
                            with_plane=False,
                            save_path=None,
-                           relative_path=True):
+                           relative_path=True,
+                           incremental=False):
     """Create info file of KITTI dataset.
 
     Given the raw data, generate its related info file in pkl format.
@@ -173,6 +185,10 @@ def create_kitti_info_file(data_path,
             Default: None.
         relative_path (bool, optional): Whether to use relative path.
             Default: True.
+        incremental (bool, optional): Whether to keep a manifest next to
+            each info file and only create the infos of the frames whose
+            raw files changed since the last run, see
+            :class:`InfoManifest`. Default: False.
     """
     imageset_folder = Path(data_path) / 'ImageSets'
     train_img_ids = _read_imageset_file(str(imageset_folder / 'train.txt'))
@@ -184,46 +200,50 @@ def create_kitti_info_file(data_path,
         save_path = Path(data_path)
     else:
         save_path = Path(save_path)
-    kitti_infos_train = get_kitti_image_info(
-        data_path,
-        training=True,
-        velodyne=True,
-        calib=True,
-        with_plane=with_plane,
-        image_ids=train_img_ids,
-        relative_path=relative_path)
-    _calculate_num_points_in_gt(data_path, kitti_infos_train, relative_path)
+
+    def create_infos(image_ids, training=True):
+        infos = get_kitti_image_info(
+            data_path,
+            training=training,
+            label_info=training,
+            velodyne=True,
+            calib=True,
+            with_plane=with_plane and training,
+            image_ids=image_ids,
+            relative_path=relative_path)
+        if training:
+            _calculate_num_points_in_gt(data_path, infos, relative_path)
+        return infos
+
+    def get_infos(image_ids, filename, training=True):
+        return update_infos(
+            filename,
+            image_ids,
+            partial(
+                get_kitti_sample_files,
+                data_path,
+                training=training,
+                label_info=training,
+                with_plane=with_plane and training),
+            partial(create_infos, training=training),
+            options=dict(
+                relative_path=relative_path,
+                with_plane=with_plane and training),
+            incremental=incremental)
+
     filename = save_path / f'{pkl_prefix}_infos_train.pkl'
+    kitti_infos_train = get_infos(train_img_ids, filename)
     print(f'Kitti info train file is saved to {filename}')
-    mmcv.dump(kitti_infos_train, filename)
-    kitti_infos_val = get_kitti_image_info(
-        data_path,
-        training=True,
-        velodyne=True,
-        calib=True,
-        with_plane=with_plane,
-        image_ids=val_img_ids,
-        relative_path=relative_path)
-    _calculate_num_points_in_gt(data_path, kitti_infos_val, relative_path)
     filename = save_path / f'{pkl_prefix}_infos_val.pkl'
+    kitti_infos_val = get_infos(val_img_ids, filename)
     print(f'Kitti info val file is saved to {filename}')
-    mmcv.dump(kitti_infos_val, filename)
     filename = save_path / f'{pkl_prefix}_infos_trainval.pkl'
     print(f'Kitti info trainval file is saved to {filename}')
     mmcv.dump(kitti_infos_train + kitti_infos_val, filename)
 
-    kitti_infos_test = get_kitti_image_info(
-        data_path,
-        training=False,
-        label_info=False,
-        velodyne=True,
-        calib=True,
-        with_plane=False,
-        image_ids=test_img_ids,
-        relative_path=relative_path)
     filename = save_path / f'{pkl_prefix}_infos_test.pkl'
+    get_infos(test_img_ids, filename, training=False)
     print(f'Kitti info test file is saved to {filename}')
-    mmcv.dump(kitti_infos_test, filename)
 
 
 def create_waymo_info_file(data_path,
@@ -231,7 +251,9 @@ def create_waymo_info_file(data_path,
                            save_path=None,
                            relative_path=True,
                            max_sweeps=5,
-                           workers=8):
+                           workers=8,
+                           packed=False,
+                           incremental=False):
     """Create info file of waymo dataset.
 
     Given the raw data, generate its related info file in pkl format.
@@ -246,6 +268,17 @@ def create_waymo_info_file(data_path,
             Default: True.
         max_sweeps (int, optional): Max sweeps before the detection frame
             to be used. Default: 5.
+        workers (int, optional): Number of processes gathering the infos.
+            Default: 8.
+        packed (bool, optional): Whether the data was converted in the
+            'packed' format of :obj:`Waymo2KITTI`. The infos then point
+            to the rows of each frame in the points of its segment.
+            Default: False.
+
+        incremental (bool, optional): Whether to keep a manifest next to
+            each info file and only create the infos of the frames whose
+            raw files changed since the last run, see
+            :class:`InfoManifest`. Default: False.
     """
     imageset_folder = Path(data_path) / 'ImageSets'
     train_img_ids = _read_imageset_file(str(imageset_folder / 'train.txt'))
@@ -265,7 +298,8 @@ def create_waymo_info_file(data_path,
         pose=True,
         relative_path=relative_path,
         max_sweeps=max_sweeps,
-        num_worker=workers)
+        num_worker=workers,
+        packed=packed)
     waymo_infos_gatherer_test = WaymoInfoGatherer(
         data_path,
         training=False,
@@ -275,7 +309,8 @@ def create_waymo_info_file(data_path,
         pose=True,
         relative_path=relative_path,
         max_sweeps=max_sweeps,
-        num_worker=workers)
+        num_worker=workers,
+        packed=packed)
     num_points_in_gt_calculater = _NumPointsInGTCalculater(
         data_path,
         relative_path,
@@ -283,23 +318,97 @@ def create_waymo_info_file(data_path,
         remove_outside=False,
         num_worker=workers)
 
-    waymo_infos_train = waymo_infos_gatherer_trainval.gather(train_img_ids)
-    num_points_in_gt_calculater.calculate(waymo_infos_train)
+    def get_infos(image_ids, filename, gatherer, with_num_points=True):
+
+        def create_infos(image_ids):
+            infos = gatherer.gather(image_ids)
+            if with_num_points:
+                num_points_in_gt_calculater.calculate(infos)
+            return infos
+
+        return update_infos(
+            filename,
+            image_ids,
+            gatherer.get_sample_files,
+            create_infos,
+            options=dict(
+                relative_path=relative_path,
+                max_sweeps=max_sweeps,
+                packed=packed),
+            incremental=incremental)
+
     filename = save_path / f'{pkl_prefix}_infos_train.pkl'
+    waymo_infos_train = get_infos(train_img_ids, filename,
+                                  waymo_infos_gatherer_trainval)
     print(f'Waymo info train file is saved to {filename}')
-    mmcv.dump(waymo_infos_train, filename)
-    waymo_infos_val = waymo_infos_gatherer_trainval.gather(val_img_ids)
-    num_points_in_gt_calculater.calculate(waymo_infos_val)
     filename = save_path / f'{pkl_prefix}_infos_val.pkl'
+    waymo_infos_val = get_infos(val_img_ids, filename,
+                                waymo_infos_gatherer_trainval)
     print(f'Waymo info val file is saved to {filename}')
-    mmcv.dump(waymo_infos_val, filename)
     filename = save_path / f'{pkl_prefix}_infos_trainval.pkl'
     print(f'Waymo info trainval file is saved to {filename}')
     mmcv.dump(waymo_infos_train + waymo_infos_val, filename)
-    waymo_infos_test = waymo_infos_gatherer_test.gather(test_img_ids)
     filename = save_path / f'{pkl_prefix}_infos_test.pkl'
+    get_infos(
+        test_img_ids,
+        filename,
+        waymo_infos_gatherer_test,
+        with_num_points=False)
     print(f'Waymo info test file is saved to {filename}')
-    mmcv.dump(waymo_infos_test, filename)
+
+
+def _reduce_point_cloud(info,
+                        data_path,
+                        save_path=None,
+                        back=False,
+                        num_features=4,
+                        front_camera_id=2):
+    """Create the reduced point cloud of a frame.
+
+    The points are projected with ``P @ R0_rect @ Tr_velo_to_cam`` and those
+    outside of the image of the front camera are removed, see
+    :func:`points_in_image`. The result is written right away.
+
+    Args:
+        info (dict): Info of the frame.
+        data_path (str): Path of original data.
+        save_path (str, optional): Path to save reduced point cloud
+            data. Default: None.
+        back (bool, optional): Whether to flip the points to back.
+            Default: False.
+        num_features (int, optional): Number of point features. Default: 4.
+        front_camera_id (int, optional): The referenced/front camera ID.
+            Default: 2.
+
+    Returns:
+        int: Number of points kept.
+    """
+    pc_info = info['point_cloud']
+    image_info = info['image']
+    calib = info['calib']
+
+    v_path = pc_info['velodyne_path']
+    v_path = Path(data_path) / v_path
+    points_v = np.fromfile(
+        str(v_path), dtype=np.float32, count=-1).reshape([-1, num_features])
+    rect = calib['R0_rect']
+    P2 = calib[f'P{str(front_camera_id)}']
+    Trv2c = calib['Tr_velo_to_cam']
+    if back:
+        points_v[:, 0] = -points_v[:, 0]
+    points_v = points_v[points_in_image(points_v, P2 @ rect @ Trv2c,
+                                        image_info['image_shape'])]
+    if save_path is None:
+        save_dir = v_path.parent.parent / (v_path.parent.stem + '_reduced')
+        save_dir.mkdir(exist_ok=True)
+        save_filename = str(save_dir / v_path.name)
+    else:
+        save_filename = str(Path(save_path) / v_path.name)
+    if back:
+        save_filename += '_back'
+    with open(save_filename, 'w') as f:
+        points_v.tofile(f)
+    return len(points_v)
 
 
 def _create_reduced_point_cloud(data_path,
@@ -307,9 +416,13 @@ def _create_reduced_point_cloud(data_path,
                                 save_path=None,
                                 back=False,
                                 num_features=4,
-                                front_camera_id=2):
+                                front_camera_id=2,
+                                workers=1):
     """Create reduced point clouds for given info.
 
+    Each frame is written as soon as it is reduced, so the point clouds are
+    never kept in memory.
+
     Args:
         data_path (str): Path of original data.
         info_path (str): Path of data info.
@@ -320,47 +433,21 @@ def _create_reduced_point_cloud(data_path,
         num_features (int, optional): Number of point features. Default: 4.
         front_camera_id (int, optional): The referenced/front camera ID.
             Default: 2.
+        workers (int, optional): Number of processes. Default: 1.
     """
     kitti_infos = mmcv.load(info_path)
-
-    for info in mmcv.track_iter_progress(kitti_infos):
-        pc_info = info['point_cloud']
-        image_info = info['image']
-        calib = info['calib']
-
-        v_path = pc_info['velodyne_path']
-        v_path = Path(data_path) / v_path
-        points_v = np.fromfile(
-            str(v_path), dtype=np.float32,
-            count=-1).reshape([-1, num_features])
-        rect = calib['R0_rect']
-        if front_camera_id == 2:
-            P2 = calib['P2']
-        else:
-            P2 = calib[f'P{str(front_camera_id)}']
-        Trv2c = calib['Tr_velo_to_cam']
-        # first remove z < 0 points
-        # keep = points_v[:, -1] > 0
-        # points_v = points_v[keep]
-        # then remove outside.
-        if back:
-            points_v[:, 0] = -points_v[:, 0]
-        points_v = box_np_ops.remove_outside_points(points_v, rect, Trv2c, P2,
-                                                    image_info['image_shape'])
-        if save_path is None:
-            save_dir = v_path.parent.parent / (v_path.parent.stem + '_reduced')
-            if not save_dir.exists():
-                save_dir.mkdir()
-            save_filename = save_dir / v_path.name
-            # save_filename = str(v_path) + '_reduced'
-            if back:
-                save_filename += '_back'
-        else:
-            save_filename = str(Path(save_path) / v_path.name)
-            if back:
-                save_filename += '_back'
-        with open(save_filename, 'w') as f:
-            points_v.tofile(f)
+    reduce_func = partial(
+        _reduce_point_cloud,
+        data_path=data_path,
+        save_path=save_path,
+        back=back,
+        num_features=num_features,
+        front_camera_id=front_camera_id)
+    if workers > 1:
+        mmcv.track_parallel_progress(reduce_func, kitti_infos, workers)
+    else:
+        for info in mmcv.track_iter_progress(kitti_infos):
+            reduce_func(info)
 
 
 def create_reduced_point_cloud(data_path,
@@ -369,7 +456,8 @@ def create_reduced_point_cloud(data_path,
                                val_info_path=None,
                                test_info_path=None,
                                save_path=None,
-                               with_back=False):
+                               with_back=False,
+                               workers=1):
     """Create reduced point clouds for training/validation/testing.
 
     Args:
@@ -385,6 +473,7 @@ def create_reduced_point_cloud(data_path,
             Default: None.
         with_back (bool, optional): Whether to flip the points to back.
             Default: False.
+        workers (int, optional): Number of processes. Default: 1.
     """
     if train_info_path is None:
         train_info_path = Path(data_path) / f'{pkl_prefix}_infos_train.pkl'
@@ -394,18 +483,21 @@ def create_reduced_point_cloud(data_path,
         test_info_path = Path(data_path) / f'{pkl_prefix}_infos_test.pkl'
 
     print('create reduced point cloud for training set')
-    _create_reduced_point_cloud(data_path, train_info_path, save_path)
+    _create_reduced_point_cloud(
+        data_path, train_info_path, save_path, workers=workers)
     print('create reduced point cloud for validation set')
-    _create_reduced_point_cloud(data_path, val_info_path, save_path)
+    _create_reduced_point_cloud(
+        data_path, val_info_path, save_path, workers=workers)
     print('create reduced point cloud for testing set')
-    _create_reduced_point_cloud(data_path, test_info_path, save_path)
+    _create_reduced_point_cloud(
+        data_path, test_info_path, save_path, workers=workers)
     if with_back:
         _create_reduced_point_cloud(
-            data_path, train_info_path, save_path, back=True)
+            data_path, train_info_path, save_path, back=True, workers=workers)
         _create_reduced_point_cloud(
-            data_path, val_info_path, save_path, back=True)
+            data_path, val_info_path, save_path, back=True, workers=workers)
         _create_reduced_point_cloud(
-            data_path, test_info_path, save_path, back=True)
+            data_path, test_info_path, save_path, back=True, workers=workers)
 
 
 def export_2d_annotation(root_path, info_path, mono3d=True):
@@ -113,6 +113,28 @@ def get_timestamp_path(idx,
                                relative_path, exist_check, use_prefix_id)
 
 
+def get_packed_path(idx,
+                    prefix,
+                    training=True,
+                    relative_path=True,
+                    exist_check=True,
+                    file_tail='.bin'):
+    """Get the path of the packed Waymo segment of a frame.
+
+    The frames of a segment share the index without its last three digits,
+    see :obj:`Waymo2KITTI`.
+    """
+    prefix = Path(prefix)
+    file_path = Path('training' if training else 'testing') / 'packed' / \
+        f'{idx // 1000:04d}{file_tail}'
+    if exist_check and not (prefix / file_path).exists():
+        raise ValueError('file not exist: {}'.format(file_path))
+    if relative_path:
+        return str(file_path)
+    else:
+        return str(prefix / file_path)
+
+
 def get_label_anno(label_path):
     annotations = {}
     annotations.update({
@@ -294,6 +316,44 @@ def get_kitti_image_info(path,
     return list(image_infos)
 
 
+def get_kitti_sample_files(path,
+                           idx,
+                           training=True,
+                           label_info=True,
+                           velodyne=True,
+                           calib=True,
+                           with_plane=False):
+    """Get the raw files the info of a KITTI frame is created from.
+
+    Args:
+        path (str): Path of the data root.
+        idx (int): Index of the frame.
+        training (bool, optional): Whether the frame is in the training
+            set. Default: True.
+        label_info (bool, optional): Whether the labels are used.
+            Default: True.
+        velodyne (bool, optional): Whether the point cloud is used.
+            Default: True.
+        calib (bool, optional): Whether the calibration is used.
+            Default: True.
+        with_plane (bool, optional): Whether the plane is used.
+            Default: False.
+
+    Returns:
+        list[str]: Paths of the files, which may not exist.
+    """
+    files = [get_image_path(idx, path, training, False, False)]
+    if label_info:
+        files.append(get_label_path(idx, path, training, False, False))
+    if velodyne:
+        files.append(get_velodyne_path(idx, path, training, False, False))
+    if calib:
+        files.append(get_calib_path(idx, path, training, False, False))
+    if with_plane:
+        files.append(get_plane_path(idx, path, training, False, False))
+    return files
+
+
 class WaymoInfoGatherer:
     """
     Parallel version of waymo dataset information gathering.
@@ -336,7 +396,8 @@ class WaymoInfoGatherer:
                  num_worker=8,
                  relative_path=True,
                  with_imageshape=True,
-                 max_sweeps=5) -> None:
+                 max_sweeps=5,
+                 packed=False) -> None:
         self.path = path
         self.training = training
         self.label_info = label_info
@@ -348,6 +409,9 @@ class WaymoInfoGatherer:
         self.relative_path = relative_path
         self.with_imageshape = with_imageshape
         self.max_sweeps = max_sweeps
+        # read the frames from the shards of `Waymo2KITTI` saved in the
+        # 'packed' format instead of the KITTI-style files
+        self.packed = packed
 
     def gather_single(self, idx):
         root_path = Path(self.path)
@@ -498,12 +562,194 @@ class WaymoInfoGatherer:
 
         return info
 
+    def get_sample_files(self, idx):
+        """Get the raw files the info of a frame is created from.
+
+        They include the files of the previous frames used as sweeps, or
+        the packed files of the whole segment of the frame.
+
+        Args:
+            idx (int): Index of the frame.
+
+        Returns:
+            list[str]: Paths of the files, which may not exist.
+        """
+        files = [
+            get_image_path(
+                idx,
+                self.path,
+                self.training,
+                False,
+                False,
+                info_type='image_0',
+                use_prefix_id=True)
+        ]
+        if self.packed:
+            return files + [
+                get_packed_path(idx, self.path, self.training, False, False,
+                                file_tail) for file_tail in ['.bin', '.pkl']
+            ]
+        if self.label_info:
+            files.append(
+                get_label_path(
+                    idx,
+                    self.path,
+                    self.training,
+                    False,
+                    False,
+                    info_type='label_all',
+                    use_prefix_id=True))
+        if self.calib:
+            files.append(
+                get_calib_path(
+                    idx,
+                    self.path,
+                    self.training,
+                    False,
+                    False,
+                    use_prefix_id=True))
+        for prev_idx in range(idx, idx - self.max_sweeps - 1, -1):
+            for get_path in [
+                    get_velodyne_path, get_timestamp_path, get_pose_path
+            ]:
+                files.append(
+                    get_path(
+                        prev_idx,
+                        self.path,
+                        self.training,
+                        False,
+                        False,
+                        use_prefix_id=True))
+        return files
+
+    def gather_segment(self, image_ids):
+        """Gather the infos of frames of the same packed segment.
+
+        The infos are the same as those of :meth:`gather_single`, except
+        that the 'velodyne_path' of the frames and their sweeps is the
+        points file of the segment, and their points are the rows in
+        'packed_range' of this file.
+
+        Args:
+            image_ids (list[int]): Indices of frames of the same segment.
+
+        Returns:
+            list[dict]: Infos of the frames.
+        """
+        velodyne_path = get_packed_path(image_ids[0], self.path, self.training,
+                                        self.relative_path)
+        meta = mmcv.load(
+            get_packed_path(
+                image_ids[0],
+                self.path,
+                self.training,
+                relative_path=False,
+                file_tail='.pkl'))
+        rows = {
+            int(frame_idx): i
+            for i, frame_idx in enumerate(meta['frame_inds'])
+        }
+        offsets = meta['point_offsets']
+        labels = meta['labels']
+
+        infos = []
+        for idx in image_ids:
+            row = rows[idx % 1000]
+            info = {}
+            pc_info = {'num_features': meta['num_features']}
+            calib_info = {}
+
+            image_info = {'image_idx': idx}
+            if self.velodyne:
+                pc_info['velodyne_path'] = velodyne_path
+                pc_info['packed_range'] = offsets[row:row + 2].copy()
+                info['timestamp'] = meta['timestamps'][row]
+            image_info['image_path'] = get_image_path(
+                idx,
+                self.path,
+                self.training,
+                self.relative_path,
+                info_type='image_0',
+                use_prefix_id=True)
+            if self.with_imageshape:
+                # the shape of the front camera
+                image_info['image_shape'] = meta['image_shapes'][row, 0]
+            info['image'] = image_info
+            info['point_cloud'] = pc_info
+            if self.calib:
+                for i in range(5):
+                    P = meta['P'][row, i]
+                    if self.extend_matrix:
+                        P = _extend_matrix(P)
+                    calib_info[f'P{i}'] = P
+                if self.extend_matrix:
+                    rect = np.eye(4)
+                else:
+                    rect = np.eye(3)
+                Tr_velo_to_cam = meta['Tr_velo_to_cam'][row, 0]
+                if self.extend_matrix:
+                    Tr_velo_to_cam = _extend_matrix(Tr_velo_to_cam)
+                calib_info['R0_rect'] = rect
+                calib_info['Tr_velo_to_cam'] = Tr_velo_to_cam
+                info['calib'] = calib_info
+            if self.pose:
+                info['pose'] = meta['poses'][row]
+
+            if self.label_info and labels is not None:
+                mask = labels['frame_inds'] == idx % 1000
+                annotations = {
+                    key: labels[key][mask]
+                    for key in [
+                        'name', 'truncated', 'occluded', 'alpha', 'bbox',
+                        'dimensions', 'location', 'rotation_y', 'camera_id'
+                    ]
+                }
+                num_gt = len(annotations['name'])
+                num_objects = int((annotations['name'] != 'DontCare').sum())
+                index = list(range(num_objects)) + [-1] * (
+                    num_gt - num_objects)
+                annotations['index'] = np.array(index, dtype=np.int32)
+                annotations['group_ids'] = np.arange(num_gt, dtype=np.int32)
+                info['annos'] = annotations
+                add_difficulty_to_annos(info)
+
+            sweeps = []
+            prev_idx = idx
+            while len(sweeps) < self.max_sweeps:
+                prev_idx -= 1
+                prev_row = rows.get(prev_idx % 1000)
+                if prev_idx // 1000 != idx // 1000 or prev_row is None:
+                    break
+                sweeps.append(
+                    dict(
+                        velodyne_path=velodyne_path,
+                        packed_range=offsets[prev_row:prev_row + 2].copy(),
+                        timestamp=meta['timestamps'][prev_row],
+                        pose=meta['poses'][prev_row]))
+            info['sweeps'] = sweeps
+            infos.append(info)
+        return infos
+
     def gather(self, image_ids):
         if not isinstance(image_ids, list):
             image_ids = list(range(image_ids))
-        image_infos = mmcv.track_parallel_progress(self.gather_single,
-                                                   image_ids, self.num_worker)
-        return list(image_infos)
+        if not self.packed:
+            image_infos = mmcv.track_parallel_progress(self.gather_single,
+                                                       image_ids,
+                                                       self.num_worker)
+            return list(image_infos)
+
+        # one task per segment, which loads the metadata of the segment once
+        segments = OrderedDict()
+        for idx in image_ids:
+            segments.setdefault(idx // 1000, []).append(idx)
+        segment_infos = mmcv.track_parallel_progress(self.gather_segment,
+                                                     list(segments.values()),
+                                                     self.num_worker)
+        idx_to_info = {}
+        for ids, infos in zip(segments.values(), segment_infos):
+            idx_to_info.update(zip(ids, infos))
+        return [idx_to_info[idx] for idx in image_ids]
 
 
 def kitti_anno_to_label_file(annos, folder):
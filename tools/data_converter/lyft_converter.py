@@ -10,7 +10,7 @@ from pyquaternion import Quaternion
 
 from mmdet3d.datasets import LyftDataset
 from .nuscenes_converter import (get_2d_boxes, get_available_scenes,
-                                 obtain_sensor2top)
+                                 map_samples_by_scene, obtain_sensor2top)
 
 lyft_categories = ('car', 'truck', 'bus', 'emergency_vehicle', 'other_vehicle',
                    'motorcycle', 'bicycle', 'pedestrian', 'animal')
@@ -19,7 +19,8 @@ lyft_categories = ('car', 'truck', 'bus', 'emergency_vehicle', 'other_vehicle',
 def create_lyft_infos(root_path,
                       info_prefix,
                       version='v1.01-train',
-                      max_sweeps=10):
+                      max_sweeps=10,
+                      workers=1):
     """Create info file of lyft dataset.
 
     Given the raw data, generate its related info file in pkl format.
@@ -31,6 +32,8 @@ def create_lyft_infos(root_path,
             Default: 'v1.01-train'.
         max_sweeps (int, optional): Max number of sweeps.
             Default: 10.
+        workers (int, optional): Number of processes filling the infos.
+            Default: 1.
     """
     lyft = Lyft(
         data_path=osp.join(root_path, version),
@@ -69,7 +72,12 @@ def create_lyft_infos(root_path,
         print(f'train scene: {len(train_scenes)}, \
                 val scene: {len(val_scenes)}')
     train_lyft_infos, val_lyft_infos = _fill_trainval_infos(
-        lyft, train_scenes, val_scenes, test, max_sweeps=max_sweeps)
+        lyft,
+        train_scenes,
+        val_scenes,
+        test,
+        max_sweeps=max_sweeps,
+        workers=workers)
 
     metadata = dict(version=version)
     if test:
@@ -91,11 +99,120 @@ def create_lyft_infos(root_path,
         mmcv.dump(data, info_val_path)
 
 
+def _fill_sample_info(lyft, sample, test=False, max_sweeps=10):
+    """Generate the info of a sample from the raw data.
+
+    Args:
+        lyft (:obj:`LyftDataset`): Dataset class in the Lyft dataset.
+        sample (dict): Sample record of the devkit.
+        test (bool, optional): Whether use the test mode. In the test mode, no
+            annotations can be accessed. Default: False.
+        max_sweeps (int, optional): Max number of sweeps. Default: 10.
+
+    Returns:
+        dict: Information of the sample.
+    """
+    lidar_token = sample['data']['LIDAR_TOP']
+    sd_rec = lyft.get('sample_data', sample['data']['LIDAR_TOP'])
+    cs_record = lyft.get('calibrated_sensor',
+                         sd_rec['calibrated_sensor_token'])
+    pose_record = lyft.get('ego_pose', sd_rec['ego_pose_token'])
+    abs_lidar_path, boxes, _ = lyft.get_sample_data(lidar_token)
+    # nuScenes devkit returns more convenient relative paths while
+    # lyft devkit returns absolute paths
+    abs_lidar_path = str(abs_lidar_path)  # absolute path
+    lidar_path = abs_lidar_path.split(f'{os.getcwd()}/')[-1]
+    # relative path
+
+    mmcv.check_file_exist(lidar_path)
+
+    info = {
+        'lidar_path': lidar_path,
+        'token': sample['token'],
+        'sweeps': [],
+        'cams': dict(),
+        'lidar2ego_translation': cs_record['translation'],
+        'lidar2ego_rotation': cs_record['rotation'],
+        'ego2global_translation': pose_record['translation'],
+        'ego2global_rotation': pose_record['rotation'],
+        'timestamp': sample['timestamp'],
+        'scene_token': sample['scene_token'],
+    }
+
+    l2e_r = info['lidar2ego_rotation']
+    l2e_t = info['lidar2ego_translation']
+    e2g_r = info['ego2global_rotation']
+    e2g_t = info['ego2global_translation']
+    l2e_r_mat = Quaternion(l2e_r).rotation_matrix
+    e2g_r_mat = Quaternion(e2g_r).rotation_matrix
+
+    # obtain 6 image's information per frame
+    camera_types = [
+        'CAM_FRONT',
+        'CAM_FRONT_RIGHT',
+        'CAM_FRONT_LEFT',
+        'CAM_BACK',
+        'CAM_BACK_LEFT',
+        'CAM_BACK_RIGHT',
+    ]
+    for cam in camera_types:
+        cam_token = sample['data'][cam]
+        cam_path, _, cam_intrinsic = lyft.get_sample_data(cam_token)
+        cam_info = obtain_sensor2top(lyft, cam_token, l2e_t, l2e_r_mat, e2g_t,
+                                     e2g_r_mat, cam)
+        cam_info.update(cam_intrinsic=cam_intrinsic)
+        info['cams'].update({cam: cam_info})
+
+    # obtain sweeps for a single key-frame
+    sd_rec = lyft.get('sample_data', sample['data']['LIDAR_TOP'])
+    sweeps = []
+    while len(sweeps) < max_sweeps:
+        if not sd_rec['prev'] == '':
+            sweep = obtain_sensor2top(lyft, sd_rec['prev'], l2e_t, l2e_r_mat,
+                                      e2g_t, e2g_r_mat, 'lidar')
+            sweeps.append(sweep)
+            sd_rec = lyft.get('sample_data', sd_rec['prev'])
+        else:
+            break
+    info['sweeps'] = sweeps
+    # obtain annotation
+    if not test:
+        annotations = [
+            lyft.get('sample_annotation', token) for token in sample['anns']
+        ]
+        locs = np.array([b.center for b in boxes]).reshape(-1, 3)
+        dims = np.array([b.wlh for b in boxes]).reshape(-1, 3)
+        rots = np.array([b.orientation.yaw_pitch_roll[0]
+                         for b in boxes]).reshape(-1, 1)
+
+        names = [b.name for b in boxes]
+        for i in range(len(names)):
+            if names[i] in LyftDataset.NameMapping:
+                names[i] = LyftDataset.NameMapping[names[i]]
+        names = np.array(names)
+
+        # we need to convert box size to
+        # the format of our lidar coordinate system
+        # which is x_size, y_size, z_size (corresponding to l, w, h)
+        gt_boxes = np.concatenate([locs, dims[:, [1, 0, 2]], rots], axis=1)
+        assert len(gt_boxes) == len(
+            annotations), f'{len(gt_boxes)}, {len(annotations)}'
+        info['gt_boxes'] = gt_boxes
+        info['gt_names'] = names
+        info['num_lidar_pts'] = np.array(
+            [a['num_lidar_pts'] for a in annotations])
+        info['num_radar_pts'] = np.array(
+            [a['num_radar_pts'] for a in annotations])
+
+    return info
+
+
 def _fill_trainval_infos(lyft,
                          train_scenes,
                          val_scenes,
                          test=False,
-                         max_sweeps=10):
+                         max_sweeps=10,
+                         workers=1):
     """Generate the train/val infos from the raw data.
 
     Args:
@@ -105,6 +222,8 @@ def _fill_trainval_infos(lyft,
         test (bool, optional): Whether use the test mode. In the test mode, no
             annotations can be accessed. Default: False.
         max_sweeps (int, optional): Max number of sweeps. Default: 10.
+        workers (int, optional): Number of processes, see
+            :func:`map_samples_by_scene`. Default: 1.
 
     Returns:
         tuple[list[dict]]: Information of training set and
@@ -113,100 +232,15 @@ def _fill_trainval_infos(lyft,
     train_lyft_infos = []
     val_lyft_infos = []
 
-    for sample in mmcv.track_iter_progress(lyft.sample):
-        lidar_token = sample['data']['LIDAR_TOP']
-        sd_rec = lyft.get('sample_data', sample['data']['LIDAR_TOP'])
-        cs_record = lyft.get('calibrated_sensor',
-                             sd_rec['calibrated_sensor_token'])
-        pose_record = lyft.get('ego_pose', sd_rec['ego_pose_token'])
-        abs_lidar_path, boxes, _ = lyft.get_sample_data(lidar_token)
-        # nuScenes devkit returns more convenient relative paths while
-        # lyft devkit returns absolute paths
-        abs_lidar_path = str(abs_lidar_path)  # absolute path
-        lidar_path = abs_lidar_path.split(f'{os.getcwd()}/')[-1]
-        # relative path
-
-        mmcv.check_file_exist(lidar_path)
-
-        info = {
-            'lidar_path': lidar_path,
-            'token': sample['token'],
-            'sweeps': [],
-            'cams': dict(),
-            'lidar2ego_translation': cs_record['translation'],
-            'lidar2ego_rotation': cs_record['rotation'],
-            'ego2global_translation': pose_record['translation'],
-            'ego2global_rotation': pose_record['rotation'],
-            'timestamp': sample['timestamp'],
-        }
-
-        l2e_r = info['lidar2ego_rotation']
-        l2e_t = info['lidar2ego_translation']
-        e2g_r = info['ego2global_rotation']
-        e2g_t = info['ego2global_translation']
-        l2e_r_mat = Quaternion(l2e_r).rotation_matrix
-        e2g_r_mat = Quaternion(e2g_r).rotation_matrix
-
-        # obtain 6 image's information per frame
-        camera_types = [
-            'CAM_FRONT',
-            'CAM_FRONT_RIGHT',
-            'CAM_FRONT_LEFT',
-            'CAM_BACK',
-            'CAM_BACK_LEFT',
-            'CAM_BACK_RIGHT',
-        ]
-        for cam in camera_types:
-            cam_token = sample['data'][cam]
-            cam_path, _, cam_intrinsic = lyft.get_sample_data(cam_token)
-            cam_info = obtain_sensor2top(lyft, cam_token, l2e_t, l2e_r_mat,
-                                         e2g_t, e2g_r_mat, cam)
-            cam_info.update(cam_intrinsic=cam_intrinsic)
-            info['cams'].update({cam: cam_info})
-
-        # obtain sweeps for a single key-frame
-        sd_rec = lyft.get('sample_data', sample['data']['LIDAR_TOP'])
-        sweeps = []
-        while len(sweeps) < max_sweeps:
-            if not sd_rec['prev'] == '':
-                sweep = obtain_sensor2top(lyft, sd_rec['prev'], l2e_t,
-                                          l2e_r_mat, e2g_t, e2g_r_mat, 'lidar')
-                sweeps.append(sweep)
-                sd_rec = lyft.get('sample_data', sd_rec['prev'])
-            else:
-                break
-        info['sweeps'] = sweeps
-        # obtain annotation
-        if not test:
-            annotations = [
-                lyft.get('sample_annotation', token)
-                for token in sample['anns']
-            ]
-            locs = np.array([b.center for b in boxes]).reshape(-1, 3)
-            dims = np.array([b.wlh for b in boxes]).reshape(-1, 3)
-            rots = np.array([b.orientation.yaw_pitch_roll[0]
-                             for b in boxes]).reshape(-1, 1)
-
-            names = [b.name for b in boxes]
-            for i in range(len(names)):
-                if names[i] in LyftDataset.NameMapping:
-                    names[i] = LyftDataset.NameMapping[names[i]]
-            names = np.array(names)
-
-            # we need to convert box size to
-            # the format of our lidar coordinate system
-            # which is x_size, y_size, z_size (corresponding to l, w, h)
-            gt_boxes = np.concatenate([locs, dims[:, [1, 0, 2]], rots], axis=1)
-            assert len(gt_boxes) == len(
-                annotations), f'{len(gt_boxes)}, {len(annotations)}'
-            info['gt_boxes'] = gt_boxes
-            info['gt_names'] = names
-            info['num_lidar_pts'] = np.array(
-                [a['num_lidar_pts'] for a in annotations])
-            info['num_radar_pts'] = np.array(
-                [a['num_radar_pts'] for a in annotations])
-
-        if sample['scene_token'] in train_scenes:
+    infos = map_samples_by_scene(
+        lyft,
+        lyft.sample,
+        _fill_sample_info,
+        workers,
+        test=test,
+        max_sweeps=max_sweeps)
+    for info in infos:
+        if info['scene_token'] in train_scenes:
             train_lyft_infos.append(info)
         else:
             val_lyft_infos.append(info)
@@ -214,13 +248,43 @@ def _fill_trainval_infos(lyft,
     return train_lyft_infos, val_lyft_infos
 
 
-def export_2d_annotation(root_path, info_path, version):
+def _export_sample_2d_annotation(lyft, info, camera_types):
+    """Get the image records and 2D annotations of the cameras of a sample.
+
+    Args:
+        lyft (:obj:`LyftDataset`): Dataset class in the Lyft dataset.
+        info (dict): Info of the sample.
+        camera_types (list[str]): Cameras to export.
+
+    Returns:
+        list[tuple]: Image record and 2D annotations of each camera.
+    """
+    records = []
+    for cam in camera_types:
+        cam_info = info['cams'][cam]
+        coco_infos = get_2d_boxes(
+            lyft,
+            cam_info['sample_data_token'],
+            visibilities=['', '1', '2', '3', '4'])
+        (height, width, _) = mmcv.imread(cam_info['data_path']).shape
+        image = dict(
+            file_name=cam_info['data_path'],
+            id=cam_info['sample_data_token'],
+            width=width,
+            height=height)
+        records.append((image, coco_infos))
+    return records
+
+
+def export_2d_annotation(root_path, info_path, version, workers=1):
     """Export 2d annotation from the info file and raw data.
 
     Args:
         root_path (str): Root path of the raw data.
         info_path (str): Path of the info file.
         version (str): Dataset version.
+        workers (int, optional): Number of processes, see
+            :func:`map_samples_by_scene`. Default: 1.
     """
     warning.warn('DeprecationWarning: 2D annotations are not used on the '
                  'Lyft dataset. The function export_2d_annotation will be '
@@ -246,20 +310,15 @@ def export_2d_annotation(root_path, info_path, version):
     ]
     coco_ann_id = 0
     coco_2d_dict = dict(annotations=[], images=[], categories=cat2Ids)
-    for info in mmcv.track_iter_progress(lyft_infos):
-        for cam in camera_types:
-            cam_info = info['cams'][cam]
-            coco_infos = get_2d_boxes(
-                lyft,
-                cam_info['sample_data_token'],
-                visibilities=['', '1', '2', '3', '4'])
-            (height, width, _) = mmcv.imread(cam_info['data_path']).shape
-            coco_2d_dict['images'].append(
-                dict(
-                    file_name=cam_info['data_path'],
-                    id=cam_info['sample_data_token'],
-                    width=width,
-                    height=height))
+    sample_records = map_samples_by_scene(
+        lyft,
+        lyft_infos,
+        _export_sample_2d_annotation,
+        workers,
+        camera_types=camera_types)
+    for records in sample_records:
+        for image, coco_infos in records:
+            coco_2d_dict['images'].append(image)
             for coco_info in coco_infos:
                 if coco_info is None:
                     continue
@@ -1,5 +1,6 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import os
+import warnings
 from collections import OrderedDict
 from os import path as osp
 from typing import List, Tuple, Union
@@ -13,6 +14,7 @@ from shapely.geometry import MultiPoint, box
 
 from mmdet3d.core.bbox import points_cam2img
 from mmdet3d.datasets import NuScenesDataset
+from mmdet3d.utils import track_parallel_progress_with_state
 
 nus_categories = ('car', 'truck', 'trailer', 'bus', 'construction_vehicle',
                   'bicycle', 'motorcycle', 'pedestrian', 'traffic_cone',
@@ -27,7 +29,8 @@ nus_attributes = ('cycle.with_rider', 'cycle.without_rider',
 def create_nuscenes_infos(root_path,
                           info_prefix,
                           version='v1.0-trainval',
-                          max_sweeps=10):
+                          max_sweeps=10,
+                          workers=1):
     """Create info file of nuscene dataset.
 
     Given the raw data, generate its related info file in pkl format.
@@ -39,6 +42,8 @@ def create_nuscenes_infos(root_path,
             Default: 'v1.0-trainval'.
         max_sweeps (int, optional): Max number of sweeps.
             Default: 10.
+        workers (int, optional): Number of processes filling the infos.
+            Default: 1.
     """
     from nuscenes.nuscenes import NuScenes
     nusc = NuScenes(version=version, dataroot=root_path, verbose=True)
@@ -79,7 +84,12 @@ def create_nuscenes_infos(root_path,
         print('train scene: {}, val scene: {}'.format(
             len(train_scenes), len(val_scenes)))
     train_nusc_infos, val_nusc_infos = _fill_trainval_infos(
-        nusc, train_scenes, val_scenes, test, max_sweeps=max_sweeps)
+        nusc,
+        train_scenes,
+        val_scenes,
+        test,
+        max_sweeps=max_sweeps,
+        workers=workers)
 
     metadata = dict(version=version)
     if test:
@@ -142,11 +152,195 @@ def get_available_scenes(nusc):
     return available_scenes
 
 
+def _process_scene_chunk(map_args, inds):
+    """Process a chunk of samples, see :func:`map_samples_by_scene`."""
+    nusc, samples, func, kwargs = map_args
+    return [func(nusc, samples[i], **kwargs) for i in inds]
+
+
+def map_samples_by_scene(nusc, samples, func, workers=1, **kwargs):
+    """Apply a function to each sample with several processes.
+
+    The samples are partitioned by scene, so that each worker processes
+    whole scenes whose sample data and sweeps are close in the devkit
+    tables. The samples without 'scene_token', e.g. infos created before it
+    was added, are partitioned by index instead. The devkit is sent once to
+    each worker instead of with every task. The results are in the order of
+    the samples whatever the number of workers.
+
+    Args:
+        nusc (:obj:`NuScenes`): Dataset class in the nuScenes dataset, or in
+            the Lyft dataset.
+        samples (list[dict]): Samples or infos, with their 'scene_token'.
+        func (callable): Function called as ``func(nusc, sample,
+            **kwargs)``. It must be picklable, e.g. defined at the top level
+            of a module.
+        workers (int, optional): Number of processes. Default: 1.
+
+    Returns:
+        list: Results of each sample.
+    """
+    if workers <= 1 or len(samples) == 0:
+        return [
+            func(nusc, sample, **kwargs)
+            for sample in mmcv.track_iter_progress(samples)
+        ]
+    # about 4 chunks per worker
+    chunk_size = max(1, -(-len(samples) // (workers * 4)))
+    if any(sample.get('scene_token') is None for sample in samples):
+        warnings.warn('The samples have no scene token, e.g. infos created '
+                      'before it was added, thus they are partitioned by '
+                      'index instead of by scene.')
+        chunks = [
+            list(range(i, min(i + chunk_size, len(samples))))
+            for i in range(0, len(samples), chunk_size)
+        ]
+    else:
+        scenes = OrderedDict()
+        for i, sample in enumerate(samples):
+            scenes.setdefault(sample['scene_token'], []).append(i)
+        # chunks of whole scenes
+        chunks = [[]]
+        for inds in scenes.values():
+            if len(chunks[-1]) >= chunk_size:
+                chunks.append([])
+            chunks[-1].extend(inds)
+    chunk_results = track_parallel_progress_with_state(
+        _process_scene_chunk, (nusc, samples, func, kwargs), chunks, workers)
+    results = [None] * len(samples)
+    for inds, chunk_result in zip(chunks, chunk_results):
+        for i, result in zip(inds, chunk_result):
+            results[i] = result
+    return results
+
+
+def _fill_sample_info(nusc, sample, test=False, max_sweeps=10):
+    """Generate the info of a sample from the raw data.
+
+    Args:
+        nusc (:obj:`NuScenes`): Dataset class in the nuScenes dataset.
+        sample (dict): Sample record of the devkit.
+        test (bool, optional): Whether use the test mode. In test mode, no
+            annotations can be accessed. Default: False.
+        max_sweeps (int, optional): Max number of sweeps. Default: 10.
+
+    Returns:
+        dict: Information of the sample.
+    """
+    lidar_token = sample['data']['LIDAR_TOP']
+    sd_rec = nusc.get('sample_data', sample['data']['LIDAR_TOP'])
+    cs_record = nusc.get('calibrated_sensor',
+                         sd_rec['calibrated_sensor_token'])
+    pose_record = nusc.get('ego_pose', sd_rec['ego_pose_token'])
+    lidar_path, boxes, _ = nusc.get_sample_data(lidar_token)
+
+    mmcv.check_file_exist(lidar_path)
+
+    info = {
+        'lidar_path': lidar_path,
+        'token': sample['token'],
+        'sweeps': [],
+        'cams': dict(),
+        'lidar2ego_translation': cs_record['translation'],
+        'lidar2ego_rotation': cs_record['rotation'],
+        'ego2global_translation': pose_record['translation'],
+        'ego2global_rotation': pose_record['rotation'],
+        'timestamp': sample['timestamp'],
+        'scene_token': sample['scene_token'],
+    }
+
+    l2e_r = info['lidar2ego_rotation']
+    l2e_t = info['lidar2ego_translation']
+    e2g_r = info['ego2global_rotation']
+    e2g_t = info['ego2global_translation']
+    l2e_r_mat = Quaternion(l2e_r).rotation_matrix
+    e2g_r_mat = Quaternion(e2g_r).rotation_matrix
+
+    # obtain 6 image's information per frame
+    camera_types = [
+        'CAM_FRONT',
+        'CAM_FRONT_RIGHT',
+        'CAM_FRONT_LEFT',
+        'CAM_BACK',
+        'CAM_BACK_LEFT',
+        'CAM_BACK_RIGHT',
+    ]
+    for cam in camera_types:
+        cam_token = sample['data'][cam]
+        cam_path, _, cam_intrinsic = nusc.get_sample_data(cam_token)
+        cam_info = obtain_sensor2top(nusc, cam_token, l2e_t, l2e_r_mat, e2g_t,
+                                     e2g_r_mat, cam)
+        cam_info.update(cam_intrinsic=cam_intrinsic)
+        info['cams'].update({cam: cam_info})
+
+    # obtain sweeps for a single key-frame
+    sd_rec = nusc.get('sample_data', sample['data']['LIDAR_TOP'])
+    sweeps = []
+    while len(sweeps) < max_sweeps:
+        if not sd_rec['prev'] == '':
+            sweep = obtain_sensor2top(nusc, sd_rec['prev'], l2e_t, l2e_r_mat,
+                                      e2g_t, e2g_r_mat, 'lidar')
+            sweeps.append(sweep)
+            sd_rec = nusc.get('sample_data', sd_rec['prev'])
+        else:
+            break
+    info['sweeps'] = sweeps
+    # obtain annotation
+    if not test:
+        annotations = [
+            nusc.get('sample_annotation', token) for token in sample['anns']
+        ]
+        locs = np.array([b.center for b in boxes]).reshape(-1, 3)
+        dims = np.array([b.wlh for b in boxes]).reshape(-1, 3)
+        rots = np.array([b.orientation.yaw_pitch_roll[0]
+                         for b in boxes]).reshape(-1, 1)
+        velocity = np.array(
+            [nusc.box_velocity(token)[:2] for token in sample['anns']])
+        valid_flag = np.array(
+            [(anno['num_lidar_pts'] + anno['num_radar_pts']) > 0
+             for anno in annotations],
+            dtype=bool).reshape(-1)
+        # convert velo from global to lidar
+        for i in range(len(boxes)):
+            velo = np.array([*velocity[i], 0.0])
+            velo = velo @ np.linalg.inv(e2g_r_mat).T @ np.linalg.inv(
+                l2e_r_mat).T
+            velocity[i] = velo[:2]
+
+        names = [b.name for b in boxes]
+        for i in range(len(names)):
+            if names[i] in NuScenesDataset.NameMapping:
+                names[i] = NuScenesDataset.NameMapping[names[i]]
+        names = np.array(names)
+        # we need to convert box size to
+        # the format of our lidar coordinate system
+        # which is x_size, y_size, z_size (corresponding to l, w, h)
+        gt_boxes = np.concatenate([locs, dims[:, [1, 0, 2]], rots], axis=1)
+        assert len(gt_boxes) == len(
+            annotations), f'{len(gt_boxes)}, {len(annotations)}'
+        info['gt_boxes'] = gt_boxes
+        info['gt_names'] = names
+        info['gt_velocity'] = velocity.reshape(-1, 2)
+        info['num_lidar_pts'] = np.array(
+            [a['num_lidar_pts'] for a in annotations])
+        info['num_radar_pts'] = np.array(
+            [a['num_radar_pts'] for a in annotations])
+        info['valid_flag'] = valid_flag
+        # attributes of the boxes, used by the native evaluation
+        info['gt_attr_names'] = np.array([
+            nusc.get('attribute', a['attribute_tokens'][0])['name']
+            if len(a['attribute_tokens']) > 0 else '' for a in annotations
+        ])
+
+    return info
+
+
 def _fill_trainval_infos(nusc,
                          train_scenes,
                          val_scenes,
                          test=False,
-                         max_sweeps=10):
+                         max_sweeps=10,
+                         workers=1):
     """Generate the train/val infos from the raw data.
 
     Args:
@@ -156,6 +350,8 @@ def _fill_trainval_infos(nusc,
         test (bool, optional): Whether use the test mode. In test mode, no
             annotations can be accessed. Default: False.
         max_sweeps (int, optional): Max number of sweeps. Default: 10.
+        workers (int, optional): Number of processes, see
+            :func:`map_samples_by_scene`. Default: 1.
 
     Returns:
         tuple[list[dict]]: Information of training set and validation set
@@ -164,108 +360,15 @@ def _fill_trainval_infos(nusc,
     train_nusc_infos = []
     val_nusc_infos = []
 
-    for sample in mmcv.track_iter_progress(nusc.sample):
-        lidar_token = sample['data']['LIDAR_TOP']
-        sd_rec = nusc.get('sample_data', sample['data']['LIDAR_TOP'])
-        cs_record = nusc.get('calibrated_sensor',
-                             sd_rec['calibrated_sensor_token'])
-        pose_record = nusc.get('ego_pose', sd_rec['ego_pose_token'])
-        lidar_path, boxes, _ = nusc.get_sample_data(lidar_token)
-
-        mmcv.check_file_exist(lidar_path)
-
-        info = {
-            'lidar_path': lidar_path,
-            'token': sample['token'],
-            'sweeps': [],
-            'cams': dict(),
-            'lidar2ego_translation': cs_record['translation'],
-            'lidar2ego_rotation': cs_record['rotation'],
-            'ego2global_translation': pose_record['translation'],
-            'ego2global_rotation': pose_record['rotation'],
-            'timestamp': sample['timestamp'],
-        }
-
-        l2e_r = info['lidar2ego_rotation']
-        l2e_t = info['lidar2ego_translation']
-        e2g_r = info['ego2global_rotation']
-        e2g_t = info['ego2global_translation']
-        l2e_r_mat = Quaternion(l2e_r).rotation_matrix
-        e2g_r_mat = Quaternion(e2g_r).rotation_matrix
-
-        # obtain 6 image's information per frame
-        camera_types = [
-            'CAM_FRONT',
-            'CAM_FRONT_RIGHT',
-            'CAM_FRONT_LEFT',
-            'CAM_BACK',
-            'CAM_BACK_LEFT',
-            'CAM_BACK_RIGHT',
-        ]
-        for cam in camera_types:
-            cam_token = sample['data'][cam]
-            cam_path, _, cam_intrinsic = nusc.get_sample_data(cam_token)
-            cam_info = obtain_sensor2top(nusc, cam_token, l2e_t, l2e_r_mat,
-                                         e2g_t, e2g_r_mat, cam)
-            cam_info.update(cam_intrinsic=cam_intrinsic)
-            info['cams'].update({cam: cam_info})
-
-        # obtain sweeps for a single key-frame
-        sd_rec = nusc.get('sample_data', sample['data']['LIDAR_TOP'])
-        sweeps = []
-        while len(sweeps) < max_sweeps:
-            if not sd_rec['prev'] == '':
-                sweep = obtain_sensor2top(nusc, sd_rec['prev'], l2e_t,
-                                          l2e_r_mat, e2g_t, e2g_r_mat, 'lidar')
-                sweeps.append(sweep)
-                sd_rec = nusc.get('sample_data', sd_rec['prev'])
-            else:
-                break
-        info['sweeps'] = sweeps
-        # obtain annotation
-        if not test:
-            annotations = [
-                nusc.get('sample_annotation', token)
-                for token in sample['anns']
-            ]
-            locs = np.array([b.center for b in boxes]).reshape(-1, 3)
-            dims = np.array([b.wlh for b in boxes]).reshape(-1, 3)
-            rots = np.array([b.orientation.yaw_pitch_roll[0]
-                             for b in boxes]).reshape(-1, 1)
-            velocity = np.array(
-                [nusc.box_velocity(token)[:2] for token in sample['anns']])
-            valid_flag = np.array(
-                [(anno['num_lidar_pts'] + anno['num_radar_pts']) > 0
-                 for anno in annotations],
-                dtype=bool).reshape(-1)
-            # convert velo from global to lidar
-            for i in range(len(boxes)):
-                velo = np.array([*velocity[i], 0.0])
-                velo = velo @ np.linalg.inv(e2g_r_mat).T @ np.linalg.inv(
-                    l2e_r_mat).T
-                velocity[i] = velo[:2]
-
-            names = [b.name for b in boxes]
-            for i in range(len(names)):
-                if names[i] in NuScenesDataset.NameMapping:
-                    names[i] = NuScenesDataset.NameMapping[names[i]]
-            names = np.array(names)
-            # we need to convert box size to
-            # the format of our lidar coordinate system
-            # which is x_size, y_size, z_size (corresponding to l, w, h)
-            gt_boxes = np.concatenate([locs, dims[:, [1, 0, 2]], rots], axis=1)
-            assert len(gt_boxes) == len(
-                annotations), f'{len(gt_boxes)}, {len(annotations)}'
-            info['gt_boxes'] = gt_boxes
-            info['gt_names'] = names
-            info['gt_velocity'] = velocity.reshape(-1, 2)
-            info['num_lidar_pts'] = np.array(
-                [a['num_lidar_pts'] for a in annotations])
-            info['num_radar_pts'] = np.array(
-                [a['num_radar_pts'] for a in annotations])
-            info['valid_flag'] = valid_flag
-
-        if sample['scene_token'] in train_scenes:
+    infos = map_samples_by_scene(
+        nusc,
+        nusc.sample,
+        _fill_sample_info,
+        workers,
+        test=test,
+        max_sweeps=max_sweeps)
+    for info in infos:
+        if info['scene_token'] in train_scenes:
             train_nusc_infos.append(info)
         else:
             val_nusc_infos.append(info)
@@ -334,7 +437,48 @@ def obtain_sensor2top(nusc,
     return sweep
 
 
-def export_2d_annotation(root_path, info_path, version, mono3d=True):
+def _export_sample_2d_annotation(nusc, info, camera_types, mono3d=True):
+    """Get the image records and 2D annotations of the cameras of a sample.
+
+    Args:
+        nusc (:obj:`NuScenes`): Dataset class in the nuScenes dataset.
+        info (dict): Info of the sample.
+        camera_types (list[str]): Cameras to export.
+        mono3d (bool, optional): Whether to export mono3d annotation.
+            Default: True.
+
+    Returns:
+        list[tuple]: Image record and 2D annotations of each camera.
+    """
+    records = []
+    for cam in camera_types:
+        cam_info = info['cams'][cam]
+        coco_infos = get_2d_boxes(
+            nusc,
+            cam_info['sample_data_token'],
+            visibilities=['', '1', '2', '3', '4'],
+            mono3d=mono3d)
+        (height, width, _) = mmcv.imread(cam_info['data_path']).shape
+        image = dict(
+            file_name=cam_info['data_path'].split('data/nuscenes/')[-1],
+            id=cam_info['sample_data_token'],
+            token=info['token'],
+            cam2ego_rotation=cam_info['sensor2ego_rotation'],
+            cam2ego_translation=cam_info['sensor2ego_translation'],
+            ego2global_rotation=info['ego2global_rotation'],
+            ego2global_translation=info['ego2global_translation'],
+            cam_intrinsic=cam_info['cam_intrinsic'],
+            width=width,
+            height=height)
+        records.append((image, coco_infos))
+    return records
+
+
+def export_2d_annotation(root_path,
+                         info_path,
+                         version,
+                         mono3d=True,
+                         workers=1):
     """Export 2d annotation from the info file and raw data.
 
     Args:
@@ -343,6 +487,8 @@ def export_2d_annotation(root_path, info_path, version, mono3d=True):
         version (str): Dataset version.
         mono3d (bool, optional): Whether to export mono3d annotation.
             Default: True.
+        workers (int, optional): Number of processes, see
+            :func:`map_samples_by_scene`. Default: 1.
     """
     # get bbox annotations for camera
     camera_types = [
@@ -362,28 +508,16 @@ def export_2d_annotation(root_path, info_path, version, mono3d=True):
     ]
     coco_ann_id = 0
     coco_2d_dict = dict(annotations=[], images=[], categories=cat2Ids)
-    for info in mmcv.track_iter_progress(nusc_infos):
-        for cam in camera_types:
-            cam_info = info['cams'][cam]
-            coco_infos = get_2d_boxes(
-                nusc,
-                cam_info['sample_data_token'],
-                visibilities=['', '1', '2', '3', '4'],
-                mono3d=mono3d)
-            (height, width, _) = mmcv.imread(cam_info['data_path']).shape
-            coco_2d_dict['images'].append(
-                dict(
-                    file_name=cam_info['data_path'].split('data/nuscenes/')
-                    [-1],
-                    id=cam_info['sample_data_token'],
-                    token=info['token'],
-                    cam2ego_rotation=cam_info['sensor2ego_rotation'],
-                    cam2ego_translation=cam_info['sensor2ego_translation'],
-                    ego2global_rotation=info['ego2global_rotation'],
-                    ego2global_translation=info['ego2global_translation'],
-                    cam_intrinsic=cam_info['cam_intrinsic'],
-                    width=width,
-                    height=height))
+    sample_records = map_samples_by_scene(
+        nusc,
+        nusc_infos,
+        _export_sample_2d_annotation,
+        workers,
+        camera_types=camera_types,
+        mono3d=mono3d)
+    for records in sample_records:
+        for image, coco_infos in records:
+            coco_2d_dict['images'].append(image)
             for coco_info in coco_infos:
                 if coco_info is None:
                     continue
@@ -1,11 +1,13 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import os
-from concurrent import futures as futures
+from functools import partial
 from os import path as osp
 
 import mmcv
 import numpy as np
 
+from tools.data_converter.stage_timer import StageTimer, process_scenes
+
 
 class S3DISData(object):
     """S3DIS data.
@@ -43,13 +45,89 @@ class S3DISData(object):
     def __len__(self):
         return len(self.sample_id_list)
 
+    def get_sample_files(self, sample_idx):
+        """Get the raw files the info of a scene is created from.
+
+        Args:
+            sample_idx (str): Index of the sample.
+
+        Returns:
+            list[str]: Paths of the files, which may not exist.
+        """
+        return [
+            osp.join(self.root_dir, 's3dis_data',
+                     f'{self.split}_{sample_idx}_{name}.npy')
+            for name in ['point', 'ins_label', 'sem_label']
+        ]
+
+    def process_single_scene(self, sample_idx, has_label=True, timer=None):
+        """Get the info of a scene and export its data.
+
+        Args:
+            sample_idx (str): Index of the sample.
+            has_label (bool, optional): Whether the data has label.
+                Default: True.
+            timer (:obj:`StageTimer`, optional): Timer of the stages of the
+                processing. Default: None.
+
+        Returns:
+            dict: Information of the scene.
+        """
+        timer = StageTimer() if timer is None else timer
+        info = dict()
+        pc_info = {
+            'num_features': 6,
+            'lidar_idx': f'{self.split}_{sample_idx}'
+        }
+        info['point_cloud'] = pc_info
+        pts_filename = osp.join(self.root_dir, 's3dis_data',
+                                f'{self.split}_{sample_idx}_point.npy')
+        pts_instance_mask_path = osp.join(
+            self.root_dir, 's3dis_data',
+            f'{self.split}_{sample_idx}_ins_label.npy')
+        pts_semantic_mask_path = osp.join(
+            self.root_dir, 's3dis_data',
+            f'{self.split}_{sample_idx}_sem_label.npy')
+
+        points = np.load(pts_filename).astype(np.float32)
+        pts_instance_mask = np.load(pts_instance_mask_path).astype(np.int)
+        pts_semantic_mask = np.load(pts_semantic_mask_path).astype(np.int)
+        timer.check('point loading')
+
+        mmcv.mkdir_or_exist(osp.join(self.root_dir, 'points'))
+        mmcv.mkdir_or_exist(osp.join(self.root_dir, 'instance_mask'))
+        mmcv.mkdir_or_exist(osp.join(self.root_dir, 'semantic_mask'))
+
+        points.tofile(
+            osp.join(self.root_dir, 'points',
+                     f'{self.split}_{sample_idx}.bin'))
+        timer.check('point export')
+        pts_instance_mask.tofile(
+            osp.join(self.root_dir, 'instance_mask',
+                     f'{self.split}_{sample_idx}.bin'))
+        pts_semantic_mask.tofile(
+            osp.join(self.root_dir, 'semantic_mask',
+                     f'{self.split}_{sample_idx}.bin'))
+        timer.check('mask export')
+
+        info['pts_path'] = osp.join('points', f'{self.split}_{sample_idx}.bin')
+        info['pts_instance_mask_path'] = osp.join(
+            'instance_mask', f'{self.split}_{sample_idx}.bin')
+        info['pts_semantic_mask_path'] = osp.join(
+            'semantic_mask', f'{self.split}_{sample_idx}.bin')
+        info['annos'] = self.get_bboxes(points, pts_instance_mask,
+                                        pts_semantic_mask)
+        timer.check('box computation')
+
+        return info
+
     def get_infos(self, num_workers=4, has_label=True, sample_id_list=None):
         """Get data infos.
 
         This method gets information from the raw data.
 
         Args:
-            num_workers (int, optional): Number of threads to be used.
+            num_workers (int, optional): Number of processes to be used.
                 Default: 4.
             has_label (bool, optional): Whether the data has label.
                 Default: True.
@@ -59,58 +137,13 @@ class S3DISData(object):
         Returns:
             infos (list[dict]): Information of the raw data.
         """
-
-        def process_single_scene(sample_idx):
-            print(f'{self.split} sample_idx: {sample_idx}')
-            info = dict()
-            pc_info = {
-                'num_features': 6,
-                'lidar_idx': f'{self.split}_{sample_idx}'
-            }
-            info['point_cloud'] = pc_info
-            pts_filename = osp.join(self.root_dir, 's3dis_data',
-                                    f'{self.split}_{sample_idx}_point.npy')
-            pts_instance_mask_path = osp.join(
-                self.root_dir, 's3dis_data',
-                f'{self.split}_{sample_idx}_ins_label.npy')
-            pts_semantic_mask_path = osp.join(
-                self.root_dir, 's3dis_data',
-                f'{self.split}_{sample_idx}_sem_label.npy')
-
-            points = np.load(pts_filename).astype(np.float32)
-            pts_instance_mask = np.load(pts_instance_mask_path).astype(np.int)
-            pts_semantic_mask = np.load(pts_semantic_mask_path).astype(np.int)
-
-            mmcv.mkdir_or_exist(osp.join(self.root_dir, 'points'))
-            mmcv.mkdir_or_exist(osp.join(self.root_dir, 'instance_mask'))
-            mmcv.mkdir_or_exist(osp.join(self.root_dir, 'semantic_mask'))
-
-            points.tofile(
-                osp.join(self.root_dir, 'points',
-                         f'{self.split}_{sample_idx}.bin'))
-            pts_instance_mask.tofile(
-                osp.join(self.root_dir, 'instance_mask',
-                         f'{self.split}_{sample_idx}.bin'))
-            pts_semantic_mask.tofile(
-                osp.join(self.root_dir, 'semantic_mask',
-                         f'{self.split}_{sample_idx}.bin'))
-
-            info['pts_path'] = osp.join('points',
-                                        f'{self.split}_{sample_idx}.bin')
-            info['pts_instance_mask_path'] = osp.join(
-                'instance_mask', f'{self.split}_{sample_idx}.bin')
-            info['pts_semantic_mask_path'] = osp.join(
-                'semantic_mask', f'{self.split}_{sample_idx}.bin')
-            info['annos'] = self.get_bboxes(points, pts_instance_mask,
-                                            pts_semantic_mask)
-
-            return info
-
-        sample_id_list = sample_id_list if sample_id_list is not None \
-            else self.sample_id_list
-        with futures.ThreadPoolExecutor(num_workers) as executor:
-            infos = executor.map(process_single_scene, sample_id_list)
-        return list(infos)
+        sample_id_list = list(sample_id_list if sample_id_list is not None else
+                              self.sample_id_list)
+        return process_scenes(
+            self.process_single_scene,
+            sample_id_list,
+            num_workers,
+            has_label=has_label)
 
     def get_bboxes(self, points, pts_instance_mask, pts_semantic_mask):
         """Convert instance masks to axis-aligned bounding boxes.
@@ -151,6 +184,16 @@ class S3DISData(object):
         return annotation
 
 
+def _count_labels(mask_path, cat_id2class, num_classes):
+    """Count the points of each label in the segmentation mask of a scene,
+    the last count being the points of the ignored classes."""
+    if mask_path.endswith('npy'):
+        mask = np.load(mask_path)
+    else:
+        mask = np.fromfile(mask_path, dtype=np.int64)
+    return np.bincount(cat_id2class[mask], minlength=num_classes + 1)
+
+
 class S3DISSegData(object):
     """S3DIS dataset used to generate infos for semantic segmentation task.
 
@@ -190,8 +233,9 @@ class S3DISSegData(object):
         self.label_weight_func = (lambda x: 1.0 / np.log(1.2 + x)) if \
             label_weight_func is None else label_weight_func
 
-    def get_seg_infos(self):
-        scene_idxs, label_weight = self.get_scene_idxs_and_label_weight()
+    def get_seg_infos(self, num_workers=1):
+        scene_idxs, label_weight = self.get_scene_idxs_and_label_weight(
+            num_workers)
         save_folder = osp.join(self.data_root, 'seg_info')
         mmcv.mkdir_or_exist(save_folder)
         np.save(
@@ -212,30 +256,45 @@ class S3DISSegData(object):
         label = self.cat_id2class[mask]
         return label
 
-    def get_scene_idxs_and_label_weight(self):
+    def get_scene_idxs_and_label_weight(self, num_workers=1):
         """Compute scene_idxs for data sampling and label weight for loss
         calculation.
 
         We sample more times for scenes with more points. Label_weight is
         inversely proportional to number of class points.
+
+        Args:
+            num_workers (int, optional): Number of processes counting the
+                labels of the scenes. Default: 1.
         """
-        num_classes = len(self.cat_ids)
-        num_point_all = []
-        label_weight = np.zeros((num_classes + 1, ))  # ignore_index
-        for data_info in self.data_infos:
-            label = self._convert_to_label(
-                osp.join(self.data_root, data_info['pts_semantic_mask_path']))
-            num_point_all.append(label.shape[0])
-            class_count, _ = np.histogram(label, range(num_classes + 2))
-            label_weight += class_count
+        mask_paths = [
+            osp.join(self.data_root, data_info['pts_semantic_mask_path'])
+            for data_info in self.data_infos
+        ]
+        count_labels = partial(
+            _count_labels,
+            cat_id2class=self.cat_id2class,
+            num_classes=len(self.cat_ids))
+        if num_workers <= 1:
+            class_counts = [count_labels(path) for path in mask_paths]
+        else:
+            class_counts = mmcv.track_parallel_progress(
+                count_labels,
+                mask_paths,
+                num_workers,
+                chunksize=max(1, -(-len(mask_paths) // (num_workers * 4))))
+        # [num_scenes, num_classes + 1], the last column is ignore_index
+        class_counts = np.stack(class_counts)
+        num_point_all = class_counts.sum(1)
+        label_weight = class_counts.sum(0)
 
         # repeat scene_idx for num_scene_point // num_sample_point times
-        sample_prob = np.array(num_point_all) / float(np.sum(num_point_all))
+        sample_prob = num_point_all / float(np.sum(num_point_all))
         num_iter = int(np.sum(num_point_all) / float(self.num_points))
-        scene_idxs = []
-        for idx in range(len(self.data_infos)):
-            scene_idxs.extend([idx] * int(round(sample_prob[idx] * num_iter)))
-        scene_idxs = np.array(scene_idxs).astype(np.int32)
+        scene_idxs = np.repeat(
+            np.arange(len(self.data_infos)),
+            np.round(sample_prob * num_iter).astype(np.int64))
+        scene_idxs = scene_idxs.astype(np.int32)
 
         # calculate label weight, adopted from PointNet++
         label_weight = label_weight[:-1].astype(np.float32)
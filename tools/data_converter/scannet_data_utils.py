@@ -1,11 +1,13 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import os
-from concurrent import futures as futures
+from functools import partial
 from os import path as osp
 
 import mmcv
 import numpy as np
 
+from tools.data_converter.stage_timer import StageTimer, process_scenes
+
 
 class ScanNetData(object):
     """ScanNet data.
@@ -85,13 +87,139 @@ class ScanNetData(object):
         mmcv.check_file_exist(matrix_file)
         return np.loadtxt(matrix_file)
 
+    def get_sample_files(self, sample_idx):
+        """Get the raw files the info of a scene is created from.
+
+        Args:
+            sample_idx (str): Index of the sample.
+
+        Returns:
+            list[str]: Paths of the files, which may not exist.
+        """
+        names = ['vert', 'aligned_bbox', 'unaligned_bbox', 'axis_align_matrix']
+        if not self.test_mode:
+            names += ['ins_label', 'sem_label']
+        files = [
+            osp.join(self.root_dir, 'scannet_instance_data',
+                     f'{sample_idx}_{name}.npy') for name in names
+        ]
+        path = osp.join(self.root_dir, 'posed_images', sample_idx)
+        if os.path.isdir(path):
+            files += [
+                osp.join(path, file) for file in sorted(os.listdir(path))
+                if file.endswith(('.jpg', '.txt'))
+            ]
+        return files
+
+    def process_single_scene(self, sample_idx, has_label=True, timer=None):
+        """Get the info of a scene and export its data.
+
+        Args:
+            sample_idx (str): Index of the sample.
+            has_label (bool, optional): Whether the data has label.
+                Default: True.
+            timer (:obj:`StageTimer`, optional): Timer of the stages of the
+                processing. Default: None.
+
+        Returns:
+            dict: Information of the scene.
+        """
+        timer = StageTimer() if timer is None else timer
+        info = dict()
+        pc_info = {'num_features': 6, 'lidar_idx': sample_idx}
+        info['point_cloud'] = pc_info
+        pts_filename = osp.join(self.root_dir, 'scannet_instance_data',
+                                f'{sample_idx}_vert.npy')
+        points = np.load(pts_filename)
+        timer.check('point loading')
+        mmcv.mkdir_or_exist(osp.join(self.root_dir, 'points'))
+        points.tofile(osp.join(self.root_dir, 'points', f'{sample_idx}.bin'))
+        info['pts_path'] = osp.join('points', f'{sample_idx}.bin')
+        timer.check('point export')
+
+        # update with RGB image paths if exist
+        if os.path.exists(osp.join(self.root_dir, 'posed_images')):
+            info['intrinsics'] = self.get_intrinsics(sample_idx)
+            all_extrinsics = self.get_extrinsics(sample_idx)
+            all_img_paths = self.get_images(sample_idx)
+            # some poses in ScanNet are invalid
+            extrinsics, img_paths = [], []
+            for extrinsic, img_path in zip(all_extrinsics, all_img_paths):
+                if np.all(np.isfinite(extrinsic)):
+                    img_paths.append(img_path)
+                    extrinsics.append(extrinsic)
+            info['extrinsics'] = extrinsics
+            info['img_paths'] = img_paths
+            timer.check('image loading')
+
+        if not self.test_mode:
+            pts_instance_mask_path = osp.join(self.root_dir,
+                                              'scannet_instance_data',
+                                              f'{sample_idx}_ins_label.npy')
+            pts_semantic_mask_path = osp.join(self.root_dir,
+                                              'scannet_instance_data',
+                                              f'{sample_idx}_sem_label.npy')
+
+            pts_instance_mask = np.load(pts_instance_mask_path).astype(
+                np.int64)
+            pts_semantic_mask = np.load(pts_semantic_mask_path).astype(
+                np.int64)
+
+            mmcv.mkdir_or_exist(osp.join(self.root_dir, 'instance_mask'))
+            mmcv.mkdir_or_exist(osp.join(self.root_dir, 'semantic_mask'))
+
+            pts_instance_mask.tofile(
+                osp.join(self.root_dir, 'instance_mask', f'{sample_idx}.bin'))
+            pts_semantic_mask.tofile(
+                osp.join(self.root_dir, 'semantic_mask', f'{sample_idx}.bin'))
+
+            info['pts_instance_mask_path'] = osp.join('instance_mask',
+                                                      f'{sample_idx}.bin')
+            info['pts_semantic_mask_path'] = osp.join('semantic_mask',
+                                                      f'{sample_idx}.bin')
+            timer.check('mask export')
+
+        if has_label:
+            annotations = {}
+            # box is of shape [k, 6 + class]
+            aligned_box_label = self.get_aligned_box_label(sample_idx)
+            unaligned_box_label = self.get_unaligned_box_label(sample_idx)
+            annotations['gt_num'] = aligned_box_label.shape[0]
+            if annotations['gt_num'] != 0:
+                aligned_box = aligned_box_label[:, :-1]  # k, 6
+                unaligned_box = unaligned_box_label[:, :-1]
+                classes = aligned_box_label[:, -1]  # k
+                annotations['name'] = np.array([
+                    self.label2cat[self.cat_ids2class[classes[i]]]
+                    for i in range(annotations['gt_num'])
+                ])
+                # default names are given to aligned bbox for compatibility
+                # we also save unaligned bbox info with marked names
+                annotations['location'] = aligned_box[:, :3]
+                annotations['dimensions'] = aligned_box[:, 3:6]
+                annotations['gt_boxes_upright_depth'] = aligned_box
+                annotations['unaligned_location'] = unaligned_box[:, :3]
+                annotations['unaligned_dimensions'] = unaligned_box[:, 3:6]
+                annotations['unaligned_gt_boxes_upright_depth'] = unaligned_box
+                annotations['index'] = np.arange(
+                    annotations['gt_num'], dtype=np.int32)
+                annotations['class'] = np.array([
+                    self.cat_ids2class[classes[i]]
+                    for i in range(annotations['gt_num'])
+                ])
+            axis_align_matrix = self.get_axis_align_matrix(sample_idx)
+            annotations['axis_align_matrix'] = axis_align_matrix  # 4x4
+            info['annos'] = annotations
+            timer.check('box computation')
+        return info
+
     def get_infos(self, num_workers=4, has_label=True, sample_id_list=None):
         """Get data infos.
 
         This method gets information from the raw data.
 
         Args:
-            num_workers (int, optional): Number of threads to be used.
+            num_workers (int, optional): Number of processes to be used.
                 Default: 4.
             has_label (bool, optional): Whether the data has label.
                 Default: True.
@@ -101,101 +229,23 @@ class ScanNetData(object):
         Returns:
             infos (list[dict]): Information of the raw data.
         """
+        sample_id_list = list(sample_id_list if sample_id_list is not None else
+                              self.sample_id_list)
+        return process_scenes(
+            self.process_single_scene,
+            sample_id_list,
+            num_workers,
+            has_label=has_label)
+
 
-        def process_single_scene(sample_idx):
-            print(f'{self.split} sample_idx: {sample_idx}')
-            info = dict()
-            pc_info = {'num_features': 6, 'lidar_idx': sample_idx}
-            info['point_cloud'] = pc_info
-            pts_filename = osp.join(self.root_dir, 'scannet_instance_data',
-                                    f'{sample_idx}_vert.npy')
-            points = np.load(pts_filename)
-            mmcv.mkdir_or_exist(osp.join(self.root_dir, 'points'))
-            points.tofile(
-                osp.join(self.root_dir, 'points', f'{sample_idx}.bin'))
-            info['pts_path'] = osp.join('points', f'{sample_idx}.bin')
-
-            # update with RGB image paths if exist
-            if os.path.exists(osp.join(self.root_dir, 'posed_images')):
-                info['intrinsics'] = self.get_intrinsics(sample_idx)
-                all_extrinsics = self.get_extrinsics(sample_idx)
-                all_img_paths = self.get_images(sample_idx)
-                # some poses in ScanNet are invalid
-                extrinsics, img_paths = [], []
-                for extrinsic, img_path in zip(all_extrinsics, all_img_paths):
-                    if np.all(np.isfinite(extrinsic)):
-                        img_paths.append(img_path)
-                        extrinsics.append(extrinsic)
-                info['extrinsics'] = extrinsics
-                info['img_paths'] = img_paths
-
-            if not self.test_mode:
-                pts_instance_mask_path = osp.join(
-                    self.root_dir, 'scannet_instance_data',
-                    f'{sample_idx}_ins_label.npy')
-                pts_semantic_mask_path = osp.join(
-                    self.root_dir, 'scannet_instance_data',
-                    f'{sample_idx}_sem_label.npy')
-
-                pts_instance_mask = np.load(pts_instance_mask_path).astype(
-                    np.int64)
-                pts_semantic_mask = np.load(pts_semantic_mask_path).astype(
-                    np.int64)
-
-                mmcv.mkdir_or_exist(osp.join(self.root_dir, 'instance_mask'))
-                mmcv.mkdir_or_exist(osp.join(self.root_dir, 'semantic_mask'))
-
-                pts_instance_mask.tofile(
-                    osp.join(self.root_dir, 'instance_mask',
-                             f'{sample_idx}.bin'))
-                pts_semantic_mask.tofile(
-                    osp.join(self.root_dir, 'semantic_mask',
-                             f'{sample_idx}.bin'))
-
-                info['pts_instance_mask_path'] = osp.join(
-                    'instance_mask', f'{sample_idx}.bin')
-                info['pts_semantic_mask_path'] = osp.join(
-                    'semantic_mask', f'{sample_idx}.bin')
-
-            if has_label:
-                annotations = {}
-                # box is of shape [k, 6 + class]
-                aligned_box_label = self.get_aligned_box_label(sample_idx)
-                unaligned_box_label = self.get_unaligned_box_label(sample_idx)
-                annotations['gt_num'] = aligned_box_label.shape[0]
-                if annotations['gt_num'] != 0:
-                    aligned_box = aligned_box_label[:, :-1]  # k, 6
-                    unaligned_box = unaligned_box_label[:, :-1]
-                    classes = aligned_box_label[:, -1]  # k
-                    annotations['name'] = np.array([
-                        self.label2cat[self.cat_ids2class[classes[i]]]
-                        for i in range(annotations['gt_num'])
-                    ])
-                    # default names are given to aligned bbox for compatibility
-                    # we also save unaligned bbox info with marked names
-                    annotations['location'] = aligned_box[:, :3]
-                    annotations['dimensions'] = aligned_box[:, 3:6]
-                    annotations['gt_boxes_upright_depth'] = aligned_box
-                    annotations['unaligned_location'] = unaligned_box[:, :3]
-                    annotations['unaligned_dimensions'] = unaligned_box[:, 3:6]
-                    annotations[
-                        'unaligned_gt_boxes_upright_depth'] = unaligned_box
-                    annotations['index'] = np.arange(
-                        annotations['gt_num'], dtype=np.int32)
-                    annotations['class'] = np.array([
-                        self.cat_ids2class[classes[i]]
-                        for i in range(annotations['gt_num'])
-                    ])
-                axis_align_matrix = self.get_axis_align_matrix(sample_idx)
-                annotations['axis_align_matrix'] = axis_align_matrix  # 4x4
-                info['annos'] = annotations
-            return info
-
-        sample_id_list = sample_id_list if sample_id_list is not None \
-            else self.sample_id_list
-        with futures.ThreadPoolExecutor(num_workers) as executor:
-            infos = executor.map(process_single_scene, sample_id_list)
-        return list(infos)
+def _count_labels(mask_path, cat_id2class, num_classes):
+    """Count the points of each label in the segmentation mask of a scene,
+    the last count being the points of the ignored classes."""
+    if mask_path.endswith('npy'):
+        mask = np.load(mask_path)
+    else:
+        mask = np.fromfile(mask_path, dtype=np.int64)
+    return np.bincount(cat_id2class[mask], minlength=num_classes + 1)
 
 
 class ScanNetSegData(object):
@@ -240,10 +290,11 @@ class ScanNetSegData(object):
         self.label_weight_func = (lambda x: 1.0 / np.log(1.2 + x)) if \
             label_weight_func is None else label_weight_func
 
-    def get_seg_infos(self):
+    def get_seg_infos(self, num_workers=1):
         if self.split == 'test':
             return
-        scene_idxs, label_weight = self.get_scene_idxs_and_label_weight()
+        scene_idxs, label_weight = self.get_scene_idxs_and_label_weight(
+            num_workers)
         save_folder = osp.join(self.data_root, 'seg_info')
         mmcv.mkdir_or_exist(save_folder)
         np.save(
@@ -264,30 +315,45 @@ class ScanNetSegData(object):
         label = self.cat_id2class[mask]
         return label
 
-    def get_scene_idxs_and_label_weight(self):
+    def get_scene_idxs_and_label_weight(self, num_workers=1):
         """Compute scene_idxs for data sampling and label weight for loss
         calculation.
 
         We sample more times for scenes with more points. Label_weight is
         inversely proportional to number of class points.
+
+        Args:
+            num_workers (int, optional): Number of processes counting the
+                labels of the scenes. Default: 1.
         """
-        num_classes = len(self.cat_ids)
-        num_point_all = []
-        label_weight = np.zeros((num_classes + 1, ))  # ignore_index
-        for data_info in self.data_infos:
-            label = self._convert_to_label(
-                osp.join(self.data_root, data_info['pts_semantic_mask_path']))
-            num_point_all.append(label.shape[0])
-            class_count, _ = np.histogram(label, range(num_classes + 2))
-            label_weight += class_count
+        mask_paths = [
+            osp.join(self.data_root, data_info['pts_semantic_mask_path'])
+            for data_info in self.data_infos
+        ]
+        count_labels = partial(
+            _count_labels,
+            cat_id2class=self.cat_id2class,
+            num_classes=len(self.cat_ids))
+        if num_workers <= 1:
+            class_counts = [count_labels(path) for path in mask_paths]
+        else:
+            class_counts = mmcv.track_parallel_progress(
+                count_labels,
+                mask_paths,
+                num_workers,
+                chunksize=max(1, -(-len(mask_paths) // (num_workers * 4))))
+        # [num_scenes, num_classes + 1], the last column is ignore_index
+        class_counts = np.stack(class_counts)
+        num_point_all = class_counts.sum(1)
+        label_weight = class_counts.sum(0)
 
         # repeat scene_idx for num_scene_point // num_sample_point times
-        sample_prob = np.array(num_point_all) / float(np.sum(num_point_all))
+        sample_prob = num_point_all / float(np.sum(num_point_all))
         num_iter = int(np.sum(num_point_all) / float(self.num_points))
-        scene_idxs = []
-        for idx in range(len(self.data_infos)):
-            scene_idxs.extend([idx] * int(round(sample_prob[idx] * num_iter)))
-        scene_idxs = np.array(scene_idxs).astype(np.int32)
+        scene_idxs = np.repeat(
+            np.arange(len(self.data_infos)),
+            np.round(sample_prob * num_iter).astype(np.int64))
+        scene_idxs = scene_idxs.astype(np.int32)
 
         # calculate label weight, adopted from PointNet++
         label_weight = label_weight[:-1].astype(np.float32)
@@ -0,0 +1,90 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import time
+from collections import OrderedDict
+from functools import partial
+
+import mmcv
+
+
+class StageTimer(object):
+    """Timer of the stages of a conversion.
+
+    Each :meth:`check` adds the time elapsed since the previous one to a
+    stage. The stage times of the scenes processed by different workers are
+    merged with :meth:`merge` to report the total time of each stage.
+    """
+
+    def __init__(self):
+        self.stage_times = OrderedDict()
+        self._last = time.perf_counter()
+
+    def check(self, stage):
+        """Add the time elapsed since the last check to a stage.
+
+        Args:
+            stage (str): Name of the stage.
+        """
+        now = time.perf_counter()
+        self.stage_times[stage] = \
+            self.stage_times.get(stage, 0.) + now - self._last
+        self._last = now
+
+    def merge(self, stage_times):
+        """Add the stage times of another timer.
+
+        Args:
+            stage_times (dict[str, float]): Time of each stage in seconds.
+        """
+        for stage, stage_time in stage_times.items():
+            self.stage_times[stage] = \
+                self.stage_times.get(stage, 0.) + stage_time
+
+    def __str__(self):
+        return ', '.join(f'{stage} {stage_time:.1f}s'
+                         for stage, stage_time in self.stage_times.items())
+
+
+def _process_timed(func, task, **kwargs):
+    """Process a task with a new timer, see :func:`process_scenes`."""
+    timer = StageTimer()
+    result = func(task, timer=timer, **kwargs)
+    return result, timer.stage_times
+
+
+def process_scenes(func, tasks, num_workers, initializer=None, **kwargs):
+    """Process the scenes of a dataset and report the time of each stage.
+
+    The scenes are processed by a process pool if ``num_workers`` is larger
+    than 1. They are sent to the workers in chunks, about 4 chunks per
+    worker, and the results are returned in order. The time of each stage
+    is summed over the scenes of all the workers.
+
+    Args:
+        func (callable): Function processing a scene, which is called as
+            ``func(task, timer=timer, **kwargs)`` with a
+            :obj:`StageTimer`. It must be picklable.
+        tasks (list): Scenes to process.
+        num_workers (int): Number of processes.
+        initializer (callable, optional): Initializer of the workers.
+            Default: None.
+
+    Returns:
+        list: Results of the scenes.
+    """
+    process = partial(_process_timed, func, **kwargs)
+    if num_workers <= 1:
+        results = [process(task) for task in mmcv.track_iter_progress(tasks)]
+    else:
+        chunksize = max(1, -(-len(tasks) // (num_workers * 4)))
+        results = mmcv.track_parallel_progress(
+            process,
+            tasks,
+            num_workers,
+            initializer=initializer,
+            chunksize=chunksize)
+    timer = StageTimer()
+    for _, stage_times in results:
+        timer.merge(stage_times)
+    if len(results) > 0:
+        print(f'\nTime of each stage over {len(results)} scenes: {timer}')
+    return [result for result, _ in results]
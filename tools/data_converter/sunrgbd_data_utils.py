@@ -1,11 +1,12 @@
 # Copyright (c) OpenMMLab. All rights reserved.
-from concurrent import futures as futures
 from os import path as osp
 
 import mmcv
 import numpy as np
 from scipy import io as sio
 
+from tools.data_converter.stage_timer import StageTimer, process_scenes
+
 
 def random_sampling(points, num_points, replace=None):
     """Random sampling.
@@ -86,7 +87,7 @@ class SUNRGBDData(object):
         assert split in ['train', 'val', 'test']
         split_file = osp.join(self.split_dir, f'{split}_data_idx.txt')
         mmcv.check_file_exist(split_file)
-        self.sample_id_list = map(int, mmcv.list_from_file(split_file))
+        self.sample_id_list = list(map(int, mmcv.list_from_file(split_file)))
         self.image_dir = osp.join(self.split_dir, 'image')
         self.calib_dir = osp.join(self.split_dir, 'calib')
         self.depth_dir = osp.join(self.split_dir, 'depth')
@@ -126,98 +127,134 @@ class SUNRGBDData(object):
         objects = [SUNRGBDInstance(line) for line in lines]
         return objects
 
-    def get_infos(self, num_workers=4, has_label=True, sample_id_list=None):
-        """Get data infos.
+    def get_sample_files(self, sample_idx):
+        """Get the raw files the info of a scene is created from.
 
-        This method gets information from the raw data.
+        Args:
+            sample_idx (int): Index of the sample.
+
+        Returns:
+            list[str]: Paths of the files, which may not exist.
+        """
+        return [
+            osp.join(self.depth_dir, f'{sample_idx:06d}.mat'),
+            osp.join(self.image_dir, f'{sample_idx:06d}.jpg'),
+            osp.join(self.calib_dir, f'{sample_idx:06d}.txt'),
+            osp.join(self.label_dir, f'{sample_idx:06d}.txt')
+        ]
+
+    def process_single_scene(self, sample_idx, has_label=True, timer=None):
+        """Get the info of a scene and export its data.
 
         Args:
-            num_workers (int, optional): Number of threads to be used.
-                Default: 4.
+            sample_idx (int): Index of the sample.
             has_label (bool, optional): Whether the data has label.
                 Default: True.
-            sample_id_list (list[int], optional): Index list of the sample.
-                Default: None.
+            timer (:obj:`StageTimer`, optional): Timer of the stages of the
+                processing. Default: None.
 
         Returns:
-            infos (list[dict]): Information of the raw data.
+            dict: Information of the scene.
         """
+        timer = StageTimer() if timer is None else timer
+        # convert depth to points
+        pc_upright_depth = self.get_depth(sample_idx)
+        timer.check('point loading')
+        pc_upright_depth_subsampled = random_sampling(pc_upright_depth,
+                                                      self.num_points)
+        timer.check('random sampling')
+
+        info = dict()
+        pc_info = {'num_features': 6, 'lidar_idx': sample_idx}
+        info['point_cloud'] = pc_info
+
+        mmcv.mkdir_or_exist(osp.join(self.root_dir, 'points'))
+        pc_upright_depth_subsampled.tofile(
+            osp.join(self.root_dir, 'points', f'{sample_idx:06d}.bin'))
+
+        info['pts_path'] = osp.join('points', f'{sample_idx:06d}.bin')
+        timer.check('point export')
+        img_path = osp.join('image', f'{sample_idx:06d}.jpg')
+        image_info = {
+            'image_idx': sample_idx,
+            'image_shape': self.get_image_shape(sample_idx),
+            'image_path': img_path
+        }
+        info['image'] = image_info
 
-        def process_single_scene(sample_idx):
-            print(f'{self.split} sample_idx: {sample_idx}')
-            # convert depth to points
-            pc_upright_depth = self.get_depth(sample_idx)
-            pc_upright_depth_subsampled = random_sampling(
-                pc_upright_depth, self.num_points)
-
-            info = dict()
-            pc_info = {'num_features': 6, 'lidar_idx': sample_idx}
-            info['point_cloud'] = pc_info
-
-            mmcv.mkdir_or_exist(osp.join(self.root_dir, 'points'))
-            pc_upright_depth_subsampled.tofile(
-                osp.join(self.root_dir, 'points', f'{sample_idx:06d}.bin'))
-
-            info['pts_path'] = osp.join('points', f'{sample_idx:06d}.bin')
-            img_path = osp.join('image', f'{sample_idx:06d}.jpg')
-            image_info = {
-                'image_idx': sample_idx,
-                'image_shape': self.get_image_shape(sample_idx),
-                'image_path': img_path
-            }
-            info['image'] = image_info
-
-            K, Rt = self.get_calibration(sample_idx)
-            calib_info = {'K': K, 'Rt': Rt}
-            info['calib'] = calib_info
-
-            if has_label:
-                obj_list = self.get_label_objects(sample_idx)
-                annotations = {}
-                annotations['gt_num'] = len([
+        K, Rt = self.get_calibration(sample_idx)
+        calib_info = {'K': K, 'Rt': Rt}
+        info['calib'] = calib_info
+        timer.check('calibration loading')
+
+        if has_label:
+            obj_list = self.get_label_objects(sample_idx)
+            annotations = {}
+            annotations['gt_num'] = len([
+                obj.classname for obj in obj_list
+                if obj.classname in self.cat2label.keys()
+            ])
+            if annotations['gt_num'] != 0:
+                annotations['name'] = np.array([
                     obj.classname for obj in obj_list
                     if obj.classname in self.cat2label.keys()
                 ])
-                if annotations['gt_num'] != 0:
-                    annotations['name'] = np.array([
-                        obj.classname for obj in obj_list
-                        if obj.classname in self.cat2label.keys()
-                    ])
-                    annotations['bbox'] = np.concatenate([
-                        obj.box2d.reshape(1, 4) for obj in obj_list
-                        if obj.classname in self.cat2label.keys()
-                    ],
+                annotations['bbox'] = np.concatenate([
+                    obj.box2d.reshape(1, 4) for obj in obj_list
+                    if obj.classname in self.cat2label.keys()
+                ],
+                                                     axis=0)
+                annotations['location'] = np.concatenate([
+                    obj.centroid.reshape(1, 3) for obj in obj_list
+                    if obj.classname in self.cat2label.keys()
+                ],
                                                          axis=0)
-                    annotations['location'] = np.concatenate([
-                        obj.centroid.reshape(1, 3) for obj in obj_list
+                annotations['dimensions'] = 2 * np.array([
+                    [obj.length, obj.width, obj.height] for obj in obj_list
+                    if obj.classname in self.cat2label.keys()
+                ])  # lwh (depth) format
+                annotations['rotation_y'] = np.array([
+                    obj.heading_angle for obj in obj_list
+                    if obj.classname in self.cat2label.keys()
+                ])
+                annotations['index'] = np.arange(len(obj_list), dtype=np.int32)
+                annotations['class'] = np.array([
+                    self.cat2label[obj.classname] for obj in obj_list
+                    if obj.classname in self.cat2label.keys()
+                ])
+                annotations['gt_boxes_upright_depth'] = np.stack(
+                    [
+                        obj.box3d for obj in obj_list
                         if obj.classname in self.cat2label.keys()
                     ],
-                                                             axis=0)
-                    annotations['dimensions'] = 2 * np.array([
-                        [obj.length, obj.width, obj.height] for obj in obj_list
-                        if obj.classname in self.cat2label.keys()
-                    ])  # lwh (depth) format
-                    annotations['rotation_y'] = np.array([
-                        obj.heading_angle for obj in obj_list
-                        if obj.classname in self.cat2label.keys()
-                    ])
-                    annotations['index'] = np.arange(
-                        len(obj_list), dtype=np.int32)
-                    annotations['class'] = np.array([
-                        self.cat2label[obj.classname] for obj in obj_list
-                        if obj.classname in self.cat2label.keys()
-                    ])
-                    annotations['gt_boxes_upright_depth'] = np.stack(
-                        [
-                            obj.box3d for obj in obj_list
-                            if obj.classname in self.cat2label.keys()
-                        ],
-                        axis=0)  # (K,8)
-                info['annos'] = annotations
-            return info
-
-        sample_id_list = sample_id_list if \
-            sample_id_list is not None else self.sample_id_list
-        with futures.ThreadPoolExecutor(num_workers) as executor:
-            infos = executor.map(process_single_scene, sample_id_list)
-        return list(infos)
+                    axis=0)  # (K,8)
+            info['annos'] = annotations
+            timer.check('box computation')
+        return info
+
+    def get_infos(self, num_workers=4, has_label=True, sample_id_list=None):
+        """Get data infos.
+
+        This method gets information from the raw data.
+
+        Args:
+            num_workers (int, optional): Number of processes to be used.
+                Default: 4.
+            has_label (bool, optional): Whether the data has label.
+                Default: True.
+            sample_id_list (list[int], optional): Index list of the sample.
+                Default: None.
+
+        Returns:
+            infos (list[dict]): Information of the raw data.
+        """
+        sample_id_list = list(sample_id_list if sample_id_list is not None else
+                              self.sample_id_list)
+        # reseed the random sampling in each worker, which would otherwise
+        # inherit the same random state
+        return process_scenes(
+            self.process_single_scene,
+            sample_id_list,
+            num_workers,
+            initializer=np.random.seed,
+            has_label=has_label)
@@ -10,6 +10,7 @@ except ImportError:
         'Please run "pip install waymo-open-dataset-tf-2-1-0==1.2.0" '
         'to install the official devkit first.')
 
+import os
 from glob import glob
 from os.path import join
 
@@ -34,6 +35,11 @@ class Waymo2KITTI(object):
             validation and 2 for testing.
         workers (int, optional): Number of workers for the parallel process.
         test_mode (bool, optional): Whether in the test_mode. Default: False.
+        save_format (str, optional): 'kitti' to save each frame as separate
+            KITTI-style files, or 'packed' to save the point clouds,
+            calibrations, poses, timestamps and labels of each segment as
+            a single shard (see :class:`PackedSegmentWriter`). The images
+            are saved as png files in both cases. Default: 'kitti'.
     """
 
     def __init__(self,
@@ -41,7 +47,10 @@ class Waymo2KITTI(object):
                  save_dir,
                  prefix,
                  workers=64,
-                 test_mode=False):
+                 test_mode=False,
+                 save_format='kitti'):
+        assert save_format in ('kitti', 'packed'), \
+            f'invalid save_format {save_format}'
         self.filter_empty_3dboxes = True
         self.filter_no_label_zone_points = True
 
@@ -77,6 +86,7 @@ class Waymo2KITTI(object):
         self.prefix = prefix
         self.workers = int(workers)
         self.test_mode = test_mode
+        self.save_format = save_format
 
         self.tfrecord_pathnames = sorted(
             glob(join(self.load_dir, '*.tfrecord')))
@@ -88,6 +98,7 @@ class Waymo2KITTI(object):
         self.point_cloud_save_dir = f'{self.save_dir}/velodyne'
         self.pose_save_dir = f'{self.save_dir}/pose'
         self.timestamp_save_dir = f'{self.save_dir}/timestamp'
+        self.packed_save_dir = f'{self.save_dir}/packed'
 
         self.create_folder()
 
@@ -106,6 +117,11 @@ class Waymo2KITTI(object):
         """
         pathname = self.tfrecord_pathnames[file_idx]
         dataset = tf.data.TFRecordDataset(pathname, compression_type='')
+        writer = None
+        if self.save_format == 'packed':
+            writer = PackedSegmentWriter(
+                f'{self.packed_save_dir}/{self.prefix}'
+                f'{str(file_idx).zfill(3)}', self.test_mode)
 
         for frame_idx, data in enumerate(dataset):
 
@@ -117,6 +133,12 @@ class Waymo2KITTI(object):
                 continue
 
             self.save_image(frame, file_idx, frame_idx)
+            if writer is not None:
+                writer.write(
+                    frame_idx, frame, *self.parse_calib(frame),
+                    self.parse_lidar(frame),
+                    None if self.test_mode else self.parse_label(frame))
+                continue
             self.save_calib(frame, file_idx, frame_idx)
             self.save_lidar(frame, file_idx, frame_idx)
             self.save_pose(frame, file_idx, frame_idx)
@@ -125,6 +147,9 @@ class Waymo2KITTI(object):
             if not self.test_mode:
                 self.save_label(frame, file_idx, frame_idx)
 
+        if writer is not None:
+            writer.close()
+
     def __len__(self):
         """Length of the filename list."""
         return len(self.tfrecord_pathnames)
@@ -144,21 +169,26 @@ class Waymo2KITTI(object):
             img = mmcv.imfrombytes(img.image)
             mmcv.imwrite(img, img_path)
 
-    def save_calib(self, frame, file_idx, frame_idx):
-        """Parse and save the calibration data.
+    def parse_calib(self, frame):
+        """Parse the calibration data.
+
+        It also keeps the transformation from the vehicle to the front
+        camera, which is used to parse the labels.
 
         Args:
             frame (:obj:`Frame`): Open dataset frame proto.
-            file_idx (int): Current file index.
-            frame_idx (int): Current frame index.
+
+        Returns:
+            tuple[np.ndarray]: Camera intrinsics of shape [5, 3, 4],
+                transformations from the vehicle to the cameras of shape
+                [5, 3, 4] and image shapes (height, width) of shape [5, 2].
         """
         # waymo front camera to kitti reference camera
         T_front_cam_to_ref = np.array([[0.0, -1.0, 0.0], [0.0, 0.0, -1.0],
                                        [1.0, 0.0, 0.0]])
         camera_calibs = []
-        R0_rect = [f'{i:e}' for i in np.eye(3).flatten()]
         Tr_velo_to_cams = []
-        calib_context = ''
+        image_shapes = []
 
         for camera in frame.context.camera_calibrations:
             # extrinsic parameters
@@ -169,8 +199,7 @@ class Waymo2KITTI(object):
                 self.cart_to_homo(T_front_cam_to_ref) @ T_vehicle_to_cam
             if camera.name == 1:  # FRONT = 1, see dataset.proto for details
                 self.T_velo_to_front_cam = Tr_velo_to_cam.copy()
-            Tr_velo_to_cam = Tr_velo_to_cam[:3, :].reshape((12, ))
-            Tr_velo_to_cams.append([f'{i:e}' for i in Tr_velo_to_cam])
+            Tr_velo_to_cams.append(Tr_velo_to_cam[:3, :])
 
             # intrinsic parameters
             camera_calib = np.zeros((3, 4))
@@ -179,9 +208,27 @@ class Waymo2KITTI(object):
             camera_calib[0, 2] = camera.intrinsic[2]
             camera_calib[1, 2] = camera.intrinsic[3]
             camera_calib[2, 2] = 1
-            camera_calib = list(camera_calib.reshape(12))
-            camera_calib = [f'{i:e}' for i in camera_calib]
             camera_calibs.append(camera_calib)
+            image_shapes.append((camera.height, camera.width))
+
+        return np.stack(camera_calibs), np.stack(Tr_velo_to_cams), \
+            np.array(image_shapes, dtype=np.int32)
+
+    def save_calib(self, frame, file_idx, frame_idx):
+        """Parse and save the calibration data.
+
+        Args:
+            frame (:obj:`Frame`): Open dataset frame proto.
+            file_idx (int): Current file index.
+            frame_idx (int): Current frame index.
+        """
+        camera_calibs, Tr_velo_to_cams, _ = self.parse_calib(frame)
+        camera_calibs = [[f'{i:e}' for i in calib.reshape(12)]
+                         for calib in camera_calibs]
+        Tr_velo_to_cams = [[f'{i:e}' for i in Tr.reshape(12)]
+                           for Tr in Tr_velo_to_cams]
+        R0_rect = [f'{i:e}' for i in np.eye(3).flatten()]
+        calib_context = ''
 
         # all camera ids are saved as id-1 in the result because
         # camera 0 is unknown in the proto
@@ -200,13 +247,15 @@ class Waymo2KITTI(object):
             fp_calib.write(calib_context)
             fp_calib.close()
 
-    def save_lidar(self, frame, file_idx, frame_idx):
-        """Parse and save the lidar data in psd format.
+    def parse_lidar(self, frame):
+        """Parse the lidar data.
 
         Args:
             frame (:obj:`Frame`): Open dataset frame proto.
-            file_idx (int): Current file index.
-            frame_idx (int): Current frame index.
+
+        Returns:
+            np.ndarray: Points of shape [N, 6] with x, y, z, intensity,
+                elongation and their position in the range image.
         """
         range_images, camera_projections, range_image_top_pose = \
             parse_range_image_and_camera_projection(frame)
@@ -249,13 +298,24 @@ class Waymo2KITTI(object):
         # concatenate x,y,z, intensity, elongation, timestamp (6-dim)
         point_cloud = np.column_stack(
             (points, intensity, elongation, mask_indices))
+        return point_cloud.astype(np.float32)
 
+    def save_lidar(self, frame, file_idx, frame_idx):
+        """Parse and save the lidar data in psd format.
+
+        Args:
+            frame (:obj:`Frame`): Open dataset frame proto.
+            file_idx (int): Current file index.
+            frame_idx (int): Current frame index.
+        """
+        point_cloud = self.parse_lidar(frame)
         pc_path = f'{self.point_cloud_save_dir}/{self.prefix}' + \
             f'{str(file_idx).zfill(3)}{str(frame_idx).zfill(3)}.bin'
         point_cloud.astype(np.float32).tofile(pc_path)
 
-    def save_label(self, frame, file_idx, frame_idx):
-        """Parse and save the label data in txt format.
+    def parse_label(self, frame):
+        """Parse the labels of the selected classes in KITTI format.
+
         The relation between waymo and kitti coordinates is noteworthy:
         1. x, y, z correspond to l, w, h (waymo) -> l, h, w (kitti)
         2. x-y-z: front-left-up (waymo) -> right-down-front(kitti)
@@ -264,12 +324,13 @@ class Waymo2KITTI(object):
 
         Args:
             frame (:obj:`Frame`): Open dataset frame proto.
-            file_idx (int): Current file index.
-            frame_idx (int): Current frame index.
+
+        Returns:
+            list[tuple]: Type, truncation, occlusion, alpha, 2D bounding box,
+                height, width, length, x, y, z, rotation_y, camera id and
+                track id of each object.
         """
-        fp_label_all = open(
-            f'{self.label_all_save_dir}/{self.prefix}' +
-            f'{str(file_idx).zfill(3)}{str(frame_idx).zfill(3)}.txt', 'w+')
+        labels = []
         id_to_bbox = dict()
         id_to_name = dict()
         for labels in frame.projected_lidar_labels:
@@ -330,6 +391,25 @@ class Waymo2KITTI(object):
             occluded = 0
             alpha = -10
 
+            labels.append(
+                (my_type, truncated, occluded, alpha, bounding_box, height,
+                 width, length, x, y, z, rotation_y, name, track_id))
+        return labels
+
+    def save_label(self, frame, file_idx, frame_idx):
+        """Parse and save the label data in txt format.
+
+        Args:
+            frame (:obj:`Frame`): Open dataset frame proto.
+            file_idx (int): Current file index.
+            frame_idx (int): Current frame index.
+        """
+        fp_label_all = open(
+            f'{self.label_all_save_dir}/{self.prefix}' +
+            f'{str(file_idx).zfill(3)}{str(frame_idx).zfill(3)}.txt', 'w+')
+        for (my_type, truncated, occluded, alpha, bounding_box, height, width,
+             length, x, y, z, rotation_y, name,
+             track_id) in self.parse_label(frame):
             line = my_type + \
                 ' {} {} {} {} {} {} {} {} {} {} {} {} {} {}\n'.format(
                     round(truncated, 2), occluded, round(alpha, 2),
@@ -395,7 +475,10 @@ class Waymo2KITTI(object):
 
     def create_folder(self):
         """Create folder for data preprocessing."""
-        if not self.test_mode:
+        if self.save_format == 'packed':
+            dir_list1 = [self.packed_save_dir]
+            dir_list2 = [self.image_save_dir]
+        elif not self.test_mode:
             dir_list1 = [
                 self.label_all_save_dir, self.calib_save_dir,
                 self.point_cloud_save_dir, self.pose_save_dir,
@@ -554,3 +637,122 @@ class Waymo2KITTI(object):
         else:
             raise ValueError(mat.shape)
         return ret
+
+
+class PackedSegmentWriter(object):
+    """Writer of the packed shard of a segment.
+
+    A shard is made of two files. The point clouds of all the frames are
+    concatenated in '{path}.bin' as float32 points of 6 dimensions (see
+    :meth:`Waymo2KITTI.parse_lidar`), and '{path}.pkl' holds the other data
+    of the frames as arrays:
+
+        - frame_inds (np.ndarray): Index of each frame in the segment.
+        - point_offsets (np.ndarray): Offsets of the points of each frame,
+            the points of the i-th frame are the rows from point_offsets[i]
+            to point_offsets[i + 1].
+        - num_features (int): Number of features of each point.
+        - timestamps (np.ndarray): Timestamps of the frames.
+        - poses (np.ndarray): Vehicle poses of shape [num_frames, 4, 4].
+        - P (np.ndarray): Camera intrinsics of shape [num_frames, 5, 3, 4].
+        - Tr_velo_to_cam (np.ndarray): Transformations from the vehicle to
+            the cameras of shape [num_frames, 5, 3, 4].
+        - image_shapes (np.ndarray): Image shapes of shape
+            [num_frames, 5, 2].
+        - labels (dict[str, np.ndarray] | None): Columns of the labels of
+            all the frames in KITTI format, with their 'frame_inds', or None
+            in test mode.
+
+    The metadata is written last, so a segment whose '.pkl' file exists is
+    complete.
+
+    Args:
+        path (str): Path of the shard without extension.
+        test_mode (bool, optional): Whether the labels are not available.
+            Default: False.
+    """
+
+    num_features = 6
+
+    def __init__(self, path, test_mode=False):
+        self.path = path
+        self.test_mode = test_mode
+        self.points_file = open(f'{path}.bin', 'wb')
+        self.frames = []
+        self.labels = []
+
+    def write(self,
+              frame_idx,
+              frame,
+              camera_calibs,
+              Tr_velo_to_cams,
+              image_shapes,
+              points,
+              labels=None):
+        """Append a frame to the shard.
+
+        Args:
+            frame_idx (int): Index of the frame in the segment.
+            frame (:obj:`Frame`): Open dataset frame proto.
+            camera_calibs (np.ndarray): Camera intrinsics.
+            Tr_velo_to_cams (np.ndarray): Transformations from the vehicle
+                to the cameras.
+            image_shapes (np.ndarray): Image shapes.
+            points (np.ndarray): Points of the frame.
+            labels (list[tuple], optional): Labels of the frame, see
+                :meth:`Waymo2KITTI.parse_label`. Default: None.
+        """
+        assert points.shape[1] == self.num_features
+        self.points_file.write(points.astype(np.float32).tobytes())
+        pose = np.array(frame.pose.transform).reshape(4, 4)
+        self.frames.append(
+            (frame_idx, len(points), frame.timestamp_micros, pose,
+             camera_calibs, Tr_velo_to_cams, image_shapes))
+        if labels is not None:
+            self.labels.extend((frame_idx, ) + label for label in labels)
+
+    def _label_columns(self):
+        """Gather the labels as columns, rounded as in the label files so
+        that both formats give the same infos."""
+        (frame_inds, names, truncated, occluded, alpha, bboxes, heights,
+         widths, lengths, xs, ys, zs, rotation_y, camera_ids,
+         track_ids) = zip(*self.labels) if self.labels else [[]] * 15
+        return dict(
+            frame_inds=np.array(frame_inds, dtype=np.int64),
+            name=np.array(names, dtype=str),
+            truncated=np.round(np.array(truncated, dtype=np.float64), 2),
+            occluded=np.array(occluded, dtype=np.int64),
+            alpha=np.round(np.array(alpha, dtype=np.float64), 2),
+            bbox=np.round(np.array(bboxes, dtype=np.float64),
+                          2).reshape(-1, 4),
+            # lhw as in the infos of KITTI
+            dimensions=np.round(
+                np.array([lengths, heights, widths], dtype=np.float64).T,
+                2).reshape(-1, 3),
+            location=np.round(np.array([xs, ys, zs], dtype=np.float64).T,
+                              2).reshape(-1, 3),
+            rotation_y=np.round(np.array(rotation_y, dtype=np.float64), 2),
+            camera_id=np.array(camera_ids, dtype=np.float64),
+            track_id=np.array(track_ids, dtype=str))
+
+    def close(self):
+        """Write the metadata of the shard."""
+        self.points_file.close()
+        (frame_inds, num_points, timestamps, poses, camera_calibs,
+         Tr_velo_to_cams, image_shapes) = zip(*self.frames) \
+            if self.frames else [[]] * 7
+        meta = dict(
+            frame_inds=np.array(frame_inds, dtype=np.int64),
+            point_offsets=np.concatenate([[0], np.cumsum(num_points)
+                                          ]).astype(np.int64),
+            num_features=self.num_features,
+            timestamps=np.array(timestamps, dtype=np.int64),
+            poses=np.array(poses, dtype=np.float64).reshape(-1, 4, 4),
+            P=np.array(camera_calibs, dtype=np.float64).reshape(-1, 5, 3, 4),
+            Tr_velo_to_cam=np.array(Tr_velo_to_cams,
+                                    dtype=np.float64).reshape(-1, 5, 3, 4),
+            image_shapes=np.array(image_shapes,
+                                  dtype=np.int32).reshape(-1, 5, 2),
+            labels=None if self.test_mode else self._label_columns())
+        mmcv.dump(meta, f'{self.path}.pkl.tmp', file_format='pkl')
+        os.replace(f'{self.path}.pkl.tmp', f'{self.path}.pkl')
@@ -1,5 +1,8 @@
 import argparse
+import copy
+import os
 import time
+from functools import partial
 from os import path as osp
 
 import mmcv
@@ -8,84 +11,217 @@ import numpy as np
 from mmdet3d.core.bbox import limit_period
 
 
-def update_sunrgbd_infos(root_dir, out_dir, pkl_files):
-    print(f'{pkl_files} will be modified because '
-          f'of the refactor of the Depth coordinate system.')
-    if root_dir == out_dir:
-        print(f'Warning, you are overwriting '
-              f'the original data under {root_dir}.')
-        time.sleep(3)
-    for pkl_file in pkl_files:
-        in_path = osp.join(root_dir, pkl_file)
-        print(f'Reading from input file: {in_path}.')
-        a = mmcv.load(in_path)
-        print('Start updating:')
-        for item in mmcv.track_iter_progress(a):
-            if 'rotation_y' in item['annos']:
-                item['annos']['rotation_y'] = -item['annos']['rotation_y']
-                item['annos']['gt_boxes_upright_depth'][:, -1:] = \
-                    -item['annos']['gt_boxes_upright_depth'][:, -1:]
-
-        out_path = osp.join(out_dir, pkl_file)
-        print(f'Writing to output file: {out_path}.')
-        mmcv.dump(a, out_path, 'pkl')
-
-
-def update_outdoor_dbinfos(root_dir, out_dir, pkl_files):
-    print(f'{pkl_files} will be modified because '
-          f'of the refactor of the LIDAR coordinate system.')
-    if root_dir == out_dir:
-        print(f'Warning, you are overwriting '
-              f'the original data under {root_dir}.')
-        time.sleep(3)
-    for pkl_file in pkl_files:
-        in_path = osp.join(root_dir, pkl_file)
-        print(f'Reading from input file: {in_path}.')
-        a = mmcv.load(in_path)
-        print('Start updating:')
-        for k in a.keys():
-            print(f'Updating samples of class {k}:')
-            for item in mmcv.track_iter_progress(a[k]):
-                boxes = item['box3d_lidar'].copy()
-                # swap l, w (or dx, dy)
-                item['box3d_lidar'][3] = boxes[4]
-                item['box3d_lidar'][4] = boxes[3]
-                # change yaw
-                item['box3d_lidar'][6] = -boxes[6] - np.pi / 2
-                item['box3d_lidar'][6] = limit_period(
-                    item['box3d_lidar'][6], period=np.pi * 2)
-
-        out_path = osp.join(out_dir, pkl_file)
-        print(f'Writing to output file: {out_path}.')
-        mmcv.dump(a, out_path, 'pkl')
-
-
-def update_nuscenes_or_lyft_infos(root_dir, out_dir, pkl_files):
-
-    print(f'{pkl_files} will be modified because '
-          f'of the refactor of the LIDAR coordinate system.')
+def _convert_lidar_boxes(boxes):
+    """Convert LiDAR boxes of shape (N, 7+) to the refactored convention."""
+    boxes = boxes.copy()
+    # swap l, w (or dx, dy)
+    boxes[:, [3, 4]] = boxes[:, [4, 3]]
+    # change yaw
+    boxes[:, 6] = limit_period(-boxes[:, 6] - np.pi / 2, period=np.pi * 2)
+    return boxes
+
+
+def _convert_depth_boxes(boxes):
+    """Convert Depth boxes of shape (N, 7) to the refactored convention."""
+    boxes = boxes.copy()
+    boxes[:, -1] = -boxes[:, -1]
+    return boxes
+
+
+def _convert_concatenated(arrays, convert_func):
+    """Convert a list of arrays at once by concatenating them.
+
+    Args:
+        arrays (list[np.ndarray]): Arrays with the same trailing shape.
+        convert_func (callable): Function converting the concatenated
+            array.
+
+    Returns:
+        list[np.ndarray]: Converted arrays, views of a single array.
+    """
+    lengths = [len(array) for array in arrays]
+    converted = convert_func(np.concatenate(arrays, axis=0))
+    return np.split(converted, np.cumsum(lengths)[:-1])
+
+
+def _update_sunrgbd_info(info):
+    if 'rotation_y' in info['annos']:
+        info['annos']['rotation_y'] = -info['annos']['rotation_y']
+        info['annos']['gt_boxes_upright_depth'][:, -1:] = \
+            -info['annos']['gt_boxes_upright_depth'][:, -1:]
+
+
+def _update_sunrgbd_infos(infos):
+    annos = [info['annos'] for info in infos if 'rotation_y' in info['annos']]
+    if len(annos) == 0:
+        return
+    rotation_y = _convert_concatenated([anno['rotation_y'] for anno in annos],
+                                       np.negative)
+    boxes = _convert_concatenated(
+        [anno['gt_boxes_upright_depth'] for anno in annos],
+        _convert_depth_boxes)
+    for anno, anno_rotation_y, anno_boxes in zip(annos, rotation_y, boxes):
+        anno['rotation_y'] = anno_rotation_y
+        anno['gt_boxes_upright_depth'] = anno_boxes
+
+
+def _update_outdoor_dbinfo(item):
+    boxes = item['box3d_lidar'].copy()
+    # swap l, w (or dx, dy)
+    item['box3d_lidar'][3] = boxes[4]
+    item['box3d_lidar'][4] = boxes[3]
+    # change yaw
+    item['box3d_lidar'][6] = -boxes[6] - np.pi / 2
+    item['box3d_lidar'][6] = limit_period(
+        item['box3d_lidar'][6], period=np.pi * 2)
+
+
+def _update_outdoor_dbinfos(items):
+    if len(items) == 0:
+        return
+    boxes = _convert_concatenated(
+        [item['box3d_lidar'][None] for item in items], _convert_lidar_boxes)
+    for item, box in zip(items, boxes):
+        item['box3d_lidar'] = box[0]
+
+
+def _update_nuscenes_or_lyft_info(info):
+    boxes = info['gt_boxes'].copy()
+    # swap l, w (or dx, dy)
+    info['gt_boxes'][:, 3] = boxes[:, 4]
+    info['gt_boxes'][:, 4] = boxes[:, 3]
+    # change yaw
+    info['gt_boxes'][:, 6] = -boxes[:, 6] - np.pi / 2
+    info['gt_boxes'][:, 6] = limit_period(
+        info['gt_boxes'][:, 6], period=np.pi * 2)
+
+
+def _update_nuscenes_or_lyft_infos(infos):
+    if len(infos) == 0:
+        return
+    boxes = _convert_concatenated([info['gt_boxes'] for info in infos],
+                                  _convert_lidar_boxes)
+    for info, info_boxes in zip(infos, boxes):
+        info['gt_boxes'] = info_boxes
+
+
+# for each kind of info file: the function getting its entries from the
+# loaded file, the function updating all the entries at once and the
+# reference function updating a single entry, used for the verification
+UPDATERS = dict(
+    sunrgbd_infos=(lambda data: data, _update_sunrgbd_infos,
+                   _update_sunrgbd_info),
+    outdoor_dbinfos=(
+        lambda data: [item for items in data.values() for item in items],
+        _update_outdoor_dbinfos, _update_outdoor_dbinfo),
+    nuscenes_or_lyft_infos=(lambda data: data['infos'],
+                            _update_nuscenes_or_lyft_infos,
+                            _update_nuscenes_or_lyft_info))
+
+
+def _assert_equal(value, expected, key='entry'):
+    """Check a value of an updated entry against the expected one."""
+    assert isinstance(value, type(expected)), f'{key} has a different type'
+    if isinstance(expected, dict):
+        assert value.keys() == expected.keys(), f'{key} has different keys'
+        for k in expected:
+            _assert_equal(value[k], expected[k], f'{key}.{k}')
+    elif isinstance(expected, (list, tuple)):
+        assert len(value) == len(expected), f'{key} has a different length'
+        for i, (v, e) in enumerate(zip(value, expected)):
+            _assert_equal(v, e, f'{key}[{i}]')
+    elif isinstance(expected, np.ndarray):
+        assert value.shape == expected.shape and \
+            value.dtype == expected.dtype, f'{key} has a different shape'
+        if np.issubdtype(expected.dtype, np.floating):
+            assert np.allclose(value, expected, atol=1e-5, equal_nan=True), \
+                f'{key} has different values'
+        else:
+            assert np.array_equal(value, expected), \
+                f'{key} has different values'
+    else:
+        assert value == expected, f'{key} has a different value'
+
+
+def update_info_file(pkl_file, root_dir, out_dir, kind, num_verify=100):
+    """Update an info file to the refactored coordinate systems.
+
+    The boxes of all the entries of the file are concatenated and converted
+    at once. The updated file is written to a temporary file first, which
+    then replaces the output file. It is loaded back to check that a random
+    sample of its entries is the same as the entries updated one by one.
+
+    The file is still loaded and dumped as a whole, since the entries of a
+    pickle cannot be streamed without changing the format of the file.
+
+    Args:
+        pkl_file (str): Name of the info file.
+        root_dir (str): Directory of the input info file.
+        out_dir (str): Directory of the output info file.
+        kind (str): Kind of the info file, a key of :obj:`UPDATERS`.
+        num_verify (int, optional): Number of entries to verify.
+            Default: 100.
+
+    Returns:
+        int: Number of updated entries.
+    """
+    get_entries, update_entries, update_entry = UPDATERS[kind]
+    in_path = osp.join(root_dir, pkl_file)
+    out_path = osp.join(out_dir, pkl_file)
+    timer = mmcv.Timer()
+    data = mmcv.load(in_path)
+    entries = get_entries(data)
+    verify_inds = np.random.RandomState(0).choice(
+        len(entries), min(num_verify, len(entries)), replace=False)
+    expected = [copy.deepcopy(entries[i]) for i in verify_inds]
+    for entry in expected:
+        update_entry(entry)
+
+    update_entries(entries)
+    tmp_path = f'{out_path}.tmp'
+    mmcv.dump(data, tmp_path, 'pkl')
+    os.replace(tmp_path, out_path)
+    del data, entries
+
+    entries = get_entries(mmcv.load(out_path))
+    for i, entry in zip(verify_inds, expected):
+        _assert_equal(entries[i], entry, f'{pkl_file}[{i}]')
+    print(f'\n{in_path} is updated to {out_path} in '
+          f'{timer.since_start():.1f}s, {len(verify_inds)} of its '
+          f'{len(entries)} entries are verified.')
+    return len(entries)
+
+
+def _update_info_file_task(root_dir, out_dir, task):
+    pkl_file, kind = task
+    return update_info_file(pkl_file, root_dir, out_dir, kind)
+
+
+def update_data_coords(root_dir, out_dir, pkl_files, workers=4):
+    """Update info files to the refactored coordinate systems.
+
+    Args:
+        root_dir (str): Directory of the input info files.
+        out_dir (str): Directory of the output info files.
+        pkl_files (list[tuple[str]]): Names of the info files and their
+            kinds, see :func:`update_info_file`.
+        workers (int, optional): Number of processes updating the files in
+            parallel. Default: 4.
+    """
+    print(f'{[pkl_file for pkl_file, _ in pkl_files]} will be modified '
+          'because of the refactor of the coordinate systems.')
     if root_dir == out_dir:
         print(f'Warning, you are overwriting '
               f'the original data under {root_dir}.')
         time.sleep(3)
-    for pkl_file in pkl_files:
-        in_path = osp.join(root_dir, pkl_file)
-        print(f'Reading from input file: {in_path}.')
-        a = mmcv.load(in_path)
-        print('Start updating:')
-        for item in mmcv.track_iter_progress(a['infos']):
-            boxes = item['gt_boxes'].copy()
-            # swap l, w (or dx, dy)
-            item['gt_boxes'][:, 3] = boxes[:, 4]
-            item['gt_boxes'][:, 4] = boxes[:, 3]
-            # change yaw
-            item['gt_boxes'][:, 6] = -boxes[:, 6] - np.pi / 2
-            item['gt_boxes'][:, 6] = limit_period(
-                item['gt_boxes'][:, 6], period=np.pi * 2)
-
-        out_path = osp.join(out_dir, pkl_file)
-        print(f'Writing to output file: {out_path}.')
-        mmcv.dump(a, out_path, 'pkl')
+    mmcv.mkdir_or_exist(out_dir)
+    update_func = partial(_update_info_file_task, root_dir, out_dir)
+    if workers > 1 and len(pkl_files) > 1:
+        mmcv.track_parallel_progress(update_func, pkl_files,
+                                     min(workers, len(pkl_files)))
+    else:
+        for task in pkl_files:
+            update_func(task)
 
 
 parser = argparse.ArgumentParser(description='Arg parser for data coords '
@@ -108,49 +244,45 @@ parser.add_argument(
     default=None,
     required=False,
     help='name of info pkl')
-args = parser.parse_args()
+parser.add_argument(
+    '--workers',
+    type=int,
+    default=4,
+    help='number of processes updating the info files in parallel')
 
 if __name__ == '__main__':
+    args = parser.parse_args()
     if args.out_dir is None:
         args.out_dir = args.root_dir
+    pkl_files = []
     if args.dataset == 'kitti':
         # KITTI infos is in CAM coord sys (unchanged)
         # KITTI dbinfos is in LIDAR coord sys (changed)
         # so we only update dbinfos
-        pkl_files = ['kitti_dbinfos_train.pkl']
-        update_outdoor_dbinfos(
-            root_dir=args.root_dir, out_dir=args.out_dir, pkl_files=pkl_files)
+        pkl_files = [('kitti_dbinfos_train.pkl', 'outdoor_dbinfos')]
     elif args.dataset == 'nuscenes':
         # nuScenes infos is in LIDAR coord sys (changed)
         # nuScenes dbinfos is in LIDAR coord sys (changed)
         # so we update both infos and dbinfos
-        pkl_files = ['nuscenes_infos_val.pkl']
+        pkl_files = [('nuscenes_infos_val.pkl', 'nuscenes_or_lyft_infos')]
         if args.version != 'v1.0-mini':
-            pkl_files.append('nuscenes_infos_train.pkl')
+            pkl_files.append(
+                ('nuscenes_infos_train.pkl', 'nuscenes_or_lyft_infos'))
+            pkl_files.append(('nuscenes_dbinfos_train.pkl', 'outdoor_dbinfos'))
         else:
-            pkl_files.append('nuscenes_infos_train_tiny.pkl')
-        update_nuscenes_or_lyft_infos(
-            root_dir=args.root_dir, out_dir=args.out_dir, pkl_files=pkl_files)
-        if args.version != 'v1.0-mini':
-            pkl_files = ['nuscenes_dbinfos_train.pkl']
-            update_outdoor_dbinfos(
-                root_dir=args.root_dir,
-                out_dir=args.out_dir,
-                pkl_files=pkl_files)
+            pkl_files.append(
+                ('nuscenes_infos_train_tiny.pkl', 'nuscenes_or_lyft_infos'))
     elif args.dataset == 'lyft':
         # Lyft infos is in LIDAR coord sys (changed)
         # Lyft has no dbinfos
         # so we update infos
-        pkl_files = ['lyft_infos_train.pkl', 'lyft_infos_val.pkl']
-        update_nuscenes_or_lyft_infos(
-            root_dir=args.root_dir, out_dir=args.out_dir, pkl_files=pkl_files)
+        pkl_files = [('lyft_infos_train.pkl', 'nuscenes_or_lyft_infos'),
+                     ('lyft_infos_val.pkl', 'nuscenes_or_lyft_infos')]
     elif args.dataset == 'waymo':
         # Waymo infos is in CAM coord sys (unchanged)
         # Waymo dbinfos is in LIDAR coord sys (changed)
         # so we only update dbinfos
-        pkl_files = ['waymo_dbinfos_train.pkl']
-        update_outdoor_dbinfos(
-            root_dir=args.root_dir, out_dir=args.out_dir, pkl_files=pkl_files)
+        pkl_files = [('waymo_dbinfos_train.pkl', 'outdoor_dbinfos')]
     elif args.dataset == 'scannet':
         # ScanNet infos is in DEPTH coord sys (changed)
         # but bbox is without yaw
@@ -163,6 +295,8 @@ if __name__ == '__main__':
         # SUNRGBD infos is in DEPTH coord sys (changed)
         # and bbox is with yaw
         # so we update infos
-        pkl_files = ['sunrgbd_infos_train.pkl', 'sunrgbd_infos_val.pkl']
-        update_sunrgbd_infos(
-            root_dir=args.root_dir, out_dir=args.out_dir, pkl_files=pkl_files)
+        pkl_files = [('sunrgbd_infos_train.pkl', 'sunrgbd_infos'),
+                     ('sunrgbd_infos_val.pkl', 'sunrgbd_infos')]
+    if len(pkl_files) > 0:
+        update_data_coords(
+            args.root_dir, args.out_dir, pkl_files, workers=args.workers)